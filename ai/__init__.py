@@ -3,19 +3,23 @@ Capa de inteligencia artificial.
 Gestiona toda la interpretación, clasificación y generación de respuestas con GPT.
 """
 
-from .classifier import clasificar_mensaje
+from .classifier import clasificar_mensaje, clasificar_sin_gpt
 from .interpreter import interpretar_con_gpt
 from .response_generator import (
     generar_respuesta_natural,
     responder_conversacion,
+    responder_conversacion_async,
     generar_resumen_natural,
-    obtener_stats_historiales
+    obtener_stats_historiales,
+    obtener_stats_respuestas
 )
 from .query_analyzer import interpretar_consulta
+from .router import analizar_mensaje, analizar_sin_navegador, obtener_stats_enrutado
 
 __all__ = [
     # Classifier
     'clasificar_mensaje',
+    'clasificar_sin_gpt',
     
     # Interpreter
     'interpretar_con_gpt',
@@ -23,9 +27,16 @@ __all__ = [
     # Response Generator
     'generar_respuesta_natural',
     'responder_conversacion',
+    'responder_conversacion_async',
     'generar_resumen_natural',
     'obtener_stats_historiales',
+    'obtener_stats_respuestas',
     
     # Query Analyzer
-    'interpretar_consulta'
+    'interpretar_consulta',
+    
+    # Router (clasificación + interpretación en una llamada)
+    'analizar_mensaje',
+    'analizar_sin_navegador',
+    'obtener_stats_enrutado'
 ]
@@ -0,0 +1,130 @@
+"""
+Cache de interpretaciones de GPT.
+
+Los usuarios repiten las mismas frases ("cuántas horas llevo esta semana",
+"pon 8 horas en desarrollo hoy") y cada una costaba una llamada a GPT. Aquí se
+guarda el resultado ya validado de interpretar_con_gpt / interpretar_consulta
+(y del análisis unificado de ai/router.py) con clave:
+
+- texto normalizado (normalizar_texto: minúsculas, sin tildes ni signos)
+- fecha de hoy (las fechas relativas se resuelven respecto a ella)
+- huella del contexto que usa el prompt: la tabla actual y el proyecto del
+  contexto (solo comandos; las consultas no dependen de la tabla)
+
+Solo se guardan órdenes que han pasado validar_ordenes(): los errores de
+validación, la información incompleta y las preguntas se vuelven a
+interpretar. Expulsión por LRU (tamaño máximo) y TTL.
+"""
+
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from config import settings
+from .clasificador_local import normalizar_texto
+
+
+# Órdenes que genera validar_ordenes() en lugar de las de GPT: no se cachean
+_ACCIONES_VALIDACION = {"error_validacion", "info_incompleta", "leer_tabla_y_preguntar"}
+
+
+def es_resultado_validado(ordenes):
+    """True si `ordenes` es una lista de acciones ejecutables que pasó validar_ordenes()."""
+    return (
+        isinstance(ordenes, list) and bool(ordenes)
+        and not any(isinstance(o, dict) and o.get("accion") in _ACCIONES_VALIDACION for o in ordenes)
+    )
+
+
+def huella_contexto(tabla_actual=None, contexto=None):
+    """Hash corto de la tabla (proyecto + horas por día) y del proyecto en contexto."""
+    filas = sorted(
+        (p.get("proyecto", ""), sorted((p.get("horas") or {}).items()))
+        for p in (tabla_actual or [])
+    )
+    proyecto = (contexto or {}).get("proyecto_actual")
+    datos = json.dumps([filas, proyecto], ensure_ascii=False, default=str)
+    return hashlib.sha1(datos.encode("utf-8")).hexdigest()[:16]
+
+
+class CacheInterpretaciones:
+    """LRU con TTL de interpretaciones por (espacio, texto normalizado, fecha, huella)."""
+
+    ESPACIOS = ("comando", "consulta", "unificado")
+
+    def __init__(self, max_entradas: int = 2000, ttl_segundos: int = 1800):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # clave -> (vence, valor)
+        self.stats = {espacio: {"hits": 0, "misses": 0, "guardados": 0} for espacio in self.ESPACIOS}
+        self.stats_expulsiones = 0
+
+    @staticmethod
+    def clave(espacio, texto, huella=""):
+        return (espacio, normalizar_texto(texto), datetime.now().strftime("%Y-%m-%d"), huella)
+
+    def obtener(self, espacio, texto, huella=""):
+        """Copia del valor guardado o None."""
+        if not settings.USE_INTERPRETATION_CACHE:
+            return None
+        clave = self.clave(espacio, texto, huella)
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[0] < time.monotonic():
+                del self._entradas[clave]
+                entrada = None
+            if entrada is None:
+                self.stats[espacio]["misses"] += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.stats[espacio]["hits"] += 1
+        print(f"[CACHE-IA] ⚡ {espacio} servido desde cache: '{texto}'")
+        return copy.deepcopy(entrada[1])
+
+    def guardar(self, espacio, texto, valor, huella=""):
+        if not settings.USE_INTERPRETATION_CACHE:
+            return
+        clave = self.clave(espacio, texto, huella)
+        with self._lock:
+            self._entradas[clave] = (time.monotonic() + self.ttl_segundos, copy.deepcopy(valor))
+            self._entradas.move_to_end(clave)
+            self.stats[espacio]["guardados"] += 1
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.stats_expulsiones += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            hits = sum(s["hits"] for s in self.stats.values())
+            consultas = hits + sum(s["misses"] for s in self.stats.values())
+            return {
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "ttl_segundos": self.ttl_segundos,
+                "expulsiones": self.stats_expulsiones,
+                "hit_rate": round(hits / consultas, 3) if consultas else 0.0,
+                "por_tipo": {
+                    espacio: {
+                        **datos,
+                        "hit_rate": round(datos["hits"] / (datos["hits"] + datos["misses"]), 3)
+                        if datos["hits"] + datos["misses"] else 0.0,
+                    }
+                    for espacio, datos in self.stats.items()
+                },
+            }
+
+
+# Instancia global
+cache_interpretaciones = CacheInterpretaciones(
+    max_entradas=settings.INTERPRETATION_CACHE_SIZE,
+    ttl_segundos=settings.INTERPRETATION_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,141 @@
+"""
+Clasificador local de intenciones (sin GPT).
+
+Primer nivel de clasificar_mensaje(): reglas ponderadas de palabras clave y
+expresiones regulares en español. Cada regla que casa suma su peso a una
+categoría y la confianza sale de la ventaja de la mejor sobre la segunda.
+Para comando y consulta, una sola regla genérica (peso menor que
+_PESO_ESPECIFICO: "pon", "ver", "cuánto"...) no basta: hace falta un segundo
+rasgo, otra regla o vocabulario del dominio (horas, días, semana, proyecto...),
+para que "pon la radio" o "cuánto es 2+2" no se decidan sin GPT.
+Solo se usa su decisión cuando la confianza supera
+settings.LOCAL_CLASSIFIER_THRESHOLD; si no, se pregunta a GPT.
+
+Determinista y por debajo de 1 ms por mensaje. Benchmark de acierto y
+latencia: benchmarks/clasificador.py (corpus en benchmarks/datos/).
+"""
+
+import re
+import unicodedata
+
+
+CATEGORIAS = ("comando", "consulta", "conversacion", "ayuda")
+
+# (expresión sobre el texto normalizado, categoría, peso)
+_REGLAS = [
+    # ---------------- comando ----------------
+    (r"\b(imputa|imputame|imputale|imputalas|imputalo)\b", "comando", 3.0),
+    (r"\bimputar\b", "comando", 1.5),
+    (r"\b(pon|ponme|ponle|ponlas|pongas|mete|meteme|metele|anade|anademe|anadele|agrega|suma|sumale|sumame)\b", "comando", 2.5),
+    (r"\b(quita|quitame|quitale|resta|restame|restale|borra|borrame|borralas|elimina|eliminame|eliminalas)\b", "comando", 3.0),
+    (r"\b(cambia|cambiame|modifica|corrige|establece|sustituye|rellena|rellename|completa|completame)\b", "comando", 2.5),
+    (r"\b(inicia|iniciar|empieza|empezar|comienza|comenzar|finaliza|finalizar|termina|terminar|cierra|cerrar|ficha|fichar)\b.*\bjornada\b", "comando", 4.0),
+    (r"\b(inicio|fin|final)\s+de\s+(la\s+)?jornada\b", "comando", 3.0),
+    (r"\b(guarda|guardalo|guardalas|emite|emitir|emitelas|emitelo)\b", "comando", 3.0),
+    (r"\b(copia|copiame|copiar|repite|repetir|duplica)\b.*\bsemana\b", "comando", 4.0),
+    (r"\b\d+([.,]\d+)?\s*(h|hs|hora|horas)\b", "comando", 1.5),
+    (r"\btoda la semana\b", "comando", 1.0),
+    (r"\ben (el )?proyecto\b", "comando", 0.5),
+
+    # ---------------- consulta ----------------
+    (r"\b(resumen|resume|resumeme)\b", "consulta", 3.0),
+    (r"\bcuant[ao]s?\b", "consulta", 2.5),
+    (r"\b(que|cuales|cuanto)\s+(tengo|he|llevo|hay)\b", "consulta", 2.5),
+    (r"\b(tengo|llevo|he)\s+(imputad\w*|puest\w*|metid\w*|hech\w*)", "consulta", 2.5),
+    (r"\b(muestrame|muestra|ensename|ensena|ver|consulta|consultar|revisa|revisame)\b", "consulta", 2.5),
+    (r"\b(dime|dame)\b", "consulta", 1.0),
+    (r"\b(lista|listado|listar|listame)\b", "consulta", 2.0),
+    (r"\bproyectos\b", "consulta", 1.5),
+    (r"\b(que|cuales|en que)\s+proyectos\b", "consulta", 2.5),
+    (r"\bpuedo imputar\b", "consulta", 3.0),
+    (r"\b(como voy|como llevo|estado de)\b", "consulta", 2.5),
+
+    # ---------------- ayuda ----------------
+    (r"^(ayuda|help|comandos|menu|opciones)$", "ayuda", 6.0),
+    (r"\b(ayuda|ayudame|help)\b", "ayuda", 2.5),
+    (r"\bque (puedes|sabes) hacer\b", "ayuda", 4.0),
+    (r"\bcomo (funciona|funcionas|te uso|se usa|uso esto|va esto)\b", "ayuda", 4.0),
+    (r"\b(guia|instrucciones|tutorial|manual)\b", "ayuda", 3.0),
+    (r"\bque comandos\b", "ayuda", 4.0),
+
+    # ---------------- conversacion ----------------
+    (r"^(hola|holi|hey|buenas|buenos dias|buenas tardes|buenas noches|que tal|gracias|muchas gracias|adios|hasta luego|chao)\b", "conversacion", 1.5),
+    (r"\b(no veo|no encuentro|no aparece|no me aparece|no sale|donde esta)\b", "conversacion", 4.0),
+    (r"\b(quien es|quien fue|capital de|chiste|que tiempo|que opinas|que piensas|cuentame|como estas)\b", "conversacion", 3.5),
+    (r"\bgracias\b", "conversacion", 2.0),
+]
+
+_REGLAS_COMPILADAS = [(re.compile(patron), categoria, peso) for patron, categoria, peso in _REGLAS]
+
+# Peso a partir del cual una regla es propia del bot y decide sin más rasgos
+_PESO_ESPECIFICO = 3.0
+
+# Vocabulario del dominio: segundo rasgo de las reglas genéricas de comando y consulta
+_DOMINIO = re.compile(
+    r"\b(\d+(,\d+)?\s*(h|hs)|horas?|jornadas?|semanas?|mes|meses|dias?|hoy|ayer|manana|"
+    r"lunes|martes|miercoles|jueves|viernes|proyectos?|lineas?|imputad\w*|imputar|"
+    r"enero|febrero|marzo|abril|mayo|junio|julio|agosto|septiembre|octubre|noviembre|diciembre)\b"
+)
+
+# Mensajes que son SOLO un saludo / cortesía (lo que antes estaba fijo en clasificar_mensaje)
+_SOLO_SALUDO = re.compile(
+    r"^(hola|holi|hey|buenas|buenos dias|buenas tardes|buenas noches|que tal|"
+    r"gracias|muchas gracias|vale|ok|okey|perfecto|genial|adios|hasta luego|chao)"
+    r"( (hola|buenas|que tal|gracias|crack|tio))*$"
+)
+
+_PUNTUACION = re.compile(r"[¿?¡!.,;:()\"']")
+
+
+def normalizar_texto(texto):
+    """Minúsculas, sin tildes, sin signos de puntuación y con espacios simples."""
+    texto = unicodedata.normalize("NFD", (texto or "").lower())
+    texto = "".join(c for c in texto if unicodedata.category(c) != "Mn")
+    # Conservar los decimales ("7,5", "7.5") y quitar el resto de signos
+    texto = re.sub(r"(\d)[.,](\d)", r"\1#\2", texto)
+    texto = _PUNTUACION.sub(" ", texto).replace("#", ",")
+    return " ".join(texto.split())
+
+
+def clasificar_local(texto):
+    """
+    Clasifica el mensaje con las reglas ponderadas.
+
+    Args:
+        texto: Mensaje del usuario
+
+    Returns:
+        tuple: (categoria, confianza, puntuaciones)
+               categoria es None si ninguna regla ha casado; confianza en [0, 1)
+    """
+    normalizado = normalizar_texto(texto)
+    puntuaciones = dict.fromkeys(CATEGORIAS, 0.0)
+
+    if _SOLO_SALUDO.match(normalizado):
+        puntuaciones["conversacion"] += 6.0
+
+    casadas = {categoria: [] for categoria in CATEGORIAS}  # pesos de las reglas que casan
+    for patron, categoria, peso in _REGLAS_COMPILADAS:
+        if patron.search(normalizado):
+            puntuaciones[categoria] += peso
+            casadas[categoria].append(peso)
+
+    # Pregunta explícita sin verbo de acción: más probable consulta que comando
+    if "?" in (texto or "") and puntuaciones["comando"] < 2.5:
+        puntuaciones["consulta"] += 0.5
+
+    orden = sorted(puntuaciones.items(), key=lambda kv: kv[1], reverse=True)
+    (mejor, s1), (_, s2) = orden[0], orden[1]
+    if s1 <= 0:
+        return None, 0.0, puntuaciones
+
+    # Ventaja sobre la segunda, suavizada para que una sola regla débil no baste
+    confianza = (s1 - s2) / (s1 + 1.0)
+
+    # Una sola regla genérica de comando/consulta sin vocabulario del dominio
+    if mejor in ("comando", "consulta"):
+        rasgos = len(casadas[mejor]) + (1 if _DOMINIO.search(normalizado) else 0)
+        if rasgos < 2 and max(casadas[mejor], default=0.0) < _PESO_ESPECIFICO:
+            confianza /= 2
+
+    return mejor, round(confianza, 3), puntuaciones
@@ -1,11 +1,16 @@
 """
 Clasificador de mensajes de usuario usando GPT-4o-mini.
 Determina si un mensaje es un comando, consulta, conversación, ayuda o listar proyectos.
+
+Antes de GPT se prueba el clasificador local (ai/clasificador_local.py): si su
+confianza supera settings.LOCAL_CLASSIFIER_THRESHOLD se usa su respuesta.
 """
 
 from datetime import datetime
 from config import settings
 from config.constants import Constants
+from metricas import registrar_uso_openai
+from .clasificador_local import clasificar_local
 
 
 def clasificar_mensaje(texto):
@@ -24,21 +29,35 @@ def clasificar_mensaje(texto):
     Returns:
         str: 'comando', 'consulta', 'conversacion' o 'ayuda'
     """
-    print(f"[DEBUG] Clasificando con GPT: '{texto}'")
+    #  OPTIMIZACIÓN: Clasificador local (reglas ponderadas, < 1 ms) para los casos claros
+    categoria = clasificar_sin_gpt(texto)
+    if categoria:
+        return categoria
     
-    texto_lower = texto.lower().strip()
-    
-    #  OPTIMIZACIÓN: Casos ultra-obvios sin GPT (opcional, pero ahorra latencia)
-    # Solo los casos 100% seguros que no tienen ambigüedad
-    if texto_lower in ["ayuda", "help", "comandos"]:
-        print(f"[DEBUG]  Clasificación rápida: ayuda")
-        return "ayuda"
+    # Para todo lo demás, usar GPT
+    return clasificar_con_gpt(texto)
+
+
+def clasificar_sin_gpt(texto):
+    """
+    Solo el clasificador local: la categoría si su confianza supera
+    LOCAL_CLASSIFIER_THRESHOLD, None si hay que preguntar a un modelo.
+    """
+    if not settings.USE_LOCAL_CLASSIFIER:
+        return None
     
-    if texto_lower in ["hola", "buenos días", "buenas tardes", "buenas noches", "hey", "qué tal", "que tal"]:
-        print(f"[DEBUG] Clasificación rápida: conversacion")
-        return "conversacion"
+    categoria, confianza, _ = clasificar_local(texto)
+    if categoria and confianza >= settings.LOCAL_CLASSIFIER_THRESHOLD:
+        print(f"[DEBUG]  Clasificación local: {categoria} (confianza {confianza})")
+        return categoria
+    print(f"[DEBUG] Clasificación local dudosa ({categoria}, {confianza})")
+    return None
+
+
+def clasificar_con_gpt(texto):
+    """Clasificación con GPT-4o-mini, sin pasar por el clasificador local."""
+    print(f"[DEBUG] Clasificando con GPT: '{texto}'")
     
-    # Para todo lo demás, usar GPT
     hoy = datetime.now().strftime("%Y-%m-%d")
     dia_semana = datetime.now().strftime("%A")
 
@@ -123,6 +142,7 @@ Respuesta:"""
             temperature=0,
             max_tokens=15
         )
+        registrar_uso_openai(response, "clasificar")
 
         clasificacion = response.choices[0].message.content.strip().lower()
         
@@ -0,0 +1,99 @@
+"""
+Clientes OpenAI compartidos por todo el proceso.
+
+settings.get_openai_client() creaba un OpenAI nuevo en cada llamada, y con él
+un pool HTTP nuevo y otro handshake TLS. Aquí se crea UNA vez (perezosamente)
+un cliente síncrono y uno asíncrono (AsyncOpenAI, para llamar desde el event
+loop de FastAPI sin ocupar threads del executor), con conexiones keep-alive,
+timeouts y reintentos configurables en settings.
+
+Con LLM_MODE "record" o "replay" el transporte HTTP de ambos clientes pasa
+por ai/transporte_llm.py (respuestas grabadas en disco).
+"""
+
+import threading
+
+import httpx
+from openai import OpenAI, AsyncOpenAI
+
+from ai.transporte_llm import obtener_almacen, TransporteGrabacion, TransporteGrabacionAsync
+from config import settings
+
+
+def _limites():
+    return httpx.Limits(
+        max_connections=settings.OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.OPENAI_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout():
+    return httpx.Timeout(settings.OPENAI_TIMEOUT_SECONDS, connect=settings.OPENAI_CONNECT_TIMEOUT)
+
+
+def _http_client():
+    almacen = obtener_almacen()
+    if almacen is None:
+        return httpx.Client(limits=_limites(), timeout=_timeout())
+    transporte = TransporteGrabacion(almacen, httpx.HTTPTransport(limits=_limites()))
+    return httpx.Client(transport=transporte, timeout=_timeout())
+
+
+def _http_client_async():
+    almacen = obtener_almacen()
+    if almacen is None:
+        return httpx.AsyncClient(limits=_limites(), timeout=_timeout())
+    transporte = TransporteGrabacionAsync(almacen, httpx.AsyncHTTPTransport(limits=_limites()))
+    return httpx.AsyncClient(transport=transporte, timeout=_timeout())
+
+
+class GestorClienteOpenAI:
+    """Un OpenAI y un AsyncOpenAI por proceso, creados la primera vez que se piden."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cliente = None
+        self._cliente_async = None
+
+    def obtener(self) -> OpenAI:
+        if self._cliente is None:
+            with self._lock:
+                if self._cliente is None:
+                    self._cliente = OpenAI(
+                        api_key=settings.OPENAI_API_KEY,
+                        base_url=settings.OPENAI_BASE_URL,
+                        timeout=_timeout(),
+                        max_retries=settings.OPENAI_MAX_RETRIES,
+                        http_client=_http_client(),
+                    )
+                    print("[OPENAI] 🔌 Cliente compartido creado")
+        return self._cliente
+
+    def obtener_async(self) -> AsyncOpenAI:
+        if self._cliente_async is None:
+            with self._lock:
+                if self._cliente_async is None:
+                    self._cliente_async = AsyncOpenAI(
+                        api_key=settings.OPENAI_API_KEY,
+                        base_url=settings.OPENAI_BASE_URL,
+                        timeout=_timeout(),
+                        max_retries=settings.OPENAI_MAX_RETRIES,
+                        http_client=_http_client_async(),
+                    )
+                    print("[OPENAI] 🔌 Cliente asíncrono compartido creado")
+        return self._cliente_async
+
+    async def cerrar(self):
+        """Cierra las conexiones de ambos clientes (al apagar el servidor)."""
+        with self._lock:
+            cliente, cliente_async = self._cliente, self._cliente_async
+            self._cliente = self._cliente_async = None
+        if cliente is not None:
+            cliente.close()
+        if cliente_async is not None:
+            await cliente_async.close()
+
+
+# Instancia global
+gestor_openai = GestorClienteOpenAI()
@@ -9,6 +9,9 @@ CORRECCIÓN APLICADA:
 import json
 from datetime import datetime
 from config import settings
+from config.constants import Constants
+from metricas import registrar_uso_openai
+from .cache_interpretaciones import cache_interpretaciones, huella_contexto, es_resultado_validado
 
 
 def validar_ordenes(ordenes, texto, contexto=None):
@@ -164,14 +167,15 @@ def validar_ordenes(ordenes, texto, contexto=None):
     return None
 
 
-def interpretar_con_gpt(texto, contexto=None, tabla_actual=None, historial=None):
-
+def construir_prompt_comandos(texto, contexto, tabla_actual=None, historial=None):
+    """
+    Prompt de interpretación de comandos (lo reutiliza el modo unificado de
+    ai/router.py). Guarda la tabla en `contexto` para validar_ordenes().
+    """
     hoy = datetime.now().strftime("%Y-%m-%d")
     dia_semana = datetime.now().strftime("%A")
 
     #  Pasar tabla al contexto para que validar_ordenes pueda usarla
-    if contexto is None:
-        contexto = {}
     if tabla_actual:
         contexto["tabla_actual"] = tabla_actual
 
@@ -185,7 +189,9 @@ def interpretar_con_gpt(texto, contexto=None, tabla_actual=None, historial=None)
 
             # Mostrar solo días con horas > 0
             dias_con_horas = []
-            for dia, valor in horas.items():
+            # Recorrer solo L-V (DIAS_KEYS repite miércoles con y sin acento)
+            for dia in Constants.DIAS_NOMBRES:
+                valor = horas.get(dia, 0)
                 if valor > 0:
                     dias_con_horas.append(f"{dia.capitalize()}: {valor}h")
 
@@ -665,6 +671,57 @@ OUTPUT: SOLO JSON, SIN TEXTO ADICIONAL
 ====================================================
 Frase del usuario: "{texto}"
 """
+    return prompt
+
+
+def procesar_ordenes(data, texto, contexto):
+    """
+    Normaliza y valida el JSON de órdenes devuelto por GPT.
+    
+    Returns:
+        list: Órdenes listas para ejecutar, o la orden de error/info incompleta de validar_ordenes()
+    """
+    hoy = datetime.now().strftime("%Y-%m-%d")
+
+    # Si devuelve un solo objeto, lo convertimos a lista
+    if isinstance(data, dict):
+        data = [data]
+
+    #  VALIDACIÓN POST-GPT: Asegurar que imputar_horas_dia SIEMPRE tenga 'dia'
+    for orden in data:
+        if orden.get("accion") == "imputar_horas_dia":
+            parametros = orden.get("parametros", {})
+            # Si no tiene 'dia', usar hoy por defecto
+            if "dia" not in parametros or not parametros.get("dia"):
+                parametros["dia"] = hoy
+                orden["parametros"] = parametros
+                print(f"[DEBUG]  GPT omitió 'dia' en imputar_horas_dia, usando hoy: {hoy}")
+
+    #  VALIDAR que las órdenes tengan sentido
+    resultado_validacion = validar_ordenes(data, texto, contexto)
+    if resultado_validacion:
+        # Si devuelve algo, es porque hay error o info incompleta
+        print(f"[DEBUG]  Comando requiere atención: {texto}")
+        return resultado_validacion
+
+    return data
+
+
+def interpretar_con_gpt(texto, contexto=None, tabla_actual=None, historial=None):
+    if contexto is None:
+        contexto = {}
+
+    #  Frase ya interpretada hoy con la misma tabla → sin GPT
+    # (con historial la interpretación depende de la conversación: no se cachea)
+    huella = huella_contexto(tabla_actual, contexto)
+    if not historial:
+        en_cache = cache_interpretaciones.obtener("comando", texto, huella)
+        if en_cache is not None:
+            if tabla_actual:
+                contexto["tabla_actual"] = tabla_actual
+            return en_cache
+
+    prompt = construir_prompt_comandos(texto, contexto, tabla_actual, historial)
 
     try:
         client = settings.get_openai_client()  #  Necesario para usar la API
@@ -677,6 +734,7 @@ Frase del usuario: "{texto}"
             ],
             temperature=0
         )
+        registrar_uso_openai(response, "interpretar")
 
         raw = response.choices[0].message.content.strip()
         print(f"[DEBUG]  GPT generó: {raw}")
@@ -689,29 +747,10 @@ Frase del usuario: "{texto}"
             print(f"[DEBUG]  JSON limpio: {raw}")
 
         data = json.loads(raw)
-
-        # Si devuelve un solo objeto, lo convertimos a lista
-        if isinstance(data, dict):
-            data = [data]
-
-        #  VALIDACIÓN POST-GPT: Asegurar que imputar_horas_dia SIEMPRE tenga 'dia'
-        for orden in data:
-            if orden.get("accion") == "imputar_horas_dia":
-                parametros = orden.get("parametros", {})
-                # Si no tiene 'dia', usar hoy por defecto
-                if "dia" not in parametros or not parametros.get("dia"):
-                    parametros["dia"] = hoy
-                    orden["parametros"] = parametros
-                    print(f"[DEBUG]  GPT omitió 'dia' en imputar_horas_dia, usando hoy: {hoy}")
-
-        #  VALIDAR que las órdenes tengan sentido
-        resultado_validacion = validar_ordenes(data, texto, contexto)
-        if resultado_validacion:
-            # Si devuelve algo, es porque hay error o info incompleta
-            print(f"[DEBUG]  Comando requiere atención: {texto}")
-            return resultado_validacion
-
-        return data
+        ordenes = procesar_ordenes(data, texto, contexto)
+        if not historial and es_resultado_validado(ordenes):
+            cache_interpretaciones.guardar("comando", texto, ordenes, huella)
+        return ordenes
 
     except Exception as e:
         print(f"[DEBUG] Error interpretando comando: {e}")
@@ -0,0 +1,175 @@
+"""
+Respuestas deterministas para los resultados habituales de un comando.
+
+ejecutar_accion() ya devuelve frases completas ("He imputado 8.0h el lunes en
+el proyecto X [FECHA:12/01/2026]", "He guardado los cambios"...). Pedirle a GPT
+que las reformule costaba una llamada por comando. Aquí se reconocen los
+resultados conocidos (fecha, proyecto, imputar, semana, borrar, guardar,
+emitir, jornada, eliminar, copiar) y se montan con plantillas, manteniendo
+la jerarquía del proyecto (departamento y cliente) de parsear_path_proyecto.
+
+Si aparece algún mensaje que no encaja (errores, combinaciones raras),
+renderizar_respuesta() devuelve None y generar_respuesta_natural() decide si
+usar GPT (settings.RESPONSE_GPT_FALLBACK).
+"""
+
+import re
+
+from utils.proyecto_utils import parsear_path_proyecto, formatear_proyecto_para_respuesta
+
+
+_FECHA = re.compile(r"\s*\[FECHA:(\d{2}/\d{2}/\d{4})\]")
+
+# (tipo, expresión sobre el mensaje ya sin [FECHA:...])
+_PATRONES = [
+    ("fecha", re.compile(r"^(?:He seleccionado la fecha|Ya estás en la semana del) (?P<fecha>\d{2}/\d{2}/\d{4})$")),
+    ("proyecto", re.compile(r"^He (?:abierto el proyecto|seleccionado) '(?P<nombre>[^']+)'(?: de '(?P<padre>[^']+)')?$")),
+    ("imputar", re.compile(
+        r"^He (?P<verbo>imputado|establecido|añadido|restado) (?P<horas>-?[\d.]+)h el (?P<dia>\S+)"
+        r"(?: en el proyecto (?P<proyecto>.+?))?(?: \(total: (?P<total>[\d.]+)h\))?$"
+    )),
+    ("semana", re.compile(
+        r"^He imputado (?:en el proyecto (?P<proyecto>.+?))?: (?P<dias>[^\n]+)(?:\n⏭️ Omitidos: (?P<omitidos>.+))?$"
+    )),
+    ("borrar", re.compile(r"^He borrado las horas del (?P<dia>\S+) en: (?P<proyectos>.+)$")),
+    ("sin_borrar", re.compile(r"^No había horas que borrar el (?P<dia>\S+)$")),
+    ("guardar", re.compile(r"^He guardado los cambios$")),
+    ("emitir", re.compile(r"^He emitido las horas correctamente$")),
+    ("jornada", re.compile(r"^(?:He (?:iniciado|finalizado) tu jornada laboral|Tu jornada ya estaba (?:iniciada|finalizada))$")),
+    ("eliminar", re.compile(r"^He eliminado la línea del proyecto '(?P<nombre>[^']+)'$")),
+    ("copiar", re.compile(r"^He copiado \d+ proyecto\(s\) de la semana pasada:", re.S)),
+]
+
+
+def _horas(valor):
+    """'8.0' → '8', '7.50' → '7.5'."""
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        return valor
+    return f"{numero:g}"
+
+
+def _cuando(dia, fecha):
+    """'el lunes 12/01' (o 'el lunes' si no hay fecha)."""
+    return f"el {dia} {fecha[:5]}" if fecha else f"el {dia}"
+
+
+def _etiqueta_proyecto(nombre, contexto):
+    """Nombre del proyecto con departamento y cliente si el contexto los conoce."""
+    contexto = contexto or {}
+    nombre = (nombre or "").strip() or contexto.get("proyecto_actual") or ""
+    clave = nombre.lower()
+
+    path_completo = contexto.get("path_completo_actual")
+    if path_completo:
+        info = parsear_path_proyecto(path_completo)
+        if clave and (clave in info["nombre"].lower() or info["nombre"].lower() in clave):
+            return formatear_proyecto_para_respuesta(path_completo)
+
+    nodo_padre = contexto.get("nodo_padre_actual")
+    proyecto_actual = (contexto.get("proyecto_actual") or "").lower()
+    if nodo_padre and nodo_padre != "__buscar__" and clave and clave == proyecto_actual:
+        return f"{nombre} de {nodo_padre}"
+
+    return nombre
+
+
+def _clasificar(mensaje):
+    """(tipo, campos) del resultado o None si no es un resultado conocido."""
+    if not isinstance(mensaje, str):
+        return None
+    fecha = None
+    encontrada = _FECHA.search(mensaje)
+    if encontrada:
+        fecha = encontrada.group(1)
+        mensaje = _FECHA.sub("", mensaje)
+    mensaje = mensaje.strip()
+
+    for tipo, patron in _PATRONES:
+        casa = patron.match(mensaje)
+        if casa:
+            campos = casa.groupdict()
+            campos["fecha_accion"] = fecha
+            campos["mensaje"] = mensaje
+            return tipo, campos
+    return None
+
+
+def _frase(tipo, campos, contexto):
+    if tipo == "imputar":
+        verbo, horas = campos["verbo"], _horas(campos["horas"])
+        proyecto = _etiqueta_proyecto(campos["proyecto"], contexto)
+        cuando = _cuando(campos["dia"], campos["fecha_accion"])
+        destino = ""
+        if proyecto:
+            destino = f" de {proyecto}" if verbo == "restado" else f" en {proyecto}"
+        total = f" (total: {_horas(campos['total'])}h)" if campos["total"] else ""
+        return f"He {verbo} {horas}h{destino} {cuando}{total}"
+
+    if tipo == "semana":
+        proyecto = _etiqueta_proyecto(campos["proyecto"], contexto)
+        destino = f" en {proyecto}" if proyecto else ""
+        frase = f"He imputado la semana{destino}: {campos['dias']}"
+        if campos["omitidos"]:
+            frase += f"\n⏭️ Omitidos: {campos['omitidos']}"
+        return frase
+
+    if tipo == "borrar":
+        return f"He borrado las horas d{_cuando(campos['dia'], campos['fecha_accion'])} en: {campos['proyectos']}"
+
+    if tipo == "proyecto":
+        return f"He abierto {_etiqueta_proyecto(campos['nombre'], contexto)}"
+
+    if tipo == "eliminar":
+        return f"He eliminado la línea de {_etiqueta_proyecto(campos['nombre'], contexto)}"
+
+    # fecha, sin_borrar, jornada, copiar: el mensaje original ya es la respuesta
+    return campos["mensaje"]
+
+
+def renderizar_respuesta(acciones_ejecutadas, contexto=None):
+    """
+    Monta la respuesta de un comando sin llamar a GPT.
+
+    Args:
+        acciones_ejecutadas: Mensajes devueltos por ejecutar_accion()
+        contexto: Contexto de la sesión (path_completo_actual, nodo_padre_actual...)
+
+    Returns:
+        str o None: None si algún mensaje no es un resultado conocido
+    """
+    resultados = []
+    for mensaje in acciones_ejecutadas:
+        clasificado = _clasificar(mensaje)
+        if clasificado is None:
+            return None
+        resultados.append(clasificado)
+
+    if not resultados:
+        return None
+
+    tipos = {tipo for tipo, _ in resultados}
+    frases = [_frase(tipo, campos, contexto) for tipo, campos in resultados
+              if tipo not in ("fecha", "proyecto", "guardar", "emitir")]
+
+    # Seleccionar fecha/proyecto solo se cuenta si es lo único que se ha hecho
+    if not frases:
+        frases = [_frase(tipo, campos, contexto) for tipo, campos in resultados if tipo in ("fecha", "proyecto")]
+
+    cierre = []
+    if "guardar" in tipos:
+        cierre.append("guardado")
+    if "emitir" in tipos:
+        cierre.append("emitido")
+
+    if frases:
+        respuesta = "✅ " + "\n".join(frases)
+        if cierre:
+            respuesta += f"\n💾 Todo {' y '.join(cierre)}."
+    elif cierre:
+        respuesta = f"✅ He {' y '.join(cierre)} los cambios."
+    else:
+        return None
+
+    return respuesta
@@ -8,19 +8,12 @@ Extrae fechas y tipo de consulta (día, semana o mes).
 import json
 from datetime import datetime, timedelta
 from config import settings
+from metricas import registrar_uso_openai
+from .cache_interpretaciones import cache_interpretaciones
 
 
-def interpretar_consulta(texto):
-    """
-    Interpreta consultas sobre horas imputadas o proyectos disponibles.
-    
-    Args:
-        texto: Consulta del usuario
-        
-    Returns:
-        dict: {'fecha': 'YYYY-MM-DD', 'tipo': 'dia'|'semana'|'mes'|'listar_proyectos'} o None
-              Para tipo='mes', fecha es el primer día del mes consultado
-    """
+def construir_prompt_consulta(texto):
+    """Prompt de interpretación de consultas (lo reutiliza el modo unificado de ai/router.py)."""
     hoy = datetime.now().strftime("%Y-%m-%d")
     hoy_obj = datetime.now()
     dia_semana = hoy_obj.strftime("%A")
@@ -164,6 +157,25 @@ Ejemplos completos:
 Devuelve SOLO el JSON, sin texto adicional.
 
 Respuesta:"""
+    return prompt
+
+
+def interpretar_consulta(texto):
+    """
+    Interpreta consultas sobre horas imputadas o proyectos disponibles.
+    
+    Args:
+        texto: Consulta del usuario
+        
+    Returns:
+        dict: {'fecha': 'YYYY-MM-DD', 'tipo': 'dia'|'semana'|'mes'|'listar_proyectos'} o None
+              Para tipo='mes', fecha es el primer día del mes consultado
+    """
+    en_cache = cache_interpretaciones.obtener("consulta", texto)
+    if en_cache is not None:
+        return en_cache
+    
+    prompt = construir_prompt_consulta(texto)
     
     try:
         client = settings.get_openai_client()
@@ -175,6 +187,7 @@ Respuesta:"""
             ],
             temperature=0
         )
+        registrar_uso_openai(response, "consulta")
         
         raw = response.choices[0].message.content.strip()
         
@@ -189,6 +202,8 @@ Respuesta:"""
         
         data = json.loads(raw)
         
+        if isinstance(data, dict) and data.get("tipo"):
+            cache_interpretaciones.guardar("consulta", texto, data)
         return data
     
     except json.JSONDecodeError as e:
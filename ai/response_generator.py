@@ -5,18 +5,51 @@ Incluye conversación general y confirmación de acciones ejecutadas.
  MODIFICADO: Ahora incluye departamento y cliente en las respuestas
 """
 
+import threading
+import time
 from datetime import datetime
 from config import settings
+from metricas import registrar_uso_openai
 from utils.proyecto_utils import parsear_path_proyecto
+from .plantillas_respuesta import renderizar_respuesta
 
 
 #  Historial conversacional POR USUARIO (antes era global)
 historiales_conversacion = {}  # user_id -> lista de mensajes
 
+#  Cómo se ha generado cada respuesta de comando y cuánto ha tardado
+_stats_respuestas_lock = threading.Lock()
+_stats_respuestas = {
+    via: {"respuestas": 0, "tiempo_total_ms": 0.0}
+    for via in ("plantilla", "gpt", "sin_gpt")
+}
+
+
+def _medir_respuesta(via, inicio):
+    with _stats_respuestas_lock:
+        _stats_respuestas[via]["respuestas"] += 1
+        _stats_respuestas[via]["tiempo_total_ms"] += (time.perf_counter() - inicio) * 1000
+
+
+def obtener_stats_respuestas():
+    """Respuestas de comandos por vía (plantilla / gpt / sin_gpt) y latencia media."""
+    with _stats_respuestas_lock:
+        return {
+            via: {
+                "respuestas": datos["respuestas"],
+                "media_ms": round(datos["tiempo_total_ms"] / datos["respuestas"], 2) if datos["respuestas"] else 0.0,
+            }
+            for via, datos in _stats_respuestas.items()
+        }
+
 
 def generar_respuesta_natural(acciones_ejecutadas, entrada_usuario, contexto=None):
     """
-    Usa GPT para generar una respuesta natural basada en las acciones ejecutadas.
+    Genera la respuesta a un comando a partir de las acciones ejecutadas.
+    
+    Los resultados habituales se montan con plantillas (plantillas_respuesta.py)
+    sin llamar a GPT; solo las combinaciones que no encajan van a GPT, y solo
+    si settings.RESPONSE_GPT_FALLBACK está activo.
     
     Args:
         acciones_ejecutadas: Lista de mensajes de acciones completadas
@@ -29,6 +62,13 @@ def generar_respuesta_natural(acciones_ejecutadas, entrada_usuario, contexto=Non
     if not acciones_ejecutadas:
         return "No he entendido qué quieres que haga. ¿Podrías reformularlo?"
     
+    inicio = time.perf_counter()
+    if settings.USE_RESPONSE_TEMPLATES:
+        respuesta = renderizar_respuesta(acciones_ejecutadas, contexto)
+        if respuesta:
+            _medir_respuesta("plantilla", inicio)
+            return respuesta
+    
     #  Extraer fechas de cada acción y limpiar mensajes
     # Ahora mantenemos la fecha asociada a cada acción
     import re
@@ -50,6 +90,10 @@ def generar_respuesta_natural(acciones_ejecutadas, entrada_usuario, contexto=Non
         else:
             acciones_con_fecha.append(acc_limpia)
     
+    if not settings.RESPONSE_GPT_FALLBACK:
+        _medir_respuesta("sin_gpt", inicio)
+        return "\n".join(acciones_con_fecha)
+    
     # Crear resumen de acciones
     resumen_acciones = "\n".join([f"- {acc}" for acc in acciones_con_fecha])
     
@@ -121,8 +165,10 @@ Respuesta:"""
             temperature=0.7,
             max_tokens=150
         )
+        registrar_uso_openai(response, "respuesta")
         
         respuesta = response.choices[0].message.content.strip()
+        _medir_respuesta("gpt", inicio)
         return respuesta
     
     except Exception as e:
@@ -130,18 +176,8 @@ Respuesta:"""
         return " · ".join(acciones_con_fecha)
 
 
-def responder_conversacion(texto, user_id="default"):
-    """
-    Usa GPT para responder a saludos, preguntas generales, etc.
-    Mantiene contexto de la conversación POR USUARIO.
-    
-    Args:
-        texto: Mensaje del usuario
-        user_id: ID del usuario (requerido para mantener contexto separado)
-        
-    Returns:
-        str: Respuesta conversacional natural
-    """
+def _preparar_conversacion(texto, user_id):
+    """Añade el mensaje al historial del usuario y devuelve (mensajes para GPT, historial)."""
     global historiales_conversacion
     
     #  Crear historial para este usuario si no existe
@@ -181,23 +217,67 @@ Hoy es {hoy} ({dia_semana}).
 Estás en medio de una conversación. NO te presentes de nuevo, NO saludes, solo responde a la pregunta de forma natural y directa.
 Si te pregunta sobre algo externo (noticias, clima, información general), responde normalmente."""
     
+    mensajes = [{"role": "system", "content": system_content}] + historial_usuario
+    return mensajes, historial_usuario
+
+
+def _guardar_respuesta_conversacion(user_id, historial_usuario, respuesta):
+    # Añadir respuesta al historial del usuario
+    historial_usuario.append({"role": "assistant", "content": respuesta})
+    historiales_conversacion[user_id] = historial_usuario
+
+
+def responder_conversacion(texto, user_id="default"):
+    """
+    Usa GPT para responder a saludos, preguntas generales, etc.
+    Mantiene contexto de la conversación POR USUARIO.
+    
+    Args:
+        texto: Mensaje del usuario
+        user_id: ID del usuario (requerido para mantener contexto separado)
+        
+    Returns:
+        str: Respuesta conversacional natural
+    """
+    mensajes, historial_usuario = _preparar_conversacion(texto, user_id)
+    
     try:
         client = settings.get_openai_client()
         response = client.chat.completions.create(
             model=settings.OPENAI_MODEL_MINI,
-            messages=[
-                {"role": "system", "content": system_content}
-            ] + historial_usuario,
+            messages=mensajes,
             temperature=0.7,
             max_tokens=200
         )
+        registrar_uso_openai(response, "conversacion")
         
         respuesta = response.choices[0].message.content.strip()
+        _guardar_respuesta_conversacion(user_id, historial_usuario, respuesta)
+        return respuesta
+    
+    except Exception as e:
+        return "Disculpa, he tenido un problema al procesar tu mensaje. ¿Podrías intentarlo de nuevo?"
+
+
+async def responder_conversacion_async(texto, user_id="default"):
+    """
+    Igual que responder_conversacion() pero con el cliente asíncrono: se
+    espera desde el event loop sin ocupar un thread del executor.
+    """
+    mensajes, historial_usuario = _preparar_conversacion(texto, user_id)
+    
+    try:
+        client = settings.get_async_openai_client()
+        response = await client.chat.completions.create(
+            model=settings.OPENAI_MODEL_MINI,
+            messages=mensajes,
+            temperature=0.7,
+            max_tokens=200
+        )
+        registrar_uso_openai(response, "conversacion")
         
-        # Añadir respuesta al historial del usuario
-        historial_usuario.append({"role": "assistant", "content": respuesta})
-        historiales_conversacion[user_id] = historial_usuario
-        
+        respuesta = response.choices[0].message.content.strip()
+        _guardar_respuesta_conversacion(user_id, historial_usuario, respuesta)
         return respuesta
     
     except Exception as e:
@@ -0,0 +1,299 @@
+"""
+Enrutado y análisis de un mensaje en una sola pasada.
+
+Antes un comando costaba clasificar_mensaje (GPT-4o-mini) + interpretar_con_gpt
+(GPT-4o), una consulta clasificar_mensaje + interpretar_consulta, y en WhatsApp
+el texto se clasificaba dos veces (en el webhook y al procesarlo).
+
+analizar_mensaje() hace normalmente UNA llamada al modelo por mensaje:
+- Tipo ya conocido (clasificado en el webhook) o decidido por el clasificador
+  local → solo la interpretación que ese tipo necesita (ninguna para ayuda y
+  conversación).
+- Tipo dudoso → una única llamada en modo JSON que devuelve el tipo y, en la
+  misma respuesta, las órdenes o los parámetros de la consulta. Si el
+  clasificador local se inclina por "comando" (aunque no llegue al umbral) la
+  tabla del navegador va ya en ese prompt. Si no, solo se lee cuando resulta
+  ser un comando, y las órdenes se reinterpretan con ella (segunda llamada)
+  únicamente si el mensaje depende de las líneas que hay (copiar, duplicar,
+  repartir...).
+
+En WhatsApp el mensaje dudoso se analiza en el webhook sin tocar el navegador
+(analizar_sin_navegador): conversación y ayuda se responden sin sesión y el
+resto del análisis viaja al procesado (analizar_mensaje(previo=...)).
+"""
+
+import json
+import re
+import threading
+
+from config import settings, Constants
+from metricas import medir, registrar_uso_openai
+from .classifier import clasificar_sin_gpt, clasificar_con_gpt
+from .clasificador_local import clasificar_local
+from .interpreter import construir_prompt_comandos, procesar_ordenes, interpretar_con_gpt
+from .query_analyzer import construir_prompt_consulta, interpretar_consulta
+from .cache_interpretaciones import cache_interpretaciones, huella_contexto, es_resultado_validado
+
+
+CATEGORIAS = ("comando", "consulta", "conversacion", "ayuda")
+
+# Órdenes que se calculan a partir de las líneas que ya hay en la tabla
+_DEPENDE_DE_TABLA = re.compile(
+    r"\b(copi\w*|duplic\w*|tripli\w*|doble|triple|mitad|mism[oa]s?|igual\w*|"
+    r"repart\w*|distribu\w*|proporcional\w*|resto|lo que (ya )?(tengo|hay))\b"
+)
+
+_stats_lock = threading.Lock()
+_stats = {"previo": 0, "local": 0, "cache": 0, "unificado": 0, "separado": 0, "fallos_unificado": 0}
+
+
+def _contar(clave):
+    with _stats_lock:
+        _stats[clave] += 1
+
+
+def obtener_stats_enrutado():
+    """Cuántos mensajes se han resuelto por cada vía."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _inclinacion_local(texto):
+    """Categoría del clasificador local aunque no llegue al umbral (None si no hay)."""
+    if not settings.USE_LOCAL_CLASSIFIER:
+        return None
+    return clasificar_local(texto)[0]
+
+
+def _depende_de_tabla(texto):
+    return bool(_DEPENDE_DE_TABLA.search(Constants.normalizar_texto(texto)))
+
+
+def _leer_tabla(obtener_tabla):
+    if obtener_tabla is None:
+        return None
+    try:
+        return obtener_tabla()
+    except Exception as e:
+        print(f"[DEBUG]  No se pudo leer la tabla: {e}")
+        return None
+
+
+def _prompt_unificado(texto, contexto, tabla_actual):
+    return f"""Analiza el mensaje de un usuario de un bot de imputación de horas y responde con UN objeto JSON:
+
+{{
+  "tipo": "comando" | "consulta" | "conversacion" | "ayuda",
+  "ordenes": [...],   (solo si tipo = "comando": el array de acciones de la SECCIÓN A)
+  "consulta": {{...}}   (solo si tipo = "consulta": el objeto de la SECCIÓN B)
+}}
+
+TIPOS:
+- "comando" → quiere EJECUTAR algo: imputar, modificar o borrar horas, iniciar/finalizar jornada,
+  guardar, emitir, copiar la semana pasada.
+- "consulta" → quiere VER horas imputadas (día, semana o mes) o la lista de proyectos disponibles.
+- "conversacion" → saludos, temas ajenos a las horas, o "no veo X" / "dónde está X" / "no encuentro X".
+- "ayuda" → pregunta cómo usar el bot o qué puede hacer.
+- "horas" para ver/mostrar → consulta; para poner/añadir/cambiar → comando.
+
+Las secciones A y B dicen "devuelve solo el array" / "solo el JSON": aquí ese valor va DENTRO del
+objeto, en "ordenes" o en "consulta". Para "conversacion" y "ayuda" basta con {{"tipo": ...}}.
+
+==================== SECCIÓN A: COMANDOS ====================
+{construir_prompt_comandos(texto, contexto, tabla_actual)}
+
+==================== SECCIÓN B: CONSULTAS ====================
+{construir_prompt_consulta(texto)}
+
+==================== RESPUESTA ====================
+Devuelve SOLO el objeto JSON con "tipo" (y "ordenes" o "consulta" si corresponde) para el mensaje: "{texto}"
+"""
+
+
+def _completar_comando(texto, contexto, obtener_tabla, ordenes):
+    """
+    Órdenes de un mensaje que el análisis unificado (sin tabla) ha clasificado como comando.
+
+    Solo aquí se lee la tabla. Las órdenes del análisis unificado valen salvo que
+    el mensaje dependa de las líneas que ya hay (_depende_de_tabla): solo entonces,
+    y si la tabla tiene líneas, se vuelven a interpretar con ella
+    (interpretar_con_gpt, con su cache).
+    """
+    tabla_actual = _leer_tabla(obtener_tabla)
+    if not (isinstance(ordenes, (list, dict)) and ordenes) or (tabla_actual and _depende_de_tabla(texto)):
+        return interpretar_con_gpt(texto, contexto, tabla_actual)
+
+    if tabla_actual:
+        contexto["tabla_actual"] = tabla_actual  # validar_ordenes() la usa
+    ordenes = procesar_ordenes(ordenes, texto, contexto)
+    if es_resultado_validado(ordenes):
+        # Lo mismo que habría devuelto interpretar_con_gpt con esta tabla
+        cache_interpretaciones.guardar("comando", texto, ordenes, huella_contexto(tabla_actual, contexto))
+    return ordenes
+
+
+def _analizar_unificado(texto, contexto, obtener_tabla, sin_navegador=False):
+    """
+    Una sola llamada: tipo + órdenes/consulta. None si falla (se usa el flujo separado).
+
+    Leer la tabla toma el lock del navegador y la mayoría de los mensajes dudosos
+    no son comandos: solo va en el prompt si el clasificador local se inclina por
+    "comando", y entonces las órdenes ya son las definitivas. Si no, se lee solo si
+    el modelo responde "comando" (_completar_comando).
+
+    Con sin_navegador=True no se lee la tabla: las órdenes de un comando se
+    devuelven sin procesar en "ordenes_sin_tabla" (analizar_mensaje(previo=...)).
+    """
+    con_tabla = not sin_navegador and obtener_tabla is not None and _inclinacion_local(texto) == "comando"
+    tabla_actual = _leer_tabla(obtener_tabla) if con_tabla else None
+    huella = huella_contexto(tabla_actual, contexto)
+
+    en_cache = cache_interpretaciones.obtener("unificado", texto, huella)
+    if en_cache is not None:
+        if en_cache["tipo"] == "comando" and not sin_navegador:
+            if con_tabla:
+                en_cache["ordenes"] = interpretar_con_gpt(texto, contexto, tabla_actual)
+            else:
+                en_cache["ordenes"] = _completar_comando(texto, contexto, obtener_tabla, None)
+        en_cache["origen"] = "cache"
+        _contar("cache")
+        return en_cache
+
+    prompt = _prompt_unificado(texto, contexto, tabla_actual)
+
+    try:
+        client = settings.get_openai_client()
+        response = client.chat.completions.create(
+            model=settings.OPENAI_MODEL_MAIN,
+            messages=[
+                {"role": "system", "content": "Eres un clasificador e intérprete de mensajes para un sistema de imputación de horas. Respondes SOLO con un objeto JSON válido."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0,
+            response_format={"type": "json_object"}
+        )
+        registrar_uso_openai(response, "unificado")
+        raw = response.choices[0].message.content.strip()
+        print(f"[DEBUG]  Análisis unificado: {raw}")
+        data = json.loads(raw)
+    except Exception as e:
+        print(f"[DEBUG] Error en el análisis unificado: {e}")
+        _contar("fallos_unificado")
+        return None
+
+    tipo = str(data.get("tipo", "")).strip().lower()
+    if tipo not in CATEGORIAS:
+        print(f"[DEBUG] Análisis unificado con tipo inválido: '{tipo}'")
+        _contar("fallos_unificado")
+        return None
+
+    resultado = {"tipo": tipo, "ordenes": None, "consulta": None, "origen": "unificado"}
+
+    if tipo == "comando":
+        ordenes = data.get("ordenes")
+        if sin_navegador:
+            resultado["ordenes_sin_tabla"] = ordenes
+        elif con_tabla and isinstance(ordenes, (list, dict)) and ordenes:
+            # Interpretadas con la tabla: valen tal cual (mismo uso que interpretar_con_gpt)
+            resultado["ordenes"] = procesar_ordenes(ordenes, texto, contexto)
+            if es_resultado_validado(resultado["ordenes"]):
+                cache_interpretaciones.guardar("comando", texto, resultado["ordenes"], huella)
+        elif con_tabla:
+            resultado["ordenes"] = interpretar_con_gpt(texto, contexto, tabla_actual)
+        else:
+            resultado["ordenes"] = _completar_comando(texto, contexto, obtener_tabla, ordenes)
+
+    elif tipo == "consulta":
+        consulta = data.get("consulta")
+        if isinstance(consulta, dict) and consulta.get("tipo"):
+            resultado["consulta"] = consulta
+        else:
+            resultado["consulta"] = interpretar_consulta(texto)
+
+    _contar("unificado")
+    if tipo != "comando" or sin_navegador or es_resultado_validado(resultado["ordenes"]):
+        # De un comando solo se guarda el tipo: las órdenes dependen de la tabla
+        cache_interpretaciones.guardar("unificado", texto, dict(resultado, ordenes=None, ordenes_sin_tabla=None), huella)
+    return resultado
+
+
+def analizar_sin_navegador(texto, contexto=None):
+    """
+    Análisis de un mensaje dudoso antes de tomar el navegador (webhook de WhatsApp),
+    para responder a conversación y ayuda sin sesión.
+
+    Returns:
+        dict: como analizar_mensaje, con "huella" del contexto usado; se pasa
+              después como previo= para no repetir la llamada
+        None: si el clasificador local se inclina por "comando" (se analiza luego
+              con la tabla en el prompt) o el análisis unificado no está disponible
+    """
+    if not settings.USE_UNIFIED_ROUTER or _inclinacion_local(texto) == "comando":
+        return None
+    contexto = dict(contexto or {})
+    with medir("clasificar_e_interpretar"):
+        resultado = _analizar_unificado(texto, contexto, None, sin_navegador=True)
+    if resultado is not None:
+        resultado["huella"] = huella_contexto(None, contexto)
+    return resultado
+
+
+def analizar_mensaje(texto, tipo=None, contexto=None, obtener_tabla=None, previo=None):
+    """
+    Clasifica e interpreta un mensaje con el menor número de llamadas al modelo.
+
+    Args:
+        texto: Mensaje del usuario
+        tipo: Clasificación ya hecha (p.ej. en el webhook de WhatsApp) para no repetirla
+        contexto: Contexto de la sesión (se pasa a la interpretación de comandos)
+        obtener_tabla: Callable que devuelve la tabla actual; solo se llama si hace falta
+        previo: Resultado de analizar_sin_navegador() para este mensaje
+
+    Returns:
+        dict: {
+            "tipo": "comando" | "consulta" | "conversacion" | "ayuda",
+            "ordenes": list o None,    # solo comandos (formato de interpretar_con_gpt)
+            "consulta": dict o None,   # solo consultas (formato de interpretar_consulta)
+            "origen": "previo" | "local" | "cache" | "unificado" | "separado"
+        }
+    """
+    if contexto is None:
+        contexto = {}
+
+    if previo is not None:
+        if previo["tipo"] != "comando":
+            return previo
+        if previo.get("huella") == huella_contexto(None, contexto):
+            with medir("interpretar"):
+                ordenes = _completar_comando(texto, contexto, obtener_tabla, previo.get("ordenes_sin_tabla"))
+            return dict(previo, ordenes=ordenes)
+        tipo = "comando"  # el proyecto en contexto ha cambiado desde el webhook: solo vale el tipo
+
+    origen = "previo"
+    if tipo is None:
+        with medir("clasificar"):
+            tipo = clasificar_sin_gpt(texto)
+        origen = "local"
+
+    if tipo is None:
+        if settings.USE_UNIFIED_ROUTER:
+            with medir("clasificar_e_interpretar"):
+                resultado = _analizar_unificado(texto, contexto, obtener_tabla)
+            if resultado is not None:
+                return resultado
+        with medir("clasificar"):
+            tipo = clasificar_con_gpt(texto)
+        origen = "separado"
+
+    _contar(origen)
+    resultado = {"tipo": tipo, "ordenes": None, "consulta": None, "origen": origen}
+
+    if tipo == "comando":
+        tabla_actual = _leer_tabla(obtener_tabla)
+        with medir("interpretar"):
+            resultado["ordenes"] = interpretar_con_gpt(texto, contexto, tabla_actual)
+    elif tipo == "consulta":
+        with medir("interpretar"):
+            resultado["consulta"] = interpretar_consulta(texto)
+
+    return resultado
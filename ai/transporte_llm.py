@@ -0,0 +1,219 @@
+"""
+Transporte HTTP de los clientes OpenAI con grabación y reproducción.
+
+Según settings.LLM_MODE:
+- "openai": sin tocar nada, cada llamada va a la API (o a OPENAI_BASE_URL).
+- "record": igual, pero cada respuesta 200 se guarda en LLM_RECORDINGS_FILE
+  (JSONL) con la huella de la petición.
+- "replay": las peticiones grabadas se contestan desde el fichero, sin red.
+  Las que no están van a OPENAI_BASE_URL si apunta a un servidor local
+  compatible (benchmarks/openai_local.py); si no, se devuelve un 404 y el
+  código de ai/ lo trata como cualquier error de OpenAI.
+
+La huella es un sha256 del endpoint, el modelo, los mensajes y los
+parámetros de la petición. Los prompts llevan la fecha de hoy; con
+LLM_KEY_IGNORE_DATES las fechas ISO y el día de la semana no cuentan, así
+que una grabación sirve otro día (las respuestas traen las fechas del día en
+que se grabó: valen para medir, no para imputar).
+
+A las respuestas reproducidas se les añade la latencia de LLM_LATENCY_MS
+(ms por modelo, "*" para el resto) con ±LLM_LATENCY_JITTER, para medir el
+pipeline de ai/ con tiempos de modelo fijos y sin el ruido de la red.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+
+import httpx
+
+from config import settings
+
+# Campos de la petición que cambian la respuesta
+_CAMPOS_HUELLA = ("model", "messages", "temperature", "max_tokens", "response_format", "tools", "tool_choice")
+_RE_FECHA = re.compile(r"\d{4}-\d{2}-\d{2}")
+_RE_DIA_SEMANA = re.compile(r"\b(Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday)\b")
+
+
+def huella_peticion(request: httpx.Request, ignorar_fechas: bool = True) -> tuple:
+    """(huella, modelo) de una petición a la API."""
+    try:
+        cuerpo = json.loads(request.content or b"{}")
+    except ValueError:
+        cuerpo = {}
+    datos = {"ruta": request.url.path.rsplit("/v1", 1)[-1]}
+    datos.update({campo: cuerpo[campo] for campo in _CAMPOS_HUELLA if campo in cuerpo})
+    texto = json.dumps(datos, ensure_ascii=False, sort_keys=True)
+    if ignorar_fechas:
+        texto = _RE_DIA_SEMANA.sub("<dia>", _RE_FECHA.sub("<fecha>", texto))
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest(), cuerpo.get("model") or ""
+
+
+class AlmacenGrabaciones:
+    """Respuestas grabadas por huella, en memoria y en un JSONL en disco."""
+
+    def __init__(self, modo: str, ruta: str, latencias_ms: dict = None, jitter: float = 0.0,
+                 ignorar_fechas: bool = True, con_respaldo: bool = False):
+        self.modo = modo
+        self.ruta = ruta
+        self.latencias_ms = latencias_ms or {}
+        self.jitter = jitter
+        self.ignorar_fechas = ignorar_fechas
+        self.con_respaldo = con_respaldo  # replay: lo no grabado va a OPENAI_BASE_URL
+        self._lock = threading.Lock()
+        self._respuestas = {}
+        self.stats = {"reproducidas": 0, "grabadas": 0, "sin_grabacion": 0, "al_respaldo": 0}
+        self._cargar()
+
+    def _cargar(self):
+        if not os.path.exists(self.ruta):
+            return
+        with open(self.ruta, encoding="utf-8") as f:
+            for linea in f:
+                if linea.strip():
+                    registro = json.loads(linea)
+                    self._respuestas[registro["huella"]] = registro["respuesta"]
+        print(f"[LLM] 📼 {len(self._respuestas)} respuestas grabadas en {self.ruta}")
+
+    def _contar(self, clave):
+        with self._lock:
+            self.stats[clave] += 1
+
+    def buscar(self, huella: str):
+        with self._lock:
+            return self._respuestas.get(huella)
+
+    def guardar(self, huella: str, modelo: str, respuesta: dict):
+        with self._lock:
+            nueva = huella not in self._respuestas
+            self._respuestas[huella] = respuesta
+            if nueva:
+                directorio = os.path.dirname(self.ruta)
+                if directorio:
+                    os.makedirs(directorio, exist_ok=True)
+                with open(self.ruta, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"huella": huella, "modelo": modelo, "respuesta": respuesta},
+                                       ensure_ascii=False) + "\n")
+                self.stats["grabadas"] += 1
+
+    def latencia(self, modelo: str) -> float:
+        """Segundos que se hace esperar una respuesta reproducida."""
+        ms = self.latencias_ms.get(modelo, self.latencias_ms.get("*", 0))
+        if ms and self.jitter:
+            ms *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return ms / 1000
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {**self.stats, "modo": self.modo, "respuestas": len(self._respuestas)}
+
+    # Lo común a los dos transportes: None = pasar la petición al transporte real
+
+    def responder(self, request: httpx.Request):
+        huella, modelo = huella_peticion(request, self.ignorar_fechas)
+        request.extensions["huella_llm"] = (huella, modelo)
+        if self.modo != "replay":
+            return None, 0.0
+        grabada = self.buscar(huella)
+        if grabada is not None:
+            self._contar("reproducidas")
+            return httpx.Response(200, json=grabada, request=request), self.latencia(modelo)
+        if self.con_respaldo:
+            self._contar("al_respaldo")
+            return None, 0.0
+        self._contar("sin_grabacion")
+        print(f"[LLM] ⚠️ Petición sin grabar ({modelo}, {huella[:12]})")
+        error = {"error": {"message": f"Sin grabación para {huella}", "type": "replay_miss"}}
+        return httpx.Response(404, json=error, request=request), 0.0
+
+    def tras_respuesta(self, request: httpx.Request, respuesta: httpx.Response):
+        if self.modo == "record" and respuesta.status_code == 200:
+            huella, modelo = request.extensions["huella_llm"]
+            self.guardar(huella, modelo, respuesta.json())
+
+
+class TransporteGrabacion(httpx.BaseTransport):
+    def __init__(self, almacen: AlmacenGrabaciones, interno: httpx.BaseTransport):
+        self.almacen = almacen
+        self.interno = interno
+
+    def handle_request(self, request):
+        request.read()
+        respuesta, espera = self.almacen.responder(request)
+        if respuesta is not None:
+            if espera:
+                time.sleep(espera)
+            return respuesta
+        respuesta = self.interno.handle_request(request)
+        if self.almacen.modo == "record":
+            respuesta.read()
+            self.almacen.tras_respuesta(request, respuesta)
+        return respuesta
+
+    def close(self):
+        self.interno.close()
+
+
+class TransporteGrabacionAsync(httpx.AsyncBaseTransport):
+    def __init__(self, almacen: AlmacenGrabaciones, interno: httpx.AsyncBaseTransport):
+        self.almacen = almacen
+        self.interno = interno
+
+    async def handle_async_request(self, request):
+        await request.aread()
+        respuesta, espera = self.almacen.responder(request)
+        if respuesta is not None:
+            if espera:
+                await asyncio.sleep(espera)
+            return respuesta
+        respuesta = await self.interno.handle_async_request(request)
+        if self.almacen.modo == "record":
+            await respuesta.aread()
+            self.almacen.tras_respuesta(request, respuesta)
+        return respuesta
+
+    async def aclose(self):
+        await self.interno.aclose()
+
+
+def parsear_latencias(texto: str) -> dict:
+    """'gpt-4o=1000,gpt-4o-mini=350,*=500' -> {modelo: ms}"""
+    latencias = {}
+    for parte in (texto or "").split(","):
+        if "=" in parte:
+            modelo, ms = parte.split("=", 1)
+            latencias[modelo.strip()] = float(ms)
+    return latencias
+
+
+_almacen = None
+_lock_almacen = threading.Lock()
+
+
+def obtener_almacen():
+    """El almacén del proceso según settings, o None en modo "openai"."""
+    global _almacen
+    if settings.LLM_MODE not in ("record", "replay"):
+        return None
+    with _lock_almacen:
+        if _almacen is None or _almacen.modo != settings.LLM_MODE:
+            _almacen = AlmacenGrabaciones(
+                settings.LLM_MODE,
+                settings.LLM_RECORDINGS_FILE,
+                latencias_ms=parsear_latencias(settings.LLM_LATENCY_MS),
+                jitter=settings.LLM_LATENCY_JITTER,
+                ignorar_fechas=settings.LLM_KEY_IGNORE_DATES,
+                con_respaldo=bool(settings.OPENAI_BASE_URL),
+            )
+            print(f"[LLM] 📼 Modo {settings.LLM_MODE} ({settings.LLM_RECORDINGS_FILE})")
+        return _almacen
+
+
+def obtener_stats_llm() -> dict:
+    almacen = _almacen
+    return almacen.get_stats() if almacen is not None else {"modo": settings.LLM_MODE}
@@ -0,0 +1,347 @@
+# barrido_semanal.py
+"""
+Barrido semanal de recordatorios en paralelo.
+
+ejecutar_check_semanal() revisaba los usuarios de uno en uno (login,
+navegación y una pausa fija por usuario) con navegadores del browser_pool:
+con unos cientos de usuarios el barrido del viernes duraba más de una hora y
+quitaba navegadores al tráfico interactivo. Aquí:
+
+- Hasta SWEEP_CONCURRENCY usuarios a la vez.
+- Navegadores propios del barrido (como mucho SWEEP_BROWSERS), fuera del
+  límite de browser_pool y reutilizados entre usuarios (se limpian cookies
+  y caches entre uno y otro). Si el usuario ya tiene su navegador abierto en
+  el pool se usa ese, que ya tiene la sesión iniciada.
+- Punto de control en disco (SWEEP_CHECKPOINT_FILE) tras cada usuario: si
+  el proceso se cae, al arrancar se reanuda el barrido de la semana sin
+  repetir a quien ya se revisó (ni reenviar recordatorios).
+- Informe por ejecución con tiempos (login, lectura, total por usuario).
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+def id_semana(fecha=None):
+    """'2026-W42': identifica el barrido de una semana."""
+    anio, semana, _ = (fecha or datetime.now()).isocalendar()
+    return f"{anio}-W{semana:02d}"
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+class PuntoControl:
+    """Progreso del barrido en un JSON (escritura atómica) para reanudarlo tras una caída."""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self.datos = None
+
+    def leer(self):
+        """Contenido del fichero o None si no existe o está corrupto."""
+        try:
+            with open(self.ruta, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"[BARRIDO]  Punto de control ilegible ({e}), se empieza de cero")
+            return None
+
+    def pendiente(self, semana: str, max_horas: float) -> bool:
+        """True si hay un barrido de `semana` a medias empezado hace menos de `max_horas`."""
+        datos = self.leer()
+        if not datos or datos.get("semana") != semana or datos.get("estado") != "en_curso":
+            return False
+        try:
+            inicio = datetime.fromisoformat(datos["inicio"])
+        except (KeyError, ValueError):
+            return False
+        return (datetime.now() - inicio).total_seconds() < max_horas * 3600
+
+    def iniciar(self, semana: str) -> dict:
+        """
+        Abre el barrido de `semana`. Si hay uno a medias de la misma semana lo
+        continúa; si no, empieza uno nuevo.
+
+        Returns:
+            dict: wa_id -> resultado de los usuarios ya revisados
+        """
+        anterior = self.leer()
+        with self._lock:
+            if anterior and anterior.get("semana") == semana and anterior.get("estado") == "en_curso":
+                self.datos = anterior
+                self.datos["reanudaciones"] = self.datos.get("reanudaciones", 0) + 1
+            else:
+                self.datos = {
+                    "semana": semana,
+                    "estado": "en_curso",
+                    "inicio": datetime.now().isoformat(timespec="seconds"),
+                    "reanudaciones": 0,
+                    "usuarios": {},
+                }
+            self._escribir()
+            # Los errores se vuelven a intentar al reanudar
+            return {wa_id: r for wa_id, r in self.datos["usuarios"].items() if r.get("resultado") != "error"}
+
+    def marcar(self, wa_id: str, resultado: dict):
+        with self._lock:
+            self.datos["usuarios"][wa_id] = resultado
+            self._escribir()
+
+    def terminar(self, informe: dict):
+        with self._lock:
+            self.datos["estado"] = "terminado"
+            self.datos["informe"] = informe
+            self._escribir()
+
+    def _escribir(self):
+        temporal = f"{self.ruta}.tmp"
+        try:
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(self.datos, f, ensure_ascii=False)
+            os.replace(temporal, self.ruta)
+        except OSError as e:
+            print(f"[BARRIDO]  No se pudo guardar el punto de control: {e}")
+
+
+class NavegadoresBarrido:
+    """Navegadores propios del barrido: no cuentan para browser_pool y se reutilizan entre usuarios."""
+
+    def __init__(self, maximo: int):
+        self.maximo = max(1, maximo)
+        self._libres = queue.Queue()
+        self._lock = threading.Lock()
+        self._todos = []
+        self._arrancando = 0
+
+    def tomar(self):
+        """Un navegador libre; arranca otro si no se ha llegado al máximo o espera a que se libere uno."""
+        while True:
+            try:
+                return self._libres.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                crear = len(self._todos) + self._arrancando < self.maximo
+                if crear:
+                    self._arrancando += 1
+
+            if crear:
+                break
+            try:
+                # Con timeout: si se descarta un navegador queda hueco para arrancar otro
+                return self._libres.get(timeout=1)
+            except queue.Empty:
+                continue
+
+        from browser_pool import BrowserSession
+        session = BrowserSession(None)
+        ok = session.initialize()
+        with self._lock:
+            self._arrancando -= 1
+            if ok:
+                self._todos.append(session)
+        return session if ok else None
+
+    def preparar(self, session, wa_id: str):
+        """Deja el navegador limpio para otro usuario (sin cookies ni tablas del anterior)."""
+        from web_automation.cache_semanas import cache_semanas
+        from web_automation.lector_http import lectores_http
+
+        cache_semanas.descartar(session.driver)
+        lectores_http.descartar(session.driver)
+        try:
+            session.driver.delete_all_cookies()
+        except Exception:
+            pass
+        session.user_id = wa_id
+        cache_semanas.asociar(session.driver, wa_id)
+        session.is_logged_in = False
+        session.contexto = {"fila_actual": None, "proyecto_actual": None}
+
+    def devolver(self, session):
+        self._libres.put(session)
+
+    def descartar(self, session):
+        """Navegador en mal estado: se cierra y deja hueco para arrancar otro."""
+        with self._lock:
+            if session in self._todos:
+                self._todos.remove(session)
+        session.close()
+
+    def cerrar_todos(self):
+        with self._lock:
+            sesiones, self._todos = self._todos, []
+        for session in sesiones:
+            session.close()
+
+    @property
+    def arrancados(self) -> int:
+        with self._lock:
+            return len(self._todos)
+
+
+class BarridoSemanal:
+    """Una ejecución del barrido: revisa a los usuarios en paralelo y produce el informe."""
+
+    def __init__(self, concurrencia: int, max_navegadores: int, punto_control: PuntoControl):
+        self.concurrencia = max(1, concurrencia)
+        self.navegadores = NavegadoresBarrido(max_navegadores)
+        self.punto_control = punto_control
+        self._lock = threading.Lock()
+        self.total = 0
+        self.procesados = 0
+        self.inicio = None
+
+    def ejecutar(self, usuarios: list) -> dict:
+        """
+        Args:
+            usuarios: [(wa_id, username, password)] con la contraseña ya descifrada
+
+        Returns:
+            dict: Informe de la ejecución
+        """
+        semana = id_semana()
+        ya_revisados = self.punto_control.iniciar(semana)
+        pendientes = [u for u in usuarios if u[0] not in ya_revisados]
+
+        self.total = len(pendientes)
+        self.inicio = time.monotonic()
+        if ya_revisados:
+            print(f"[BARRIDO] ⏯️ Reanudando barrido {semana}: {len(ya_revisados)} ya revisados, quedan {len(pendientes)}")
+        print(f"[BARRIDO] 🚀 Revisando {len(pendientes)} usuarios ({self.concurrencia} a la vez, "
+              f"hasta {self.navegadores.maximo} navegadores propios)")
+
+        resultados = []
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrencia, thread_name_prefix="barrido") as pool:
+                for resultado in pool.map(self._revisar_y_marcar, pendientes):
+                    resultados.append(resultado)
+        finally:
+            arrancados = self.navegadores.arrancados
+            self.navegadores.cerrar_todos()
+
+        informe = self._informe(semana, resultados, len(ya_revisados), arrancados)
+        self.punto_control.terminar(informe)
+        return informe
+
+    def _revisar_y_marcar(self, usuario):
+        wa_id = usuario[0]
+        resultado = self._revisar(*usuario)
+        self.punto_control.marcar(wa_id, resultado)
+        with self._lock:
+            self.procesados += 1
+            procesados = self.procesados
+        print(f"[BARRIDO]  [{procesados}/{self.total}] {wa_id}: {resultado['resultado']} ({resultado['total_ms']:.0f} ms)")
+        return resultado
+
+    def _revisar(self, wa_id, username, password):
+        """Revisa un usuario y le envía el recordatorio si no tiene horas esta semana."""
+        from scheduler import verificar_horas_semana, hacer_login_para_check, enviar_recordatorio_whatsapp, MENSAJE_RECORDATORIO
+        from browser_pool import browser_pool
+        from conversation_state import conversation_state_manager
+
+        inicio = time.monotonic()
+        resultado = {"resultado": "error", "navegador": None, "login_ms": 0.0, "lectura_ms": 0.0}
+
+        def _fin(**campos):
+            resultado.update(campos)
+            resultado["total_ms"] = round((time.monotonic() - inicio) * 1000, 1)
+            return resultado
+
+        if not password:
+            return _fin(error="No se pudo descifrar la contraseña")
+
+        # Navegador interactivo ya abierto (sesión iniciada) o uno del barrido
+        session = browser_pool.obtener_existente(wa_id)
+        propio = session is None
+        if propio:
+            session = self.navegadores.tomar()
+            if session is None or not session.driver:
+                return _fin(error="No se pudo arrancar un navegador")
+            self.navegadores.preparar(session, wa_id)
+        resultado["navegador"] = "barrido" if propio else "interactivo"
+
+        roto = False
+        try:
+            t = time.monotonic()
+            if not hacer_login_para_check(session, username, password):
+                return _fin(error="Login fallido", login_ms=round((time.monotonic() - t) * 1000, 1))
+            resultado["login_ms"] = round((time.monotonic() - t) * 1000, 1)
+
+            t = time.monotonic()
+            with session.lock:
+                tiene_horas = verificar_horas_semana(session, session.driver, session.wait)
+            resultado["lectura_ms"] = round((time.monotonic() - t) * 1000, 1)
+
+            if not propio:
+                session.update_activity()
+
+            if tiene_horas:
+                return _fin(resultado="con_horas")
+
+            conversation_state_manager.guardar_recordatorio_semanal(wa_id)
+            enviar_recordatorio_whatsapp(wa_id, MENSAJE_RECORDATORIO)
+            return _fin(resultado="recordatorio")
+
+        except Exception as e:
+            print(f"[BARRIDO]    ❌ Error procesando {wa_id}: {e}")
+            traceback.print_exc()
+            roto = propio
+            return _fin(error=str(e))
+
+        finally:
+            if propio:
+                if roto:
+                    self.navegadores.descartar(session)
+                else:
+                    self.navegadores.devolver(session)
+
+    def _informe(self, semana, resultados, reanudados, navegadores):
+        duracion = time.monotonic() - self.inicio
+        totales = [r["total_ms"] for r in resultados]
+        logins = [r["login_ms"] for r in resultados if r["login_ms"]]
+        lecturas = [r["lectura_ms"] for r in resultados if r["lectura_ms"]]
+        contar = lambda clave: sum(1 for r in resultados if r["resultado"] == clave)  # noqa: E731
+
+        return {
+            "semana": semana,
+            "fin": datetime.now().isoformat(timespec="seconds"),
+            "duracion_s": round(duracion, 1),
+            "revisados": len(resultados),
+            "reanudados": reanudados,
+            "con_horas": contar("con_horas"),
+            "recordatorios": contar("recordatorio"),
+            "errores": contar("error"),
+            "concurrencia": self.concurrencia,
+            "navegadores_arrancados": navegadores,
+            "usuarios_por_minuto": round(len(resultados) / duracion * 60, 1) if duracion else 0.0,
+            "tiempo_usuario_ms": {"p50": _percentil(totales, 0.5), "p95": _percentil(totales, 0.95),
+                                  "max": max(totales, default=0.0)},
+            "login_ms_p50": _percentil(logins, 0.5),
+            "lectura_ms_p50": _percentil(lecturas, 0.5),
+            "fallos": {wa_id: r.get("error") for wa_id, r in self.punto_control.datos["usuarios"].items()
+                       if r["resultado"] == "error"},
+        }
+
+    def progreso(self) -> dict:
+        with self._lock:
+            return {
+                "procesados": self.procesados,
+                "total": self.total,
+                "segundos": round(time.monotonic() - self.inicio, 1) if self.inicio else 0.0,
+            }
@@ -0,0 +1,170 @@
+"""
+Benchmark de web_automation contra el simulador local de GestiónITT.
+
+Levanta benchmarks/simulador_gestionitt.py, apunta settings.LOGIN_URL a él y
+repite --iteraciones veces el recorrido típico de un comando con un
+navegador de browser_pool.BrowserSession (las mismas opciones de Chrome que
+en producción):
+
+    login -> seleccionar_fecha -> leer_tabla -> seleccionar_proyecto
+          -> imputar_horas_dia -> guardar_linea -> consultar_semana
+          -> listar_proyectos
+
+Cada iteración usa una semana futura distinta (vacía y sin emitir). Por
+defecto el catálogo del árbol se invalida en cada iteración para que cuente
+el tamaño del árbol; con --catalogo-en-cache se mide el caso caliente.
+Muestra p50/p95/máx por paso y los comandos enviados al chromedriver.
+
+Necesita Chrome y chromedriver. En un Linux sin pantalla:
+    xvfb-run python benchmarks/automatizacion_local.py
+
+Uso:
+    python benchmarks/automatizacion_local.py
+    python benchmarks/automatizacion_local.py --iteraciones 10 --latencia-ms 120 --departamentos 60 --proyectos 30
+"""
+
+import argparse
+import os
+import sys
+import time
+import traceback
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.simulador_gestionitt import SimuladorGestionITT  # noqa: E402
+from browser_pool import BrowserSession  # noqa: E402
+from config import settings  # noqa: E402
+from core.consultas import consultar_semana  # noqa: E402
+from web_automation import (  # noqa: E402
+    hacer_login, seleccionar_fecha, leer_tabla_imputacion, seleccionar_proyecto,
+    imputar_horas_dia, guardar_linea, estadisticas_esperas,
+)
+from web_automation.catalogo_proyectos import catalogo_proyectos  # noqa: E402
+from web_automation.listado_proyectos import listar_todos_proyectos  # noqa: E402
+
+PASOS = ["login", "seleccionar_fecha", "leer_tabla", "seleccionar_proyecto",
+         "imputar_horas_dia", "guardar_linea", "consultar_semana", "listar_proyectos"]
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def contar_comandos(driver):
+    """Envuelve driver.execute para contar los comandos de cada paso."""
+    contador = [0]
+    original = driver.execute
+
+    def execute(driver_command, params=None):
+        contador[0] += 1
+        return original(driver_command, params)
+
+    driver.execute = execute
+    return contador
+
+
+def recorrido(session, usuario, fecha, proyecto, contexto):
+    """Genera (paso, función) del recorrido de una iteración."""
+    driver, wait = session.driver, session.wait
+    estado = {}
+
+    def _login():
+        ok, mensaje = hacer_login(driver, wait, usuario, "clave-local")
+        if not ok:
+            raise RuntimeError(mensaje)
+
+    def _seleccionar_proyecto():
+        fila, mensaje, _, _ = seleccionar_proyecto(driver, wait, proyecto, contexto=contexto)
+        if fila is None:
+            raise RuntimeError(mensaje)
+        estado["fila"] = fila
+
+    yield "login", _login
+    yield "seleccionar_fecha", lambda: seleccionar_fecha(driver, fecha, contexto)
+    yield "leer_tabla", lambda: leer_tabla_imputacion(driver)
+    yield "seleccionar_proyecto", _seleccionar_proyecto
+    yield "imputar_horas_dia", lambda: imputar_horas_dia(driver, wait, "lunes", 8, estado["fila"], proyecto,
+                                                         modo="establecer")
+    yield "guardar_linea", lambda: guardar_linea(driver, wait)
+    yield "consultar_semana", lambda: consultar_semana(driver, wait, fecha)
+    yield "listar_proyectos", lambda: listar_todos_proyectos(driver, wait, clave_usuario=usuario)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iteraciones", type=int, default=5)
+    parser.add_argument("--latencia-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--departamentos", type=int, default=20)
+    parser.add_argument("--proyectos", type=int, default=15)
+    parser.add_argument("--profundidad", type=int, default=1)
+    parser.add_argument("--proyecto", default="Eventos", help="proyecto que se imputa en cada iteración")
+    parser.add_argument("--catalogo-en-cache", action="store_true", help="no invalidar el catálogo del árbol")
+    args = parser.parse_args()
+
+    simulador = SimuladorGestionITT(
+        latencia_ms=args.latencia_ms, jitter_ms=args.jitter_ms, departamentos=args.departamentos,
+        proyectos=args.proyectos, profundidad=args.profundidad,
+    ).iniciar()
+    settings.LOGIN_URL = simulador.url
+    print(f"Simulador en {simulador.url}: {simulador.arbol.total_nodos} nodos, latencia {args.latencia_ms:g} ms")
+
+    session = BrowserSession("benchmark")
+    if not session.initialize():
+        simulador.parar()
+        sys.exit("No se pudo arrancar Chrome (¿falta chromedriver o xvfb-run?)")
+    comandos = contar_comandos(session.driver)
+
+    tiempos = {paso: [] for paso in PASOS}
+    por_paso = {paso: [] for paso in PASOS}
+    errores = {}
+    lunes = datetime.now() - timedelta(days=datetime.now().weekday())
+    inicio = time.perf_counter()
+    try:
+        for n in range(args.iteraciones):
+            usuario = f"bench{n:03d}"
+            fecha = (lunes + timedelta(weeks=n + 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            contexto = {"fila_actual": None, "proyecto_actual": None, "user_id": usuario}
+            session.driver.delete_all_cookies()
+            if not args.catalogo_en_cache:
+                catalogo_proyectos.invalidar()
+
+            t_iteracion = time.perf_counter()
+            for paso, funcion in recorrido(session, usuario, fecha, args.proyecto, contexto):
+                antes, t = comandos[0], time.perf_counter()
+                try:
+                    funcion()
+                except Exception as e:
+                    errores.setdefault(paso, []).append(str(e))
+                    traceback.print_exc()
+                    break
+                finally:
+                    tiempos[paso].append((time.perf_counter() - t) * 1000)
+                    por_paso[paso].append(comandos[0] - antes)
+            print(f"[{n + 1}/{args.iteraciones}] {usuario} semana {fecha:%d/%m/%Y}: "
+                  f"{(time.perf_counter() - t_iteracion) * 1000:.0f} ms")
+    finally:
+        session.close()
+        simulador.parar()
+    total_s = time.perf_counter() - inicio
+
+    print(f"\n{'paso':<22}{'p50 ms':>10}{'p95 ms':>10}{'máx ms':>10}{'comandos':>10}{'errores':>9}")
+    for paso in PASOS:
+        valores = tiempos[paso]
+        media_comandos = sum(por_paso[paso]) / len(por_paso[paso]) if por_paso[paso] else 0
+        print(f"{paso:<22}{_percentil(valores, 0.5):>10.0f}{_percentil(valores, 0.95):>10.0f}"
+              f"{max(valores, default=0):>10.0f}{media_comandos:>10.1f}{len(errores.get(paso, [])):>9}")
+    print(f"\nTotal: {total_s:.1f} s  |  comandos al chromedriver: {comandos[0]}  |  "
+          f"peticiones al simulador: {sum(simulador.get_stats()['peticiones'].values())}")
+    print(f"Esperas: {estadisticas_esperas.get_stats()}")
+    for paso, mensajes in errores.items():
+        print(f"Errores en {paso}: {mensajes[:3]}")
+
+
+if __name__ == "__main__":
+    main()
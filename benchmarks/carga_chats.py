@@ -0,0 +1,509 @@
+"""
+Prueba de carga de extremo a extremo de POST /chats.
+
+run_server.py dice aguantar 50+ usuarios a la vez; esto lo mide. Arranca:
+- el simulador de GestiónITT (benchmarks/simulador_gestionitt.py)
+- un OpenAI local (benchmarks/openai_local.py) que responde a cada texto del
+  catálogo de mensajes con sus órdenes o su consulta
+- un receptor de WhatsApp que hace de Meta Cloud API
+- server.py con uvicorn en un subproceso, apuntando a los tres, con una base
+  de datos sqlite temporal donde se dan de alta los usuarios con credenciales
+
+y simula --usuarios-whatsapp + --usuarios-web usuarios que mandan
+--mensajes-por-usuario mensajes cada uno (comandos, consultas, conversación
+y ayuda en castellano), esperando la respuesta y un tiempo de "pensar" entre
+uno y otro. En WhatsApp los comandos y consultas se contestan con "Estoy
+trabajando en ello" y la respuesta llega después al receptor: la latencia
+cuenta hasta esa entrega.
+
+Informe: mensajes por segundo, p50/p95/p99 por tipo de mensaje, saturación
+del pool de navegadores, cola del executor y de los buzones (muestreadas de
+/stats) y memoria del servidor y de sus Chrome (/proc, solo Linux). Con la
+misma --semilla cada usuario manda los mismos mensajes con las mismas
+pausas; --salida guarda el resultado en JSON y --comparar lo contrasta con
+el de otra ejecución (p.ej. de otro commit).
+
+Necesita Chrome y chromedriver (xvfb-run en un Linux sin pantalla).
+
+Uso:
+    python benchmarks/carga_chats.py
+    python benchmarks/carga_chats.py --usuarios-whatsapp 150 --usuarios-web 50 --mensajes-por-usuario 8
+    python benchmarks/carga_chats.py --salida carga_nueva.json --comparar carga_main.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.openai_local import ServidorOpenAILocal  # noqa: E402
+from benchmarks.simulador_gestionitt import SimuladorGestionITT  # noqa: E402
+
+PASSWORD = "clave-local"
+TEXTO_EN_CURSO = "Estoy trabajando en ello"
+DIAS = ["lunes", "martes", "miércoles", "jueves", "viernes"]
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+# ============================================================================
+# CATÁLOGO DE MENSAJES
+# ============================================================================
+
+def catalogo_mensajes(hoy: date) -> list:
+    """
+    Mensajes que mandan los usuarios simulados, con lo que respondería el
+    modelo a cada uno y su peso en la mezcla.
+
+    Returns:
+        list: [{"clase", "texto", "tipo", "ordenes" | "consulta", "peso"}]
+    """
+    lunes = hoy - timedelta(days=hoy.weekday())
+    # Días de esta semana del mismo mes (los de otro mes salen deshabilitados)
+    dias = [(DIAS[i], lunes + timedelta(days=i)) for i in range(5) if (lunes + timedelta(days=i)).month == hoy.month]
+    ayer = hoy - timedelta(days=1)
+
+    mensajes = [
+        {"clase": "consulta_semana", "texto": "¿Cuántas horas llevo esta semana?", "peso": 8},
+        {"clase": "consulta_semana", "texto": "resumen de la semana", "peso": 6},
+        {"clase": "consulta_semana", "texto": "qué tengo imputado la semana pasada", "peso": 3,
+         "fecha": lunes - timedelta(days=7)},
+        {"clase": "consulta_dia", "texto": "¿qué he imputado hoy?", "peso": 5},
+        {"clase": "consulta_dia", "texto": "dime las horas de ayer", "peso": 3, "fecha": ayer},
+        {"clase": "consulta_mes", "texto": "resumen del mes", "peso": 3, "fecha": hoy.replace(day=1)},
+        {"clase": "listar_proyectos", "texto": "¿qué proyectos tengo disponibles?", "peso": 3},
+        {"clase": "conversacion", "texto": "hola, buenos días", "peso": 5},
+        {"clase": "conversacion", "texto": "muchas gracias por la ayuda", "peso": 3},
+        {"clase": "ayuda", "texto": "¿qué puedes hacer?", "peso": 3},
+    ]
+    for m in mensajes:
+        clase = m["clase"]
+        if clase.startswith("consulta_"):
+            m["tipo"] = "consulta"
+            m["consulta"] = {"fecha": m.pop("fecha", hoy).isoformat(), "tipo": clase.split("_", 1)[1]}
+        elif clase == "listar_proyectos":
+            m["tipo"] = "consulta"
+            m["consulta"] = {"tipo": "listar_proyectos"}
+        else:
+            m["tipo"] = clase
+
+    # Comandos: "establecer" para que repetirlos no acumule horas (como mucho 3+2+1 al día)
+    for proyecto, horas in (("Eventos", 3), ("Vacaciones", 2), ("Preventa", 1)):
+        for nombre_dia, fecha in dias:
+            mensajes.append({
+                "clase": "comando_imputar",
+                "texto": f"pon {horas} horas en {proyecto} el {nombre_dia}",
+                "tipo": "comando",
+                "peso": 12 / len(dias),
+                "ordenes": [
+                    {"accion": "seleccionar_fecha", "parametros": {"fecha": fecha.isoformat()}},
+                    {"accion": "seleccionar_proyecto", "parametros": {"nombre": proyecto}},
+                    {"accion": "imputar_horas_dia",
+                     "parametros": {"dia": fecha.isoformat(), "horas": horas, "modo": "establecer"}},
+                    {"accion": "guardar_linea"},
+                ],
+            })
+    return mensajes
+
+
+# ============================================================================
+# RECEPTOR DE WHATSAPP
+# ============================================================================
+
+class ReceptorWhatsApp:
+    """Hace de POST /{phone_number_id}/messages de Meta y avisa de cada entrega."""
+
+    def __init__(self, al_recibir):
+        self.al_recibir = al_recibir
+        self.recibidos = 0
+        receptor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                cuerpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                receptor.recibidos += 1
+                receptor.al_recibir(cuerpo["to"], cuerpo["text"]["body"])
+                respuesta = b'{"messages": [{"id": "wamid.local"}]}'
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(respuesta)))
+                self.end_headers()
+                self.wfile.write(respuesta)
+
+            def log_message(self, *args):
+                pass
+
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self._servidor.daemon_threads = True
+        threading.Thread(target=self._servidor.serve_forever, daemon=True, name="whatsapp-local").start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._servidor.server_port}"
+
+    def parar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+
+# ============================================================================
+# SERVIDOR Y USUARIOS
+# ============================================================================
+
+def sembrar_usuarios(n_whatsapp: int, n_web: int):
+    """Da de alta los usuarios con credenciales (en la base de datos de DATABASE_URL)."""
+    from db import SessionLocal, crear_usuario
+
+    whatsapp = [f"34600{i:06d}" for i in range(n_whatsapp)]
+    web = [f"carga-web-{i:04d}" for i in range(n_web)]
+    db = SessionLocal()
+    try:
+        for i, wa_id in enumerate(whatsapp):
+            usuario = crear_usuario(db, wa_id=wa_id, canal="whatsapp")
+            usuario.establecer_credenciales_intranet(f"wa{i:04d}", PASSWORD)
+        for i, app_id in enumerate(web):
+            usuario = crear_usuario(db, app_id=app_id, canal="webapp")
+            usuario.establecer_credenciales_intranet(f"web{i:04d}", PASSWORD)
+        db.commit()
+    finally:
+        db.close()
+    return whatsapp, web
+
+
+def rss_mb(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for linea in f:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def descendientes(pid: int) -> list:
+    hijos = {}
+    for entrada in os.listdir("/proc"):
+        if not entrada.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entrada}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        hijos.setdefault(ppid, []).append(int(entrada))
+    resultado, pendientes = [], [pid]
+    while pendientes:
+        for hijo in hijos.get(pendientes.pop(), []):
+            resultado.append(hijo)
+            pendientes.append(hijo)
+    return resultado
+
+
+class Carga:
+    """Una ejecución: usuarios simulados, muestreo de /stats y resultados."""
+
+    def __init__(self, args, url_servidor, pid_servidor, catalogo):
+        self.args = args
+        self.url = url_servidor
+        self.pid = pid_servidor
+        self.catalogo = catalogo
+        self.resultados = []  # (canal, clase, ms o None si falló, detalle)
+        self.muestras = []
+        self._entregas = {}  # wa_id -> asyncio.Queue de respuestas por WhatsApp
+        self._loop = None
+        self._fin = False
+        self.openai_stats = {}
+        self.simulador_stats = {}
+
+    def entrega_whatsapp(self, wa_id, texto):
+        """Llamada desde el hilo del receptor."""
+        cola = self._entregas.get(wa_id)
+        if cola is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(cola.put_nowait, (time.perf_counter(), texto))
+
+    async def ejecutar(self, whatsapp, web):
+        self._loop = asyncio.get_running_loop()
+        for wa_id in whatsapp:
+            self._entregas[wa_id] = asyncio.Queue()
+        usuarios = [("whatsapp", u) for u in whatsapp] + [("webapp", u) for u in web]
+        random.Random(self.args.semilla).shuffle(usuarios)
+
+        limites = httpx.Limits(max_connections=len(usuarios) + 10)
+        async with httpx.AsyncClient(base_url=self.url, timeout=self.args.timeout, limits=limites) as cliente:
+            muestreo = asyncio.create_task(self._muestrear(cliente))
+            inicio = time.perf_counter()
+            await asyncio.gather(*(
+                self._usuario(cliente, canal, ident, self.args.rampa * i / max(1, len(usuarios)))
+                for i, (canal, ident) in enumerate(usuarios)
+            ))
+            duracion = time.perf_counter() - inicio
+            self._fin = True
+            await muestreo
+            final = (await cliente.get("/stats")).json()
+        return duracion, final
+
+    async def _usuario(self, cliente, canal, ident, retraso):
+        rnd = random.Random(f"{self.args.semilla}:{ident}")
+        pesos = [m["peso"] for m in self.catalogo]
+        await asyncio.sleep(retraso)
+        for _ in range(self.args.mensajes_por_usuario):
+            mensaje = rnd.choices(self.catalogo, weights=pesos)[0]
+            await self._enviar(cliente, canal, ident, mensaje)
+            await asyncio.sleep(rnd.expovariate(1 / self.args.pensar) if self.args.pensar else 0)
+
+    async def _enviar(self, cliente, canal, ident, mensaje):
+        cuerpo = {"message": mensaje["texto"]}
+        cuerpo["wa_id" if canal == "whatsapp" else "user_id"] = ident
+        cola = self._entregas.get(ident)
+        while cola is not None and not cola.empty():
+            cola.get_nowait()  # entregas tardías de un mensaje anterior
+
+        inicio = time.perf_counter()
+        try:
+            respuesta = await cliente.post("/chats", json=cuerpo)
+            respuesta.raise_for_status()
+            texto = respuesta.json().get("reply") or respuesta.json().get("error") or ""
+            if cola is not None and TEXTO_EN_CURSO in texto:
+                fin, texto = await asyncio.wait_for(cola.get(), self.args.timeout)
+            else:
+                fin = time.perf_counter()
+        except Exception as e:
+            self.resultados.append((canal, mensaje["clase"], None, f"{type(e).__name__}: {e}"))
+            return
+        fallo = texto.lstrip().startswith(("❌", "Error", "No he podido", "⏳ Todavía"))
+        self.resultados.append((canal, mensaje["clase"], None if fallo else (fin - inicio) * 1000, texto[:120]))
+
+    async def _muestrear(self, cliente):
+        while not self._fin:
+            try:
+                stats = (await cliente.get("/stats", timeout=10)).json()
+            except Exception:
+                stats = None
+            if stats:
+                hijos = descendientes(self.pid)
+                self.muestras.append({
+                    "t": time.perf_counter(),
+                    "navegadores": stats["browser_pool"]["active_sessions"],
+                    "max_navegadores": stats["browser_pool"]["max_sessions"],
+                    "reserva": stats["browser_pool"]["warm_standby"],
+                    "buzones": stats["buzones"]["en_espera"],
+                    "executor_cola": stats["executor"]["en_cola"],
+                    "executor_hilos": stats["executor"]["hilos"],
+                    "rss_servidor_mb": rss_mb(self.pid),
+                    "rss_chrome_mb": sum(rss_mb(p) for p in hijos),
+                    "procesos_chrome": len(hijos),
+                })
+            await asyncio.sleep(1)
+
+
+def informe(carga: Carga, duracion: float, final: dict, args) -> dict:
+    por_clase = {}
+    for canal, clase, ms, _ in carga.resultados:
+        for clave in (clase, f"canal:{canal}", "total"):
+            datos = por_clase.setdefault(clave, {"ms": [], "errores": 0})
+            if ms is None:
+                datos["errores"] += 1
+            else:
+                datos["ms"].append(ms)
+
+    latencias = {
+        clave: {
+            "n": len(d["ms"]) + d["errores"],
+            "errores": d["errores"],
+            "p50": round(_percentil(d["ms"], 0.5)),
+            "p95": round(_percentil(d["ms"], 0.95)),
+            "p99": round(_percentil(d["ms"], 0.99)),
+        }
+        for clave, d in sorted(por_clase.items())
+    }
+    muestras = carga.muestras or [{}]
+    serie = lambda campo: [m.get(campo, 0) for m in muestras]  # noqa: E731
+    max_navegadores = final["browser_pool"]["max_sessions"]
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                                text=True).stdout.strip()
+    except OSError:
+        commit = ""
+
+    return {
+        "commit": commit,
+        "config": {k: v for k, v in vars(args).items() if k not in ("salida", "comparar")},
+        "mensajes": len(carga.resultados),
+        "duracion_s": round(duracion, 1),
+        "mensajes_por_segundo": round(len(carga.resultados) / duracion, 2) if duracion else 0.0,
+        "latencia_ms": latencias,
+        "pool": {
+            "max_activos": max(serie("navegadores")),
+            "limite": max_navegadores,
+            "saturado_pct": round(100 * sum(1 for n in serie("navegadores") if n >= max_navegadores)
+                                  / len(muestras), 1),
+            "arranques_en_frio": final["browser_pool"]["cold_starts"],
+            "aciertos_reserva": final["browser_pool"]["warm_hits"],
+        },
+        "colas": {
+            "executor_max": max(serie("executor_cola")),
+            "executor_media": round(sum(serie("executor_cola")) / len(muestras), 1),
+            "executor_hilos_max": max(serie("executor_hilos")),
+            "buzones_max": max(serie("buzones")),
+            "buzones_rechazados": final["buzones"].get("rechazados", 0),
+        },
+        "memoria_mb": {
+            "servidor_inicio": round(muestras[0].get("rss_servidor_mb", 0)),
+            "servidor_fin": round(muestras[-1].get("rss_servidor_mb", 0)),
+            "servidor_max": round(max(serie("rss_servidor_mb"))),
+            "chrome_max": round(max(serie("rss_chrome_mb"))),
+            "procesos_chrome_max": max(serie("procesos_chrome")),
+        },
+        "openai_local": carga.openai_stats,
+        "simulador": carga.simulador_stats,
+    }
+
+
+def imprimir(resultado: dict, anterior: dict = None):
+    print(f"\n{'tipo':<22}{'n':>6}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for clave, d in resultado["latencia_ms"].items():
+        linea = f"{clave:<22}{d['n']:>6}{d['errores']:>6}{d['p50']:>10}{d['p95']:>10}{d['p99']:>10}"
+        previo = (anterior or {}).get("latencia_ms", {}).get(clave)
+        if previo:
+            linea += f"   (antes p50 {previo['p50']}, p95 {previo['p95']}, p99 {previo['p99']})"
+        print(linea)
+
+    print(f"\n{resultado['mensajes']} mensajes en {resultado['duracion_s']} s: "
+          f"{resultado['mensajes_por_segundo']} msg/s"
+          + (f" (antes {anterior['mensajes_por_segundo']} msg/s, commit {anterior.get('commit')})" if anterior else ""))
+    pool, colas, memoria = resultado["pool"], resultado["colas"], resultado["memoria_mb"]
+    print(f"Navegadores: máx {pool['max_activos']}/{pool['limite']}, pool lleno el {pool['saturado_pct']} % "
+          f"del tiempo, {pool['arranques_en_frio']} arranques en frío, {pool['aciertos_reserva']} de la reserva")
+    print(f"Executor: cola máx {colas['executor_max']} (media {colas['executor_media']}), "
+          f"hilos máx {colas['executor_hilos_max']}  |  buzones: máx {colas['buzones_max']} en espera, "
+          f"{colas['buzones_rechazados']} rechazados")
+    print(f"Memoria: servidor {memoria['servidor_inicio']} → {memoria['servidor_fin']} MB "
+          f"(máx {memoria['servidor_max']})  |  Chrome máx {memoria['chrome_max']} MB "
+          f"en {memoria['procesos_chrome_max']} procesos")
+    print(f"OpenAI local: {resultado['openai_local']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--usuarios-whatsapp", type=int, default=60)
+    parser.add_argument("--usuarios-web", type=int, default=20)
+    parser.add_argument("--mensajes-por-usuario", type=int, default=5)
+    parser.add_argument("--pensar", type=float, default=3.0, help="media (s) de la pausa entre mensajes")
+    parser.add_argument("--rampa", type=float, default=30.0, help="segundos en los que van entrando los usuarios")
+    parser.add_argument("--timeout", type=float, default=180.0, help="máximo por respuesta (s)")
+    parser.add_argument("--latencia-intranet-ms", type=float, default=80)
+    parser.add_argument("--factor-latencia-llm", type=float, default=1.0, help="0 = OpenAI local sin espera")
+    parser.add_argument("--departamentos", type=int, default=20)
+    parser.add_argument("--proyectos", type=int, default=15)
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--salida", help="fichero JSON donde guardar el resultado")
+    parser.add_argument("--comparar", help="resultado JSON de otra ejecución")
+    args = parser.parse_args()
+
+    hoy = date.today()
+    catalogo = catalogo_mensajes(hoy)
+    simulador = SimuladorGestionITT(latencia_ms=args.latencia_intranet_ms, jitter_ms=args.latencia_intranet_ms / 4,
+                                    departamentos=args.departamentos, proyectos=args.proyectos,
+                                    password=PASSWORD, semilla=args.semilla).iniciar()
+    openai_local = ServidorOpenAILocal({m["texto"]: m for m in catalogo},
+                                       factor_latencia=args.factor_latencia_llm).iniciar()
+
+    directorio = tempfile.mkdtemp(prefix="carga_chats_")
+    from cryptography.fernet import Fernet
+    entorno = {
+        "URL_PRIVADA": simulador.url,
+        "OPENAI_BASE_URL": openai_local.url,
+        "OPENAI_API_KEY": "local",
+        "META_WHATSAPP_TOKEN": "local",
+        "META_PHONE_NUMBER_ID": "123456",
+        "DATABASE_URL": f"sqlite:///{os.path.join(directorio, 'carga.db')}",
+        "ENCRYPTION_KEY": Fernet.generate_key().decode(),
+        "COOKIE_STORE_DIR": os.path.join(directorio, "sesiones"),
+        "WHATSAPP_DEAD_LETTER_FILE": os.path.join(directorio, "no_entregados.jsonl"),
+        "SWEEP_CHECKPOINT_FILE": os.path.join(directorio, "barrido.json"),
+        "PYTHONUNBUFFERED": "1",
+    }
+    os.environ.update(entorno)  # sembrar_usuarios usa la misma base de datos y clave
+
+    carga = None
+    receptor = ReceptorWhatsApp(lambda wa_id, texto: carga and carga.entrega_whatsapp(wa_id, texto))
+    os.environ["WHATSAPP_API_URL"] = receptor.url
+
+    whatsapp, web = sembrar_usuarios(args.usuarios_whatsapp, args.usuarios_web)
+    log = open(os.path.join(directorio, "servidor.log"), "w")
+    servidor = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(args.puerto),
+         "--workers", "1", "--limit-concurrency", "1000", "--log-level", "warning"],
+        cwd=RAIZ, env=dict(os.environ), stdout=log, stderr=subprocess.STDOUT,
+    )
+    url = f"http://127.0.0.1:{args.puerto}"
+    print(f"Simulador {simulador.url} ({simulador.arbol.total_nodos} nodos), OpenAI local {openai_local.url}, "
+          f"WhatsApp {receptor.url}")
+    print(f"Servidor en {url} (log: {log.name}), {len(whatsapp)} usuarios de WhatsApp y {len(web)} web")
+
+    try:
+        for _ in range(120):
+            try:
+                if httpx.get(f"{url}/stats", timeout=2).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if servidor.poll() is not None:
+                sys.exit(f"El servidor no arrancó; mira {log.name}")
+            time.sleep(0.5)
+        else:
+            sys.exit(f"El servidor no responde; mira {log.name}")
+
+        carga = Carga(args, url, servidor.pid, catalogo)
+        duracion, final = asyncio.run(carga.ejecutar(whatsapp, web))
+    finally:
+        servidor.terminate()
+        try:
+            servidor.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            servidor.kill()
+        log.close()
+        receptor.parar()
+        openai_local.parar()
+        simulador.parar()
+
+    carga.openai_stats = openai_local.get_stats()
+    carga.simulador_stats = {k: v for k, v in simulador.get_stats().items() if k != "peticiones"}
+    resultado = informe(carga, duracion, final, args)
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)
+    imprimir(resultado, anterior)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+        print(f"Resultado en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
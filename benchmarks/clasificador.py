@@ -0,0 +1,102 @@
+"""
+Benchmark del clasificador local de intenciones (ai/clasificador_local.py).
+
+Mide sobre el corpus etiquetado (benchmarks/datos/clasificador.tsv):
+- Cobertura: % de mensajes que el nivel local decide sin GPT
+- Acierto en los mensajes decididos (y matriz de confusión)
+- Latencia por mensaje (p50 / p99 / máx)
+
+Uso:
+    python benchmarks/clasificador.py
+    python benchmarks/clasificador.py --umbral 0.6 --fallos
+"""
+
+import argparse
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from ai.clasificador_local import clasificar_local, CATEGORIAS  # noqa: E402
+from config import settings  # noqa: E402
+
+CORPUS = os.path.join(RAIZ, "benchmarks", "datos", "clasificador.tsv")
+
+
+def cargar_corpus(ruta):
+    ejemplos = []
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            linea = linea.rstrip("\n")
+            if not linea or linea.startswith("#"):
+                continue
+            categoria, texto = linea.split("\t", 1)
+            ejemplos.append((categoria, texto))
+    return ejemplos
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--umbral", type=float, default=settings.LOCAL_CLASSIFIER_THRESHOLD)
+    parser.add_argument("--repeticiones", type=int, default=200, help="pasadas para medir la latencia")
+    parser.add_argument("--fallos", action="store_true", help="listar errores y mensajes que irían a GPT")
+    args = parser.parse_args()
+
+    ejemplos = cargar_corpus(args.corpus)
+
+    # Acierto y cobertura
+    decididos = aciertos = 0
+    confusion = {real: dict.fromkeys(CATEGORIAS, 0) for real in CATEGORIAS}
+    errores, a_gpt = [], []
+    for real, texto in ejemplos:
+        categoria, confianza, _ = clasificar_local(texto)
+        if categoria is None or confianza < args.umbral:
+            a_gpt.append((real, texto, categoria, confianza))
+            continue
+        decididos += 1
+        confusion[real][categoria] += 1
+        if categoria == real:
+            aciertos += 1
+        else:
+            errores.append((real, texto, categoria, confianza))
+
+    # Latencia
+    tiempos = []
+    for _ in range(args.repeticiones):
+        for _, texto in ejemplos:
+            inicio = time.perf_counter()
+            clasificar_local(texto)
+            tiempos.append(time.perf_counter() - inicio)
+
+    total = len(ejemplos)
+    print(f"Corpus: {total} mensajes  |  umbral de confianza: {args.umbral}")
+    print(f"Cobertura local: {decididos}/{total} ({decididos / total:.1%})  → {total - decididos} irían a GPT")
+    if decididos:
+        print(f"Acierto en decididos: {aciertos}/{decididos} ({aciertos / decididos:.1%})")
+    print(f"Latencia: p50 {percentil(tiempos, 0.5) * 1e6:.0f} µs  |  "
+          f"p99 {percentil(tiempos, 0.99) * 1e6:.0f} µs  |  máx {max(tiempos) * 1e6:.0f} µs")
+
+    print("\nMatriz de confusión (fila = real, columna = local):")
+    print(f"{'':>14}" + "".join(f"{c:>14}" for c in CATEGORIAS))
+    for real in CATEGORIAS:
+        print(f"{real:>14}" + "".join(f"{confusion[real][c]:>14}" for c in CATEGORIAS))
+
+    if args.fallos:
+        print("\nErrores:")
+        for real, texto, categoria, confianza in errores:
+            print(f"  [{real} → {categoria} {confianza}] {texto}")
+        print("\nA GPT:")
+        for real, texto, categoria, confianza in a_gpt:
+            print(f"  [{real}, local: {categoria} {confianza}] {texto}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+/*
+ * Scripts del simulador de GestiónITT (benchmarks/simulador_gestionitt.py).
+ *
+ * Un jQuery mínimo con lo que usan los scripts que ejecuta el bot
+ * (jQuery.active, .first(), .jstree('open_all' | 'close_all' | 'deselect_all'),
+ * .datepicker('option', 'dateFormat')), el datepicker, el buscador del
+ * árbol de proyectos y la botonera de la pantalla de imputación.
+ */
+
+(function () {
+    function Coleccion(elementos) {
+        for (var i = 0; i < elementos.length; i++) { this[i] = elementos[i]; }
+        this.length = elementos.length;
+    }
+
+    Coleccion.prototype.first = function () {
+        return new Coleccion(this.length ? [this[0]] : []);
+    };
+
+    Coleccion.prototype.jstree = function (orden) {
+        for (var i = 0; i < this.length; i++) {
+            var lis = this[i].querySelectorAll('li.jstree-open, li.jstree-closed');
+            for (var j = 0; j < lis.length; j++) {
+                if (orden === 'open_all') { abrirNodo(lis[j], true); }
+                if (orden === 'close_all') { abrirNodo(lis[j], false); }
+            }
+            if (orden === 'deselect_all') {
+                var marcados = this[i].querySelectorAll('a.jstree-clicked');
+                for (var k = 0; k < marcados.length; k++) { marcados[k].classList.remove('jstree-clicked'); }
+            }
+        }
+        return this;
+    };
+
+    Coleccion.prototype.datepicker = function (orden, opcion) {
+        if (orden === 'option' && opcion === 'dateFormat') { return 'dd/mm/yy'; }
+        return this;
+    };
+
+    function jQuery(selector) {
+        if (typeof selector === 'string') { return new Coleccion(document.querySelectorAll(selector)); }
+        return new Coleccion(selector ? [selector] : []);
+    }
+    jQuery.active = 0;
+
+    window.jQuery = window.$ = jQuery;
+})();
+
+/* Peticiones AJAX que cuentan en jQuery.active (lo que mira esperas.pagina_lista) */
+function ajax(url, datos, alTerminar) {
+    var peticion = new XMLHttpRequest();
+    jQuery.active++;
+    peticion.open('POST', url);
+    peticion.setRequestHeader('Content-Type', 'application/x-www-form-urlencoded');
+    peticion.onloadend = function () {
+        jQuery.active--;
+        if (alTerminar) { alTerminar(peticion); }
+    };
+    peticion.send(datos);
+}
+
+/* ---------------------------------------------------------------- jornada */
+
+function jornada(accion) {
+    ajax('/jornada', 'accion=' + accion, function (peticion) {
+        var estado = JSON.parse(peticion.responseText || '{}').estado;
+        document.getElementById('botonInicioJornada').disabled = estado !== 'sin_iniciar';
+        document.getElementById('botonFinJornada').disabled = estado !== 'iniciada';
+    });
+}
+
+/* ------------------------------------------------------------- datepicker */
+
+var MESES = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio', 'Julio',
+             'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre'];
+var calendario = {mes: 0, anio: 0};
+
+function abrirCalendario() {
+    var partes = document.getElementById('fechaImputacion').value.split('/');
+    calendario.mes = parseInt(partes[1], 10) - 1;
+    calendario.anio = parseInt(partes[2], 10);
+    pintarCalendario();
+    document.getElementById('ui-datepicker-div').style.display = 'block';
+}
+
+function moverCalendario(meses) {
+    calendario.mes += meses;
+    if (calendario.mes < 0) { calendario.mes = 11; calendario.anio--; }
+    if (calendario.mes > 11) { calendario.mes = 0; calendario.anio++; }
+    pintarCalendario();
+}
+
+function pintarCalendario() {
+    var primero = new Date(calendario.anio, calendario.mes, 1);
+    var dias = new Date(calendario.anio, calendario.mes + 1, 0).getDate();
+    var hueco = (primero.getDay() + 6) % 7;  // semanas de lunes a domingo
+    var html = '<div class="ui-datepicker-header">' +
+        '<a class="ui-datepicker-prev" href="#" onclick="moverCalendario(-1); return false;">Ant</a>' +
+        '<a class="ui-datepicker-next" href="#" onclick="moverCalendario(1); return false;">Sig</a>' +
+        '<div class="ui-datepicker-title">' + MESES[calendario.mes] + ' ' + calendario.anio + '</div></div>' +
+        '<table class="ui-datepicker-calendar"><thead><tr><th>Lu</th><th>Ma</th><th>Mi</th><th>Ju</th>' +
+        '<th>Vi</th><th>Sá</th><th>Do</th></tr></thead><tbody><tr>';
+    for (var i = 0; i < hueco; i++) { html += '<td class="ui-datepicker-other-month">&#xa0;</td>'; }
+    for (var dia = 1; dia <= dias; dia++) {
+        if ((hueco + dia - 1) % 7 === 0 && dia > 1) { html += '</tr><tr>'; }
+        html += '<td><a class="ui-state-default" href="#" onclick="elegirDia(' + dia + '); return false;">' +
+            dia + '</a></td>';
+    }
+    html += '</tr></tbody></table>';
+    document.getElementById('ui-datepicker-div').innerHTML = html;
+}
+
+function elegirDia(dia) {
+    var input = document.getElementById('fechaImputacion');
+    var dos = function (n) { return (n < 10 ? '0' : '') + n; };
+    input.value = dos(dia) + '/' + dos(calendario.mes + 1) + '/' + calendario.anio;
+    document.getElementById('ui-datepicker-div').style.display = 'none';
+    input.form.submit();
+}
+
+/* ------------------------------------------------------------ imputación */
+
+var filaDestino = null;
+
+function formatearHoras(valor) {
+    return String(Math.round(valor * 100) / 100).replace('.', ',');
+}
+
+function recalcular() {
+    var tabla = document.getElementById('tablaImputacion');
+    if (!tabla) { return; }
+    var totales = [0, 0, 0, 0, 0];
+    var filas = tabla.querySelectorAll('#cuerpoImputacion tr.filaImputacion');
+    for (var i = 0; i < filas.length; i++) {
+        var total = 0;
+        for (var d = 0; d < 5; d++) {
+            var campo = filas[i].querySelector("input[id$='.h" + (d + 1) + "']");
+            var valor = parseFloat((campo.value || '0').replace(',', '.')) || 0;
+            totales[d] += valor;
+            total += valor;
+        }
+        filas[i].querySelector('td.totalFila').textContent = formatearHoras(total);
+    }
+    var celdas = tabla.querySelectorAll('td.totalDia');
+    for (var c = 0; c < celdas.length; c++) { celdas[c].textContent = formatearHoras(totales[c]); }
+}
+
+function nuevaLinea() {
+    var tabla = document.getElementById('tablaImputacion');
+    var i = parseInt(tabla.getAttribute('data-siguiente'), 10);
+    var habilitados = tabla.getAttribute('data-habilitados').split(',');
+    var prefijo = 'listaEmpleadoHoras[' + i + ']';
+    var html = '<td class="tdSubproyecto"><select id="' + prefijo + '.subproyecto" name="' + prefijo +
+        '.subproyecto"><option value="">Seleccione opción</option></select>' +
+        '<input type="button" id="btCambiarSubproyecto' + i + '" class="btCambiar" value="&raquo;" ' +
+        'onclick="abrirBuscador(this)"></td>';
+    for (var d = 1; d <= 5; d++) {
+        var oculto = habilitados[d - 1] === '1' ? '' : ' style="display:none"';
+        html += '<td><input type="text" class="h' + d + '" id="' + prefijo + '.h' + d + '" name="' + prefijo +
+            '.h' + d + '" value="0" size="4"' + oculto + '></td>';
+    }
+    html += '<td class="totalFila">0</td><td><input type="button" id="btEliminar' + i +
+        '" class="btEliminar" value="Eliminar" onclick="eliminarLinea(this)"></td>';
+    var fila = document.createElement('tr');
+    fila.className = 'filaImputacion';
+    fila.innerHTML = html;
+    document.getElementById('cuerpoImputacion').appendChild(fila);
+    tabla.setAttribute('data-siguiente', String(i + 1));
+}
+
+function eliminarLinea(boton) {
+    var fila = boton.closest('tr');
+    fila.parentNode.removeChild(fila);
+    recalcular();
+}
+
+function enviarImputacion(accion) {
+    var form = document.getElementById('formImputacion');
+    form.elements.accion.value = accion;
+    form.submit();
+}
+
+function guardar() {
+    enviarImputacion('guardar');
+}
+
+function emitir() {
+    if (confirm('¿Desea emitir las horas de la semana? Después no se podrán modificar.')) {
+        enviarImputacion('emitir');
+    }
+}
+
+function volver() {
+    window.location.href = '/inicio';
+}
+
+function cerrarDialogo(boton) {
+    var dialogo = boton.closest('.ui-dialog');
+    dialogo.parentNode.removeChild(dialogo);
+}
+
+/* -------------------------------------------------- buscador de proyectos */
+
+function abrirNodo(li, abrir) {
+    if (!li.querySelector(':scope > ul')) { return; }
+    li.classList.toggle('jstree-open', abrir);
+    li.classList.toggle('jstree-closed', !abrir);
+}
+
+function abrirBuscador(boton) {
+    filaDestino = boton.closest('tr');
+    document.getElementById('overlay').style.display = 'block';
+}
+
+function hideOverlay() {
+    document.getElementById('overlay').style.display = 'none';
+}
+
+function limpiarBusqueda(campo) {
+    if (campo.value === 'Introduzca proyecto/tipologia') {
+        campo.value = '';
+        campo.style.color = '';
+    }
+}
+
+/* Filtra el árbol: coincidencias, sus antecesores (abiertos) y sus descendientes */
+function buscadorJTree() {
+    var texto = document.getElementById('textoBusqueda').value.trim().toLowerCase();
+    var lis = document.querySelectorAll('#treeTipologia li');
+    if (!texto || texto === 'introduzca proyecto/tipologia') {
+        for (var i = 0; i < lis.length; i++) { lis[i].style.display = ''; }
+        return;
+    }
+    for (var j = 0; j < lis.length; j++) { lis[j].style.display = 'none'; }
+    for (var k = 0; k < lis.length; k++) {
+        var a = lis[k].querySelector(':scope > a');
+        if (!a || a.textContent.toLowerCase().indexOf(texto) < 0) { continue; }
+        var descendientes = lis[k].querySelectorAll('li');
+        for (var d = 0; d < descendientes.length; d++) { descendientes[d].style.display = ''; }
+        var nodo = lis[k];
+        while (nodo && nodo.id !== 'treeTipologia') {
+            if (nodo.tagName === 'LI') {
+                nodo.style.display = '';
+                if (nodo !== lis[k]) { abrirNodo(nodo, true); }
+            }
+            nodo = nodo.parentElement;
+        }
+    }
+}
+
+function rutaNodo(li) {
+    var nombres = [];
+    while (li) {
+        nombres.unshift(li.querySelector(':scope > a').textContent.trim());
+        li = li.parentElement.closest('#treeTipologia li');
+    }
+    return nombres.join(' - ');
+}
+
+document.addEventListener('click', function (evento) {
+    var a = evento.target.closest('#treeTipologia a');
+    if (!a) { return; }
+    evento.preventDefault();
+    var li = a.parentElement;
+    if (li.getAttribute('rel') !== 'subproyectos') {
+        abrirNodo(li, !li.classList.contains('jstree-open'));
+        return;
+    }
+    a.classList.add('jstree-clicked');
+    if (filaDestino) {
+        var select = filaDestino.querySelector('select');
+        select.innerHTML = '<option value="">Seleccione opción</option>';
+        var opcion = document.createElement('option');
+        opcion.value = li.id;
+        opcion.textContent = rutaNodo(li);
+        opcion.selected = true;
+        select.appendChild(opcion);
+    }
+    hideOverlay();
+});
+
+document.addEventListener('input', function (evento) {
+    if (evento.target.closest('#cuerpoImputacion')) { recalcular(); }
+});
@@ -0,0 +1,231 @@
+"""
+Microbenchmarks de las funciones en Python puro que corren en cada mensaje
+o en cada nodo del árbol de proyectos.
+
+- normalizar (las copias de proyecto_handler, desambiguacion y catalogo_proyectos)
+- desambiguacion: similitud, encontrar_mejor_coincidencia_nodo,
+  resolver_respuesta_desambiguacion
+- utils.proyecto_utils.parsear_path_proyecto
+- ai.interpreter.validar_ordenes y core.ejecutor.preprocesar_ordenes con
+  listas de órdenes como las que genera GPT
+- core.consultas.calcular_semanas_del_mes
+- CatalogoProyectos: indexar el árbol y buscar coincidencias
+
+Lo que depende del árbol se mide con árboles sintéticos de --tamanos
+proyectos (el generador del simulador de GestiónITT: ramas fijas con nombres
+duplicados + departamentos de 25 proyectos). Para cada caso: operaciones por
+segundo (la mejor de --repeticiones tandas de --tiempo segundos) y memoria
+asignada en el pico de una llamada (tracemalloc, KB). Los print de depuración
+de las funciones se mandan a /dev/null pero su coste cuenta, como en
+producción.
+
+--salida guarda el resultado en JSON y --comparar muestra la variación
+respecto a otra ejecución, para ver regresiones al crecer el catálogo.
+
+Uso:
+    python benchmarks/funciones_calientes.py
+    python benchmarks/funciones_calientes.py --tamanos 100,1000,10000 --salida micro.json
+    python benchmarks/funciones_calientes.py --filtro desambiguacion --comparar micro_main.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from config import Constants  # noqa: E402
+from ai.interpreter import validar_ordenes  # noqa: E402
+from benchmarks.simulador_gestionitt import ArbolProyectos  # noqa: E402
+from core.consultas import calcular_semanas_del_mes  # noqa: E402
+from core.ejecutor import preprocesar_ordenes  # noqa: E402
+from utils.proyecto_utils import parsear_path_proyecto  # noqa: E402
+from web_automation import desambiguacion  # noqa: E402
+from web_automation.catalogo_proyectos import CatalogoProyectos  # noqa: E402
+from web_automation.proyecto_handler import normalizar as normalizar_handler  # noqa: E402
+
+PROYECTOS_POR_DEPARTAMENTO = 25
+
+TEXTOS = [
+    "Estudio/Investigación", "Formación", "Departamento Desarrollo e IDI", "Permiso Retribuido Festivo",
+    "Arelance - Departamento Comercial - Preventa", "BAJA MÉDICA", "proyecto europeo fase 2",
+]
+
+
+def nodos_arbol(proyectos: int) -> list:
+    """Nodos de un árbol sintético en el formato del volcado JS de catalogo_proyectos."""
+    arbol = ArbolProyectos(max(1, proyectos // PROYECTOS_POR_DEPARTAMENTO), PROYECTOS_POR_DEPARTAMENTO)
+    nodos, posiciones = [], {}
+    pendientes = [arbol.raiz]
+    while pendientes:  # preorden, como querySelectorAll('li')
+        nodo = pendientes.pop()
+        posiciones[nodo.id] = len(nodos)
+        nodos.append({
+            "idx": len(nodos),
+            "id": nodo.id,
+            "texto": nodo.nombre,
+            "rel": nodo.rel,
+            "padre": posiciones[nodo.padre.id] if nodo.padre is not None else -1,
+        })
+        pendientes.extend(reversed(nodo.hijos))
+    return nodos
+
+
+def listas_ordenes(hoy: date) -> list:
+    """(ordenes, texto) con las formas habituales de las órdenes de GPT."""
+    lunes = hoy - timedelta(days=hoy.weekday())
+    dias = [(lunes + timedelta(days=d)).isoformat() for d in range(5)]
+    fecha = {"accion": "seleccionar_fecha", "parametros": {"fecha": dias[0]}}
+
+    def proyecto(nombre):
+        return {"accion": "seleccionar_proyecto", "parametros": {"nombre": nombre}}
+
+    def imputar(dia, horas, modo="sumar"):
+        return {"accion": "imputar_horas_dia", "parametros": {"dia": dia, "horas": horas, "modo": modo}}
+
+    guardar = {"accion": "guardar_linea"}
+    return [
+        ([fecha, proyecto("Desarrollo"), imputar(dias[0], 8), guardar], "pon 8 horas en desarrollo el lunes"),
+        ([fecha, proyecto("Formación")] + [imputar(d, 8) for d in dias] + [guardar],
+         "imputa toda la semana en formación"),
+        ([fecha, proyecto("Eventos"), imputar(dias[2], 3), proyecto("Preventa"), imputar(dias[2], 5), guardar],
+         "3 horas en eventos y 5 en preventa el miércoles"),
+        ([fecha, proyecto("Vacaciones"), imputar(dias[4], 0, "establecer"), guardar],
+         "quita las horas de vacaciones del viernes"),
+        ([fecha, imputar(dias[1], 2)], "súmale 2 horas al martes"),
+        ([fecha, proyecto("Estudio")], "pon estudio"),
+        ([fecha], "el lunes"),
+        ([fecha, {"accion": "eliminar_linea", "parametros": {"nombre": "Desarrollo"}}, guardar],
+         "borra la línea de desarrollo"),
+    ]
+
+
+def medir(funcion, argumentos: list, tiempo: float, repeticiones: int) -> dict:
+    """ops/s (mejor tanda) y KB asignados en el pico de una llamada."""
+    n = len(argumentos)
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        # Calibrar: llamadas por tanda para que dure ~tiempo
+        llamadas, transcurrido = 1, 0.0
+        while True:
+            inicio = time.perf_counter()
+            for i in range(llamadas):
+                funcion(*argumentos[i % n])
+            transcurrido = time.perf_counter() - inicio
+            if transcurrido >= tiempo / 4 or llamadas >= 10_000_000:
+                break
+            llamadas *= 4
+        llamadas = max(1, int(llamadas * tiempo / max(transcurrido, 1e-9)))
+
+        mejor = 0.0
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            for i in range(llamadas):
+                funcion(*argumentos[i % n])
+            mejor = max(mejor, llamadas / (time.perf_counter() - inicio))
+
+        muestras = min(n, 50)
+        picos = []
+        tracemalloc.start()
+        try:
+            for i in range(muestras):
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                funcion(*argumentos[i])
+                picos.append(tracemalloc.get_traced_memory()[1] - base)
+        finally:
+            tracemalloc.stop()
+
+    return {"ops_s": round(mejor, 1), "kb_pico": round(sum(picos) / len(picos) / 1024, 2)}
+
+
+def casos_fijos(hoy: date):
+    """(nombre, función, argumentos) que no dependen del tamaño del árbol."""
+    textos = [(t,) for t in TEXTOS]
+    ordenes = listas_ordenes(hoy)
+    yield "normalizar[proyecto_handler]", normalizar_handler, textos
+    yield "normalizar[desambiguacion]", desambiguacion.normalizar, textos
+    yield "normalizar_texto[constants]", Constants.normalizar_texto, textos
+    yield "similitud", desambiguacion.similitud, [
+        ("comercial", "Arelance → Departamento Comercial → Desarrollo"),
+        ("IDI", "Departamento Desarrollo e IDI"),
+        ("el de admin", "Arelance → Admin-Staff → Formación"),
+    ]
+    yield "parsear_path_proyecto", parsear_path_proyecto, [
+        ("Arelance - Departamento Desarrollo e IDI - Estudio/Investigación",),
+        ("Arelance - Departamento Desarrollo e IDI - Proyecto Europeo - Fase 2",),
+        ("Departamento Comercial - Preventa",),
+        ("Vacaciones",),
+    ]
+    yield "validar_ordenes", validar_ordenes, [(o, t, {"proyecto_actual": "Desarrollo"}) for o, t in ordenes]
+    # preprocesar_ordenes no cambia la lista que recibe, solo el contexto
+    yield "preprocesar_ordenes", lambda o: preprocesar_ordenes(o, {}), [(o,) for o, _ in ordenes]
+    yield "calcular_semanas_del_mes", calcular_semanas_del_mes, [(hoy.year, m) for m in range(1, 13)]
+
+
+def casos_arbol(proyectos: int):
+    """(nombre, función, argumentos) sobre un árbol de `proyectos` proyectos."""
+    nodos = nodos_arbol(proyectos)
+    catalogo = CatalogoProyectos(nodos)
+    # Un proyecto repetido en cada departamento generado: la lista crece con el árbol
+    coincidencias = catalogo.coincidencias("-001")
+    ultimo = f"Departamento {max(1, proyectos // PROYECTOS_POR_DEPARTAMENTO):02d}"
+
+    yield "CatalogoProyectos()", CatalogoProyectos, [(nodos,)]
+    yield "catalogo.coincidencias", catalogo.coincidencias, [("Desarrollo",), ("Formación",), ("-013",)]
+    yield "encontrar_mejor_coincidencia_nodo", desambiguacion.encontrar_mejor_coincidencia_nodo, [
+        (ultimo.lower(), coincidencias), ("comercial", catalogo.coincidencias("Desarrollo")),
+    ]
+    yield "resolver_respuesta_desambiguacion", desambiguacion.resolver_respuesta_desambiguacion, [
+        ("la 2", coincidencias), ("el tres", coincidencias), ("el de comercial", coincidencias),
+    ]
+    yield "parsear_path_proyecto[arbol]", lambda: [
+        parsear_path_proyecto(" - ".join(n["ruta"])) for n in catalogo.nodos if n["es_hoja"]
+    ], [()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", default="100,1000,10000", help="proyectos de los árboles sintéticos")
+    parser.add_argument("--tiempo", type=float, default=0.3, help="segundos por tanda")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--filtro", help="solo los casos cuyo nombre contenga este texto")
+    parser.add_argument("--salida", help="fichero JSON donde guardar el resultado")
+    parser.add_argument("--comparar", help="resultado JSON de otra ejecución")
+    args = parser.parse_args()
+
+    casos = [(nombre, "-", f, a) for nombre, f, a in casos_fijos(date.today())]
+    for tamano in (int(t) for t in args.tamanos.split(",")):
+        casos += [(nombre, str(tamano), f, a) for nombre, f, a in casos_arbol(tamano)]
+    if args.filtro:
+        casos = [c for c in casos if args.filtro in c[0]]
+
+    anterior = {}
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = {(r["caso"], r["proyectos"]): r for r in json.load(f)["resultados"]}
+
+    print(f"{'caso':<38}{'proyectos':>10}{'ops/s':>14}{'KB pico':>10}")
+    resultados = []
+    for nombre, tamano, funcion, argumentos in casos:
+        medida = medir(funcion, argumentos, args.tiempo, args.repeticiones)
+        resultados.append({"caso": nombre, "proyectos": tamano, **medida})
+        linea = f"{nombre:<38}{tamano:>10}{medida['ops_s']:>14,.0f}{medida['kb_pico']:>10.2f}"
+        previo = anterior.get((nombre, tamano))
+        if previo and previo["ops_s"]:
+            linea += f"   {(medida['ops_s'] / previo['ops_s'] - 1) * 100:+.1f} % ops/s"
+        print(linea)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "resultados": resultados}, f, ensure_ascii=False, indent=2)
+        print(f"Resultado en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
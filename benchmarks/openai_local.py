@@ -0,0 +1,220 @@
+"""
+Servidor local compatible con la API de OpenAI (POST /v1/chat/completions)
+para los benchmarks de extremo a extremo.
+
+Reconoce qué parte de ai/ hace la llamada por el mensaje de sistema
+(clasificar, unificado, interpretar, consulta, respuesta o conversacion),
+saca el texto del usuario del prompt y responde con lo que diga el catálogo
+para ese texto: {"texto": {"tipo": ..., "ordenes": [...], "consulta": {...}}}.
+Si el texto no está en el catálogo lo trata como conversación.
+
+Cada tipo de llamada tarda lo que indique el perfil de latencia (ms, con
+±jitter) y la respuesta trae `usage` para que cuenten los tokens en /metrics.
+
+Uso (para apuntar el bot a él):
+    python benchmarks/openai_local.py --puerto 8091
+    OPENAI_BASE_URL=http://127.0.0.1:8091/v1 OPENAI_API_KEY=local python run_server.py
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ms por tipo de llamada (del orden de lo que tardan gpt-4o / gpt-4o-mini)
+LATENCIAS_MS = {
+    "clasificar": 350,
+    "unificado": 1200,
+    "interpretar": 1000,
+    "consulta": 500,
+    "respuesta": 700,
+    "conversacion": 800,
+}
+
+# Frase fija de cada mensaje de sistema de ai/ -> tipo de llamada
+_SISTEMAS = [
+    ("Respondes SOLO con una palabra", "clasificar"),
+    ("clasificador e intérprete", "unificado"),
+    ("intérprete experto de lenguaje natural", "interpretar"),
+    ("intérprete de fechas", "consulta"),
+    ("confirma tareas completadas", "respuesta"),
+]
+
+# Dónde pone cada prompt el mensaje del usuario (el último es el bueno: el
+# prompt unificado incluye los de comandos y consultas)
+_RE_TEXTO = re.compile(r'(?:Frase del usuario|El usuario pregunta|Mensaje|para el mensaje): "(.*)"')
+
+
+def tipo_llamada(mensajes: list) -> str:
+    sistema = next((m.get("content") or "" for m in mensajes if m.get("role") == "system"), "")
+    for frase, tipo in _SISTEMAS:
+        if frase in sistema:
+            return tipo
+    return "conversacion"
+
+
+def texto_usuario(mensajes: list) -> str:
+    ultimo = next((m.get("content") or "" for m in reversed(mensajes) if m.get("role") == "user"), "")
+    encontrados = _RE_TEXTO.findall(ultimo)
+    return encontrados[-1] if encontrados else ultimo.strip()
+
+
+class ServidorOpenAILocal:
+    """
+    Servidor en un hilo; se usa como context manager o con iniciar() / parar().
+
+    Args:
+        catalogo: texto del usuario -> {"tipo", "ordenes", "consulta"}
+        latencias_ms: perfil por tipo de llamada (por defecto LATENCIAS_MS)
+        factor_latencia: multiplica todo el perfil (0 = sin espera)
+        jitter: variación relativa (0.3 = ±30 %)
+    """
+
+    def __init__(self, catalogo: dict = None, puerto: int = 0, latencias_ms: dict = None,
+                 factor_latencia: float = 1.0, jitter: float = 0.3):
+        self.catalogo = catalogo or {}
+        self.puerto = puerto
+        self.latencias_ms = {**LATENCIAS_MS, **(latencias_ms or {})}
+        self.factor_latencia = factor_latencia
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self.llamadas = {tipo: 0 for tipo in self.latencias_ms}
+        self.desconocidos = 0
+        self._servidor = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.puerto}/v1"
+
+    def iniciar(self):
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", self.puerto), self._manejador())
+        self._servidor.daemon_threads = True
+        self.puerto = self._servidor.server_port
+        threading.Thread(target=self._servidor.serve_forever, daemon=True, name="openai-local").start()
+        return self
+
+    def parar(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {"llamadas": dict(self.llamadas), "textos_desconocidos": self.desconocidos}
+
+    def contenido(self, tipo: str, texto: str) -> str:
+        """Lo que respondería el modelo a la llamada `tipo` para `texto`."""
+        entrada = self.catalogo.get(texto)
+        if entrada is None:
+            with self._lock:
+                self.desconocidos += 1
+            entrada = {"tipo": "conversacion"}
+
+        if tipo == "clasificar":
+            return entrada["tipo"]
+        if tipo == "unificado":
+            datos = {"tipo": entrada["tipo"]}
+            if entrada["tipo"] == "comando":
+                datos["ordenes"] = entrada.get("ordenes") or []
+            elif entrada["tipo"] == "consulta":
+                datos["consulta"] = entrada.get("consulta") or {"tipo": "listar_proyectos"}
+            return json.dumps(datos, ensure_ascii=False)
+        if tipo == "interpretar":
+            return json.dumps(entrada.get("ordenes") or [], ensure_ascii=False)
+        if tipo == "consulta":
+            return json.dumps(entrada.get("consulta") or {"tipo": "listar_proyectos"}, ensure_ascii=False)
+        if tipo == "respuesta":
+            return "¡Listo! He imputado las horas y lo he guardado todo."
+        return "¡Hola! Soy tu asistente de imputación de horas. ¿Qué necesitas?"
+
+    def _esperar(self, tipo: str):
+        espera = self.latencias_ms.get(tipo, 0) * self.factor_latencia
+        if self.jitter:
+            espera *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        if espera > 0:
+            time.sleep(espera / 1000)
+
+    def _manejador(self):
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                cuerpo = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    return self._responder(404, {"error": {"message": "No encontrado"}})
+
+                mensajes = cuerpo.get("messages") or []
+                tipo = tipo_llamada(mensajes)
+                with servidor._lock:
+                    servidor.llamadas[tipo] = servidor.llamadas.get(tipo, 0) + 1
+                servidor._esperar(tipo)
+
+                contenido = servidor.contenido(tipo, texto_usuario(mensajes))
+                prompt = sum(len(m.get("content") or "") for m in mensajes) // 4
+                completion = max(1, len(contenido) // 4)
+                self._responder(200, {
+                    "id": f"chatcmpl-local-{random.getrandbits(32):08x}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": cuerpo.get("model") or "local",
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": contenido},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": prompt, "completion_tokens": completion,
+                              "total_tokens": prompt + completion},
+                })
+
+            def _responder(self, codigo, datos):
+                cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+                self.send_response(codigo)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        return Manejador
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--puerto", type=int, default=8091)
+    parser.add_argument("--factor-latencia", type=float, default=1.0, help="multiplica el perfil (0 = sin espera)")
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--catalogo", help="JSON con texto -> {tipo, ordenes, consulta}")
+    args = parser.parse_args()
+
+    catalogo = {}
+    if args.catalogo:
+        with open(args.catalogo, encoding="utf-8") as f:
+            catalogo = json.load(f)
+
+    servidor = ServidorOpenAILocal(catalogo, args.puerto, factor_latencia=args.factor_latencia,
+                                   jitter=args.jitter).iniciar()
+    print(f"OpenAI local en {servidor.url} ({len(catalogo)} textos en el catálogo)")
+    print(f"Para el bot: OPENAI_BASE_URL={servidor.url} OPENAI_API_KEY=local")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        servidor.parar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark del perfil de Chrome: clásico frente al perfil ligero de automatización.
+
+Contra el simulador de GestiónITT con --recursos (logo, fuente corporativa y
+analítica en cada página, como la intranet de verdad) arranca un navegador
+de browser_pool.BrowserSession con cada perfil, hace login y navega
+--navegaciones veces alternando /inicio y la pantalla de imputación.
+
+    clasico: con ventana, pageLoadStrategy normal, sin bloqueos ni flags
+    ligero:  lo de settings por defecto: headless, eager, bloqueo por CDP de
+             imágenes / fuentes / analítica, sin animaciones y flags de memoria
+
+Por perfil: arranque de Chrome, tiempo de driver.get() y hasta que la página
+está lista (esperar_pagina_lista, lo que espera el bot), RSS de los procesos
+de Chrome (suma de los hijos del chromedriver, /proc: solo Linux) y recursos
+pesados que llegaron a pedirse al simulador.
+
+El perfil clásico abre ventana: en un Linux sin pantalla, con xvfb-run.
+
+Uso:
+    xvfb-run python benchmarks/perfil_navegador.py
+    python benchmarks/perfil_navegador.py --perfiles ligero --navegaciones 40
+    xvfb-run python benchmarks/perfil_navegador.py --latencia-recursos-ms 150 --departamentos 60
+"""
+
+import argparse
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.carga_chats import descendientes, rss_mb  # noqa: E402
+from benchmarks.simulador_gestionitt import SimuladorGestionITT  # noqa: E402
+from browser_pool import BrowserSession  # noqa: E402
+from config import settings  # noqa: E402
+from web_automation import hacer_login  # noqa: E402
+from web_automation.esperas import esperar_pagina_lista  # noqa: E402
+
+PERFILES = {
+    "clasico": {
+        "BROWSER_HEADLESS": False,
+        "BROWSER_PAGE_LOAD_STRATEGY": "normal",
+        "BROWSER_BLOCK_RESOURCES": False,
+        "BROWSER_DISABLE_ANIMATIONS": False,
+        "BROWSER_MEMORY_FLAGS": False,
+    },
+    "ligero": {
+        "BROWSER_HEADLESS": True,
+        "BROWSER_PAGE_LOAD_STRATEGY": "eager",
+        "BROWSER_BLOCK_RESOURCES": True,
+        "BROWSER_DISABLE_ANIMATIONS": True,
+        "BROWSER_MEMORY_FLAGS": True,
+    },
+}
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def rss_chrome(session) -> tuple:
+    """(MB, procesos) de Chrome: los descendientes del chromedriver."""
+    procesos = descendientes(session.driver.service.process.pid)
+    return sum(rss_mb(p) for p in procesos), len(procesos)
+
+
+def medir_perfil(nombre, simulador, navegaciones) -> dict:
+    for clave, valor in PERFILES[nombre].items():
+        setattr(settings, clave, valor)
+    recursos_antes = simulador.get_stats()["peticiones"].get("GET /recursos", 0)
+
+    inicio = time.perf_counter()
+    session = BrowserSession(f"perfil-{nombre}")
+    if not session.initialize():
+        raise RuntimeError("No se pudo arrancar Chrome (¿falta chromedriver o xvfb-run?)")
+    arranque = (time.perf_counter() - inicio) * 1000
+
+    get_ms, lista_ms, memoria = [], [], []
+    try:
+        ok, mensaje = hacer_login(session.driver, session.wait, f"perfil-{nombre}", "clave-local")
+        if not ok:
+            raise RuntimeError(mensaje)
+        for n in range(navegaciones):
+            destino = simulador.url + ("imputacion" if n % 2 else "inicio")
+            t0 = time.perf_counter()
+            session.driver.get(destino)
+            t1 = time.perf_counter()
+            esperar_pagina_lista(session.driver, "perfil_navegador")
+            get_ms.append((t1 - t0) * 1000)
+            lista_ms.append((time.perf_counter() - t0) * 1000)
+            memoria.append(rss_chrome(session))
+    finally:
+        session.close()
+
+    return {
+        "arranque_ms": arranque,
+        "get_p50": _percentil(get_ms, 0.5),
+        "get_p95": _percentil(get_ms, 0.95),
+        "lista_p50": _percentil(lista_ms, 0.5),
+        "lista_p95": _percentil(lista_ms, 0.95),
+        "rss_final": memoria[-1][0] if memoria else 0.0,
+        "rss_max": max((m[0] for m in memoria), default=0.0),
+        "procesos": max((m[1] for m in memoria), default=0),
+        "recursos": simulador.get_stats()["peticiones"].get("GET /recursos", 0) - recursos_antes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--perfiles", default="clasico,ligero")
+    parser.add_argument("--navegaciones", type=int, default=20)
+    parser.add_argument("--latencia-ms", type=float, default=50, help="espera de cada página")
+    parser.add_argument("--latencia-recursos-ms", type=float, default=80, help="espera de cada imagen/fuente/script")
+    parser.add_argument("--departamentos", type=int, default=20)
+    parser.add_argument("--proyectos", type=int, default=15)
+    args = parser.parse_args()
+
+    simulador = SimuladorGestionITT(
+        latencia_ms=args.latencia_ms, departamentos=args.departamentos, proyectos=args.proyectos,
+        recursos=True, latencia_recursos_ms=args.latencia_recursos_ms,
+    ).iniciar()
+    settings.LOGIN_URL = simulador.url
+    print(f"Simulador en {simulador.url}: {simulador.arbol.total_nodos} nodos, latencia {args.latencia_ms:g} ms, "
+          f"recursos {args.latencia_recursos_ms:g} ms")
+
+    resultados = {}
+    try:
+        for nombre in args.perfiles.split(","):
+            resultados[nombre] = medir_perfil(nombre, simulador, args.navegaciones)
+            print(f"[{nombre}] {args.navegaciones} navegaciones")
+    finally:
+        simulador.parar()
+
+    print(f"\n{'perfil':<10}{'arranque':>10}{'get p50':>9}{'get p95':>9}{'lista p50':>11}{'lista p95':>11}"
+          f"{'RSS MB':>9}{'máx MB':>9}{'procesos':>10}{'recursos':>10}")
+    for nombre, r in resultados.items():
+        print(f"{nombre:<10}{r['arranque_ms']:>10.0f}{r['get_p50']:>9.0f}{r['get_p95']:>9.0f}"
+              f"{r['lista_p50']:>11.0f}{r['lista_p95']:>11.0f}{r['rss_final']:>9.0f}{r['rss_max']:>9.0f}"
+              f"{r['procesos']:>10}{r['recursos']:>10}")
+    print("(tiempos en ms; RSS suma la memoria compartida de cada proceso)")
+
+
+if __name__ == "__main__":
+    main()
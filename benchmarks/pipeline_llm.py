@@ -0,0 +1,93 @@
+"""
+Benchmark de clasificar_mensaje + interpretar_con_gpt con respuestas grabadas.
+
+Pasa los mensajes del corpus (benchmarks/datos/clasificador.tsv) por
+ai.classifier.clasificar_mensaje y los comandos por
+ai.interpreter.interpretar_con_gpt, con el transporte de ai/transporte_llm.py:
+
+- --modo record: llama a OpenAI (hace falta OPENAI_API_KEY) y graba.
+- --modo replay: responde desde las grabaciones, sin red, con la latencia de
+  --latencia por modelo; así dos ejecuciones solo se diferencian en el
+  código de ai/ (prompts, validación, clasificador local...).
+
+La cache de interpretaciones se desactiva para que cada pasada llame al
+modelo. Muestra p50/p95/máx por fase y lo reproducido / grabado.
+
+Uso:
+    python benchmarks/pipeline_llm.py --modo record
+    python benchmarks/pipeline_llm.py --modo replay --pasadas 5
+    python benchmarks/pipeline_llm.py --modo replay --latencia "gpt-4o=0,gpt-4o-mini=0"
+"""
+
+import argparse
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.clasificador import CORPUS, cargar_corpus, percentil  # noqa: E402
+from config import settings  # noqa: E402
+
+GRABACIONES = os.path.join(RAIZ, "benchmarks", "datos", "grabaciones_llm.jsonl")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modo", choices=["openai", "record", "replay"], default="replay")
+    parser.add_argument("--grabaciones", default=GRABACIONES)
+    parser.add_argument("--latencia", default="gpt-4o=1000,gpt-4o-mini=350",
+                        help="ms por modelo para las respuestas reproducidas")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--pasadas", type=int, default=1)
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--limite", type=int, default=0, help="usar solo los N primeros mensajes")
+    parser.add_argument("--sin-clasificador-local", action="store_true", help="clasificar todo con el modelo")
+    args = parser.parse_args()
+
+    # Antes de crear el cliente OpenAI, que lee el modo al crearse
+    settings.LLM_MODE = args.modo
+    settings.LLM_RECORDINGS_FILE = args.grabaciones
+    settings.LLM_LATENCY_MS = args.latencia
+    settings.LLM_LATENCY_JITTER = args.jitter
+    settings.USE_INTERPRETATION_CACHE = False
+    if args.sin_clasificador_local:
+        settings.USE_LOCAL_CLASSIFIER = False
+
+    from ai.classifier import clasificar_mensaje
+    from ai.interpreter import interpretar_con_gpt
+    from ai.transporte_llm import obtener_stats_llm
+
+    ejemplos = cargar_corpus(args.corpus)
+    if args.limite:
+        ejemplos = ejemplos[:args.limite]
+
+    tiempos = {"clasificar": [], "interpretar": [], "total": []}
+    sin_ordenes = 0
+    inicio = time.perf_counter()
+    for _ in range(args.pasadas):
+        for _, texto in ejemplos:
+            t0 = time.perf_counter()
+            categoria = clasificar_mensaje(texto)
+            t1 = time.perf_counter()
+            tiempos["clasificar"].append((t1 - t0) * 1000)
+            if categoria == "comando":
+                if not interpretar_con_gpt(texto, {}):
+                    sin_ordenes += 1
+                tiempos["interpretar"].append((time.perf_counter() - t1) * 1000)
+            tiempos["total"].append((time.perf_counter() - t0) * 1000)
+    total_s = time.perf_counter() - inicio
+
+    print(f"\n{'fase':<14}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'máx ms':>10}")
+    for fase, valores in tiempos.items():
+        if valores:
+            print(f"{fase:<14}{len(valores):>6}{percentil(valores, 0.5):>10.1f}"
+                  f"{percentil(valores, 0.95):>10.1f}{max(valores):>10.1f}")
+    print(f"\n{len(ejemplos)} mensajes x {args.pasadas} pasadas en {total_s:.1f} s, "
+          f"{sin_ordenes} comandos sin órdenes")
+    print(f"LLM: {obtener_stats_llm()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark de las respuestas de comandos: plantillas vs GPT.
+
+Para cada comando de ejemplo (mensajes tal como los devuelve ejecutar_accion)
+mide cuánto tarda en montarse la respuesta con plantillas
+(ai/plantillas_respuesta.py) y, con --gpt, cuánto tarda la reformulación con
+GPT que se usaba antes, para ver la latencia que se ahorra por comando.
+
+Uso:
+    python benchmarks/respuestas.py
+    python benchmarks/respuestas.py --gpt          # necesita OPENAI_API_KEY
+"""
+
+import argparse
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from ai.plantillas_respuesta import renderizar_respuesta  # noqa: E402
+from config import settings  # noqa: E402
+
+CONTEXTO = {
+    "proyecto_actual": "Desarrollo",
+    "nodo_padre_actual": "Departamento Comercial",
+    "path_completo_actual": "Arelance - Departamento Comercial - Desarrollo",
+}
+
+# (descripción, texto del usuario, mensajes de ejecutar_accion)
+COMANDOS = [
+    ("imputar día", "pon 8 horas en desarrollo el lunes", [
+        "He seleccionado la fecha 12/01/2026",
+        "He abierto el proyecto 'Desarrollo' de 'Departamento Comercial'",
+        "He imputado 8.0h el lunes en el proyecto Desarrollo [FECHA:12/01/2026]",
+        "He guardado los cambios",
+    ]),
+    ("sumar horas", "añade 2 horas a desarrollo hoy", [
+        "Ya estás en la semana del 12/01/2026",
+        "He abierto el proyecto 'Desarrollo'",
+        "He añadido 2.0h el martes en el proyecto Desarrollo (total: 6.0h) [FECHA:13/01/2026]",
+        "He guardado los cambios",
+    ]),
+    ("restar horas", "quita 1,5 horas de desarrollo el viernes", [
+        "He abierto el proyecto 'Desarrollo'",
+        "He restado 1.5h el viernes en el proyecto Desarrollo (total: 6.5h) [FECHA:16/01/2026]",
+        "He guardado los cambios",
+    ]),
+    ("semana completa", "imputa toda la semana en desarrollo", [
+        "He abierto el proyecto 'Desarrollo' de 'Departamento Comercial'",
+        "He imputado en el proyecto Desarrollo: lunes (8.5h), martes (8.5h), miércoles (8.5h), jueves (8.5h), viernes (6.5h)",
+        "He guardado los cambios",
+    ]),
+    ("borrar día", "borra las horas del miércoles", [
+        "He seleccionado la fecha 14/01/2026",
+        "He borrado las horas del miércoles en: Desarrollo (8.0h), Formación (1.0h)",
+        "He guardado los cambios",
+    ]),
+    ("emitir", "emite las horas", [
+        "He guardado los cambios",
+        "He emitido las horas correctamente",
+    ]),
+    ("jornada", "inicia la jornada", [
+        "He iniciado tu jornada laboral",
+    ]),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=2000, help="pasadas para medir las plantillas")
+    parser.add_argument("--gpt", action="store_true", help="medir también la respuesta con GPT (una llamada por comando)")
+    args = parser.parse_args()
+
+    if args.gpt:
+        from ai.response_generator import generar_respuesta_natural
+        settings.USE_RESPONSE_TEMPLATES = False
+
+    print(f"{'comando':<18}{'plantilla':>12}{'gpt':>12}{'ahorro':>12}")
+    for descripcion, texto, mensajes in COMANDOS:
+        respuesta = renderizar_respuesta(mensajes, CONTEXTO)
+        if respuesta is None:
+            print(f"{descripcion:<18}  sin plantilla (iría a GPT)")
+            continue
+
+        inicio = time.perf_counter()
+        for _ in range(args.repeticiones):
+            renderizar_respuesta(mensajes, CONTEXTO)
+        plantilla_ms = (time.perf_counter() - inicio) / args.repeticiones * 1000
+
+        columnas = f"{descripcion:<18}{plantilla_ms:>10.3f}ms"
+        if args.gpt:
+            inicio = time.perf_counter()
+            generar_respuesta_natural(mensajes, texto, CONTEXTO)
+            gpt_ms = (time.perf_counter() - inicio) * 1000
+            columnas += f"{gpt_ms:>10.0f}ms{gpt_ms - plantilla_ms:>10.0f}ms"
+        print(columnas)
+        print("    " + respuesta.replace("\n", "\n    "))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,749 @@
+"""
+Simulador local de GestiónITT para medir web_automation sin la intranet.
+
+Reproduce las pantallas que maneja el bot con los mismos selectores que
+config/selectors.py:
+- Login: #usuario, #password, #btAceptar y .errorLogin si no valen.
+- Pantalla principal: .botonSalirHtml, botones de jornada y el datepicker
+  (input.hasDatepicker dentro de un formulario + .ui-datepicker-trigger).
+- Pantalla de imputación de la semana elegida: cabeceras td.tdDia /
+  td.tdDiaDisabled (días de otro mes, con su input .hN oculto), filas con el
+  select listaEmpleadoHoras[i].subproyecto (deshabilitado si la línea ya está
+  guardada) y los inputs .h1..h5, Nueva línea, Guardar (los errores salen en
+  un .ui-dialog), Emitir (confirm de JS), Volver y el buscador de proyectos
+  con el jstree #treeTipologia.
+- Un jQuery mínimo (benchmarks/datos/simulador/gestionitt.js) con lo que usan
+  los scripts del bot: jQuery.active, .jstree('open_all'...),
+  .datepicker('option', 'dateFormat'), buscadorJTree() y hideOverlay().
+
+Las horas por usuario y semana, la jornada y la semana elegida en cada sesión
+viven en memoria. Se configuran la latencia del servidor y el tamaño del
+árbol de proyectos para medir cada cambio con páginas de tamaño controlado.
+
+Uso:
+    python benchmarks/simulador_gestionitt.py --puerto 8090
+    python benchmarks/simulador_gestionitt.py --latencia-ms 150 --departamentos 40 --proyectos 25
+    URL_PRIVADA=http://127.0.0.1:8090/ python run_server.py   # el bot contra el simulador
+
+Desde otro benchmark:
+    from benchmarks.simulador_gestionitt import SimuladorGestionITT
+    with SimuladorGestionITT(latencia_ms=100) as simulador:
+        settings.LOGIN_URL = simulador.url
+"""
+
+import argparse
+import html
+import json
+import os
+import random
+import secrets
+import struct
+import threading
+import time
+import zlib
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+DIR_ESTATICOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datos", "simulador")
+
+MESES = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", "Julio",
+         "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"]
+DIAS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes"]
+TEXTO_BUSQUEDA = "Introduzca proyecto/tipologia"
+SIN_SELECCION = "Seleccione opción"
+
+# Ramas que existen siempre: nombres repetidos en varios departamentos (para
+# la desambiguación), contenidos unos en otros y un subproyecto con hijos
+ARBOL_FIJO = [
+    ("Departamento Desarrollo e IDI", [
+        "Desarrollo", "Estudio/Investigación", "Formación",
+        ("Proyecto Europeo", ["Fase 1", "Fase 2"]),
+    ]),
+    ("Departamento Comercial", ["Desarrollo", "Eventos", "Preventa"]),
+    ("Admin-Staff", ["Formación", "Permiso Retribuido", "Permiso Retribuido Festivo", "Vacaciones", "Baja Médica"]),
+]
+
+# Subcarpetas por nivel cuando --profundidad > 1
+AREAS_POR_NIVEL = 2
+
+
+def lunes_de(fecha: date) -> date:
+    return fecha - timedelta(days=fecha.weekday())
+
+
+def dias_habilitados(fecha: date) -> list:
+    """L-V de la semana de `fecha`: solo se imputan los días del mismo mes (el resto, tdDiaDisabled)."""
+    lunes = lunes_de(fecha)
+    return [((lunes + timedelta(days=d)).year, (lunes + timedelta(days=d)).month) == (fecha.year, fecha.month)
+            for d in range(5)]
+
+
+def formatear_horas(horas: float) -> str:
+    """8.5 -> '8,5' (como las pinta la intranet)."""
+    return f"{horas:g}".replace(".", ",")
+
+
+# ============================================================================
+# ÁRBOL DE PROYECTOS
+# ============================================================================
+
+class Nodo:
+    __slots__ = ("id", "nombre", "rel", "padre", "hijos")
+
+    def __init__(self, ident, nombre, rel, padre=None):
+        self.id = ident
+        self.nombre = nombre
+        self.rel = rel
+        self.padre = padre
+        self.hijos = []
+
+    def ruta(self) -> list:
+        nodos, nodo = [], self
+        while nodo is not None:
+            nodos.append(nodo.nombre)
+            nodo = nodo.padre
+        return nodos[::-1]
+
+    def texto_opcion(self) -> str:
+        """'Arelance - Departamento Comercial - Desarrollo', el texto de la opción del select."""
+        return " - ".join(self.ruta())
+
+
+class ArbolProyectos:
+    """
+    Árbol de tipologías: la raíz, las ramas de ARBOL_FIJO y `departamentos`
+    ramas generadas con `profundidad` niveles de carpetas y `proyectos`
+    subproyectos en cada carpeta final.
+    """
+
+    def __init__(self, departamentos: int = 10, proyectos: int = 10, profundidad: int = 1):
+        self._siguiente = 0
+        self.por_id = {}
+        self.raiz = self._nuevo("Arelance", "raiz", None)
+        self.habituales = []  # hojas de ARBOL_FIJO: las que tienen horas al sembrar
+
+        for departamento, hijos in ARBOL_FIJO:
+            nodo = self._nuevo(departamento, "tipologia", self.raiz)
+            self._fijos(nodo, hijos)
+
+        for d in range(1, departamentos + 1):
+            nodo = self._nuevo(f"Departamento {d:02d}", "tipologia", self.raiz)
+            self._generar(nodo, f"{d:02d}", max(1, profundidad), proyectos)
+
+    def _nuevo(self, nombre, rel, padre):
+        self._siguiente += 1
+        nodo = Nodo(f"j1_{self._siguiente}", nombre, rel, padre)
+        self.por_id[nodo.id] = nodo
+        if padre is not None:
+            padre.hijos.append(nodo)
+        return nodo
+
+    def _fijos(self, padre, hijos):
+        for hijo in hijos:
+            if isinstance(hijo, tuple):
+                nodo = self._nuevo(hijo[0], "subproyectos", padre)
+                self._fijos(nodo, hijo[1])
+            else:
+                self.habituales.append(self._nuevo(hijo, "subproyectos", padre))
+
+    def _generar(self, padre, prefijo, niveles, proyectos):
+        if niveles > 1:
+            for a in range(1, AREAS_POR_NIVEL + 1):
+                area = self._nuevo(f"Área {prefijo}.{a}", "tipologia", padre)
+                self._generar(area, f"{prefijo}.{a}", niveles - 1, proyectos)
+            return
+        for p in range(1, proyectos + 1):
+            self._nuevo(f"Proyecto {prefijo}-{p:03d}", "subproyectos", padre)
+
+    def subproyecto(self, ident: str):
+        nodo = self.por_id.get(ident)
+        return nodo if nodo is not None and nodo.rel == "subproyectos" else None
+
+    @property
+    def total_nodos(self) -> int:
+        return len(self.por_id)
+
+
+# ============================================================================
+# ESTADO DE LA INTRANET
+# ============================================================================
+
+class EstadoIntranet:
+    """
+    Horas por (usuario, lunes) y jornada por usuario. Cada semana se siembra
+    la primera vez que se pide, de forma determinista con la semilla:
+    - semanas futuras: vacías
+    - semana actual: vacía para `fraccion_sin_horas` de los usuarios; el resto
+      con horas hasta hoy
+    - semanas pasadas: con horas, emitidas las anteriores a la pasada
+    """
+
+    def __init__(self, arbol: ArbolProyectos, max_horas_dia: float = 12, fraccion_sin_horas: float = 0.5,
+                 semilla: int = 0):
+        self.arbol = arbol
+        self.max_horas_dia = max_horas_dia
+        self.fraccion_sin_horas = fraccion_sin_horas
+        self.semilla = semilla
+        self._lock = threading.Lock()
+        self._semanas = {}  # (usuario, lunes) -> {"filas": [[id_nodo, [h1..h5]]], "emitida": bool}
+        self._jornadas = {}  # usuario -> "sin_iniciar" | "iniciada" | "finalizada"
+
+    def _sembrar(self, usuario: str, lunes: date) -> dict:
+        hoy = date.today()
+        lunes_hoy = lunes_de(hoy)
+        rnd = random.Random(f"{self.semilla}:{usuario}:{lunes.isoformat()}")
+        semana = {"filas": [], "emitida": lunes < lunes_hoy - timedelta(days=7)}
+        if lunes > lunes_hoy or (lunes == lunes_hoy and rnd.random() < self.fraccion_sin_horas):
+            return semana
+
+        dias = 5 if lunes < lunes_hoy else min(5, hoy.weekday() + 1)
+        jornada = [8.5, 8.5, 8.5, 8.5, 6.5]
+        proyectos = rnd.sample(self.arbol.habituales, k=rnd.choice([1, 2]))
+        reparto = [1.0] if len(proyectos) == 1 else [0.75, 0.25]
+        for nodo, parte in zip(proyectos, reparto):
+            horas = [jornada[i] * parte if i < dias else 0.0 for i in range(5)]
+            semana["filas"].append([nodo.id, horas])
+        return semana
+
+    def semana(self, usuario: str, lunes: date) -> dict:
+        """Copia de la semana de `usuario` que empieza en `lunes`."""
+        with self._lock:
+            semana = self._semanas.get((usuario, lunes))
+            if semana is None:
+                semana = self._semanas[(usuario, lunes)] = self._sembrar(usuario, lunes)
+            return {"filas": [[i, list(h)] for i, h in semana["filas"]], "emitida": semana["emitida"]}
+
+    def guardar(self, usuario: str, lunes: date, filas: list, habilitados: list, emitir: bool = False):
+        """
+        Valida y guarda las líneas enviadas por el formulario.
+
+        Args:
+            filas: [(id del subproyecto o "", [texto h1..h5])] en orden
+            habilitados: 5 booleanos; los días de otro mes conservan lo guardado
+
+        Returns:
+            str | None: Mensaje de error (como lo mostraría la intranet) o None
+        """
+        anterior = self.semana(usuario, lunes)
+        if anterior["emitida"]:
+            return "La semana ya está emitida y no se puede modificar"
+        guardadas = {ident: horas for ident, horas in anterior["filas"]}
+
+        nuevas, vistos = [], set()
+        for ident, textos in filas:
+            try:
+                horas = [float((t or "0").strip().replace(",", ".") or 0) for t in textos]
+            except ValueError:
+                return f"Valor de horas no válido en la línea {len(nuevas) + 1}"
+            if any(h < 0 for h in horas):
+                return "No se pueden imputar horas negativas"
+            if not ident:
+                if any(horas):
+                    return "Debe seleccionar un subproyecto para todas las líneas con horas"
+                continue
+            nodo = self.arbol.subproyecto(ident)
+            if nodo is None:
+                return "El subproyecto seleccionado no es válido"
+            if ident in vistos:
+                return f"El subproyecto {nodo.nombre} está repetido"
+            vistos.add(ident)
+            previas = guardadas.get(ident, [0.0] * 5)
+            nuevas.append([ident, [h if habilitados[i] else previas[i] for i, h in enumerate(horas)]])
+
+        for i, dia in enumerate(DIAS):
+            total = sum(horas[i] for _, horas in nuevas)
+            if total > self.max_horas_dia:
+                return f"El {dia.lower()} se superan las {formatear_horas(self.max_horas_dia)} horas imputables"
+
+        with self._lock:
+            self._semanas[(usuario, lunes)] = {"filas": nuevas, "emitida": emitir}
+        return None
+
+    def jornada(self, usuario: str) -> str:
+        with self._lock:
+            return self._jornadas.get(usuario, "sin_iniciar")
+
+    def cambiar_jornada(self, usuario: str, accion: str) -> str:
+        with self._lock:
+            actual = self._jornadas.get(usuario, "sin_iniciar")
+            if accion == "inicio" and actual == "sin_iniciar":
+                actual = "iniciada"
+            elif accion == "fin" and actual == "iniciada":
+                actual = "finalizada"
+            self._jornadas[usuario] = actual
+            return actual
+
+
+# ============================================================================
+# PÁGINAS
+# ============================================================================
+
+# Lo que pesa una página de la intranet de verdad y el bot no necesita:
+# logo, fuente corporativa y analítica (se piden en cada página, sin cache,
+# como en un navegador recién arrancado)
+HTML_RECURSOS = (
+    '<style>@font-face { font-family: Corporativa; src: url("/recursos/corporativa.woff2"); }'
+    ' body { font-family: Corporativa, Arial, sans-serif; }</style>'
+    '<script async src="/recursos/analytics.js"></script>'
+)
+HTML_LOGO = '<img class="logo" src="/recursos/logo.png" alt="GestiónITT" width="160" height="40">'
+
+
+def _png(ancho: int, alto: int, semilla: int = 0) -> bytes:
+    """PNG válido de píxeles aleatorios (no se comprime: pesa ~ancho*alto*3)."""
+    rnd = random.Random(semilla)
+    filas = b"".join(b"\x00" + rnd.randbytes(ancho * 3) for _ in range(alto))
+
+    def bloque(tipo, datos):
+        return struct.pack(">I", len(datos)) + tipo + datos + struct.pack(">I", zlib.crc32(tipo + datos))
+
+    return (b"\x89PNG\r\n\x1a\n" + bloque(b"IHDR", struct.pack(">IIBBBBB", ancho, alto, 8, 2, 0, 0, 0))
+            + bloque(b"IDAT", zlib.compress(filas, 1)) + bloque(b"IEND", b""))
+
+
+def recursos_pesados() -> dict:
+    """nombre -> (bytes, tipo) de los recursos de HTML_RECURSOS / HTML_LOGO."""
+    relleno = random.Random(1).randbytes(60 * 1024)
+    analitica = "/* analítica */\n" + "// " + "x" * 76 + "\n"
+    return {
+        "logo.png": (_png(320, 160), "image/png"),
+        "corporativa.woff2": (b"wOF2" + relleno, "font/woff2"),
+        "analytics.js": ((analitica * 500 + "window.analiticaCargada = true;\n").encode("utf-8"),
+                         "application/javascript"),
+    }
+
+
+def _pagina(titulo: str, cuerpo: str, usuario: str = None) -> str:
+    cabecera = ""
+    if usuario:
+        cabecera = (f'<div class="cabecera"><span class="usuario">{html.escape(usuario)}</span>'
+                    f'<a class="botonSalirHtml" href="/logout">Salir</a></div>')
+    return (
+        '<!DOCTYPE html>\n<html lang="es"><head><meta charset="utf-8">'
+        f"<title>GestiónITT - {titulo}</title>"
+        '<link rel="stylesheet" href="/static/gestionitt.css">'
+        '<script src="/static/gestionitt.js"></script>'
+        f"</head><body>{cabecera}<div class=\"contenido\">{cuerpo}</div></body></html>"
+    )
+
+
+def pagina_login(error: str = None) -> str:
+    aviso = f'<div class="errorLogin">{html.escape(error)}</div>' if error else ""
+    return _pagina("Acceso", (
+        '<form id="formLogin" method="post" action="/login">'
+        '<label for="usuario">Usuario</label><input type="text" id="usuario" name="usuario">'
+        '<label for="password">Contraseña</label><input type="password" id="password" name="password">'
+        '<input type="submit" id="btAceptar" value="Aceptar">'
+        f"</form>{aviso}"
+    ))
+
+
+def pagina_inicio(usuario: str, jornada: str, fecha: date) -> str:
+    inicio = "" if jornada == "sin_iniciar" else " disabled"
+    fin = "" if jornada == "iniciada" else " disabled"
+    return _pagina("Inicio", (
+        '<div class="jornada">'
+        f'<input type="button" id="botonInicioJornada" value="Iniciar jornada" onclick="jornada(\'inicio\')"{inicio}>'
+        f'<input type="button" id="botonFinJornada" value="Finalizar jornada" onclick="jornada(\'fin\')"{fin}>'
+        "</div>"
+        '<form id="formFecha" method="post" action="/imputacion">'
+        '<input type="hidden" name="accion" value="cambiarFecha">'
+        '<label for="fechaImputacion">Fecha de imputación</label>'
+        f'<input type="text" id="fechaImputacion" name="fecha" class="hasDatepicker" readonly '
+        f'value="{fecha.strftime("%d/%m/%Y")}">'
+        '<button type="button" class="ui-datepicker-trigger" onclick="abrirCalendario()">...</button>'
+        "</form>"
+        '<div id="ui-datepicker-div" class="ui-datepicker" style="display:none"></div>'
+    ), usuario)
+
+
+def _html_arbol(nodo: Nodo) -> str:
+    if nodo.hijos:
+        hijos = "".join(_html_arbol(h) for h in nodo.hijos)
+        return (f'<li id="{nodo.id}" rel="{nodo.rel}" class="jstree-closed"><ins class="jstree-icon"></ins>'
+                f'<a href="#">{html.escape(nodo.nombre)}</a><ul>{hijos}</ul></li>')
+    return (f'<li id="{nodo.id}" rel="{nodo.rel}" class="jstree-leaf"><ins class="jstree-icon"></ins>'
+            f'<a href="#">{html.escape(nodo.nombre)}</a></li>')
+
+
+def _html_fila(i: int, nodo: Nodo, horas: list, habilitados: list, emitida: bool) -> str:
+    bloqueo = " disabled" if emitida else ""
+    opcion = f'<option value="">{SIN_SELECCION}</option>'
+    celdas = []
+    if nodo is not None:
+        opcion += f'<option value="{nodo.id}" selected>{html.escape(nodo.texto_opcion())}</option>'
+    for d in range(5):
+        oculto = "" if habilitados[d] else ' style="display:none"'
+        celdas.append(
+            f'<td><input type="text" class="h{d + 1}" id="listaEmpleadoHoras[{i}].h{d + 1}" '
+            f'name="listaEmpleadoHoras[{i}].h{d + 1}" value="{formatear_horas(horas[d])}" size="4"{oculto}{bloqueo}></td>'
+        )
+    # Una línea guardada no cambia de subproyecto: su select va deshabilitado y el id viaja oculto
+    oculto_id = f'<input type="hidden" name="listaEmpleadoHoras[{i}].idSubproyecto" value="{nodo.id}">' if nodo else ""
+    return (
+        '<tr class="filaImputacion"><td class="tdSubproyecto">'
+        f'<select id="listaEmpleadoHoras[{i}].subproyecto" name="listaEmpleadoHoras[{i}].subproyecto" disabled>'
+        f"{opcion}</select>{oculto_id}"
+        f'<input type="button" id="btCambiarSubproyecto{i}" class="btCambiar" value="&raquo;" disabled></td>'
+        f'{"".join(celdas)}<td class="totalFila">{formatear_horas(sum(horas))}</td>'
+        f'<td><input type="button" id="btEliminar{i}" class="btEliminar" value="Eliminar" '
+        f'onclick="eliminarLinea(this)"{bloqueo}></td></tr>'
+    )
+
+
+def pagina_imputacion(usuario: str, arbol: ArbolProyectos, semana: dict, fecha: date, error: str = None) -> str:
+    lunes = lunes_de(fecha)
+    dias = [lunes + timedelta(days=d) for d in range(5)]
+    habilitados = dias_habilitados(fecha)
+    emitida = semana["emitida"]
+
+    cabeceras = "".join(
+        f'<td class="{"tdDia" if habilitado else "tdDiaDisabled"}">{DIAS[d]} {dia.day}</td>'
+        for d, (dia, habilitado) in enumerate(zip(dias, habilitados))
+    )
+    filas = "".join(
+        _html_fila(i, arbol.por_id.get(ident), horas, habilitados, emitida)
+        for i, (ident, horas) in enumerate(semana["filas"])
+    )
+    totales = "".join(
+        f'<td class="totalDia">{formatear_horas(sum(h[d] for _, h in semana["filas"]))}</td>' for d in range(5)
+    )
+    dialogo = ""
+    if error:
+        dialogo = (
+            '<div class="ui-dialog" role="dialog"><div class="ui-dialog-titlebar">Error</div>'
+            f'<div class="ui-dialog-content">{html.escape(error)}</div>'
+            '<div class="ui-dialog-buttonpane"><button type="button" onclick="cerrarDialogo(this)">Aceptar</button></div>'
+            "</div>"
+        )
+    estado = '<span class="emitida">Semana emitida</span>' if emitida else ""
+
+    return _pagina("Imputación", (
+        f'<h2>Semana del {lunes.strftime("%d/%m/%Y")} {estado}</h2>'
+        '<form id="formImputacion" method="post" action="/imputacion">'
+        '<input type="hidden" name="accion" value="guardar">'
+        f'<table id="tablaImputacion" data-habilitados="{",".join("1" if h else "0" for h in habilitados)}" '
+        f'data-emitida="{1 if emitida else 0}" data-siguiente="{len(semana["filas"])}">'
+        f'<thead><tr><td class="tdCabecera">Subproyecto</td>{cabeceras}<td>Total</td><td></td></tr></thead>'
+        f'<tbody id="cuerpoImputacion">{filas}</tbody>'
+        f'<tfoot><tr><td>Total</td>{totales}<td></td><td></td></tr></tfoot>'
+        "</table></form>"
+        '<div class="botonera">'
+        '<input type="button" id="btNuevaLinea" value="Nueva línea" onclick="nuevaLinea()">'
+        '<input type="button" id="btGuardarLinea" value="Guardar" onclick="guardar()">'
+        '<input type="button" id="btEmitir" value="Emitir" onclick="emitir()">'
+        '<input type="button" id="btVolver" value="Volver" onclick="volver()">'
+        "</div>"
+        '<div id="overlay" class="overlay" style="display:none"><div class="buscador">'
+        f'<input type="text" id="textoBusqueda" value="{TEXTO_BUSQUEDA}" style="color:gray" onfocus="limpiarBusqueda(this)">'
+        '<input type="button" id="buscar" value="Buscar" onclick="buscadorJTree()">'
+        '<input type="button" id="cerrarBuscador" value="Cerrar" onclick="hideOverlay()">'
+        f'<div id="treeTipologia" class="jstree"><ul>{_html_arbol(arbol.raiz)}</ul></div>'
+        f"</div></div>{dialogo}"
+    ), usuario)
+
+
+# ============================================================================
+# SERVIDOR
+# ============================================================================
+
+def _leer_fecha(texto: str):
+    try:
+        return datetime.strptime((texto or "").strip(), "%d/%m/%Y").date()
+    except ValueError:
+        return None
+
+
+def _filas_formulario(campos: dict) -> list:
+    """[(id del subproyecto, [texto h1..h5])] de listaEmpleadoHoras[i].* en orden de índice."""
+    indices = sorted({int(clave[19:clave.index("]")]) for clave in campos
+                      if clave.startswith("listaEmpleadoHoras[") and "]" in clave
+                      and clave[19:clave.index("]")].isdigit()})
+    filas = []
+    for i in indices:
+        prefijo = f"listaEmpleadoHoras[{i}]"
+        ident = campos.get(f"{prefijo}.subproyecto") or campos.get(f"{prefijo}.idSubproyecto") or ""
+        filas.append((ident, [campos.get(f"{prefijo}.h{d}", "0") for d in range(1, 6)]))
+    return filas
+
+
+class SimuladorGestionITT:
+    """
+    Servidor HTTP del simulador en un hilo. Se usa como context manager o
+    con iniciar() / parar().
+
+    Args:
+        latencia_ms / jitter_ms: espera de cada página (no de los estáticos)
+        latencia_login_ms: espera adicional del POST de login
+        recursos: añadir a cada página logo, fuente y analítica (HTML_RECURSOS),
+            servidos con `latencia_recursos_ms` de espera
+        password: si se da, la única contraseña válida; si no, cualquiera no vacía
+        caducidad_sesion_s: inactividad tras la que la sesión caduca (0 = nunca)
+    """
+
+    def __init__(self, puerto: int = 0, latencia_ms: float = 0, jitter_ms: float = 0, latencia_login_ms: float = 0,
+                 departamentos: int = 10, proyectos: int = 10, profundidad: int = 1, max_horas_dia: float = 12,
+                 fraccion_sin_horas: float = 0.5, password: str = None, caducidad_sesion_s: float = 0,
+                 semilla: int = 0, recursos: bool = False, latencia_recursos_ms: float = 0):
+        self.puerto = puerto
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.latencia_login_ms = latencia_login_ms
+        self.password = password
+        self.caducidad_sesion_s = caducidad_sesion_s
+        self.recursos = recursos_pesados() if recursos else {}
+        self.latencia_recursos_ms = latencia_recursos_ms
+        self.arbol = ArbolProyectos(departamentos, proyectos, profundidad)
+        self.estado = EstadoIntranet(self.arbol, max_horas_dia, fraccion_sin_horas, semilla)
+        self._lock = threading.Lock()
+        self._sesiones = {}  # cookie -> {"usuario", "fecha", "ultimo"}
+        self._stats = {"peticiones": {}, "bytes": 0, "logins": 0, "logins_fallidos": 0, "guardados": 0, "errores": 0}
+        self._servidor = None
+        self._hilo = None
+
+    # ---------------- ciclo de vida ----------------
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.puerto}/"
+
+    def iniciar(self):
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", self.puerto), self._manejador())
+        self._servidor.daemon_threads = True
+        self.puerto = self._servidor.server_port
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True, name="simulador-gestionitt")
+        self._hilo.start()
+        return self
+
+    def parar(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                **{k: v for k, v in self._stats.items() if k != "peticiones"},
+                "peticiones": dict(self._stats["peticiones"]),
+                "sesiones": len(self._sesiones),
+                "nodos_arbol": self.arbol.total_nodos,
+            }
+
+    # ---------------- sesiones ----------------
+
+    def _sesion(self, cookie: str):
+        with self._lock:
+            sesion = self._sesiones.get(cookie)
+            if sesion is None:
+                return None
+            ahora = time.monotonic()
+            if self.caducidad_sesion_s and ahora - sesion["ultimo"] > self.caducidad_sesion_s:
+                del self._sesiones[cookie]
+                return None
+            sesion["ultimo"] = ahora
+            return sesion
+
+    def _abrir_sesion(self, usuario: str) -> str:
+        cookie = secrets.token_hex(16)
+        with self._lock:
+            self._sesiones[cookie] = {"usuario": usuario, "fecha": date.today(), "ultimo": time.monotonic()}
+        return cookie
+
+    def _cerrar_sesion(self, cookie: str):
+        with self._lock:
+            self._sesiones.pop(cookie, None)
+
+    def _credenciales_validas(self, usuario: str, password: str) -> bool:
+        if not usuario or not password:
+            return False
+        return self.password is None or password == self.password
+
+    def _contar(self, clave: str, cantidad: int = 1):
+        with self._lock:
+            self._stats[clave] += cantidad
+
+    def _esperar(self, extra_ms: float = 0):
+        espera = self.latencia_ms + extra_ms
+        if self.jitter_ms:
+            espera += random.uniform(-self.jitter_ms, self.jitter_ms)
+        if espera > 0:
+            time.sleep(espera / 1000)
+
+    # ---------------- HTTP ----------------
+
+    def _manejador(self):
+        simulador = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self._atender("GET")
+
+            def do_POST(self):
+                self._atender("POST")
+
+            def _atender(self, metodo):
+                ruta = urlsplit(self.path).path
+                with simulador._lock:
+                    clave = f"{metodo} {ruta if not ruta.startswith(('/static/', '/recursos/')) else ruta.rsplit('/', 1)[0]}"
+                    simulador._stats["peticiones"][clave] = simulador._stats["peticiones"].get(clave, 0) + 1
+
+                longitud = int(self.headers.get("Content-Length") or 0)
+                campos = dict(parse_qsl(self.rfile.read(longitud).decode("utf-8"), keep_blank_values=True))
+
+                if ruta.startswith("/static/"):
+                    return self._estatico(ruta[len("/static/"):])
+                if ruta.startswith("/recursos/"):
+                    return self._recurso(ruta[len("/recursos/"):])
+                if ruta == "/stats-simulador":
+                    return self._responder(200, json.dumps(simulador.get_stats()), "application/json")
+
+                simulador._esperar()
+                cookie = self._cookie()
+                sesion = simulador._sesion(cookie) if cookie else None
+
+                if ruta == "/login" and metodo == "POST":
+                    return self._login(campos)
+                if ruta == "/logout":
+                    simulador._cerrar_sesion(cookie)
+                    return self._redirigir("/")
+                if sesion is None:
+                    # Sin sesión (o caducada) cualquier pantalla devuelve el login
+                    return self._html(pagina_login())
+                if ruta in ("/", "/login"):
+                    return self._redirigir("/inicio")
+                if ruta == "/inicio":
+                    usuario = sesion["usuario"]
+                    return self._html(pagina_inicio(usuario, simulador.estado.jornada(usuario), sesion["fecha"]))
+                if ruta == "/jornada" and metodo == "POST":
+                    estado = simulador.estado.cambiar_jornada(sesion["usuario"], campos.get("accion", ""))
+                    return self._responder(200, json.dumps({"estado": estado}), "application/json")
+                if ruta == "/imputacion":
+                    return self._imputacion(sesion, campos if metodo == "POST" else {})
+                self._responder(404, "No encontrado", "text/plain; charset=utf-8")
+
+            def _login(self, campos):
+                simulador._esperar(simulador.latencia_login_ms)
+                usuario = campos.get("usuario", "").strip()
+                if not simulador._credenciales_validas(usuario, campos.get("password", "")):
+                    simulador._contar("logins_fallidos")
+                    return self._html(pagina_login("Credenciales no válidas"))
+                simulador._contar("logins")
+                cookie = simulador._abrir_sesion(usuario)
+                self._redirigir("/inicio", {"Set-Cookie": f"JSESSIONID={cookie}; Path=/; HttpOnly"})
+
+            def _imputacion(self, sesion, campos):
+                usuario = sesion["usuario"]
+                accion = campos.get("accion")
+                error = None
+
+                if accion in ("guardar", "emitir"):
+                    fecha = sesion["fecha"]
+                    error = simulador.estado.guardar(usuario, lunes_de(fecha), _filas_formulario(campos),
+                                                     dias_habilitados(fecha), emitir=accion == "emitir")
+                    simulador._contar("errores" if error else "guardados")
+                elif campos:
+                    # Formulario del datepicker: la sesión recuerda la semana elegida
+                    fecha = _leer_fecha(campos.get("fecha"))
+                    if fecha is None:
+                        return self._responder(400, "Fecha no válida", "text/plain; charset=utf-8")
+                    sesion["fecha"] = fecha
+
+                fecha = sesion["fecha"]
+                semana = simulador.estado.semana(usuario, lunes_de(fecha))
+                self._html(pagina_imputacion(usuario, simulador.arbol, semana, fecha, error))
+
+            def _cookie(self):
+                for parte in (self.headers.get("Cookie") or "").split(";"):
+                    nombre, _, valor = parte.strip().partition("=")
+                    if nombre == "JSESSIONID":
+                        return valor
+                return None
+
+            def _estatico(self, nombre):
+                ruta = os.path.join(DIR_ESTATICOS, os.path.basename(nombre))
+                if not os.path.isfile(ruta):
+                    return self._responder(404, "No encontrado", "text/plain; charset=utf-8")
+                tipo = "text/css" if ruta.endswith(".css") else "application/javascript"
+                with open(ruta, encoding="utf-8") as f:
+                    self._responder(200, f.read(), f"{tipo}; charset=utf-8", {"Cache-Control": "max-age=3600"})
+
+            def _recurso(self, nombre):
+                if nombre not in simulador.recursos:
+                    return self._responder(404, "No encontrado", "text/plain; charset=utf-8")
+                time.sleep(simulador.latencia_recursos_ms / 1000)
+                contenido, tipo = simulador.recursos[nombre]
+                self._responder(200, contenido, tipo, {"Cache-Control": "no-store"})
+
+            def _html(self, contenido):
+                if simulador.recursos:
+                    contenido = contenido.replace("</head>", HTML_RECURSOS + "</head>", 1)
+                    contenido = contenido.replace('<div class="contenido">', HTML_LOGO + '<div class="contenido">', 1)
+                self._responder(200, contenido, "text/html; charset=utf-8", {"Cache-Control": "no-store"})
+
+            def _redirigir(self, destino, cabeceras=None):
+                self._responder(302, "", "text/plain; charset=utf-8", {"Location": destino, **(cabeceras or {})})
+
+            def _responder(self, codigo, texto, tipo, cabeceras=None):
+                cuerpo = texto if isinstance(texto, bytes) else texto.encode("utf-8")
+                self.send_response(codigo)
+                self.send_header("Content-Type", tipo)
+                self.send_header("Content-Length", str(len(cuerpo)))
+                for clave, valor in (cabeceras or {}).items():
+                    self.send_header(clave, valor)
+                self.end_headers()
+                self.wfile.write(cuerpo)
+                simulador._contar("bytes", len(cuerpo))
+
+            def log_message(self, *args):
+                pass
+
+        return Manejador
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--puerto", type=int, default=8090)
+    parser.add_argument("--latencia-ms", type=float, default=0, help="espera de cada página")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="variación aleatoria (±) de la latencia")
+    parser.add_argument("--latencia-login-ms", type=float, default=0, help="espera adicional del login")
+    parser.add_argument("--departamentos", type=int, default=10, help="ramas generadas además de las fijas")
+    parser.add_argument("--proyectos", type=int, default=10, help="subproyectos por carpeta final")
+    parser.add_argument("--profundidad", type=int, default=1, help="niveles de carpetas por departamento")
+    parser.add_argument("--max-horas-dia", type=float, default=12)
+    parser.add_argument("--sin-horas", type=float, default=0.5,
+                        help="fracción de usuarios sin horas en la semana actual")
+    parser.add_argument("--password", default=None, help="única contraseña válida (por defecto cualquiera)")
+    parser.add_argument("--caducidad-sesion", type=float, default=0, help="segundos de inactividad (0 = nunca)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--recursos", action="store_true", help="logo, fuente y analítica en cada página")
+    parser.add_argument("--latencia-recursos-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    simulador = SimuladorGestionITT(
+        puerto=args.puerto, latencia_ms=args.latencia_ms, jitter_ms=args.jitter_ms,
+        latencia_login_ms=args.latencia_login_ms, departamentos=args.departamentos, proyectos=args.proyectos,
+        profundidad=args.profundidad, max_horas_dia=args.max_horas_dia, fraccion_sin_horas=args.sin_horas,
+        password=args.password, caducidad_sesion_s=args.caducidad_sesion, semilla=args.semilla,
+        recursos=args.recursos, latencia_recursos_ms=args.latencia_recursos_ms,
+    ).iniciar()
+    print(f"Simulador de GestiónITT en {simulador.url} ({simulador.arbol.total_nodos} nodos en el árbol)")
+    print(f"Para el bot: URL_PRIVADA={simulador.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        simulador.parar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Prueba del emisor de WhatsApp (emisor_whatsapp.py) contra un servidor local.
+
+Levanta un servidor HTTP que imita POST /{phone_number_id}/messages de Meta:
+tarda --latencia ms, responde 429 (con Retry-After) o 500 en una fracción de
+las peticiones y 400 permanente a un destinatario "roto". Envía --mensajes
+mensajes repartidos entre --usuarios y comprueba:
+- que llegan todos (menos los del destinatario roto, que van a no entregados)
+- que a cada usuario le llegan en el orden en que se encolaron
+- que no se supera --por-segundo
+y muestra la latencia de entrega y los reintentos.
+
+Uso:
+    python benchmarks/whatsapp_local.py
+    python benchmarks/whatsapp_local.py --mensajes 500 --usuarios 50 --fallos 0.2
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from emisor_whatsapp import EmisorWhatsApp  # noqa: E402
+
+DESTINATARIO_ROTO = "34000000000"
+
+
+def crear_servidor(latencia_ms, fallos, recibidos, instantes):
+    class Manejador(BaseHTTPRequestHandler):
+        def do_POST(self):
+            cuerpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(latencia_ms / 1000)
+
+            if cuerpo["to"] == DESTINATARIO_ROTO:
+                return self._responder(400, {"error": {"code": 131026, "message": "Recipient not reachable"}})
+            sorteo = random.random()
+            if sorteo < fallos / 2:
+                return self._responder(429, {"error": {"code": 130429, "message": "Rate limit hit"}}, {"Retry-After": "0.2"})
+            if sorteo < fallos:
+                return self._responder(500, {"error": {"code": 1, "message": "Internal error"}})
+
+            with lock:
+                instantes.append(time.monotonic())
+                for texto in cuerpo["text"]["body"].split("\n\n"):
+                    recibidos.setdefault(cuerpo["to"], []).append(texto)
+            self._responder(200, {"messages": [{"id": "wamid.local"}]})
+
+        def _responder(self, codigo, datos, cabeceras=None):
+            cuerpo = json.dumps(datos).encode()
+            self.send_response(codigo)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            for clave, valor in (cabeceras or {}).items():
+                self.send_header(clave, valor)
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    lock = threading.Lock()
+    return ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mensajes", type=int, default=200)
+    parser.add_argument("--usuarios", type=int, default=20)
+    parser.add_argument("--latencia", type=float, default=50, help="ms que tarda el servidor en responder")
+    parser.add_argument("--fallos", type=float, default=0.1, help="fracción de respuestas 429/500")
+    parser.add_argument("--por-segundo", type=float, default=50)
+    parser.add_argument("--trabajadores", type=int, default=4)
+    args = parser.parse_args()
+
+    recibidos, instantes = {}, []
+    servidor = crear_servidor(args.latencia, args.fallos, recibidos, instantes)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+    fichero = os.path.join(tempfile.mkdtemp(), "no_entregados.jsonl")
+    emisor = EmisorWhatsApp(
+        f"http://127.0.0.1:{servidor.server_port}", "token-local", "123456",
+        por_segundo=args.por_segundo, trabajadores=args.trabajadores, fichero_no_entregados=fichero,
+    )
+
+    usuarios = [f"34600{i:06d}" for i in range(args.usuarios)]
+    enviados = {}
+    inicio = time.monotonic()
+    for n in range(args.mensajes):
+        wa_id = random.choice(usuarios)
+        texto = f"mensaje {n}"
+        enviados.setdefault(wa_id, []).append(texto)
+        emisor.enviar(wa_id, texto)
+    emisor.enviar(DESTINATARIO_ROTO, "este no llega")
+    encolado_ms = (time.monotonic() - inicio) * 1000
+
+    emisor.cerrar(timeout=120)
+    total_s = time.monotonic() - inicio
+    servidor.shutdown()
+
+    stats = emisor.get_stats()
+    en_orden = all(recibidos.get(u) == textos for u, textos in enviados.items())
+    pico = max((sum(1 for t in instantes if i <= t < i + 1) for i in instantes), default=0)
+    with open(fichero, encoding="utf-8") as f:
+        no_entregados = [json.loads(linea) for linea in f]
+
+    print(f"Encolar {args.mensajes + 1} mensajes: {encolado_ms:.1f} ms  |  todo entregado en {total_s:.1f} s")
+    print(f"Recibidos: {sum(len(v) for v in recibidos.values())}/{args.mensajes}  |  en orden por usuario: {en_orden}")
+    print(f"Llamadas HTTP OK: {len(instantes)}  |  agrupados: {stats['agrupados']}  |  "
+          f"reintentos: {stats['reintentos']}  |  limitados (429): {stats['limitados']}")
+    print(f"Pico de envíos aceptados en 1 s: {pico} (límite {args.por_segundo:g})")
+    print(f"Latencia de entrega: p50 {stats['latencia_ms']['p50']} ms  |  "
+          f"p95 {stats['latencia_ms']['p95']} ms  |  máx {stats['latencia_ms']['max']} ms")
+    print(f"No entregados: {len(no_entregados)} → {[r['wa_id'] for r in no_entregados]}")
+
+
+if __name__ == "__main__":
+    main()
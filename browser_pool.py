@@ -12,6 +12,33 @@ from datetime import datetime, timedelta
 import threading
 import time
 
+from config import settings
+from metricas import LockMedido, instrumentar_driver, pool_sesiones
+
+
+# Flags de Chrome que recortan procesos y memoria sin afectar a la intranet
+FLAGS_MEMORIA = [
+    '--disable-background-networking',
+    '--disable-component-update',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--no-first-run',
+    '--mute-audio',
+    '--metrics-recording-only',
+    '--disable-features=Translate,OptimizationHints,MediaRouter,BackForwardCache,AutofillServerCommunication',
+    '--renderer-process-limit=2',
+]
+
+# Sin animaciones: la UI queda quieta en cuanto cambia (menos esperas de DOM estable)
+_JS_SIN_ANIMACIONES = """
+    document.addEventListener('DOMContentLoaded', function () {
+        var estilo = document.createElement('style');
+        estilo.textContent = '*, *::before, *::after { animation: none !important; transition: none !important; }';
+        document.head.appendChild(estilo);
+        if (window.jQuery && window.jQuery.fx) { window.jQuery.fx.off = true; }
+    });
+"""
+
 
 def get_chrome_service():
     """
@@ -35,14 +62,14 @@ def get_chrome_service():
 class BrowserSession:
     """Representa una sesión de navegador para un usuario específico."""
     
-    def __init__(self, user_id: str):
-        self.user_id = user_id
+    def __init__(self, user_id: str = None):
+        self.user_id = user_id  # None mientras está en el banco en caliente
         self.driver = None
         self.wait = None
         self.last_activity = datetime.now()
         self.is_logged_in = False
         self.contexto = {"fila_actual": None, "proyecto_actual": None}
-        self.lock = threading.Lock()  # Para operaciones thread-safe
+        self.lock = LockMedido("navegador")  # Para operaciones thread-safe (mide la espera)
         
     def initialize(self):
         """Inicializa el navegador Chrome."""
@@ -51,7 +78,16 @@ class BrowserSession:
             options = webdriver.ChromeOptions()
 
             # MODO HEADLESS
-
+            if settings.BROWSER_HEADLESS:
+                options.add_argument('--headless=new')
+            # "eager" devuelve el control antes de la carga completa y cuenta con que
+            # las esperas por eventos esperen a readyState; con los sleeps fijos no lo hacen
+            options.page_load_strategy = (
+                settings.BROWSER_PAGE_LOAD_STRATEGY if settings.USE_EVENT_WAITS else "normal"
+            )
+            if settings.BROWSER_MEMORY_FLAGS:
+                for flag in FLAGS_MEMORIA:
+                    options.add_argument(flag)
             
             options.add_argument('--disable-gpu')
             options.add_argument('--window-size=1920,1080')
@@ -65,7 +101,8 @@ class BrowserSession:
                 options.add_argument('--remote-debugging-port=0')  # Puerto aleatorio
                 options.add_argument('--single-process')  # Reduce memoria
 
-            self.driver = webdriver.Chrome(service=service, options=options)
+            self.driver = instrumentar_driver(webdriver.Chrome(service=service, options=options))
+            self._aplicar_perfil_cdp()
             self.wait = WebDriverWait(self.driver, 15)
             self.last_activity = datetime.now()
             print(f"[BROWSER POOL]  Navegador iniciado para usuario: {self.user_id}")
@@ -75,6 +112,18 @@ class BrowserSession:
             print(f"[BROWSER POOL]  Error iniciando navegador para {self.user_id}: {e}")
             return False
     
+    def _aplicar_perfil_cdp(self):
+        """Bloqueo de imágenes, fuentes y analítica y desactivar animaciones (vía CDP)."""
+        try:
+            if settings.BROWSER_BLOCK_RESOURCES:
+                self.driver.execute_cdp_cmd("Network.enable", {})
+                self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": settings.BROWSER_BLOCKED_URLS})
+            if settings.BROWSER_DISABLE_ANIMATIONS:
+                self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": _JS_SIN_ANIMACIONES})
+        except Exception as e:
+            # Sin CDP el navegador funciona igual, solo sin el ahorro
+            print(f"[BROWSER POOL] ⚠️ Perfil ligero no aplicado para {self.user_id}: {e}")
+    
     def update_activity(self):
         """Actualiza el timestamp de última actividad."""
         self.last_activity = datetime.now()
@@ -87,6 +136,10 @@ class BrowserSession:
         """Cierra el navegador y libera recursos."""
         try:
             if self.driver:
+                from web_automation.lector_http import lectores_http
+                from web_automation.cache_semanas import cache_semanas
+                lectores_http.descartar(self.driver)
+                cache_semanas.descartar(self.driver)
                 self.driver.quit()
                 print(f"[BROWSER POOL] 🔒 Navegador cerrado para usuario: {self.user_id}")
         except Exception as e:
@@ -100,90 +153,269 @@ class BrowserSession:
 class BrowserPool:
     """
     Pool de navegadores que gestiona sesiones para múltiples usuarios.
+    
+    Mantiene además un "banco en caliente" de `warm_size` navegadores ya
+    arrancados y sin asignar. Un usuario nuevo recibe uno de ellos al instante
+    y un thread en segundo plano repone el banco. El thread arranca con la
+    primera get_session(), no al crear el pool: importar el módulo no abre
+    ningún Chrome. Arrancar Chrome (varios segundos) nunca se hace con
+    `self.lock` tomado, así que el resto de usuarios no se bloquea mientras se
+    crea un navegador.
     """
     
-    def __init__(self, max_sessions: int = 10, session_timeout_minutes: int = 3):
+    def __init__(self, max_sessions: int = 10, session_timeout_minutes: int = 3, warm_size: int = 0):
         self.sessions = {}  # user_id -> BrowserSession
         self.max_sessions = max_sessions
         self.session_timeout_minutes = session_timeout_minutes
         self.lock = threading.Lock()
         
+        # 🔥 Banco de navegadores en caliente (sin usuario asignado)
+        self.warm_size = max(0, warm_size)
+        self.standby = []  # Lista de BrowserSession inicializadas
+        self._arrancando_standby = 0  # Navegadores de reserva en proceso de arranque
+        self._creando = {}  # user_id -> threading.Event (evita arrancar dos Chrome para el mismo usuario)
+        self._refill_event = threading.Event()
+        self._stopped = False
+        self.stats = {"warm_hits": 0, "cold_starts": 0, "fallos_arranque": 0}
+        
         # Iniciar thread de limpieza de sesiones inactivas
         self.cleanup_thread = threading.Thread(target=self._cleanup_expired_sessions, daemon=True)
         self.cleanup_thread.start()
-        print(f"[BROWSER POOL]  Pool inicializado (max: {max_sessions}, timeout: {session_timeout_minutes}min)")
+        
+        # Thread de reposición del banco en caliente (se arranca en la primera get_session)
+        self.refill_thread = None
+        
+        print(f"[BROWSER POOL]  Pool inicializado (max: {max_sessions}, timeout: {session_timeout_minutes}min, warm: {self.warm_size})")
     
     def get_session(self, user_id: str) -> BrowserSession:
         """Obtiene o crea una sesión de navegador para un usuario."""
-        with self.lock:
-            if user_id in self.sessions:
-                session = self.sessions[user_id]
-                session.update_activity()
-                return session
-            
-            # Limpiar si se alcanzó el límite
-            if len(self.sessions) >= self.max_sessions:
-                self._force_cleanup()
+        while True:
+            a_cerrar = []
+            session = None
+            crear = False
+            with self.lock:
+                self._arrancar_reposicion()
+                if user_id in self.sessions:
+                    session = self.sessions[user_id]
+                    session.update_activity()
+                    pool_sesiones.inc(resultado="existente")
+                    return session
                 
-                if len(self.sessions) >= self.max_sessions:
-                    print(f"[BROWSER POOL]  Límite de sesiones alcanzado ({self.max_sessions})")
-                    oldest_user = min(self.sessions.keys(), 
-                                    key=lambda k: self.sessions[k].last_activity)
-                    self.close_session(oldest_user)
+                # Otro thread ya está creando el navegador de este usuario → esperar
+                evento = self._creando.get(user_id)
+                if evento is None:
+                    # Limpiar si se alcanzó el límite (los arranques en curso ya ocupan su plaza)
+                    if self._ocupadas() >= self.max_sessions:
+                        a_cerrar = self._force_cleanup()
+                        
+                        while self._ocupadas() >= self.max_sessions and self.sessions:
+                            print(f"[BROWSER POOL]  Límite de sesiones alcanzado ({self.max_sessions})")
+                            oldest_user = min(self.sessions.keys(), 
+                                            key=lambda k: self.sessions[k].last_activity)
+                            a_cerrar.append(self.sessions.pop(oldest_user))
+                    
+                    if self._ocupadas() >= self.max_sessions and self._creando:
+                        # Todas las plazas son arranques en curso → esperar a que acabe uno
+                        evento = next(iter(self._creando.values()))
+                    else:
+                        # 🔥 Navegador en caliente disponible → se comprueba fuera del lock y se asigna
+                        session = self._tomar_standby()
+                        evento = threading.Event()
+                        self._creando[user_id] = evento  # reserva la plaza hasta registrar la sesión
+                        crear = True
+            
+            # Cierres, comprobaciones y arranques de Chrome siempre fuera del lock
+            self._cerrar_en_segundo_plano(a_cerrar)
+            
+            if not crear:
+                evento.wait()
+                continue  # Reintentar: la sesión ya estará registrada (o falló) o hay plaza libre
+            
+            if session is not None:
+                if self._responde(session):
+                    return self._asignar_standby(session, user_id, evento)
+                print(f"[BROWSER POOL]  Navegador en reserva sin respuesta, se descarta")
+                self._cerrar_en_segundo_plano([session])
             
-            session = BrowserSession(user_id)
-            if session.initialize():
+            return self._crear_sesion_en_frio(user_id, evento)
+    
+    def _ocupadas(self) -> int:
+        """Plazas del límite en uso: sesiones registradas + arranques en curso (llamar dentro del lock)."""
+        return len(self.sessions) + len(self._creando)
+    
+    def obtener_existente(self, user_id: str):
+        """Sesión del usuario si ya tiene navegador abierto, sin crear ninguno."""
+        with self.lock:
+            return self.sessions.get(user_id)
+    
+    def _arrancar_reposicion(self):
+        """Arranca el thread del banco en caliente si aún no lo está (llamar dentro del lock)."""
+        if self.warm_size > 0 and self.refill_thread is None and not self._stopped:
+            self.refill_thread = threading.Thread(target=self._refill_standby, daemon=True)
+            self.refill_thread.start()
+            self._refill_event.set()
+    
+    @staticmethod
+    def _responde(session: BrowserSession) -> bool:
+        """Ping al driver: un Chrome de reserva puede haber muerto mientras esperaba."""
+        try:
+            session.driver.current_url
+            return True
+        except Exception:
+            return False
+    
+    def _tomar_standby(self):
+        """Saca un navegador del banco en caliente (llamar dentro del lock)."""
+        while self.standby:
+            session = self.standby.pop()
+            if session.driver is not None:
+                self._refill_event.set()
+                return session
+        self._refill_event.set()
+        return None
+    
+    def _asignar(self, session: BrowserSession, user_id: str):
+        """Asigna un navegador del banco a un usuario (llamar dentro del lock)."""
+        from web_automation.cache_semanas import cache_semanas
+        session.user_id = user_id
+        session.update_activity()
+        self.sessions[user_id] = session
+        cache_semanas.asociar(session.driver, user_id)
+    
+    def _asignar_standby(self, session: BrowserSession, user_id: str, evento: threading.Event):
+        """Registra para el usuario un navegador del banco ya comprobado."""
+        with self.lock:
+            self._creando.pop(user_id, None)
+            self._asignar(session, user_id)
+            self.stats["warm_hits"] += 1
+            pool_sesiones.inc(resultado="caliente")
+            print(f"[BROWSER POOL] 🔥 Navegador en caliente asignado a {user_id} (quedan {len(self.standby)})")
+            print(f"[BROWSER POOL]  Sesiones activas: {len(self.sessions)}/{self.max_sessions}")
+        evento.set()
+        return session
+    
+    def _crear_sesion_en_frio(self, user_id: str, evento: threading.Event):
+        """Arranca un Chrome para el usuario sin tener el lock tomado."""
+        session = BrowserSession(user_id)
+        ok = session.initialize()
+        
+        with self.lock:
+            self._creando.pop(user_id, None)
+            if ok:
+                from web_automation.cache_semanas import cache_semanas
                 self.sessions[user_id] = session
+                cache_semanas.asociar(session.driver, user_id)
+                self.stats["cold_starts"] += 1
+                pool_sesiones.inc(resultado="frio")
                 print(f"[BROWSER POOL]  Sesiones activas: {len(self.sessions)}/{self.max_sessions}")
-                return session
             else:
-                return None
+                self.stats["fallos_arranque"] += 1
+                pool_sesiones.inc(resultado="fallo")
+        evento.set()
+        
+        return session if ok else None
+    
+    def _refill_standby(self):
+        """Thread que mantiene `warm_size` navegadores arrancados y sin asignar."""
+        while not self._stopped:
+            self._refill_event.wait(timeout=30)
+            self._refill_event.clear()
+            
+            while not self._stopped:
+                with self.lock:
+                    faltan = self.warm_size - len(self.standby) - self._arrancando_standby
+                    # No superar el máximo de navegadores vivos
+                    hueco = self.max_sessions - len(self.sessions) - len(self.standby) - self._arrancando_standby
+                    if faltan <= 0 or hueco <= 0:
+                        break
+                    self._arrancando_standby += 1
+                
+                session = BrowserSession(None)
+                ok = session.initialize()
+                
+                with self.lock:
+                    self._arrancando_standby -= 1
+                    if ok and not self._stopped:
+                        self.standby.append(session)
+                        print(f"[BROWSER POOL] 🔥 Navegador en reserva listo ({len(self.standby)}/{self.warm_size})")
+                        session = None
+                    elif not ok:
+                        self.stats["fallos_arranque"] += 1
+                
+                if session is not None:
+                    session.close()
+                    if not ok:
+                        # Evitar bucle de arranques fallidos seguidos
+                        time.sleep(10)
+    
+    def _cerrar_en_segundo_plano(self, sesiones):
+        """Cierra navegadores (driver.quit puede tardar) sin bloquear al llamante."""
+        if not sesiones:
+            return
+        
+        def _cerrar():
+            for session in sesiones:
+                session.close()
+        
+        threading.Thread(target=_cerrar, daemon=True).start()
+        self._refill_event.set()
     
     def close_session(self, user_id: str):
         """Cierra la sesión de un usuario específico."""
         with self.lock:
-            if user_id in self.sessions:
-                self.sessions[user_id].close()
-                del self.sessions[user_id]
+            session = self.sessions.pop(user_id, None)
+            if session:
                 print(f"[BROWSER POOL]  Sesiones activas: {len(self.sessions)}/{self.max_sessions}")
+        if session:
+            session.close()
+            self._refill_event.set()
     
     def _force_cleanup(self):
-        """Limpia forzosamente sesiones expiradas."""
+        """
+        Retira del pool las sesiones expiradas (llamar dentro del lock).
+        
+        Returns:
+            list: Sesiones retiradas, pendientes de cerrar fuera del lock
+        """
         expired = [
             user_id for user_id, session in self.sessions.items()
             if session.is_expired(self.session_timeout_minutes)
         ]
         
+        retiradas = []
         for user_id in expired:
             print(f"[BROWSER POOL]  Cerrando sesión expirada: {user_id}")
-            self.sessions[user_id].close()
-            del self.sessions[user_id]
+            retiradas.append(self.sessions.pop(user_id))
+        return retiradas
     
     def _cleanup_expired_sessions(self):
         """Thread que limpia sesiones expiradas periódicamente."""
         while True:
             time.sleep(30)
             with self.lock:
-                expired = [
-                    user_id for user_id, session in self.sessions.items()
-                    if session.is_expired(self.session_timeout_minutes)
-                ]
-                
+                expired = self._force_cleanup()
                 if expired:
                     print(f"[BROWSER POOL]  Limpiando {len(expired)} sesiones expiradas...")
-                    for user_id in expired:
-                        self.sessions[user_id].close()
-                        del self.sessions[user_id]
                     print(f"[BROWSER POOL]  Sesiones activas: {len(self.sessions)}/{self.max_sessions}")
+            
+            for session in expired:
+                session.close()
+            if expired:
+                self._refill_event.set()
     
     def close_all(self):
-        """Cierra todas las sesiones activas."""
+        """Cierra todas las sesiones activas y las de reserva."""
         with self.lock:
-            print(f"[BROWSER POOL] 🛑 Cerrando todas las sesiones ({len(self.sessions)})...")
-            for session in self.sessions.values():
-                session.close()
+            self._stopped = True
+            sesiones = list(self.sessions.values()) + self.standby
+            print(f"[BROWSER POOL] 🛑 Cerrando todas las sesiones ({len(self.sessions)} + {len(self.standby)} en reserva)...")
             self.sessions.clear()
-            print("[BROWSER POOL]  Todas las sesiones cerradas")
+            self.standby = []
+        self._refill_event.set()
+        
+        for session in sesiones:
+            session.close()
+        print("[BROWSER POOL]  Todas las sesiones cerradas")
     
     def get_stats(self) -> dict:
         """Obtiene estadísticas del pool."""
@@ -191,10 +423,19 @@ class BrowserPool:
             return {
                 "active_sessions": len(self.sessions),
                 "max_sessions": self.max_sessions,
+                "warm_standby": len(self.standby),
+                "warm_size": self.warm_size,
+                "warm_hits": self.stats["warm_hits"],
+                "cold_starts": self.stats["cold_starts"],
+                "fallos_arranque": self.stats["fallos_arranque"],
                 "users": list(self.sessions.keys())
             }
 
 
 # Instancia global del pool
 #  Timeout de 30 min para evitar re-logins frecuentes
-browser_pool = BrowserPool(max_sessions=50, session_timeout_minutes=30)
+browser_pool = BrowserPool(
+    max_sessions=50,
+    session_timeout_minutes=30,
+    warm_size=settings.BROWSER_WARM_POOL_SIZE
+)
@@ -0,0 +1,174 @@
+# buzones.py
+"""
+Buzones por usuario para procesar sus mensajes en orden.
+
+Antes cada mensaje ocupaba un worker del ThreadPoolExecutor aunque solo
+fuese para quedarse bloqueado en BrowserSession.lock esperando al mensaje
+anterior del mismo usuario. Ahora cada usuario tiene un buzón: sus mensajes
+se ejecutan de uno en uno y en orden de llegada, y al pool solo se le manda
+trabajo listo para ejecutarse (como mucho un mensaje por usuario a la vez).
+
+Tras cada mensaje el worker se libera y el siguiente del mismo usuario se
+vuelve a encolar en el pool, así un usuario con muchos mensajes no acapara
+un thread mientras otros esperan.
+
+Mensajes repetidos (mismo texto) que todavía no han empezado se agrupan en
+uno solo, y si un usuario acumula demasiados pendientes se rechazan.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+class BuzonLleno(Exception):
+    """El usuario ya tiene el máximo de mensajes pendientes."""
+
+    def __init__(self, pendientes: int):
+        super().__init__(f"{pendientes} mensajes pendientes")
+        self.pendientes = pendientes
+
+
+class _Trabajo:
+    __slots__ = ("fn", "args", "clave", "future", "encolado")
+
+    def __init__(self, fn, args, clave):
+        self.fn = fn
+        self.args = args
+        self.clave = clave
+        self.future = Future()
+        self.encolado = time.monotonic()
+
+
+class _Buzon:
+    __slots__ = ("cola", "activo")
+
+    def __init__(self):
+        self.cola = deque()   # _Trabajo pendientes (sin empezar)
+        self.activo = False   # True mientras hay un mensaje en el pool o ejecutándose
+
+
+class PlanificadorBuzones:
+    """Un ejecutor lógico por usuario sobre un ThreadPoolExecutor compartido."""
+
+    def __init__(self, executor, max_pendientes: int = 5):
+        """
+        Args:
+            executor: ThreadPoolExecutor compartido que ejecuta el trabajo listo
+            max_pendientes: Mensajes sin empezar por usuario antes de rechazar (BuzonLleno)
+        """
+        self.executor = executor
+        self.max_pendientes = max_pendientes
+        self._lock = threading.Lock()
+        self._buzones = {}  # user_id -> _Buzon (solo usuarios con trabajo)
+        self._espera_total = 0.0
+        self.stats = {"encolados": 0, "ejecutados": 0, "agrupados": 0, "rechazados": 0}
+
+    def enviar(self, user_id, clave, fn, *args):
+        """
+        Encola `fn(*args)` en el buzón del usuario.
+
+        Args:
+            user_id: Usuario dueño del buzón
+            clave: Identifica mensajes repetidos (p.ej. el texto normalizado); None = nunca agrupar
+            fn: Función a ejecutar en el pool
+
+        Returns:
+            tuple: (Future, nuevo) - nuevo=False si se ha agrupado con un mensaje
+                   idéntico que aún no había empezado (comparten Future)
+
+        Raises:
+            BuzonLleno: si el usuario ya tiene max_pendientes mensajes sin empezar
+        """
+        with self._lock:
+            buzon = self._buzones.setdefault(user_id, _Buzon())
+
+            if clave is not None:
+                for trabajo in buzon.cola:
+                    if trabajo.clave == clave:
+                        self.stats["agrupados"] += 1
+                        print(f"[BUZONES] 🔁 Mensaje repetido de {user_id}, agrupado con el pendiente")
+                        return trabajo.future, False
+
+            if len(buzon.cola) >= self.max_pendientes:
+                self.stats["rechazados"] += 1
+                print(f"[BUZONES]  Buzón de {user_id} lleno ({len(buzon.cola)} pendientes)")
+                raise BuzonLleno(len(buzon.cola))
+
+            trabajo = _Trabajo(fn, args, clave)
+            buzon.cola.append(trabajo)
+            self.stats["encolados"] += 1
+
+            arrancar = not buzon.activo
+            buzon.activo = True
+            if not arrancar:
+                print(f"[BUZONES] 📥 {user_id} tiene {len(buzon.cola)} mensaje(s) en espera")
+
+        if arrancar:
+            try:
+                self.executor.submit(self._ejecutar_siguiente, user_id)
+            except RuntimeError as e:
+                # Pool cerrado (apagando el servidor)
+                self._vaciar(user_id, e)
+        return trabajo.future, True
+
+    def _ejecutar_siguiente(self, user_id):
+        """Ejecuta UN mensaje del usuario y, si quedan más, vuelve a encolarse en el pool."""
+        with self._lock:
+            buzon = self._buzones[user_id]
+            trabajo = buzon.cola.popleft()
+            self._espera_total += time.monotonic() - trabajo.encolado
+
+        if trabajo.future.set_running_or_notify_cancel():
+            try:
+                trabajo.future.set_result(trabajo.fn(*trabajo.args))
+            except BaseException as e:
+                trabajo.future.set_exception(e)
+
+        with self._lock:
+            self.stats["ejecutados"] += 1
+            seguir = bool(buzon.cola)
+            if not seguir:
+                buzon.activo = False
+                del self._buzones[user_id]
+
+        if seguir:
+            try:
+                self.executor.submit(self._ejecutar_siguiente, user_id)
+            except RuntimeError as e:
+                # Pool cerrado (apagando el servidor): no quedaría nadie para ejecutarlos
+                self._vaciar(user_id, e)
+
+    def _vaciar(self, user_id, error):
+        """Quita el buzón del usuario y falla con `error` todos sus mensajes pendientes."""
+        with self._lock:
+            buzon = self._buzones.pop(user_id, None)
+            if buzon is None:
+                return
+            buzon.activo = False
+            pendientes = list(buzon.cola)
+            buzon.cola.clear()
+        for trabajo in pendientes:
+            if not trabajo.future.done():
+                trabajo.future.set_exception(error)
+
+    def profundidad(self, user_id) -> int:
+        """Mensajes del usuario en espera (sin contar el que se está ejecutando)."""
+        with self._lock:
+            buzon = self._buzones.get(user_id)
+            return len(buzon.cola) if buzon else 0
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            por_usuario = {u: len(b.cola) for u, b in self._buzones.items() if b.cola}
+            ejecutados = self.stats["ejecutados"]
+            return {
+                **self.stats,
+                "usuarios_activos": len(self._buzones),
+                "en_espera": sum(por_usuario.values()),
+                "profundidad_max": max(por_usuario.values(), default=0),
+                "por_usuario": por_usuario,
+                "espera_media_ms": round(self._espera_total / ejecutados * 1000, 1) if ejecutados else 0.0,
+                "max_pendientes": self.max_pendientes,
+            }
@@ -1,10 +1,32 @@
 """
 Gestor de estado de conversación para desambiguación interactiva.
 Mantiene el contexto de las preguntas pendientes por usuario.
+
+Almacén acotado: como mucho `max_estados` usuarios (se expulsa el menos
+reciente), cada estado caduca según su tipo y un thread en segundo plano
+retira los caducados usando un heap ordenado por vencimiento (O(log n) por
+estado en lugar de recorrer todos los usuarios).
 """
 
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 
+from config import settings
+
+
+# Minutos de vida de cada tipo de estado
+TTL_POR_TIPO = {
+    "desambiguacion_proyecto": None,  # None = timeout_minutes del gestor
+    "info_incompleta": None,
+    "recordatorio_semanal": 120,
+    "confirmar_emision": 30,
+    "ultimo_proyecto": 15,
+}
+
 
 class ConversationStateManager:
     """
@@ -12,14 +34,83 @@ class ConversationStateManager:
     Almacena contexto por usuario para desambiguación de proyectos.
     """
     
-    def __init__(self, timeout_minutes=5):
+    def __init__(self, timeout_minutes=5, max_estados=5000, intervalo_limpieza=30):
         """
         Args:
             timeout_minutes: Tiempo en minutos antes de expirar un estado pendiente
+            max_estados: Máximo de usuarios con estado (LRU al superarlo)
+            intervalo_limpieza: Segundos entre pasadas del thread de limpieza (0 = sin thread)
         """
-        # Diccionario: user_id -> estado
-        self.estados = {}
+        # Diccionario: user_id -> estado (orden = uso, el primero es el menos reciente)
+        self.estados = OrderedDict()
         self.timeout_minutes = timeout_minutes
+        self.max_estados = max_estados
+        self.lock = threading.RLock()
+        
+        # Vencimientos: user_id -> instante (time.monotonic) en que caduca TODO su estado.
+        # El heap puede tener entradas obsoletas; se descartan al sacarlas.
+        self._vencimientos = {}
+        self._heap = []  # (vence, secuencia, user_id)
+        self._secuencia = itertools.count()
+        self.stats = {"expirados": 0, "expulsados_lru": 0}
+        
+        self._detener = threading.Event()
+        if intervalo_limpieza > 0:
+            self.intervalo_limpieza = intervalo_limpieza
+            self.cleanup_thread = threading.Thread(target=self._limpiar_periodicamente, daemon=True)
+            self.cleanup_thread.start()
+    
+    # ------------------------------------------------------------------
+    # Almacenamiento interno (siempre con self.lock tomado)
+    # ------------------------------------------------------------------
+    
+    def _ttl_minutos(self, tipo):
+        ttl = TTL_POR_TIPO.get(tipo)
+        return self.timeout_minutes if ttl is None else ttl
+    
+    def _programar(self, user_id, minutos):
+        """Alarga el vencimiento del usuario hasta dentro de `minutos` (nunca lo acorta)."""
+        vence = time.monotonic() + minutos * 60
+        if vence <= self._vencimientos.get(user_id, 0):
+            return
+        self._vencimientos[user_id] = vence
+        heapq.heappush(self._heap, (vence, next(self._secuencia), user_id))
+        
+        # Demasiadas entradas obsoletas en el heap → reconstruirlo
+        if len(self._heap) > 2 * len(self._vencimientos) + 64:
+            self._heap = [(v, next(self._secuencia), u) for u, v in self._vencimientos.items()]
+            heapq.heapify(self._heap)
+    
+    def _guardar(self, user_id, estado, tipo):
+        """Sustituye el estado del usuario y aplica el TTL del tipo y el límite LRU."""
+        self.estados[user_id] = estado
+        self.estados.move_to_end(user_id)
+        self._vencimientos.pop(user_id, None)
+        self._programar(user_id, self._ttl_minutos(tipo))
+        self._expulsar_sobrantes()
+    
+    def _expulsar_sobrantes(self):
+        while len(self.estados) > self.max_estados:
+            user_id, _ = self.estados.popitem(last=False)
+            self._vencimientos.pop(user_id, None)
+            self.stats["expulsados_lru"] += 1
+            print(f"[CONVERSACION]  Límite de estados alcanzado, expulsando: {user_id}")
+    
+    def _eliminar(self, user_id):
+        self.estados.pop(user_id, None)
+        self._vencimientos.pop(user_id, None)
+    
+    def _limpiar_periodicamente(self):
+        """Thread que retira los estados caducados."""
+        while not self._detener.wait(self.intervalo_limpieza):
+            try:
+                self.limpiar_expirados()
+            except Exception as e:
+                print(f"[CONVERSACION]  Error limpiando estados: {e}")
+    
+    def detener(self):
+        """Para el thread de limpieza."""
+        self._detener.set()
     
     def tiene_pregunta_pendiente(self, user_id):
         """
@@ -31,27 +122,32 @@ class ConversationStateManager:
         Returns:
             bool: True si hay pregunta pendiente y no ha expirado
         """
-        if user_id not in self.estados:
-            return False
-        
-        estado = self.estados[user_id]
-        
-        #  Usar .get() para evitar KeyError si no hay timestamp
-        timestamp = estado.get("timestamp")
-        if not timestamp:
-            # Si no hay timestamp, el estado es inválido, limpiar
-            print(f"[CONVERSACION]  Estado sin timestamp para usuario: {user_id}, limpiando...")
-            self.limpiar_estado(user_id)
-            return False
-        
-        # Verificar si ha expirado (usar timeout_override si existe)
-        timeout = estado.get("timeout_override", self.timeout_minutes)
-        if datetime.now() - timestamp > timedelta(minutes=timeout):
-            print(f"[CONVERSACION] ⏰ Estado expirado para usuario: {user_id} (timeout: {timeout}min)")
-            self.limpiar_estado(user_id)
-            return False
-        
-        return estado.get("tipo") in ["desambiguacion_proyecto", "info_incompleta", "recordatorio_semanal", "confirmar_emision"]
+        with self.lock:
+            estado = self.estados.get(user_id)
+            if estado is None:
+                return False
+            
+            # Solo "ultimo_proyecto" (sin pregunta): no es un estado inválido
+            if not estado.get("tipo"):
+                return False
+            
+            #  Usar .get() para evitar KeyError si no hay timestamp
+            timestamp = estado.get("timestamp")
+            if not timestamp:
+                # Si no hay timestamp, el estado es inválido, limpiar
+                print(f"[CONVERSACION]  Estado sin timestamp para usuario: {user_id}, limpiando...")
+                self.limpiar_estado(user_id)
+                return False
+            
+            # Verificar si ha expirado (usar timeout_override si existe)
+            timeout = estado.get("timeout_override", self._ttl_minutos(estado.get("tipo")))
+            if datetime.now() - timestamp > timedelta(minutes=timeout):
+                print(f"[CONVERSACION] ⏰ Estado expirado para usuario: {user_id} (timeout: {timeout}min)")
+                self.limpiar_estado(user_id)
+                return False
+            
+            self.estados.move_to_end(user_id)
+            return estado.get("tipo") in ["desambiguacion_proyecto", "info_incompleta", "recordatorio_semanal", "confirmar_emision"]
     
     def guardar_desambiguacion(self, user_id, nombre_proyecto, coincidencias, comando_original, indice_orden=0, respuestas_acumuladas=None, texto_original=None):
         """
@@ -66,16 +162,17 @@ class ConversationStateManager:
             respuestas_acumuladas: Lista de respuestas ya generadas antes de la desambiguación
             texto_original: Texto original completo del comando del usuario
         """
-        self.estados[user_id] = {
-            "tipo": "desambiguacion_proyecto",
-            "nombre_proyecto": nombre_proyecto,
-            "coincidencias": coincidencias,
-            "comando_original": comando_original,
-            "indice_orden": indice_orden,
-            "respuestas_acumuladas": respuestas_acumuladas or [],  #  Guardar respuestas previas
-            "texto_original": texto_original,  #  Guardar texto original completo
-            "timestamp": datetime.now()
-        }
+        with self.lock:
+            self._guardar(user_id, {
+                "tipo": "desambiguacion_proyecto",
+                "nombre_proyecto": nombre_proyecto,
+                "coincidencias": coincidencias,
+                "comando_original": comando_original,
+                "indice_orden": indice_orden,
+                "respuestas_acumuladas": respuestas_acumuladas or [],  #  Guardar respuestas previas
+                "texto_original": texto_original,  #  Guardar texto original completo
+                "timestamp": datetime.now()
+            }, "desambiguacion_proyecto")
         
         print(f"[CONVERSACION] 💾 Guardado estado de desambiguación para: {user_id}")
         print(f"[CONVERSACION]    Proyecto: {nombre_proyecto}")
@@ -93,10 +190,11 @@ class ConversationStateManager:
         Returns:
             dict: Estado guardado o None si no existe
         """
-        if not self.tiene_pregunta_pendiente(user_id):
-            return None
-        
-        return self.estados[user_id]
+        with self.lock:
+            if not self.tiene_pregunta_pendiente(user_id):
+                return None
+            
+            return self.estados[user_id]
     
     def guardar_info_incompleta(self, user_id, info_parcial, que_falta):
         """
@@ -108,12 +206,13 @@ class ConversationStateManager:
                          Ejemplo: {'proyecto': 'Desarrollo'} o {'horas': 3, 'dia': 'hoy'}
             que_falta: Qué información falta ('proyecto', 'horas', 'dia', etc.)
         """
-        self.estados[user_id] = {
-            "tipo": "info_incompleta",
-            "info_parcial": info_parcial,
-            "que_falta": que_falta,
-            "timestamp": datetime.now()
-        }
+        with self.lock:
+            self._guardar(user_id, {
+                "tipo": "info_incompleta",
+                "info_parcial": info_parcial,
+                "que_falta": que_falta,
+                "timestamp": datetime.now()
+            }, "info_incompleta")
         
         print(f"[CONVERSACION] 💾 Guardada info incompleta para: {user_id}")
         print(f"[CONVERSACION]    Info parcial: {info_parcial}")
@@ -129,14 +228,15 @@ class ConversationStateManager:
         Returns:
             dict: Info parcial guardada o None si no existe
         """
-        if user_id not in self.estados:
-            return None
-        
-        estado = self.estados[user_id]
-        if estado.get("tipo") != "info_incompleta":
-            return None
-        
-        return estado
+        with self.lock:
+            estado = self.estados.get(user_id)
+            if estado is None or estado.get("tipo") != "info_incompleta":
+                return None
+            
+            if not self.tiene_pregunta_pendiente(user_id):
+                return None
+            
+            return estado
     
     def guardar_ultimo_proyecto(self, user_id, nombre_proyecto, nodo_padre=None, dia=None):
         """
@@ -148,16 +248,20 @@ class ConversationStateManager:
             nodo_padre: Nodo padre del proyecto (opcional)
             dia: Día imputado (opcional, ej: "viernes", "lunes")
         """
-        if user_id not in self.estados:
-            self.estados[user_id] = {}
-        
-        # Actualizar solo el campo de último proyecto sin borrar otros estados
-        self.estados[user_id]["ultimo_proyecto"] = {
-            "nombre": nombre_proyecto,
-            "nodo_padre": nodo_padre,
-            "dia": dia,  #  NUEVO
-            "timestamp": datetime.now()
-        }
+        with self.lock:
+            if user_id not in self.estados:
+                self.estados[user_id] = {}
+            
+            # Actualizar solo el campo de último proyecto sin borrar otros estados
+            self.estados[user_id]["ultimo_proyecto"] = {
+                "nombre": nombre_proyecto,
+                "nodo_padre": nodo_padre,
+                "dia": dia,  #  NUEVO
+                "timestamp": datetime.now()
+            }
+            self.estados.move_to_end(user_id)
+            self._programar(user_id, self._ttl_minutos("ultimo_proyecto"))
+            self._expulsar_sobrantes()
         
         print(f"[CONVERSACION] 💾 Guardado último proyecto para {user_id}: {nombre_proyecto}")
         if dia:
@@ -173,10 +277,9 @@ class ConversationStateManager:
         Returns:
             dict: {'nombre': str, 'nodo_padre': str} o None
         """
-        if user_id not in self.estados:
-            return None
-        
-        ultimo = self.estados[user_id].get("ultimo_proyecto")
+        with self.lock:
+            estado = self.estados.get(user_id)
+            ultimo = estado.get("ultimo_proyecto") if estado else None
         if not ultimo:
             return None
         
@@ -187,7 +290,7 @@ class ConversationStateManager:
             return None
         
         # Verificar si no ha expirado (15 minutos)
-        if datetime.now() - timestamp > timedelta(minutes=15):
+        if datetime.now() - timestamp > timedelta(minutes=self._ttl_minutos("ultimo_proyecto")):
             print(f"[CONVERSACION] ⏰ Último proyecto expirado para {user_id}")
             return None
         
@@ -202,12 +305,13 @@ class ConversationStateManager:
         Args:
             user_id: ID del usuario (wa_id)
         """
-        self.estados[user_id] = {
-            "tipo": "recordatorio_semanal",
-            "coincidencias": [],  # Requerido por tiene_pregunta_pendiente
-            "timestamp": datetime.now(),
-            "timeout_override": 120  # 2 horas en minutos
-        }
+        with self.lock:
+            self._guardar(user_id, {
+                "tipo": "recordatorio_semanal",
+                "coincidencias": [],  # Requerido por tiene_pregunta_pendiente
+                "timestamp": datetime.now(),
+                "timeout_override": self._ttl_minutos("recordatorio_semanal")  # 2 horas en minutos
+            }, "recordatorio_semanal")
         
         print(f"[CONVERSACION] 📋 Guardado recordatorio semanal para: {user_id} (expira en 2h)")
     
@@ -219,12 +323,13 @@ class ConversationStateManager:
         Args:
             user_id: ID del usuario (wa_id)
         """
-        self.estados[user_id] = {
-            "tipo": "confirmar_emision",
-            "coincidencias": [],
-            "timestamp": datetime.now(),
-            "timeout_override": 30  # 30 minutos
-        }
+        with self.lock:
+            self._guardar(user_id, {
+                "tipo": "confirmar_emision",
+                "coincidencias": [],
+                "timestamp": datetime.now(),
+                "timeout_override": self._ttl_minutos("confirmar_emision")  # 30 minutos
+            }, "confirmar_emision")
         
         print(f"[CONVERSACION] 📤 Guardada confirmación de emisión para: {user_id} (expira en 30min)")
     
@@ -235,36 +340,63 @@ class ConversationStateManager:
         Args:
             user_id: ID del usuario
         """
-        if user_id in self.estados:
-            print(f"[CONVERSACION]  Limpiando estado de usuario: {user_id}")
-            del self.estados[user_id]
+        with self.lock:
+            if user_id in self.estados:
+                print(f"[CONVERSACION]  Limpiando estado de usuario: {user_id}")
+                self._eliminar(user_id)
     
     def limpiar_expirados(self):
         """
-        Limpia todos los estados que han expirado.
+        Limpia todos los estados que han expirado (pregunta pendiente y
+        último proyecto). Solo mira la cabeza del heap de vencimientos.
+        
+        Returns:
+            int: Número de usuarios limpiados
         """
-        ahora = datetime.now()
-        usuarios_expirados = [
-            user_id for user_id, estado in self.estados.items()
-            if estado.get("timestamp") and ahora - estado["timestamp"] > timedelta(minutes=self.timeout_minutes)
-        ]
+        ahora = time.monotonic()
+        limpiados = 0
+        with self.lock:
+            while self._heap and self._heap[0][0] <= ahora:
+                vence, _, user_id = heapq.heappop(self._heap)
+                if self._vencimientos.get(user_id) != vence:
+                    continue  # Entrada obsoleta (estado renovado o eliminado)
+                self._eliminar(user_id)
+                limpiados += 1
+            self.stats["expirados"] += limpiados
         
-        for user_id in usuarios_expirados:
-            print(f"[CONVERSACION]  Limpiando estado expirado: {user_id}")
-            del self.estados[user_id]
+        if limpiados:
+            print(f"[CONVERSACION]  Limpiados {limpiados} estados expirados ({len(self.estados)} activos)")
+        return limpiados
     
     def get_stats(self):
         """
-        Obtiene estadísticas del gestor de estado.
+        Obtiene estadísticas del gestor de estado (sin identificadores de usuario).
         
         Returns:
             dict: Estadísticas
         """
-        return {
-            "estados_activos": len(self.estados),
-            "usuarios": list(self.estados.keys())
-        }
+        with self.lock:
+            por_tipo = {}
+            con_ultimo_proyecto = 0
+            for estado in self.estados.values():
+                tipo = estado.get("tipo")
+                if tipo:
+                    por_tipo[tipo] = por_tipo.get(tipo, 0) + 1
+                if "ultimo_proyecto" in estado:
+                    con_ultimo_proyecto += 1
+            return {
+                "estados_activos": len(self.estados),
+                "por_tipo": por_tipo,
+                "con_ultimo_proyecto": con_ultimo_proyecto,
+                "max_estados": self.max_estados,
+                "vencimientos_en_heap": len(self._heap),
+                **self.stats,
+            }
 
 
 # Instancia global del gestor de estado
-conversation_state_manager = ConversationStateManager(timeout_minutes=5)
+conversation_state_manager = ConversationStateManager(
+    timeout_minutes=5,
+    max_estados=settings.MAX_CONVERSATION_STATES,
+    intervalo_limpieza=settings.CONVERSATION_STATE_CLEANUP_SECONDS
+)
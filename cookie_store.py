@@ -0,0 +1,155 @@
+# cookie_store.py
+"""
+Almacén cifrado de cookies de la intranet por usuario.
+
+Cuando el BrowserPool cierra un navegador por inactividad, el siguiente
+mensaje del usuario obligaba a repetir el login completo (carga, formulario
+y espera fija). Guardamos las cookies tras cada login correcto y las
+inyectamos en el navegador nuevo antes de recurrir a usuario/contraseña.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from config import settings
+from db import cifrar, descifrar
+
+
+class CookieStore:
+    """Guarda y restaura snapshots cifrados de cookies (uno por user_id)"""
+    
+    def __init__(self, directorio: str, ttl_horas: float = 8):
+        self.directorio = directorio
+        self.ttl_segundos = ttl_horas * 3600
+        self._lock = threading.Lock()
+        self.stats = {
+            "restauraciones_ok": 0,       # Login evitado gracias al snapshot
+            "restauraciones_fallidas": 0,  # Había snapshot pero ya no valía
+            "sin_snapshot": 0,             # No había snapshot (o caducado)
+            "logins_completos": 0          # Logins con formulario
+        }
+    
+    def _ruta(self, user_id: str) -> str:
+        """Ruta del snapshot (el nombre no expone el user_id)."""
+        nombre = hashlib.sha256(str(user_id).encode()).hexdigest()[:32]
+        return os.path.join(self.directorio, f"{nombre}.snap")
+    
+    def guardar(self, user_id: str, username: str, driver):
+        """Guarda las cookies actuales del navegador del usuario."""
+        try:
+            datos = json.dumps({
+                "username": username,
+                "guardado": time.time(),
+                "cookies": driver.get_cookies()
+            })
+            with self._lock:
+                os.makedirs(self.directorio, exist_ok=True)
+                with open(self._ruta(user_id), "w") as f:
+                    f.write(cifrar(datos))
+            print(f"[COOKIES] 💾 Snapshot guardado para {user_id}")
+        except Exception as e:
+            print(f"[COOKIES]  Error guardando snapshot de {user_id}: {e}")
+    
+    def cargar(self, user_id: str, username: str):
+        """
+        Devuelve las cookies guardadas si existen, no han caducado y
+        pertenecen al mismo usuario de intranet. None en otro caso.
+        """
+        ruta = self._ruta(user_id)
+        try:
+            with self._lock:
+                if not os.path.exists(ruta):
+                    return None
+                with open(ruta) as f:
+                    contenido = f.read()
+        except Exception as e:
+            print(f"[COOKIES]  Error leyendo snapshot de {user_id}: {e}")
+            return None
+        
+        texto = descifrar(contenido)
+        if not texto:
+            self.invalidar(user_id)
+            return None
+        
+        try:
+            datos = json.loads(texto)
+        except ValueError:
+            self.invalidar(user_id)
+            return None
+        
+        if datos.get("username") != username:
+            # Credenciales cambiadas → el snapshot es de otra cuenta
+            self.invalidar(user_id)
+            return None
+        if time.time() - datos.get("guardado", 0) > self.ttl_segundos:
+            self.invalidar(user_id)
+            return None
+        
+        return datos.get("cookies")
+    
+    def invalidar(self, user_id: str):
+        """Elimina el snapshot de un usuario."""
+        with self._lock:
+            try:
+                os.remove(self._ruta(user_id))
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"[COOKIES]  Error eliminando snapshot de {user_id}: {e}")
+    
+    def get_stats(self) -> dict:
+        """Estadísticas de restauración (cuántos logins se han evitado)."""
+        with self._lock:
+            stats = dict(self.stats)
+        intentos = stats["restauraciones_ok"] + stats["restauraciones_fallidas"] + stats["sin_snapshot"]
+        stats["ratio_logins_evitados"] = round(stats["restauraciones_ok"] / intentos, 3) if intentos else 0.0
+        return stats
+    
+    def _contar(self, clave: str):
+        with self._lock:
+            self.stats[clave] += 1
+
+
+def login_con_snapshot(session, username: str, password: str, usar_snapshot: bool = True):
+    """
+    Login para una BrowserSession: primero intenta restaurar las cookies
+    guardadas y, si no sirven, hace el login completo y guarda el snapshot.
+    Debe llamarse con session.lock tomado.
+    
+    Args:
+        usar_snapshot: False cuando hay que VERIFICAR la contraseña (alta o
+                       cambio de credenciales): se hace login real siempre.
+    
+    Returns:
+        tuple: (success: bool, message: str) con el mismo formato que hacer_login
+    """
+    from web_automation import hacer_login, restaurar_sesion_cookies
+    
+    if usar_snapshot:
+        cookies = cookie_store.cargar(session.user_id, username)
+        if cookies:
+            if restaurar_sesion_cookies(session.driver, cookies):
+                cookie_store._contar("restauraciones_ok")
+                print(f"[COOKIES]  Login evitado para {session.user_id} (sesión restaurada)")
+                return True, "sesion_restaurada"
+            cookie_store._contar("restauraciones_fallidas")
+            cookie_store.invalidar(session.user_id)
+        else:
+            cookie_store._contar("sin_snapshot")
+    
+    success, mensaje = hacer_login(session.driver, session.wait, username, password)
+    cookie_store._contar("logins_completos")
+    
+    if success:
+        cookie_store.guardar(session.user_id, username, session.driver)
+    elif "credenciales_invalidas" in mensaje:
+        cookie_store.invalidar(session.user_id)
+    
+    return success, mensaje
+
+
+# Instancia global
+cookie_store = CookieStore(settings.COOKIE_STORE_DIR, settings.COOKIE_SNAPSHOT_TTL_HOURS)
@@ -5,12 +5,12 @@ Incluye consultas de días y semanas específicas.
  MODIFICADO: Ahora muestra departamento y cliente en los resúmenes
 """
 
-import time
 from datetime import timedelta
 from utils.proyecto_utils import formatear_proyecto_con_jerarquia
+from web_automation.cache_semanas import cache_semanas, leer_semana_cacheada
 
 
-def consultar_dia(driver, wait, fecha_obj, canal="webapp"):
+def consultar_dia(driver, wait, fecha_obj, canal="webapp", lector=None):
     """
     Consulta la información de un día específico.
     Navega a la fecha, lee la tabla y devuelve un resumen del día.
@@ -20,22 +20,18 @@ def consultar_dia(driver, wait, fecha_obj, canal="webapp"):
         wait: WebDriverWait configurado
         fecha_obj: Objeto datetime con la fecha a consultar
         canal: Canal de origen ("webapp" o "slack")
+        lector: (Opcional) LectorHTTP para leer sin usar el navegador
         
     Returns:
         str: Resumen formateado con las horas del día
     """
-    from web_automation import lunes_de_semana, seleccionar_fecha, leer_tabla_imputacion
     
     print(f"[DEBUG]  consultar_dia - Fecha recibida: {fecha_obj.strftime('%Y-%m-%d %A')}")
     
     try:
         #  Navegar directamente a la fecha del día (no al lunes)
         # Esto asegura que el día esté habilitado en la vista
-        seleccionar_fecha(driver, fecha_obj)
-        time.sleep(2)  # Esperar a que cargue la tabla
-        
-        # Leer la información de la tabla
-        proyectos = leer_tabla_imputacion(driver)
+        proyectos, _ = leer_semana_cacheada(driver, fecha_obj, lector, espera="consulta_dia", legacy=2)
         
         if not proyectos:
             fecha_str = fecha_obj.strftime('%d/%m/%Y')
@@ -136,7 +132,7 @@ def consultar_dia(driver, wait, fecha_obj, canal="webapp"):
         return f"No he podido consultar ese día: {e}"
 
 
-def consultar_semana(driver, wait, fecha_obj, canal="webapp"):
+def consultar_semana(driver, wait, fecha_obj, canal="webapp", lector=None):
     """
     Consulta la información de una semana específica.
     Navega a la fecha, lee la tabla y devuelve un resumen.
@@ -149,11 +145,12 @@ def consultar_semana(driver, wait, fecha_obj, canal="webapp"):
         wait: WebDriverWait configurado
         fecha_obj: Objeto datetime con la fecha (cualquier día de la semana)
         canal: Canal de origen ("webapp" o "slack")
+        lector: (Opcional) LectorHTTP para leer sin usar el navegador
         
     Returns:
         str: Resumen formateado con las horas de la semana
     """
-    from web_automation import lunes_de_semana, seleccionar_fecha, leer_tabla_imputacion, detectar_dias_deshabilitados
+    from web_automation import lunes_de_semana
     
     print(f"[DEBUG]  consultar_semana - Fecha recibida: {fecha_obj.strftime('%Y-%m-%d %A')}")
     
@@ -171,14 +168,12 @@ def consultar_semana(driver, wait, fecha_obj, canal="webapp"):
         # CONSULTA 1: Navegar al LUNES
         # =====================================================
         print(f"[DEBUG]  Consulta 1: Navegando al lunes {lunes.strftime('%d/%m/%Y')}...")
-        seleccionar_fecha(driver, lunes)
-        time.sleep(2)
-        
-        #  Detectar si hay días deshabilitados
-        dias_estado = detectar_dias_deshabilitados(driver)
+        #  Detectar también si hay días deshabilitados
+        proyectos_lunes, dias_estado = leer_semana_cacheada(
+            driver, lunes, lector, espera="consulta_semana", legacy=2, con_dias=True
+        )
         dias_deshabilitados = [dia for dia, habilitado in dias_estado.items() if not habilitado]
         
-        proyectos_lunes = leer_tabla_imputacion(driver)
         print(f"[DEBUG]  Consulta 1 (lunes): {len(proyectos_lunes)} proyectos encontrados")
         
         # Acumular proyectos de la primera consulta
@@ -198,10 +193,7 @@ def consultar_semana(driver, wait, fecha_obj, canal="webapp"):
         # =====================================================
         if dias_deshabilitados:
             print(f"[DEBUG] 🔄 Consulta 2: Navegando al viernes {viernes.strftime('%d/%m/%Y')} para completar días: {dias_deshabilitados}...")
-            seleccionar_fecha(driver, viernes)
-            time.sleep(2)
-            
-            proyectos_viernes = leer_tabla_imputacion(driver)
+            proyectos_viernes, _ = leer_semana_cacheada(driver, viernes, lector, espera="consulta_semana", legacy=2)
             print(f"[DEBUG]  Consulta 2 (viernes): {len(proyectos_viernes)} proyectos encontrados")
             
             # Acumular proyectos de la segunda consulta
@@ -498,7 +490,7 @@ def calcular_semanas_del_mes(anio: int, mes: int) -> list:
     return semanas
 
 
-def consultar_mes(driver, wait, mes: int, anio: int, canal: str = "webapp"):
+def consultar_mes(driver, wait, mes: int, anio: int, canal: str = "webapp", lector=None):
     """
     Consulta la información de todas las semanas de un mes.
     
@@ -510,12 +502,12 @@ def consultar_mes(driver, wait, mes: int, anio: int, canal: str = "webapp"):
         mes: Número del mes (1-12)
         anio: Año (ej: 2026)
         canal: Canal de origen ("webapp" o "slack")
+        lector: (Opcional) LectorHTTP para leer sin usar el navegador
         
     Returns:
         str: Resumen formateado con las horas del mes por semana
     """
     from datetime import datetime
-    from web_automation import lunes_de_semana, seleccionar_fecha, leer_tabla_imputacion
     
     # Nombres de meses en español
     MESES_NOMBRES = {
@@ -545,15 +537,32 @@ def consultar_mes(driver, wait, mes: int, anio: int, canal: str = "webapp"):
         total_mes = 0
         proyectos_mes = {}  # Acumulado de horas por proyecto en todo el mes
         
+        # Con lector HTTP: pedir a la vez todas las semanas que no estén en cache, repartidas
+        # entre varias sesiones de la intranet (la cache se consulta aquí una sola vez por
+        # semana y el bucle reutiliza el resultado)
+        en_cache = {}
+        lecturas = {}
+        if lector is not None:
+            en_cache = {lunes: cache_semanas.obtener(driver, lunes) for lunes, _ in semanas}
+            pendientes = [lunes for lunes, tabla in en_cache.items() if tabla is None]
+            lecturas = lector.leer_semanas(pendientes) if pendientes else {}
+            for lunes, lectura in lecturas.items():
+                if lectura is not None:
+                    cache_semanas.guardar(driver, lunes, lectura["proyectos"], lectura["dias_estado"])
+        
         for i, (lunes, viernes) in enumerate(semanas, 1):
             print(f"[DEBUG]  Consultando semana {i}/{len(semanas)}: {lunes.strftime('%d/%m')} - {viernes.strftime('%d/%m')}...")
             
-            # Navegar al lunes de esta semana
-            seleccionar_fecha(driver, lunes)
-            time.sleep(1.5)  # Esperar carga
-            
-            # Leer tabla de imputación
-            proyectos = leer_tabla_imputacion(driver)
+            # Leer la tabla del lunes de esta semana
+            if lecturas.get(lunes) is not None:
+                proyectos = lecturas[lunes]["proyectos"]
+            elif en_cache.get(lunes) is not None:
+                proyectos = en_cache[lunes][0]
+            else:
+                proyectos, _ = leer_semana_cacheada(
+                    driver, lunes, lector, espera="consulta_mes", legacy=1.5,
+                    consultar_cache=lunes not in en_cache
+                )
             
             # Calcular total de la semana
             total_semana = 0
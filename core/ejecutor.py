@@ -5,7 +5,6 @@ Coordina la ejecución de comandos interpretados por la IA.
  MODIFICADO: Guarda path_completo_actual para mostrar jerarquía en respuestas
 """
 
-import time
 from datetime import datetime, timedelta
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -25,7 +24,8 @@ from web_automation import (
     volver_inicio,
     copiar_semana_anterior,
     detectar_dias_deshabilitados,
-    lunes_de_semana
+    lunes_de_semana,
+    esperar_pagina_lista
 )
 
 
@@ -282,7 +282,7 @@ def ejecutar_accion(driver, wait, orden, contexto):
                     # 2. Volver a pantalla principal
                     print(f"[DEBUG] 🔙 Volviendo a pantalla principal...")
                     volver_inicio(driver)
-                    time.sleep(1)
+                    esperar_pagina_lista(driver, "recovery", legacy=1)
 
                     # 3. Limpiar contexto para forzar navegación fresca
                     contexto["fecha_seleccionada"] = None
@@ -388,7 +388,7 @@ def ejecutar_accion(driver, wait, orden, contexto):
         # 2. Volver a pantalla principal
         print(f"[DEBUG] 🔙 Volviendo a pantalla principal...")
         volver_inicio(driver)
-        time.sleep(1)
+        esperar_pagina_lista(driver, "recovery", legacy=1)
 
         # 3. Calcular fecha de un día deshabilitado para navegar
         fecha_sel = contexto.get("fecha_seleccionada")
@@ -549,24 +549,15 @@ def ejecutar_accion(driver, wait, orden, contexto):
         return "No he entendido esa instrucción"
 
 
-def ejecutar_lista_acciones(driver, wait, ordenes, contexto=None):
+def preprocesar_ordenes(ordenes, contexto):
     """
-    Ejecuta una lista de acciones en secuencia.
+    Ajusta las órdenes antes de ejecutarlas (sin navegador):
+    - 5x imputar_horas_dia L-V tras un seleccionar_proyecto → imputar_horas_semana
+    - seleccionar_proyecto + imputar(0, establecer) → contexto["es_borrado_horas"]
     
-    Args:
-        driver: WebDriver de Selenium
-        wait: WebDriverWait configurado
-        ordenes: Lista de diccionarios con acciones
-        contexto: Diccionario de contexto (opcional, se crea si no existe)
-        
     Returns:
-        list: Lista de mensajes de respuesta de cada acción
+        list: Órdenes a ejecutar
     """
-    if contexto is None:
-        contexto = {"fila_actual": None, "proyecto_actual": None, "error_critico": False, "path_completo_actual": None}
-    
-    respuestas = []
-    
     # ==========================================================================
     #  PRE-PROCESAMIENTO: Detectar si GPT generó "toda la semana" como 5 imputar_horas_dia
     # Si es así, convertir a una sola acción imputar_horas_semana
@@ -613,7 +604,6 @@ def ejecutar_lista_acciones(driver, wait, ordenes, contexto=None):
         ordenes_procesadas.append(orden)
         i += 1
     
-    # Usar las órdenes procesadas
     ordenes = ordenes_procesadas
     
     # ==========================================================================
@@ -631,6 +621,28 @@ def ejecutar_lista_acciones(driver, wait, ordenes, contexto=None):
                         print(f"[DEBUG]  Detectado: seleccionar_proyecto + imputar(0, establecer) → modo borrar horas")
                         break
     
+    return ordenes
+
+
+def ejecutar_lista_acciones(driver, wait, ordenes, contexto=None):
+    """
+    Ejecuta una lista de acciones en secuencia.
+    
+    Args:
+        driver: WebDriver de Selenium
+        wait: WebDriverWait configurado
+        ordenes: Lista de diccionarios con acciones
+        contexto: Diccionario de contexto (opcional, se crea si no existe)
+        
+    Returns:
+        list: Lista de mensajes de respuesta de cada acción
+    """
+    if contexto is None:
+        contexto = {"fila_actual": None, "proyecto_actual": None, "error_critico": False, "path_completo_actual": None}
+    
+    respuestas = []
+    ordenes = preprocesar_ordenes(ordenes, contexto)
+    
     # ==========================================================================
     # EJECUCIÓN
     # ==========================================================================
@@ -0,0 +1,329 @@
+# emisor_whatsapp.py
+"""
+Envío de mensajes de WhatsApp (Meta Cloud API) en segundo plano.
+
+enviar_whatsapp() hacía un requests.post bloqueante, con conexión nueva y sin
+reintentos, desde el event loop (procesar_whatsapp_en_background) y desde los
+threads del scheduler. Ahora solo encola el mensaje y vuelve; un thread con
+su propio event loop los envía:
+
+- Cola por destinatario: los mensajes a un mismo usuario salen en orden y,
+  si se acumulan varios, se unen en uno solo (WHATSAPP_BATCH_MAX).
+- Un httpx.AsyncClient con conexiones keep-alive y varios envíos a la vez a
+  usuarios distintos (WHATSAPP_WORKERS).
+- Límite de envíos por segundo (cubo de fichas); un 429 vacía el cubo
+  durante el Retry-After.
+- Reintentos con backoff exponencial para 429, 5xx, errores de red y los
+  códigos de límite de Meta; lo que no se entrega acaba en
+  WHATSAPP_DEAD_LETTER_FILE (una línea JSON por mensaje).
+- Latencia de entrega (encolado → aceptado por Meta) en get_stats().
+
+WHATSAPP_API_URL permite apuntar a un servidor local (benchmarks/whatsapp_local.py).
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import httpx
+
+from config import settings
+
+
+LIMITE_TEXTO = 4096  # caracteres por mensaje de texto en WhatsApp
+RETARDO_BASE = 0.5  # segundos del primer reintento (se duplica en cada uno)
+RETARDO_MAX = 30
+
+# Códigos de error de Meta que indican límite de envíos (vienen con HTTP 400)
+_CODIGOS_LIMITE = {4, 80007, 130429, 131048, 131056}
+
+
+class _Mensaje:
+    __slots__ = ("wa_id", "texto", "encolado")
+
+    def __init__(self, wa_id, texto):
+        self.wa_id = wa_id
+        self.texto = texto
+        self.encolado = time.monotonic()
+
+
+class _LimitadorTasa:
+    """
+    Cubo de fichas de capacidad 1: envíos separados al menos 1/por_segundo,
+    así ninguna ventana de un segundo supera `por_segundo` (sin ráfagas).
+    """
+
+    def __init__(self, por_segundo):
+        self.por_segundo = por_segundo
+        self.fichas = 1.0
+        self.ultimo = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def esperar(self):
+        async with self._lock:
+            while True:
+                ahora = time.monotonic()
+                self.fichas = min(1.0, self.fichas + (ahora - self.ultimo) * self.por_segundo)
+                self.ultimo = ahora
+                if self.fichas >= 1:
+                    self.fichas -= 1
+                    return
+                await asyncio.sleep((1 - self.fichas) / self.por_segundo)
+
+    def penalizar(self, segundos):
+        """Tras un 429: no enviar nada durante `segundos`."""
+        self.fichas = min(self.fichas, 1 - segundos * self.por_segundo)
+
+
+def _segundos_retry_after(response):
+    try:
+        return max(0.0, float(response.headers.get("Retry-After", "")))
+    except ValueError:
+        return None
+
+
+def _es_limite_meta(response):
+    try:
+        return response.json().get("error", {}).get("code") in _CODIGOS_LIMITE
+    except Exception:
+        return False
+
+
+class EmisorWhatsApp:
+    """Cola de salida de WhatsApp con su propio event loop en un thread."""
+
+    def __init__(self, url_base, token, phone_number_id, por_segundo=20, max_reintentos=4,
+                 lote_max=5, trabajadores=4, timeout=15, fichero_no_entregados=None):
+        self.url = f"{url_base.rstrip('/')}/{phone_number_id}/messages"
+        self.token = token
+        self.por_segundo = por_segundo
+        self.max_reintentos = max_reintentos
+        self.lote_max = max(1, lote_max)
+        self.trabajadores = trabajadores
+        self.timeout = timeout
+        self.fichero_no_entregados = fichero_no_entregados
+
+        self._lock = threading.Lock()
+        self._pendientes = {}   # wa_id -> deque de _Mensaje sin enviar
+        self._activos = set()   # wa_id en la cola de listos o enviándose
+        self._thread = None
+        self._loop = None
+        self._listos = None     # asyncio.Queue de wa_id con mensajes
+        self._detener = None    # asyncio.Event
+        self._arrancado = threading.Event()
+        self._timeout_cierre = 10
+        self._latencias = deque(maxlen=1000)
+        self.no_entregados = deque(maxlen=20)
+        self.stats = {"encolados": 0, "enviados": 0, "llamadas": 0, "agrupados": 0,
+                      "reintentos": 0, "no_entregados": 0, "limitados": 0}
+
+    # ------------------------------------------------------------------
+    # API (cualquier thread o el event loop de FastAPI)
+    # ------------------------------------------------------------------
+
+    def enviar(self, wa_id: str, mensaje: str):
+        """Encola `mensaje` para `wa_id` y vuelve enseguida."""
+        if not mensaje:
+            return
+        self._arrancar()
+        with self._lock:
+            self._pendientes.setdefault(wa_id, deque()).append(_Mensaje(wa_id, mensaje))
+            self.stats["encolados"] += 1
+            nuevo = wa_id not in self._activos
+            self._activos.add(wa_id)
+        if nuevo:
+            try:
+                self._loop.call_soon_threadsafe(self._listos.put_nowait, wa_id)
+            except RuntimeError:
+                # Emisor ya cerrado (apagando el servidor)
+                print(f"[WA-EMISOR]  Emisor cerrado, mensaje a {wa_id} descartado")
+
+    def cerrar(self, timeout: float = 10):
+        """Espera (como mucho `timeout` s) a que salga lo pendiente y para el thread."""
+        with self._lock:
+            thread, loop = self._thread, self._loop
+        if thread is None or not thread.is_alive():
+            return
+        self._timeout_cierre = timeout
+        loop.call_soon_threadsafe(self._detener.set)
+        thread.join(timeout + 5)
+        print("[WA-EMISOR] 🛑 Emisor de WhatsApp detenido")
+
+    # ------------------------------------------------------------------
+    # Thread y event loop propios
+    # ------------------------------------------------------------------
+
+    def _arrancar(self):
+        if self._arrancado.is_set():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=lambda: asyncio.run(self._principal()), daemon=True)
+                self._thread.start()
+        self._arrancado.wait()
+
+    async def _principal(self):
+        self._loop = asyncio.get_running_loop()
+        self._listos = asyncio.Queue()
+        self._detener = asyncio.Event()
+        self._limitador = _LimitadorTasa(self.por_segundo)
+        self._cliente = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.trabajadores, max_keepalive_connections=self.trabajadores),
+            headers={"Authorization": f"Bearer {self.token}"},
+        )
+        self._arrancado.set()
+
+        tareas = [asyncio.create_task(self._trabajador()) for _ in range(self.trabajadores)]
+        await self._detener.wait()
+
+        try:
+            await asyncio.wait_for(self._listos.join(), self._timeout_cierre)
+        except asyncio.TimeoutError:
+            print(f"[WA-EMISOR]  Cierre con {sum(len(c) for c in self._pendientes.values())} mensajes sin enviar")
+        for tarea in tareas:
+            tarea.cancel()
+        await self._cliente.aclose()
+
+    async def _trabajador(self):
+        while True:
+            wa_id = await self._listos.get()
+            try:
+                await self._enviar_lote(wa_id)
+            except Exception as e:
+                print(f"[WA-EMISOR] ❌ Error inesperado enviando a {wa_id}: {e}")
+            finally:
+                with self._lock:
+                    seguir = bool(self._pendientes.get(wa_id))
+                    if not seguir:
+                        self._pendientes.pop(wa_id, None)
+                        self._activos.discard(wa_id)
+                if seguir:
+                    self._listos.put_nowait(wa_id)
+                self._listos.task_done()
+
+    def _tomar_lote(self, wa_id):
+        """Mensajes pendientes del usuario que caben en un solo envío."""
+        with self._lock:
+            cola = self._pendientes[wa_id]
+            lote = [cola.popleft()]
+            longitud = len(lote[0].texto)
+            while cola and len(lote) < self.lote_max and longitud + 2 + len(cola[0].texto) <= LIMITE_TEXTO:
+                longitud += 2 + len(cola[0].texto)
+                lote.append(cola.popleft())
+            return lote
+
+    async def _enviar_lote(self, wa_id):
+        lote = self._tomar_lote(wa_id)
+        texto = "\n\n".join(m.texto for m in lote)
+
+        entregado, detalle, intentos = await self._post_con_reintentos(wa_id, texto)
+
+        ahora = time.monotonic()
+        with self._lock:
+            self.stats["llamadas"] += 1
+            if entregado:
+                self.stats["enviados"] += len(lote)
+                self.stats["agrupados"] += len(lote) - 1
+                self._latencias.extend(ahora - m.encolado for m in lote)
+            else:
+                self.stats["no_entregados"] += len(lote)
+
+        if entregado:
+            extra = f" ({len(lote)} mensajes agrupados)" if len(lote) > 1 else ""
+            print(f"[WA-EMISOR] ✅ Mensaje enviado a {wa_id}{extra}")
+        else:
+            self._registrar_no_entregado(wa_id, texto, detalle, intentos)
+
+    async def _post_con_reintentos(self, wa_id, texto):
+        """Returns: (entregado, detalle del último error, intentos)"""
+        payload = {
+            "messaging_product": "whatsapp",
+            "to": wa_id,
+            "type": "text",
+            "text": {"body": texto},
+        }
+        detalle = None
+        for intento in range(self.max_reintentos + 1):
+            await self._limitador.esperar()
+            espera = None
+            try:
+                response = await self._cliente.post(self.url, json=payload)
+            except httpx.HTTPError as e:
+                detalle = f"{type(e).__name__}: {e}"
+                reintentable = True
+            else:
+                if response.status_code in (200, 201):
+                    return True, None, intento + 1
+                detalle = f"HTTP {response.status_code}: {response.text[:300]}"
+                limitado = response.status_code == 429 or _es_limite_meta(response)
+                reintentable = limitado or response.status_code >= 500
+                if limitado:
+                    espera = _segundos_retry_after(response)
+                    self._limitador.penalizar(espera or 1)
+                    with self._lock:
+                        self.stats["limitados"] += 1
+
+            if not reintentable or intento == self.max_reintentos:
+                return False, detalle, intento + 1
+
+            retardo = espera if espera is not None else min(RETARDO_MAX, RETARDO_BASE * 2 ** intento)
+            retardo *= random.uniform(0.8, 1.2)
+            with self._lock:
+                self.stats["reintentos"] += 1
+            print(f"[WA-EMISOR] 🔁 Reintento {intento + 1}/{self.max_reintentos} a {wa_id} en {retardo:.1f}s ({detalle})")
+            await asyncio.sleep(retardo)
+
+        return False, detalle, self.max_reintentos + 1
+
+    def _registrar_no_entregado(self, wa_id, texto, detalle, intentos):
+        registro = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "wa_id": wa_id,
+            "texto": texto,
+            "intentos": intentos,
+            "error": detalle,
+        }
+        print(f"[WA-EMISOR] ❌ Mensaje a {wa_id} NO entregado tras {intentos} intento(s): {detalle}")
+        with self._lock:
+            self.no_entregados.append({k: v for k, v in registro.items() if k != "texto"})
+        if self.fichero_no_entregados:
+            try:
+                with open(self.fichero_no_entregados, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            except OSError as e:
+                print(f"[WA-EMISOR]  No se pudo escribir en {self.fichero_no_entregados}: {e}")
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            latencias = sorted(self._latencias)
+            return {
+                **self.stats,
+                "en_cola": sum(len(c) for c in self._pendientes.values()),
+                "destinatarios_activos": len(self._activos),
+                "latencia_ms": {
+                    "p50": round(latencias[len(latencias) // 2] * 1000, 1) if latencias else 0.0,
+                    "p95": round(latencias[int(len(latencias) * 0.95)] * 1000, 1) if latencias else 0.0,
+                    "max": round(latencias[-1] * 1000, 1) if latencias else 0.0,
+                },
+                "ultimos_no_entregados": list(self.no_entregados),
+                "por_segundo": self.por_segundo,
+            }
+
+
+# Instancia global
+emisor_whatsapp = EmisorWhatsApp(
+    settings.WHATSAPP_API_URL,
+    settings.META_WHATSAPP_TOKEN,
+    settings.META_PHONE_NUMBER_ID,
+    por_segundo=settings.WHATSAPP_RATE_PER_SECOND,
+    max_reintentos=settings.WHATSAPP_MAX_RETRIES,
+    lote_max=settings.WHATSAPP_BATCH_MAX,
+    trabajadores=settings.WHATSAPP_WORKERS,
+    timeout=settings.WHATSAPP_TIMEOUT_SECONDS,
+    fichero_no_entregados=settings.WHATSAPP_DEAD_LETTER_FILE,
+)
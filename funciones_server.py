@@ -6,16 +6,21 @@ Centraliza toda la lógica de manejo de desambiguación, login, credenciales y e
 from typing import Tuple, Optional, Dict, List
 from sqlalchemy.orm import Session
 
-from web_automation import hacer_login, leer_tabla_imputacion
+from web_automation import leer_tabla_imputacion
 from web_automation.desambiguacion import (
     resolver_respuesta_desambiguacion,
     generar_mensaje_desambiguacion
 )
 from conversation_state import conversation_state_manager
 from credential_manager import credential_manager
+from cookie_store import login_con_snapshot
+from web_automation.catalogo_proyectos import catalogo_proyectos
+from web_automation.cache_semanas import cache_semanas
+from web_automation.lector_http import lectores_http
 from core import ejecutar_accion
 from ai import interpretar_con_gpt, generar_respuesta_natural
 from db import registrar_peticion
+from metricas import medir
 
 
 # ============================================================================
@@ -179,7 +184,7 @@ def manejar_pregunta_modificacion(mensaje_dict: dict, texto: str, user_id: str,
 # AUTENTICACIÓN Y LOGIN
 # ============================================================================
 
-def hacer_login_con_lock(session, username: str, password: str) -> Tuple[bool, str]:
+def hacer_login_con_lock(session, username: str, password: str, usar_snapshot: bool = False) -> Tuple[bool, str]:
     """
     Ejecuta login con lock de la sesión
     
@@ -187,12 +192,14 @@ def hacer_login_con_lock(session, username: str, password: str) -> Tuple[bool, s
         session: BrowserSession del pool
         username: Usuario de GestionITT
         password: Contraseña de GestionITT
+        usar_snapshot: Si True, intenta antes restaurar las cookies guardadas
+                       (no usar cuando se están verificando credenciales nuevas)
         
     Returns:
         (success, mensaje)
     """
-    with session.lock:
-        return hacer_login(session.driver, session.wait, username, password)
+    with session.lock, medir("login"):
+        return login_con_snapshot(session, username, password, usar_snapshot=usar_snapshot)
 
 
 def manejar_cambio_credenciales(texto: str, user_id: str, usuario, db: Session, 
@@ -241,6 +248,10 @@ def manejar_cambio_credenciales(texto: str, user_id: str, usuario, db: Session,
         if success:
             # Login OK → guardar credenciales
             session.is_logged_in = True
+            # Otra cuenta puede ver otro árbol de proyectos y otras horas
+            catalogo_proyectos.invalidar(user_id)
+            cache_semanas.descartar_usuario(user_id)
+            lectores_http.invalidar(user_id)
             ok, mensaje_guardado = credential_manager.guardar_credenciales(
                 db, user_id, username, password, canal=canal
             )
@@ -281,7 +292,7 @@ def realizar_login_inicial(session, user_id: str, username: str, password: str,
     if not session.is_logged_in:
         print(f"[INFO] Haciendo login para usuario: {username} ({user_id})")
         try:
-            success, mensaje_login = hacer_login_con_lock(session, username, password)
+            success, mensaje_login = hacer_login_con_lock(session, username, password, usar_snapshot=True)
             
             if not success:
                 if "credenciales_invalidas" in mensaje_login:
@@ -478,12 +489,13 @@ def ejecutar_comando_completo(comando: str, texto_original: str, session, contex
     # Leer tabla actual
     tabla_actual = None
     try:
-        with session.lock:
+        with session.lock, medir("leer_tabla"):
             tabla_actual = leer_tabla_imputacion(session.driver)
     except Exception as e:
         print(f"[DEBUG]  No se pudo leer la tabla: {e}")
     
-    ordenes = interpretar_con_gpt(comando, contexto, tabla_actual)
+    with medir("interpretar"):
+        ordenes = interpretar_con_gpt(comando, contexto, tabla_actual)
     
     if not ordenes:
         respuesta = "🤔 No he entendido qué quieres que haga."
@@ -540,7 +552,7 @@ def ejecutar_ordenes_y_generar_respuesta(ordenes: list, texto: str, session, con
         if orden.get("accion") == "imputar_horas_dia":
             contexto["es_borrado_horas"] = False
         
-        with session.lock:
+        with session.lock, medir("ejecutar_accion"):
             mensaje = ejecutar_accion(session.driver, session.wait, orden, contexto)
         
         # Verificar si necesita desambiguación o confirmación
@@ -555,7 +567,8 @@ def ejecutar_ordenes_y_generar_respuesta(ordenes: list, texto: str, session, con
     
     # Generar respuesta natural
     if respuestas:
-        respuesta_natural = generar_respuesta_natural(respuestas, texto_original, contexto)
+        with medir("generar_respuesta"):
+            respuesta_natural = generar_respuesta_natural(respuestas, texto_original, contexto)
     else:
         respuesta_natural = "He procesado la instrucción, pero no hubo mensajes de salida."
     
@@ -725,7 +738,7 @@ def ejecutar_con_coincidencia(coincidencia: dict, estado: dict, session, db: Ses
         orden = ordenes_originales[idx]
         print(f"[DEBUG] 🔁 Ejecutando orden {idx}: {orden.get('accion')}")
         
-        with session.lock:
+        with session.lock, medir("ejecutar_accion"):
             mensaje = ejecutar_accion(session.driver, session.wait, orden, contexto)
             print(f"[DEBUG] 🔁 Resultado: {type(mensaje).__name__} - {str(mensaje)[:100] if not isinstance(mensaje, dict) else 'dict'}")
             
@@ -773,7 +786,8 @@ def ejecutar_con_coincidencia(coincidencia: dict, estado: dict, session, db: Ses
     
     if respuestas:
         #  Usar el texto original completo para generar la respuesta
-        respuesta_natural = generar_respuesta_natural(respuestas, texto_comando_original, contexto)
+        with medir("generar_respuesta"):
+            respuesta_natural = generar_respuesta_natural(respuestas, texto_comando_original, contexto)
     else:
         respuesta_natural = " Listo"
     
@@ -808,7 +822,7 @@ def buscar_en_sistema(estado: dict, session, db: Session, usuario, user_id: str,
     for idx in range(indice_orden, len(ordenes_originales)):
         orden = ordenes_originales[idx]
         
-        with session.lock:
+        with session.lock, medir("ejecutar_accion"):
             mensaje = ejecutar_accion(session.driver, session.wait, orden, contexto)
             
             # Manejar desambiguación
@@ -848,7 +862,8 @@ def buscar_en_sistema(estado: dict, session, db: Session, usuario, user_id: str,
     conversation_state_manager.limpiar_estado(user_id)
     
     if respuestas:
-        respuesta_natural = generar_respuesta_natural(respuestas, texto_comando_original, contexto)
+        with medir("generar_respuesta"):
+            respuesta_natural = generar_respuesta_natural(respuestas, texto_comando_original, contexto)
     else:
         respuesta_natural = " Listo"
     
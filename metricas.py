@@ -0,0 +1,269 @@
+# metricas.py
+"""
+Métricas en formato de texto de Prometheus para GET /metrics.
+
+/stats da contadores y medias sueltas, pero no dice en qué fase se va el
+tiempo de un mensaje ni cómo se reparte (p50 frente a p99). Aquí hay:
+
+- Un histograma de latencia por fase de procesar_mensaje_usuario_sync
+  (gestion_fase_segundos{fase=...}): autenticacion, sesion_navegador, login,
+  clasificar, clasificar_e_interpretar, leer_tabla, interpretar,
+  ejecutar_accion, generar_respuesta, registrar_bd y total.
+- Contadores de comandos de Selenium (cada llamada al chromedriver), tokens
+  de OpenAI, aciertos/fallos del pool de navegadores y la espera por el lock
+  de cada BrowserSession.
+- Recolectores: funciones que se llaman al pedir /metrics y convierten los
+  get_stats() que ya existen en métricas.
+
+Sin dependencias externas: el formato de texto es sencillo y así no hace
+falta prometheus_client.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Cubre desde una lectura de cache (ms) hasta un login lento de Selenium (decenas de s)
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatear_etiquetas(nombres, valores, extra=None) -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _formatear_numero(valor) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+class Contador:
+    """Valor que solo crece, con etiquetas."""
+
+    tipo = "counter"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+        self._valores = {}  # tupla de etiquetas -> valor
+
+    def inc(self, valor: float = 1, **etiquetas):
+        clave = tuple(str(etiquetas.get(n, "")) for n in self.etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + valor
+
+    def valor(self, **etiquetas) -> float:
+        clave = tuple(str(etiquetas.get(n, "")) for n in self.etiquetas)
+        with self._lock:
+            return self._valores.get(clave, 0)
+
+    def exponer(self) -> list:
+        with self._lock:
+            valores = sorted(self._valores.items())
+        return [f"{self.nombre}{_formatear_etiquetas(self.etiquetas, clave)} {_formatear_numero(v)}"
+                for clave, v in valores]
+
+
+class Histograma:
+    """Distribución de duraciones en buckets acumulados, con etiquetas."""
+
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas=(), buckets=BUCKETS_SEGUNDOS):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = {}  # tupla de etiquetas -> [cuentas por bucket, suma, total]
+
+    def observar(self, valor: float, **etiquetas):
+        clave = tuple(str(etiquetas.get(n, "")) for n in self.etiquetas)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[0][i] += 1
+                    break
+            serie[1] += valor
+            serie[2] += 1
+
+    def exponer(self) -> list:
+        with self._lock:
+            series = sorted((clave, (list(s[0]), s[1], s[2])) for clave, s in self._series.items())
+        lineas = []
+        for clave, (cuentas, suma, total) in series:
+            acumulado = 0
+            for limite, cuenta in zip(self.buckets, cuentas):
+                acumulado += cuenta
+                le = f'le="{_formatear_numero(limite)}"'
+                lineas.append(f"{self.nombre}_bucket{_formatear_etiquetas(self.etiquetas, clave, le)} {acumulado}")
+            infinito = _formatear_etiquetas(self.etiquetas, clave, 'le="+Inf"')
+            lineas.append(f"{self.nombre}_bucket{infinito} {total}")
+            lineas.append(f"{self.nombre}_sum{_formatear_etiquetas(self.etiquetas, clave)} {_formatear_numero(suma)}")
+            lineas.append(f"{self.nombre}_count{_formatear_etiquetas(self.etiquetas, clave)} {total}")
+        return lineas
+
+
+class RegistroMetricas:
+    """Métricas del proceso y recolectores que se evalúan al exponerlas."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metricas = {}
+        self._recolectores = []
+
+    def _registrar(self, metrica):
+        with self._lock:
+            existente = self._metricas.get(metrica.nombre)
+            if existente is not None:
+                return existente
+            self._metricas[metrica.nombre] = metrica
+            return metrica
+
+    def contador(self, nombre: str, ayuda: str, etiquetas=()) -> Contador:
+        return self._registrar(Contador(nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas=(), buckets=BUCKETS_SEGUNDOS) -> Histograma:
+        return self._registrar(Histograma(nombre, ayuda, etiquetas, buckets))
+
+    def recolector(self, funcion):
+        """
+        Registra `funcion()`, que al exponer devuelve una lista de
+        (nombre, tipo, ayuda, [(dict de etiquetas, valor)]).
+        """
+        with self._lock:
+            self._recolectores.append(funcion)
+
+    def exponer(self) -> str:
+        """Todas las métricas en el formato de texto de Prometheus (versión 0.0.4)."""
+        with self._lock:
+            metricas = list(self._metricas.values())
+            recolectores = list(self._recolectores)
+
+        lineas = []
+        for metrica in metricas:
+            lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+            lineas.extend(metrica.exponer())
+
+        for funcion in recolectores:
+            try:
+                familias = funcion()
+            except Exception as e:
+                print(f"[METRICAS]  Error en el recolector {getattr(funcion, '__name__', funcion)}: {e}")
+                continue
+            for nombre, tipo, ayuda, muestras in familias:
+                lineas.append(f"# HELP {nombre} {ayuda}")
+                lineas.append(f"# TYPE {nombre} {tipo}")
+                for etiquetas, valor in muestras:
+                    lineas.append(f"{nombre}{_formatear_etiquetas(etiquetas.keys(), etiquetas.values())} "
+                                  f"{_formatear_numero(valor)}")
+        return "\n".join(lineas) + "\n"
+
+
+# Instancia global
+registro_metricas = RegistroMetricas()
+
+fases = registro_metricas.histograma(
+    "gestion_fase_segundos", "Duración de cada fase del procesamiento de un mensaje", ("fase",))
+selenium_comandos = registro_metricas.contador(
+    "gestion_selenium_comandos_total", "Comandos enviados al chromedriver", ("comando",))
+selenium_segundos = registro_metricas.contador(
+    "gestion_selenium_segundos_total", "Tiempo total esperando al chromedriver", ("comando",))
+openai_llamadas = registro_metricas.contador(
+    "gestion_openai_llamadas_total", "Llamadas a la API de OpenAI", ("origen", "modelo"))
+openai_tokens = registro_metricas.contador(
+    "gestion_openai_tokens_total", "Tokens de OpenAI consumidos", ("origen", "modelo", "tipo"))
+pool_sesiones = registro_metricas.contador(
+    "gestion_pool_sesiones_total",
+    "Peticiones de navegador al pool por resultado (existente, caliente, frio, fallo)", ("resultado",))
+espera_lock = registro_metricas.histograma(
+    "gestion_espera_lock_segundos", "Espera hasta conseguir el lock de un navegador", ("lock",))
+
+
+@contextmanager
+def medir(fase: str):
+    """Observa en gestion_fase_segundos lo que tarda el bloque (aunque lance una excepción)."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        fases.observar(time.perf_counter() - inicio, fase=fase)
+
+
+def instrumentar_driver(driver):
+    """
+    Cuenta cada comando que el driver envía al chromedriver. Todo pasa por
+    driver.execute (también los de WebElement), así que basta con envolverlo.
+    """
+    original = driver.execute
+
+    def execute(driver_command, params=None):
+        inicio = time.perf_counter()
+        try:
+            return original(driver_command, params)
+        finally:
+            selenium_comandos.inc(comando=driver_command)
+            selenium_segundos.inc(time.perf_counter() - inicio, comando=driver_command)
+
+    driver.execute = execute
+    return driver
+
+
+def registrar_uso_openai(response, origen: str):
+    """Suma la llamada y los tokens de `response.usage` (si la respuesta lo trae)."""
+    modelo = getattr(response, "model", None) or "desconocido"
+    openai_llamadas.inc(origen=origen, modelo=modelo)
+    uso = getattr(response, "usage", None)
+    if uso is None:
+        return
+    openai_tokens.inc(getattr(uso, "prompt_tokens", 0) or 0, origen=origen, modelo=modelo, tipo="prompt")
+    openai_tokens.inc(getattr(uso, "completion_tokens", 0) or 0, origen=origen, modelo=modelo, tipo="completion")
+
+
+class LockMedido:
+    """threading.Lock que observa en gestion_espera_lock_segundos lo que se espera por él."""
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self._lock = threading.Lock()
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        # Sin contención no se toma la hora: es el caso habitual
+        if self._lock.acquire(False):
+            espera_lock.observar(0.0, lock=self.nombre)
+            return True
+        if not blocking:
+            return False
+        inicio = time.perf_counter()
+        conseguido = self._lock.acquire(True, timeout)
+        espera_lock.observar(time.perf_counter() - inicio, lock=self.nombre)
+        return conseguido
+
+    def release(self):
+        self._lock.release()
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
@@ -4,16 +4,15 @@ Cada viernes a las 14:00, revisa usuarios de WhatsApp que no han imputado horas
 y les envía un recordatorio con opción de cargar la semana anterior.
 """
 
-import time
+import threading
 import traceback
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 
+from config import settings
 from db import SessionLocal, Usuario
-from browser_pool import browser_pool
 from auth_handler import obtener_credenciales
-from web_automation import leer_tabla_imputacion, seleccionar_fecha, lunes_de_semana
-from conversation_state import conversation_state_manager
+from web_automation import lunes_de_semana, leer_semana_cacheada
 
 
 # ============================================================================
@@ -23,6 +22,18 @@ from conversation_state import conversation_state_manager
 TEST_ONLY_NUMBERS = ["34674590643"]
 # TEST_ONLY_NUMBERS = []  # ← Descomentar esta línea para activar para todos
 
+MENSAJE_RECORDATORIO = (
+    "📋 *Recordatorio de imputación*\n\n"
+    "No tienes horas registradas esta semana.\n\n"
+    "¿Quieres que cargue el horario de la semana pasada?\n\n"
+    "Responde *Sí* o *No*"
+)
+
+# Un solo barrido a la vez (job del viernes o reanudación al arrancar)
+_lock_barrido = threading.Lock()
+barrido_actual = None
+ultimo_informe = None
+
 
 def obtener_usuarios_whatsapp(db: Session) -> list:
     """
@@ -62,11 +73,8 @@ def verificar_horas_semana(session, driver, wait) -> bool:
         hoy = datetime.now()
         lunes = lunes_de_semana(hoy)
         
-        seleccionar_fecha(driver, lunes)
-        time.sleep(2)
-        
-        # Leer tabla de imputación
-        proyectos = leer_tabla_imputacion(driver)
+        # Leer tabla de imputación (desde la cache si la semana se leyó hace poco)
+        proyectos, _ = leer_semana_cacheada(driver, lunes, espera="scheduler_semana", legacy=2)
         
         if not proyectos:
             return False
@@ -113,9 +121,9 @@ def hacer_login_para_check(session, username: str, password: str) -> bool:
         return True
     
     try:
-        from web_automation import hacer_login
+        from cookie_store import login_con_snapshot
         with session.lock:
-            success, mensaje = hacer_login(session.driver, session.wait, username, password)
+            success, mensaje = login_con_snapshot(session, username, password)
         
         if success:
             session.is_logged_in = True
@@ -129,12 +137,30 @@ def hacer_login_para_check(session, username: str, password: str) -> bool:
         return False
 
 
+def _datos_usuarios(db: Session) -> list:
+    """(wa_id, username, password) de cada usuario, leídos antes de repartirlos entre threads."""
+    return [
+        (usuario.wa_id, usuario.username_intranet, usuario.obtener_password_intranet())
+        for usuario in obtener_usuarios_whatsapp(db)
+    ]
+
+
 def ejecutar_check_semanal():
     """
     Job principal del scheduler.
-    Recorre todos los usuarios de WhatsApp y envía recordatorio
-    a los que no tienen horas imputadas esta semana.
+    Recorre todos los usuarios de WhatsApp (en paralelo, barrido_semanal.py) y
+    envía recordatorio a los que no tienen horas imputadas esta semana.
+    
+    Returns:
+        dict: Informe de la ejecución, o None si no se ha ejecutado
     """
+    global barrido_actual, ultimo_informe
+    from barrido_semanal import BarridoSemanal, PuntoControl
+    
+    if not _lock_barrido.acquire(blocking=False):
+        print("[SCHEDULER] ⏭️ Ya hay un check semanal en marcha")
+        return None
+    
     print(f"\n[SCHEDULER] {'='*60}")
     print(f"[SCHEDULER] 📋 Iniciando check semanal de imputación - {datetime.now().strftime('%d/%m/%Y %H:%M')}")
     print(f"[SCHEDULER] {'='*60}")
@@ -143,91 +169,61 @@ def ejecutar_check_semanal():
     
     try:
         # Obtener usuarios de WhatsApp con credenciales
-        usuarios = obtener_usuarios_whatsapp(db)
+        usuarios = _datos_usuarios(db)
+        db.close()
         print(f"[SCHEDULER] 👥 Usuarios WhatsApp con credenciales: {len(usuarios)}")
         
         if not usuarios:
             print(f"[SCHEDULER] ℹ️ No hay usuarios que revisar")
-            return
-        
-        recordatorios_enviados = 0
-        usuarios_con_horas = 0
-        errores = 0
+            return None
         
-        for usuario in usuarios:
-            wa_id = usuario.wa_id
-            username = usuario.username_intranet
-            password = usuario.obtener_password_intranet()
-            
-            if not password:
-                print(f"[SCHEDULER]  ⚠️ {wa_id}: No se pudo descifrar la contraseña, saltando")
-                errores += 1
-                continue
-            
-            print(f"[SCHEDULER]  🔍 Revisando usuario: {wa_id} ({username})")
-            
-            try:
-                # Obtener o crear sesión de navegador
-                session = browser_pool.get_session(wa_id)
-                if not session or not session.driver:
-                    print(f"[SCHEDULER]    ⚠️ No se pudo obtener sesión de navegador")
-                    errores += 1
-                    continue
-                
-                # Hacer login si es necesario
-                if not hacer_login_para_check(session, username, password):
-                    print(f"[SCHEDULER]    ⚠️ No se pudo hacer login, saltando")
-                    errores += 1
-                    continue
-                
-                # Verificar si tiene horas esta semana
-                with session.lock:
-                    tiene_horas = verificar_horas_semana(session, session.driver, session.wait)
-                
-                session.update_activity()
-                
-                if tiene_horas:
-                    print(f"[SCHEDULER]    ✅ Tiene horas imputadas")
-                    usuarios_con_horas += 1
-                else:
-                    print(f"[SCHEDULER]    📩 Sin horas → enviando recordatorio")
-                    
-                    # Construir mensaje de recordatorio
-                    mensaje = (
-                        "📋 *Recordatorio de imputación*\n\n"
-                        "No tienes horas registradas esta semana.\n\n"
-                        "¿Quieres que cargue el horario de la semana pasada?\n\n"
-                        "Responde *Sí* o *No*"
-                    )
-                    
-                    # Guardar estado de pregunta pendiente
-                    conversation_state_manager.guardar_recordatorio_semanal(wa_id)
-                    
-                    # Enviar mensaje
-                    enviar_recordatorio_whatsapp(wa_id, mensaje)
-                    recordatorios_enviados += 1
-                
-                # Esperar entre usuarios para no saturar
-                time.sleep(3)
-            
-            except Exception as e:
-                print(f"[SCHEDULER]    ❌ Error procesando {wa_id}: {e}")
-                traceback.print_exc()
-                errores += 1
-                continue
+        barrido_actual = BarridoSemanal(
+            concurrencia=settings.SWEEP_CONCURRENCY,
+            max_navegadores=settings.SWEEP_BROWSERS,
+            punto_control=PuntoControl(settings.SWEEP_CHECKPOINT_FILE),
+        )
+        informe = barrido_actual.ejecutar(usuarios)
+        ultimo_informe = informe
         
         # Resumen final
         print(f"\n[SCHEDULER] {'='*60}")
-        print(f"[SCHEDULER] 📊 Resumen del check semanal:")
-        print(f"[SCHEDULER]    👥 Total revisados: {len(usuarios)}")
-        print(f"[SCHEDULER]    ✅ Con horas: {usuarios_con_horas}")
-        print(f"[SCHEDULER]    📩 Recordatorios enviados: {recordatorios_enviados}")
-        print(f"[SCHEDULER]    ⚠️ Errores: {errores}")
+        print(f"[SCHEDULER] 📊 Resumen del check semanal ({informe['semana']}):")
+        print(f"[SCHEDULER]    👥 Total revisados: {informe['revisados']} (+{informe['reanudados']} de una ejecución anterior)")
+        print(f"[SCHEDULER]    ✅ Con horas: {informe['con_horas']}")
+        print(f"[SCHEDULER]    📩 Recordatorios enviados: {informe['recordatorios']}")
+        print(f"[SCHEDULER]    ⚠️ Errores: {informe['errores']}")
+        print(f"[SCHEDULER]    ⏱️ Duración: {informe['duracion_s']}s "
+              f"({informe['usuarios_por_minuto']} usuarios/min, p50 {informe['tiempo_usuario_ms']['p50']:.0f} ms por usuario)")
         print(f"[SCHEDULER] {'='*60}\n")
+        return informe
     
     except Exception as e:
         print(f"[SCHEDULER] ❌ Error general en check semanal: {e}")
         traceback.print_exc()
+        return None
     
     finally:
         db.close()
+        barrido_actual = None
+        _lock_barrido.release()
+
+
+def reanudar_check_pendiente():
+    """
+    Al arrancar el servidor: si el barrido de esta semana se quedó a medias
+    (caída o reinicio), lo continúa desde el punto de control.
+    """
+    from barrido_semanal import PuntoControl, id_semana
+    
+    if PuntoControl(settings.SWEEP_CHECKPOINT_FILE).pendiente(id_semana(), settings.SWEEP_RESUME_MAX_HOURS):
+        print("[SCHEDULER] ⏯️ Check semanal interrumpido, reanudando...")
+        ejecutar_check_semanal()
+
+
+def obtener_stats_barrido() -> dict:
+    """Progreso del barrido en curso y el informe del último."""
+    barrido = barrido_actual
+    return {
+        "en_curso": barrido.progreso() if barrido else None,
+        "ultimo_informe": ultimo_informe,
+    }
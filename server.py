@@ -5,9 +5,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import re
-import requests
 from fastapi import FastAPI, Request, Depends, Query
-from fastapi.responses import JSONResponse, HTMLResponse, FileResponse
+from fastapi.responses import JSONResponse, HTMLResponse, FileResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from collections import deque
@@ -19,15 +18,29 @@ from db import SessionLocal
 import traceback
 
 # Importaciones de módulos
-from ai import clasificar_mensaje, interpretar_con_gpt, responder_conversacion, interpretar_consulta
+from ai import (
+    clasificar_sin_gpt, analizar_mensaje, analizar_sin_navegador, obtener_stats_enrutado, obtener_stats_respuestas,
+    responder_conversacion, responder_conversacion_async
+)
+from ai.cache_interpretaciones import cache_interpretaciones
+from ai.cliente_openai import gestor_openai
+from ai.transporte_llm import obtener_stats_llm
 from core import consultar_dia, consultar_semana, consultar_mes, mostrar_comandos
-from web_automation import leer_tabla_imputacion
-from db import get_db, registrar_peticion, obtener_usuario_por_origen, crear_usuario
+from web_automation import estadisticas_esperas
+from web_automation.catalogo_proyectos import catalogo_proyectos
+from web_automation.lector_http import lectores_http, consultar_sin_navegador
+from web_automation.cache_semanas import cache_semanas, leer_tabla_en_pantalla
+from db import get_db, registrar_peticion, obtener_usuario_por_origen, crear_usuario, escritor_peticiones
 from auth_handler import verificar_y_solicitar_credenciales, obtener_credenciales, extraer_credenciales_con_gpt
 from browser_pool import browser_pool
 from conversation_state import conversation_state_manager
 from credential_manager import credential_manager
 from auth_token_manager import auth_token_manager
+from cookie_store import cookie_store, login_con_snapshot
+from buzones import PlanificadorBuzones, BuzonLleno
+from emisor_whatsapp import emisor_whatsapp
+from metricas import registro_metricas, medir
+from config import settings
 
 # ⭐ IMPORTAR TODAS LAS FUNCIONES AUXILIARES
 from funciones_server import (
@@ -44,6 +57,8 @@ from funciones_server import (
 # Inicialización
 app = FastAPI()
 executor = ThreadPoolExecutor(max_workers=50)
+# Mensajes de cada usuario en orden, de uno en uno, sobre el pool compartido
+buzones = PlanificadorBuzones(executor, max_pendientes=settings.MAILBOX_MAX_PENDING)
 
 # CORS
 app.add_middleware(
@@ -54,8 +69,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-META_WHATSAPP_TOKEN = os.getenv("META_WHATSAPP_TOKEN")
-META_PHONE_NUMBER_ID = os.getenv("META_PHONE_NUMBER_ID")
 BASE_URL = os.getenv("BASE_URL", "https://tu-dominio.com")  # URL pública del servidor
 
 # Servir archivos estáticos (static/ y assets/ ambos en /static)
@@ -110,9 +123,8 @@ async def auth_login_submit(request: Request):
         return JSONResponse({"success": False, "message": "Error técnico. Inténtalo de nuevo."})
 
     try:
-        from web_automation import hacer_login
         with session.lock:
-            success, mensaje_login = hacer_login(session.driver, session.wait, username, password)
+            success, mensaje_login = login_con_snapshot(session, username, password, usar_snapshot=False)
 
         if success:
             session.is_logged_in = True
@@ -160,7 +172,7 @@ async def auth_login_submit(request: Request):
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
-from scheduler import ejecutar_check_semanal
+from scheduler import ejecutar_check_semanal, reanudar_check_pendiente, obtener_stats_barrido
 
 scheduler = BackgroundScheduler()
 scheduler.add_job(
@@ -170,6 +182,8 @@ scheduler.add_job(
     name='Check semanal de imputación de horas',
     replace_existing=True
 )
+# Sin trigger: se ejecuta una vez al arrancar (continúa un check semanal que se cortó)
+scheduler.add_job(reanudar_check_pendiente, id='reanudar_check_semanal', name='Reanudar check semanal interrumpido')
 scheduler.start()
 print("[SCHEDULER] 📋 Scheduler iniciado - Check semanal: Viernes a las 14:00")
 
@@ -177,11 +191,17 @@ print("[SCHEDULER] 📋 Scheduler iniciado - Check semanal: Viernes a las 14:00"
 # FUNCIÓN PRINCIPAL DE PROCESAMIENTO
 # ============================================================================
 
-def procesar_mensaje_usuario_sync(texto: str, user_id: str, db: Session, canal: str = "webapp"):
-    """Lógica principal para procesar mensajes de usuarios"""
+def procesar_mensaje_usuario_sync(texto: str, user_id: str, db: Session, canal: str = "webapp", tipo_mensaje: str = None,
+                                  analisis_previo: dict = None):
+    """
+    Lógica principal para procesar mensajes de usuarios.
+    `tipo_mensaje` es la clasificación ya hecha en el webhook (para no repetirla) y
+    `analisis_previo` el análisis sin navegador del webhook (analizar_sin_navegador).
+    """
     
     # Verificar autenticación
-    usuario, mensaje_auth = verificar_y_solicitar_credenciales(db, user_id, canal=canal)
+    with medir("autenticacion"):
+        usuario, mensaje_auth = verificar_y_solicitar_credenciales(db, user_id, canal=canal)
     
     # Manejar cambio de credenciales
     if credential_manager.esta_cambiando_credenciales(user_id):
@@ -197,7 +217,8 @@ def procesar_mensaje_usuario_sync(texto: str, user_id: str, db: Session, canal:
         return mensaje_auth
     
     # Obtener sesión de navegador
-    session = browser_pool.get_session(user_id)
+    with medir("sesion_navegador"):
+        session = browser_pool.get_session(user_id)
     if not session or not session.driver:
         error_msg = " No he podido iniciar el navegador. Intenta de nuevo en unos momentos."
         registrar_peticion(db, usuario.id, texto, "error", canal=canal, respuesta=error_msg, estado="error")
@@ -294,8 +315,13 @@ def procesar_mensaje_usuario_sync(texto: str, user_id: str, db: Session, canal:
                     return manejar_desambiguacion_multiple(texto, estado, session, db, usuario, 
                                                           user_id, canal, contexto)
         
-        # PROCESAR NUEVO MENSAJE
-        tipo_mensaje = clasificar_mensaje(texto)
+        # PROCESAR NUEVO MENSAJE: clasificar e interpretar (normalmente una llamada al modelo)
+        def obtener_tabla():
+            with session.lock, medir("leer_tabla"):
+                return leer_tabla_en_pantalla(session.driver)
+        
+        analisis = analizar_mensaje(texto, tipo_mensaje, contexto, obtener_tabla, previo=analisis_previo)
+        tipo_mensaje = analisis["tipo"]
 
         # AYUDA
         if tipo_mensaje == "ayuda":
@@ -306,14 +332,15 @@ def procesar_mensaje_usuario_sync(texto: str, user_id: str, db: Session, canal:
 
         # CONVERSACIÓN
         elif tipo_mensaje == "conversacion":
-            respuesta = responder_conversacion(texto, user_id)
+            with medir("generar_respuesta"):
+                respuesta = responder_conversacion(texto, user_id)
             registrar_peticion(db, usuario.id, texto, "conversacion", canal=canal, respuesta=respuesta)
             session.update_activity()
             return respuesta
 
         # CONSULTAS
         elif tipo_mensaje == "consulta":
-            consulta_info = interpretar_consulta(texto)
+            consulta_info = analisis["consulta"]
             
             #  CASO 1: Listar proyectos
             if not consulta_info or consulta_info.get("tipo") == "listar_proyectos":
@@ -332,7 +359,7 @@ def procesar_mensaje_usuario_sync(texto: str, user_id: str, db: Session, canal:
                         filtro_nodo = match.group(1).strip()
                 
                 with session.lock:
-                    proyectos_por_nodo = listar_todos_proyectos(session.driver, session.wait, filtro_nodo)
+                    proyectos_por_nodo = listar_todos_proyectos(session.driver, session.wait, filtro_nodo, clave_usuario=user_id)
                 
                 respuesta = formatear_lista_proyectos(proyectos_por_nodo, canal=canal)
                 registrar_peticion(db, usuario.id, texto, "listar_proyectos", canal=canal, respuesta=respuesta)
@@ -342,17 +369,17 @@ def procesar_mensaje_usuario_sync(texto: str, user_id: str, db: Session, canal:
         #  CASO 2: Consulta de horas (día, semana o mes)
             if consulta_info:
                 fecha = datetime.fromisoformat(consulta_info["fecha"])
+                # El lector HTTP hace su propio login en la intranet
+                credenciales = (usuario.username_intranet, usuario.obtener_password_intranet())
                 
                 if consulta_info.get("tipo") == "dia":
-                    with session.lock:
-                        resumen = consultar_dia(session.driver, session.wait, fecha, canal=canal)
+                    resumen = consultar_sin_navegador(session, credenciales, consultar_dia, fecha, canal=canal)
                     registrar_peticion(db, usuario.id, texto, "consulta_dia", canal=canal, respuesta=resumen)
                     session.update_activity()
                     return resumen
                     
                 elif consulta_info.get("tipo") == "semana":
-                    with session.lock:
-                        resumen = consultar_semana(session.driver, session.wait, fecha, canal=canal)
+                    resumen = consultar_sin_navegador(session, credenciales, consultar_semana, fecha, canal=canal)
                     registrar_peticion(db, usuario.id, texto, "consulta_semana", canal=canal, respuesta=resumen)
                     session.update_activity()
                     return resumen
@@ -361,8 +388,7 @@ def procesar_mensaje_usuario_sync(texto: str, user_id: str, db: Session, canal:
                     #  Consulta de un mes completo
                     mes = fecha.month
                     anio = fecha.year
-                    with session.lock:
-                        resumen = consultar_mes(session.driver, session.wait, mes, anio, canal=canal)
+                    resumen = consultar_sin_navegador(session, credenciales, consultar_mes, mes, anio, canal=canal)
                     registrar_peticion(db, usuario.id, texto, "consulta_mes", canal=canal, respuesta=resumen)
                     session.update_activity()
                     return resumen
@@ -375,14 +401,7 @@ def procesar_mensaje_usuario_sync(texto: str, user_id: str, db: Session, canal:
 
         # COMANDOS DE IMPUTACIÓN
         elif tipo_mensaje == "comando":
-            tabla_actual = None
-            try:
-                with session.lock:
-                    tabla_actual = leer_tabla_imputacion(session.driver)
-            except Exception as e:
-                print(f"[DEBUG]  No se pudo leer la tabla: {e}")
-            
-            ordenes = interpretar_con_gpt(texto, contexto, tabla_actual)
+            ordenes = analisis["ordenes"]
             
             if not ordenes:
                 respuesta = "🤔 No he entendido qué quieres que haga."
@@ -426,18 +445,47 @@ def procesar_mensaje_usuario_sync(texto: str, user_id: str, db: Session, canal:
         return error_msg
 
 
-async def procesar_mensaje_usuario(texto: str, user_id: str, db: Session, canal: str = "webapp"):
-    """Versión asíncrona que ejecuta el procesamiento en thread pool"""
-    loop = asyncio.get_event_loop()
-    resultado = await loop.run_in_executor(
-        executor,
-        procesar_mensaje_usuario_sync,
-        texto,
-        user_id,
-        db,
-        canal
-    )
-    return resultado
+def _procesar_mensaje_medido(texto: str, user_id: str, db: Session, canal: str, tipo_mensaje: str = None,
+                             analisis_previo: dict = None):
+    """procesar_mensaje_usuario_sync con su duración total en /metrics (fase "total")"""
+    with medir("total"):
+        return procesar_mensaje_usuario_sync(texto, user_id, db, canal, tipo_mensaje, analisis_previo)
+
+
+def _encolar_mensaje(texto: str, user_id: str, db: Session, canal: str, tipo_mensaje: str = None,
+                     analisis_previo: dict = None):
+    """
+    Encola el mensaje en el buzón del usuario (sus mensajes se procesan en orden).
+    
+    Returns:
+        tuple: (Future, nuevo) - nuevo=False si era un duplicado de uno pendiente
+    """
+    clave = (canal, " ".join(texto.lower().split()))
+    return buzones.enviar(user_id, clave, _procesar_mensaje_medido, texto, user_id, db, canal, tipo_mensaje,
+                          analisis_previo)
+
+
+def _stats_executor() -> dict:
+    """Hilos del executor y tareas esperando a uno (ThreadPoolExecutor no lo expone)."""
+    return {
+        "max_workers": executor._max_workers,
+        "hilos": len(executor._threads),
+        "en_cola": executor._work_queue.qsize(),
+    }
+
+
+def _mensaje_buzon_lleno(e: BuzonLleno) -> str:
+    return (f"⏳ Todavía estoy con tus {e.pendientes} mensajes anteriores. "
+            f"Espera a que termine y vuelve a escribirme.")
+
+
+async def procesar_mensaje_usuario(texto: str, user_id: str, db: Session, canal: str = "webapp", tipo_mensaje: str = None):
+    """Versión asíncrona: encola en el buzón del usuario y espera la respuesta"""
+    try:
+        future, _ = _encolar_mensaje(texto, user_id, db, canal, tipo_mensaje)
+    except BuzonLleno as e:
+        return _mensaje_buzon_lleno(e)
+    return await asyncio.wrap_future(future)
 
 
 # ============================================================================
@@ -537,6 +585,42 @@ async def chat(request: Request, db: Session = Depends(get_db)):
                     f"🔒 Tus credenciales se guardan cifradas y seguras."
                 )
             })
+
+        # -----------------------------------------------------
+        # 💬 AYUDA Y CONVERSACIÓN: SIN NAVEGADOR
+        # -----------------------------------------------------
+        #  Sin cambio de credenciales ni pregunta pendiente, clasificar en local.
+        # Si el clasificador local duda (None) el mensaje se analiza aquí en una sola
+        # llamada (ai/router.py), salvo que se incline por comando: ese se analiza en
+        # background con la tabla en el prompt. El análisis viaja al background para
+        # que el mensaje nunca se clasifique dos veces
+        tipo_mensaje = None
+        analisis_previo = None
+        sin_estado = (not credential_manager.esta_cambiando_credenciales(wa_id)
+                      and not conversation_state_manager.tiene_pregunta_pendiente(wa_id))
+        if sin_estado:
+            tipo_mensaje = clasificar_sin_gpt(texto)
+            if tipo_mensaje is None:
+                existente = browser_pool.obtener_existente(wa_id)
+                loop = asyncio.get_event_loop()
+                analisis_previo = await loop.run_in_executor(
+                    executor,
+                    lambda: analizar_sin_navegador(texto, existente.contexto if existente else None)
+                )
+                if analisis_previo is not None:
+                    tipo_mensaje = analisis_previo["tipo"]
+
+        if tipo_mensaje == "ayuda":
+            respuesta = mostrar_comandos()
+            registrar_peticion(db, usuario_wa.id, texto, "ayuda", canal="whatsapp", respuesta=respuesta)
+            return JSONResponse({"reply": respuesta})
+
+        if tipo_mensaje == "conversacion":
+            # Cliente asíncrono: no bloquea el event loop ni ocupa un worker
+            respuesta = await responder_conversacion_async(texto, wa_id)
+            registrar_peticion(db, usuario_wa.id, texto, "conversacion", canal="whatsapp", respuesta=respuesta)
+            return JSONResponse({"reply": respuesta})
+
         # 🔐 ASEGURAR LOGIN Y NAVEGACIÓN BASE
         session = browser_pool.get_session(wa_id)
         if not session or not session.driver:
@@ -574,39 +658,15 @@ async def chat(request: Request, db: Session = Depends(get_db)):
             )
             return JSONResponse({"reply": respuesta})
         
-        #  Si NO tiene pregunta pendiente, clasificar para decidir flujo
-        tipo_mensaje = clasificar_mensaje(texto)  #  UNA SOLA CLASIFICACIÓN
+        #  Consulta, comando o tipo aún por decidir → background
+        asyncio.create_task(
+            procesar_whatsapp_en_background(texto, wa_id, tipo_mensaje, analisis_previo)
+        )
 
-        if tipo_mensaje in ("consulta", "comando"):
-            #  Lanzar procesamiento en background (SIN db)
-            asyncio.create_task(
-                procesar_whatsapp_en_background(texto, wa_id)
-            )
-
-            # 👇 RESPUESTA INMEDIATA (WhatsApp)
-            return JSONResponse({
-                "reply": "⏳ *Estoy trabajando en ello…*"
-            })
-        
-        #  Para conversación/ayuda, procesar directamente SIN clasificar de nuevo
-        elif tipo_mensaje == "ayuda":
-            respuesta = mostrar_comandos()
-            registrar_peticion(db, usuario_wa.id, texto, "ayuda", canal="whatsapp", respuesta=respuesta)
-            session.update_activity()
-            return JSONResponse({"reply": respuesta})
-        
-        elif tipo_mensaje == "conversacion":
-            respuesta = responder_conversacion(texto, wa_id)
-            registrar_peticion(db, usuario_wa.id, texto, "conversacion", canal="whatsapp", respuesta=respuesta)
-            session.update_activity()
-            return JSONResponse({"reply": respuesta})
-        
-        # Fallback para otros tipos
-        else:
-            respuesta = await procesar_mensaje_usuario(
-                texto, wa_id, db, canal="whatsapp"
-            )
-            return JSONResponse({"reply": respuesta})
+        # 👇 RESPUESTA INMEDIATA (WhatsApp)
+        return JSONResponse({
+            "reply": "⏳ *Estoy trabajando en ello…*"
+        })
 
     # ---------------------------------------------------------
     # WEBAPP NORMAL (sin WhatsApp, sin login inicial)
@@ -619,14 +679,21 @@ async def chat(request: Request, db: Session = Depends(get_db)):
     return JSONResponse({"reply": respuesta})
 
     
-async def procesar_whatsapp_en_background(texto: str, wa_id: str):
+async def procesar_whatsapp_en_background(texto: str, wa_id: str, tipo_mensaje: str = None,
+                                         analisis_previo: dict = None):
     db = SessionLocal()
     try:
-        respuesta = await procesar_mensaje_usuario(
-            texto, wa_id, db, canal="whatsapp"
-        )
+        try:
+            future, nuevo = _encolar_mensaje(texto, wa_id, db, "whatsapp", tipo_mensaje, analisis_previo)
+        except BuzonLleno as e:
+            enviar_whatsapp(wa_id, _mensaje_buzon_lleno(e))
+            return
 
-        enviar_whatsapp(wa_id, respuesta)
+        respuesta = await asyncio.wrap_future(future)
+
+        # Un duplicado comparte la respuesta del original, que ya la envía
+        if nuevo:
+            enviar_whatsapp(wa_id, respuesta)
 
     except Exception:
         print("[BACKGROUND ERROR]  Excepción en background:")
@@ -643,34 +710,11 @@ async def procesar_whatsapp_en_background(texto: str, wa_id: str):
 
 def enviar_whatsapp(wa_id: str, mensaje: str):
     """
-    Envía un mensaje de WhatsApp usando Meta Cloud API (Business API oficial)
+    Envía un mensaje de WhatsApp usando Meta Cloud API (Business API oficial).
+    Solo lo encola en el emisor (emisor_whatsapp.py): no bloquea ni el event
+    loop ni los threads del scheduler; los reintentos van en segundo plano.
     """
-    try:
-        url = f"https://graph.facebook.com/v21.0/{META_PHONE_NUMBER_ID}/messages"
-
-        headers = {
-            "Authorization": f"Bearer {META_WHATSAPP_TOKEN}",
-            "Content-Type": "application/json"
-        }
-
-        payload = {
-            "messaging_product": "whatsapp",
-            "to": wa_id,
-            "type": "text",
-            "text": {
-                "body": mensaje
-            }
-        }
-
-        response = requests.post(url, json=payload, headers=headers, timeout=15)
-
-        if response.status_code not in (200, 201):
-            print(f"[META WA API] ❌ Error {response.status_code}: {response.text}")
-        else:
-            print(f"[META WA API] ✅ Mensaje enviado a {wa_id}")
-
-    except Exception as e:
-        print(f"[META WA API] ❌ Excepción enviando mensaje: {e}")
+    emisor_whatsapp.enviar(wa_id, mensaje)
 
 
 @app.get("/stats")
@@ -683,10 +727,64 @@ async def stats():
     
     return JSONResponse({
         "browser_pool": browser_stats,
-        "conversaciones": conversation_stats
+        "conversaciones": conversation_stats,
+        "cookie_snapshots": cookie_store.get_stats(),
+        "catalogo_proyectos": catalogo_proyectos.get_stats(),
+        "esperas": estadisticas_esperas.get_stats(),
+        "lectura_http": lectores_http.get_stats(),
+        "cache_semanas": cache_semanas.get_stats(),
+        "estado_conversacion": conversation_state_manager.get_stats(),
+        "auditoria": escritor_peticiones.get_stats(),
+        "buzones": buzones.get_stats(),
+        "executor": _stats_executor(),
+        "enrutado": obtener_stats_enrutado(),
+        "respuestas_comandos": obtener_stats_respuestas(),
+        "cache_interpretaciones": cache_interpretaciones.get_stats(),
+        "llm": obtener_stats_llm(),
+        "whatsapp_salida": emisor_whatsapp.get_stats(),
+        "barrido_semanal": obtener_stats_barrido()
     })
 
 
+def _metricas_de_stats():
+    """Lo que ya cuenta /stats, en forma de métricas (se evalúa en cada GET /metrics)."""
+    pool = browser_pool.get_stats()
+    semanas = cache_semanas.get_stats()
+    interpretaciones = cache_interpretaciones.get_stats()["por_tipo"]
+    cookies = cookie_store.get_stats()
+    colas = buzones.get_stats()
+    return [
+        ("gestion_navegadores", "gauge", "Navegadores del pool por estado", [
+            ({"estado": "activo"}, pool["active_sessions"]),
+            ({"estado": "reserva"}, pool["warm_standby"]),
+        ]),
+        ("gestion_cache_total", "counter", "Aciertos y fallos de las caches", [
+            *(({"cache": "semanas", "resultado": r}, semanas[r]) for r in ("hits", "misses")),
+            *(({"cache": f"interpretaciones_{espacio}", "resultado": r}, datos[r])
+              for espacio, datos in interpretaciones.items() for r in ("hits", "misses")),
+        ]),
+        ("gestion_login_total", "counter", "Logins por vía (snapshot de cookies o formulario)", [
+            ({"via": "snapshot"}, cookies["restauraciones_ok"]),
+            ({"via": "formulario"}, cookies["logins_completos"]),
+        ]),
+        ("gestion_cola_mensajes", "gauge", "Mensajes en cola", [
+            ({"cola": "buzones"}, colas["en_espera"]),
+            ({"cola": "executor"}, _stats_executor()["en_cola"]),
+            ({"cola": "auditoria"}, escritor_peticiones.get_stats()["en_cola"]),
+            ({"cola": "whatsapp"}, emisor_whatsapp.get_stats()["en_cola"]),
+        ]),
+    ]
+
+
+registro_metricas.recolector(_metricas_de_stats)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Métricas en formato Prometheus: latencia por fase, Selenium, tokens de OpenAI, pool y locks"""
+    return PlainTextResponse(registro_metricas.exponer(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/trigger-check-semanal")
 async def trigger_check_semanal():
     """Ejecutar el check semanal manualmente (para testing)"""
@@ -699,6 +797,9 @@ async def trigger_check_semanal():
 async def close_user_session(user_id: str):
     """Cerrar sesión de un usuario"""
     browser_pool.close_session(user_id)
+    catalogo_proyectos.invalidar(user_id)
+    lectores_http.invalidar(user_id)
+    cache_semanas.descartar_usuario(user_id)
     return JSONResponse({"status": "ok", "message": f"Sesión de {user_id} cerrada"})
 
 
@@ -709,6 +810,13 @@ def shutdown_event():
     print("[SCHEDULER] 🛑 Scheduler detenido")
     browser_pool.close_all()
     executor.shutdown(wait=True)
+    escritor_peticiones.cerrar()  # Volcar el registro de peticiones pendiente
+    emisor_whatsapp.cerrar()  # Enviar los mensajes de WhatsApp que queden en cola
+
+
+@app.on_event("shutdown")
+async def cerrar_clientes_openai():
+    await gestor_openai.cerrar()
 
 
 #  Manejo de señales para cierre limpio (Ctrl+C, kill)
@@ -719,6 +827,8 @@ import os
 def signal_handler(signum, frame):
     print(f"\n[SERVER] 🛑 Señal {signum} recibida, cerrando...")
     browser_pool.close_all()
+    escritor_peticiones.cerrar()
+    emisor_whatsapp.cerrar(timeout=3)
     # En lugar de sys.exit(), dejamos que uvicorn maneje el cierre
     os._exit(0)
 
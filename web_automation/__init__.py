@@ -8,7 +8,8 @@ from .interactions import (
     volver_inicio,
     guardar_linea,
     emitir_linea,
-    save_cookies
+    save_cookies,
+    restaurar_sesion_cookies
 )
 
 from .navigation import (
@@ -24,6 +25,8 @@ from .proyecto_handler import (
     imputar_horas_semana,
     borrar_todas_horas_dia,
     leer_tabla_imputacion,
+    extraer_tabla_imputacion,
+    aplicar_cambios_tabla,
     copiar_semana_anterior
 )
 
@@ -32,6 +35,18 @@ from .jornada import (
     finalizar_jornada
 )
 
+from .esperas import (
+    esperar_pagina_lista,
+    esperar_tabla_imputacion,
+    estadisticas_esperas
+)
+
+from .cache_semanas import (
+    cache_semanas,
+    leer_semana_cacheada,
+    leer_tabla_en_pantalla
+)
+
 
 __all__ = [
     # Interactions
@@ -40,6 +55,7 @@ __all__ = [
     'guardar_linea',
     'emitir_linea',
     'save_cookies',
+    'restaurar_sesion_cookies',
     
     # Navigation
     'seleccionar_fecha',
@@ -53,12 +69,24 @@ __all__ = [
     'imputar_horas_semana',
     'borrar_todas_horas_dia',
     'leer_tabla_imputacion',
+    'extraer_tabla_imputacion',
+    'aplicar_cambios_tabla',
     'copiar_semana_anterior',
     
     # Jornada
     'iniciar_jornada',
     'finalizar_jornada',
     
+    # Esperas
+    'esperar_pagina_lista',
+    'esperar_tabla_imputacion',
+    'estadisticas_esperas',
+    
+    # Cache de semanas
+    'cache_semanas',
+    'leer_semana_cacheada',
+    'leer_tabla_en_pantalla',
+    
     # Listado Proyectos
     'listar_todos_proyectos',
     'formatear_lista_proyectos'
@@ -0,0 +1,231 @@
+"""
+Cache de semanas leídas por usuario.
+
+La misma semana se leía una y otra vez: antes de cada comando (contexto para
+GPT), en cada consulta y en el scheduler. Aquí se guardan las tablas ya
+parseadas (formato leer_tabla_imputacion) por usuario y semana, con TTL. Las consultas repetidas sobre una semana en cache no tocan el
+navegador ni su lock.
+
+Escrituras:
+- imputar_horas_dia / imputar_horas_semana / borrar_todas_horas_dia / aplicar_cambios_tabla /
+  eliminar_linea_proyecto dejan cambios SIN guardar → invalidan la semana.
+- guardar_linea / emitir_linea → se vuelve a extraer la tabla (una llamada JS)
+  y se guarda como estado de la semana (write-through).
+
+La clave es el user_id. Las funciones reciben el driver y lo traducen al
+usuario con el registro que hace browser_pool al asignar cada navegador
+(asociar), así la cache sobrevive a que se cierre o se recicle el navegador.
+Se vacía con descartar_usuario() al cambiar las credenciales o cerrar la sesión.
+Un driver sin usuario asociado (benchmarks, pruebas) usa su session_id.
+"""
+
+import copy
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+from config import settings
+
+
+def _clave_semana(fecha):
+    """
+    (lunes, año, mes) de la vista que muestra la intranet al elegir `fecha`.
+    El mes importa: en semanas partidas los días del otro mes salen deshabilitados.
+    """
+    dia = fecha.date() if isinstance(fecha, datetime) else fecha
+    return (dia - timedelta(days=dia.weekday()), dia.year, dia.month)
+
+
+class CacheSemanas:
+    """Snapshots de semanas por usuario, con TTL y registro de la semana en pantalla."""
+
+    def __init__(self, ttl_segundos: int = 300):
+        self.ttl_segundos = ttl_segundos
+        self._lock = threading.Lock()
+        self._snapshots = {}   # (user_id, clave_semana) -> {"proyectos", "dias_estado", "creado"}
+        self._usuarios = {}    # session_id -> user_id del navegador
+        self._en_pantalla = {}  # session_id -> fecha seleccionada en el navegador
+        self.stats = {"hits": 0, "misses": 0, "guardados": 0, "invalidaciones": 0}
+
+    # ------------------------------------------------------------------
+    # Usuario de cada navegador
+    # ------------------------------------------------------------------
+
+    def asociar(self, driver, user_id):
+        """El navegador pasa a ser de `user_id` (browser_pool, barrido semanal)."""
+        session_id = getattr(driver, "session_id", None)
+        with self._lock:
+            self._usuarios[session_id] = user_id
+            self._en_pantalla.pop(session_id, None)
+
+    def _clave(self, driver, fecha):
+        """(user_id, semana) de `fecha` para el usuario del navegador (llamar dentro del lock)."""
+        session_id = getattr(driver, "session_id", None)
+        return (self._usuarios.get(session_id, session_id), _clave_semana(fecha))
+
+    # ------------------------------------------------------------------
+    # Semana en pantalla
+    # ------------------------------------------------------------------
+
+    def marcar_en_pantalla(self, driver, fecha):
+        """seleccionar_fecha() ha cargado la semana de `fecha` en el navegador."""
+        with self._lock:
+            self._en_pantalla[driver.session_id] = fecha
+
+    def olvidar_pantalla(self, driver):
+        """El navegador ya no muestra una semana conocida (volver, login...)."""
+        with self._lock:
+            self._en_pantalla.pop(getattr(driver, "session_id", None), None)
+
+    def fecha_en_pantalla(self, driver):
+        with self._lock:
+            return self._en_pantalla.get(getattr(driver, "session_id", None))
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def obtener(self, driver, fecha, con_dias=False):
+        """
+        Tabla en cache de la semana de `fecha` o None.
+
+        Returns:
+            tuple: (proyectos, dias_estado) como copias, o None
+        """
+        with self._lock:
+            clave = self._clave(driver, fecha)
+            entrada = self._snapshots.get(clave)
+            if entrada and time.time() - entrada["creado"] > self.ttl_segundos:
+                del self._snapshots[clave]
+                entrada = None
+            if entrada is None or (con_dias and entrada["dias_estado"] is None):
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            return copy.deepcopy(entrada["proyectos"]), copy.deepcopy(entrada["dias_estado"])
+
+    def guardar(self, driver, fecha, proyectos, dias_estado=None):
+        with self._lock:
+            clave = self._clave(driver, fecha)
+            anterior = self._snapshots.get(clave)
+            if dias_estado is None and anterior:
+                dias_estado = anterior["dias_estado"]  # los días habilitados no cambian al escribir
+            self._snapshots[clave] = {
+                "proyectos": copy.deepcopy(proyectos),
+                "dias_estado": copy.deepcopy(dias_estado),
+                "creado": time.time(),
+            }
+            self.stats["guardados"] += 1
+
+    def invalidar_pantalla(self, driver):
+        """Descarta la semana que muestra el navegador (tiene cambios sin guardar)."""
+        fecha = self.fecha_en_pantalla(driver)
+        if fecha is None:
+            return
+        with self._lock:
+            if self._snapshots.pop(self._clave(driver, fecha), None) is not None:
+                self.stats["invalidaciones"] += 1
+
+    def refrescar_pantalla(self, driver):
+        """Write-through: vuelve a extraer la tabla en pantalla y la guarda."""
+        fecha = self.fecha_en_pantalla(driver)
+        if fecha is None:
+            return
+        from web_automation.proyecto_handler import leer_tabla_imputacion
+        self.guardar(driver, fecha, leer_tabla_imputacion(driver))
+
+    def descartar(self, driver):
+        """
+        Olvida un navegador (al cerrarlo o reutilizarlo para otro usuario). Las
+        semanas de su usuario se quedan; las de un driver sin usuario se borran.
+        """
+        session_id = getattr(driver, "session_id", None)
+        with self._lock:
+            self._en_pantalla.pop(session_id, None)
+            if self._usuarios.pop(session_id, None) is None:
+                self._borrar(session_id)
+
+    def descartar_usuario(self, user_id):
+        """Olvida las semanas de un usuario (cambio de credenciales o cierre de sesión)."""
+        with self._lock:
+            self._borrar(user_id)
+
+    def _borrar(self, propietario):
+        """Borra los snapshots de un usuario o driver (llamar dentro del lock)."""
+        for clave in [c for c in self._snapshots if c[0] == propietario]:
+            del self._snapshots[clave]
+        self.stats["invalidaciones"] += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            ahora = time.time()
+            vigentes = sum(1 for e in self._snapshots.values() if ahora - e["creado"] <= self.ttl_segundos)
+            return {
+                **self.stats,
+                "semanas_en_cache": vigentes,
+                "ttl_segundos": self.ttl_segundos,
+            }
+
+
+# Instancia global
+cache_semanas = CacheSemanas(ttl_segundos=settings.WEEK_CACHE_TTL_SECONDS)
+
+
+def leer_semana_cacheada(driver, fecha_obj, lector=None, espera="consulta", legacy=2, con_dias=False,
+                         consultar_cache=True):
+    """
+    Lee la tabla de la semana que muestra la intranet al elegir `fecha_obj`:
+    primero la cache, después el lector HTTP (si lo hay) y por último Selenium.
+
+    Sin lector, el llamador ya tiene el lock del navegador. Con lector, el lector
+    usa sus propias sesiones de la intranet y aquí solo se toma el lock
+    (lector.lock_navegador) si hay que caer a Selenium. consultar_cache=False cuando el llamador ya ha
+    consultado la cache para esta semana (no se cuenta dos veces el fallo).
+
+    Returns:
+        tuple: (proyectos, dias_estado) - dias_estado es None si con_dias=False
+    """
+    from web_automation.navigation import seleccionar_fecha, detectar_dias_deshabilitados
+    from web_automation.proyecto_handler import leer_tabla_imputacion
+    from web_automation.esperas import esperar_tabla_imputacion
+
+    en_cache = cache_semanas.obtener(driver, fecha_obj, con_dias=con_dias) if consultar_cache else None
+    if en_cache is not None:
+        print(f"[DEBUG]  Semana del {fecha_obj.strftime('%d/%m/%Y')} servida desde cache")
+        return en_cache
+
+    if lector is not None:
+        lectura = lector.leer_semana(fecha_obj)
+        if lectura is not None:
+            cache_semanas.guardar(driver, fecha_obj, lectura["proyectos"], lectura["dias_estado"])
+            return lectura["proyectos"], (lectura["dias_estado"] if con_dias else None)
+        print(f"[DEBUG] 🔄 Lectura HTTP no disponible, usando el navegador")
+
+    with (lector.lock_navegador if lector is not None else nullcontext()):
+        seleccionar_fecha(driver, fecha_obj)
+        esperar_tabla_imputacion(driver, espera, legacy=legacy)  # Esperar a que cargue la tabla
+        dias_estado = detectar_dias_deshabilitados(driver) if con_dias else None
+        proyectos = leer_tabla_imputacion(driver)
+
+    cache_semanas.guardar(driver, fecha_obj, proyectos, dias_estado)
+    return proyectos, dias_estado
+
+
+def leer_tabla_en_pantalla(driver):
+    """
+    leer_tabla_imputacion() de la semana que muestra el navegador, desde la
+    cache si está vigente (contexto de la tabla antes de cada comando).
+    """
+    from web_automation.proyecto_handler import leer_tabla_imputacion
+
+    fecha = cache_semanas.fecha_en_pantalla(driver)
+    if fecha is not None:
+        en_cache = cache_semanas.obtener(driver, fecha)
+        if en_cache is not None:
+            return en_cache[0]
+
+    proyectos = leer_tabla_imputacion(driver)
+    if fecha is not None:
+        cache_semanas.guardar(driver, fecha, proyectos)
+    return proyectos
@@ -0,0 +1,352 @@
+"""
+Catálogo cacheado del árbol de proyectos (jstree #treeTipologia) por usuario.
+
+Antes, seleccionar_proyecto, buscar_proyectos_duplicados y listar_todos_proyectos
+expandían el árbol, esperaban y recorrían todos los //li//a pidiendo .text uno a
+uno. Ahora el árbol se vuelca UNA vez con una sola llamada JS, se indexa en
+memoria (nombre normalizado, nodo padre, id) y se reutiliza durante un TTL.
+"""
+
+import threading
+import time
+
+from config import settings, Constants
+
+
+# Expande el árbol y devuelve todos los nodos con su id, texto, rel y padre.
+_JS_VOLCAR_ARBOL = """
+    var raiz = document.getElementById('treeTipologia');
+    if (!raiz) { return null; }
+    try {
+        var tree = $('#treeTipologia');
+        if (tree && tree.jstree) { tree.jstree('open_all'); }
+    } catch (e) {}
+    var lis = raiz.querySelectorAll('li');
+    var posiciones = new Map();
+    var nodos = [];
+    for (var i = 0; i < lis.length; i++) {
+        posiciones.set(lis[i], i);
+    }
+    for (var i = 0; i < lis.length; i++) {
+        var li = lis[i];
+        var a = li.querySelector(':scope > a');
+        var padre = li.parentElement ? li.parentElement.closest('li') : null;
+        if (padre && !raiz.contains(padre)) { padre = null; }
+        nodos.push({
+            idx: i,
+            id: li.id || '',
+            texto: a ? a.textContent.trim() : '',
+            rel: li.getAttribute('rel') || '',
+            padre: padre ? posiciones.get(padre) : -1
+        });
+    }
+    return nodos;
+"""
+
+# Localiza el <a> de un nodo por id (o por ruta de nombres si no hay id) y lo centra.
+_JS_LOCALIZAR_NODO = """
+    var id = arguments[0], ruta = arguments[1];
+    var raiz = document.getElementById('treeTipologia');
+    if (!raiz) { return null; }
+    try {
+        var tree = $('#treeTipologia');
+        if (tree && tree.jstree) { tree.jstree('open_all'); }
+    } catch (e) {}
+    var li = id ? document.getElementById(id) : null;
+    if (!li) {
+        var actual = raiz;
+        for (var i = 0; i < ruta.length && actual; i++) {
+            var siguiente = null;
+            var candidatos = actual.querySelectorAll('li');
+            for (var j = 0; j < candidatos.length; j++) {
+                var a = candidatos[j].querySelector(':scope > a');
+                if (a && a.textContent.trim() === ruta[i]) { siguiente = candidatos[j]; break; }
+            }
+            actual = siguiente;
+        }
+        li = actual;
+    }
+    if (!li) { return null; }
+    var enlace = li.querySelector(':scope > a');
+    if (enlace) { enlace.scrollIntoView({block: 'center'}); }
+    return enlace;
+"""
+
+
+def _trigramas(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class CatalogoProyectos:
+    """Snapshot indexado del árbol de proyectos de un usuario."""
+
+    def __init__(self, nodos):
+        self.creado = time.time()
+        self.nodos = []
+        self.por_nombre = {}   # nombre normalizado -> [nodo] en orden del árbol
+        self.por_trigrama = {}  # trigrama -> {nombre normalizado} (búsquedas parciales)
+
+        for crudo in nodos:
+            nodo = {
+                "idx": crudo.get("idx", len(self.nodos)),
+                "id": crudo.get("id") or "",
+                "nombre": (crudo.get("texto") or "").strip(),
+                "rel": crudo.get("rel") or "",
+                "padre_idx": crudo.get("padre", -1),
+                "hijos": [],
+            }
+            nodo["nombre_norm"] = Constants.normalizar_texto(nodo["nombre"])
+            nodo["es_proyecto"] = nodo["rel"] == "subproyectos"
+            self.nodos.append(nodo)
+
+        raices = []
+        for nodo in self.nodos:
+            if 0 <= nodo["padre_idx"] < len(self.nodos):
+                self.nodos[nodo["padre_idx"]]["hijos"].append(nodo)
+            else:
+                raices.append(nodo)
+
+        # Proyecto final = subproyecto sin subproyectos por debajo. Se resuelve
+        # en una sola pasada de abajo arriba (recorrido por niveles invertido)
+        orden = list(raices)
+        for nodo in orden:
+            orden.extend(nodo["hijos"])
+        con_proyectos_debajo = set()
+        for nodo in reversed(orden):
+            if any(h["es_proyecto"] or id(h) in con_proyectos_debajo for h in nodo["hijos"]):
+                con_proyectos_debajo.add(id(nodo))
+            nodo["es_hoja"] = nodo["es_proyecto"] and id(nodo) not in con_proyectos_debajo
+
+        for nodo in self.nodos:
+            nodo["ruta"] = self._ruta(nodo)
+            padre = self.padre(nodo)
+            nodo["padre_nombre"] = padre["nombre"] if padre else ""
+            if nodo["nombre_norm"]:
+                self.por_nombre.setdefault(nodo["nombre_norm"], []).append(nodo)
+
+        for clave in self.por_nombre:
+            for trigrama in _trigramas(clave):
+                self.por_trigrama.setdefault(trigrama, set()).add(clave)
+
+    # ------------------------------------------------------------------
+    # Navegación
+    # ------------------------------------------------------------------
+
+    def padre(self, nodo):
+        idx = nodo["padre_idx"]
+        return self.nodos[idx] if 0 <= idx < len(self.nodos) else None
+
+    def _ruta(self, nodo):
+        """Nombres desde la raíz hasta el nodo (incluido)."""
+        ruta = [nodo["nombre"]]
+        actual = self.padre(nodo)
+        while actual is not None:
+            if actual["nombre"] and actual["nombre"] not in ruta:
+                ruta.insert(0, actual["nombre"])
+            actual = self.padre(actual)
+        return ruta
+
+    def _descendientes(self, nodo):
+        pendientes = list(nodo["hijos"])
+        while pendientes:
+            hijo = pendientes.pop()
+            yield hijo
+            pendientes.extend(hijo["hijos"])
+
+    def proyectos_bajo(self, nodo):
+        """Subproyectos que cuelgan (a cualquier profundidad) de un nodo."""
+        return [d for d in self._descendientes(nodo) if d["es_proyecto"] and d["nombre"]]
+
+    # ------------------------------------------------------------------
+    # Búsquedas
+    # ------------------------------------------------------------------
+
+    def _por_texto(self, nombre_norm):
+        """
+        Nodos cuyo nombre normalizado es `nombre_norm` o lo contiene.
+
+        Los candidatos a coincidencia parcial son los nombres que tienen todos
+        los trigramas de `nombre_norm` (por_trigrama); después se comprueba la
+        subcadena. Con menos de 3 caracteres no hay trigramas y se recorren
+        todos los nombres distintos (lineal).
+
+        Returns:
+            tuple: (exactos, parciales), cada lista en orden del árbol
+        """
+        exactos = self.por_nombre.get(nombre_norm, [])
+        trigramas = _trigramas(nombre_norm)
+        if trigramas:
+            conjuntos = sorted((self.por_trigrama.get(t, set()) for t in trigramas), key=len)
+            candidatos = set(conjuntos[0]).intersection(*conjuntos[1:])
+        else:
+            candidatos = self.por_nombre.keys()
+        parciales = []
+        for clave in candidatos:
+            if nombre_norm in clave and clave != nombre_norm:
+                parciales.extend(self.por_nombre[clave])
+        parciales.sort(key=lambda n: n["idx"])
+        return exactos, parciales
+
+    def buscar_proyectos(self, nombre, bajo=None):
+        """
+        Subproyectos cuyo nombre coincide con `nombre`.
+
+        Returns:
+            tuple: (exactos, parciales)
+        """
+        nombre_norm = Constants.normalizar_texto(nombre or "")
+        if bajo:
+            candidatos = self.proyectos_bajo(bajo)
+            exactos = [n for n in candidatos if n["nombre_norm"] == nombre_norm]
+            parciales = [n for n in candidatos if nombre_norm in n["nombre_norm"] and n["nombre_norm"] != nombre_norm]
+            return exactos, parciales
+
+        exactos, parciales = self._por_texto(nombre_norm)
+        return [n for n in exactos if n["es_proyecto"]], [n for n in parciales if n["es_proyecto"]]
+
+    def buscar_nodos(self, nombre, solo_carpetas=False):
+        """Nodos (de cualquier tipo o solo carpetas) cuyo nombre contiene `nombre`."""
+        exactos, parciales = self._por_texto(Constants.normalizar_texto(nombre or ""))
+        resultado = exactos + parciales
+        if solo_carpetas:
+            resultado = [n for n in resultado if not n["es_proyecto"]]
+        return resultado
+
+    def coincidencias(self, nombre):
+        """
+        Coincidencias de proyectos finales con el formato de
+        buscar_proyectos_duplicados() (sin WebElement: se usa nodo_id).
+        """
+        exactos, parciales = self._por_texto(Constants.normalizar_texto(nombre or ""))
+        resultado = []
+        for nodo in sorted(exactos + parciales, key=lambda n: n["idx"]):
+            if not nodo["es_hoja"]:
+                continue
+            resultado.append({
+                "proyecto": nodo["nombre"],
+                "nodo_padre": nodo["padre_nombre"] or "Desconocido",
+                "path_completo": " → ".join(nodo["ruta"]),
+                "nodo_id": nodo["id"],
+            })
+        return resultado
+
+    def listado(self, filtro_nodo=None):
+        """
+        Mismo formato que listar_todos_proyectos():
+        {"Arelance > Admin-Staff": ["Proyecto1", ...], ...}
+        """
+        filtro_norm = Constants.normalizar_texto(filtro_nodo) if filtro_nodo else None
+        proyectos_por_nodo = {}
+
+        for nodo in self.nodos:
+            if not nodo["nombre"] or not any(h["es_proyecto"] for h in nodo["hijos"]):
+                continue
+            clave_nodo = " > ".join(nodo["ruta"])
+            if filtro_norm and filtro_norm not in Constants.normalizar_texto(clave_nodo):
+                continue
+            nombres = sorted({p["nombre"] for p in self.proyectos_bajo(nodo)})
+            if nombres:
+                proyectos_por_nodo[clave_nodo] = nombres
+
+        return proyectos_por_nodo
+
+    def __len__(self):
+        return sum(1 for n in self.nodos if n["es_proyecto"])
+
+
+class GestorCatalogos:
+    """Cache de catálogos por usuario con TTL e invalidación explícita."""
+
+    def __init__(self, ttl_minutes: int = 60):
+        self.ttl_segundos = ttl_minutes * 60
+        self._catalogos = {}  # clave_usuario -> CatalogoProyectos
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "volcados": 0, "invalidaciones": 0}
+
+    def obtener(self, clave):
+        """Catálogo vigente del usuario o None."""
+        with self._lock:
+            catalogo = self._catalogos.get(clave)
+            if catalogo and time.time() - catalogo.creado <= self.ttl_segundos:
+                self.stats["hits"] += 1
+                return catalogo
+            if catalogo:
+                del self._catalogos[clave]
+            self.stats["misses"] += 1
+            return None
+
+    def guardar(self, clave, catalogo):
+        with self._lock:
+            self._catalogos[clave] = catalogo
+            self.stats["volcados"] += 1
+
+    def invalidar(self, clave=None):
+        """Invalida el catálogo de un usuario (o todos si clave=None)."""
+        with self._lock:
+            if clave is None:
+                self._catalogos.clear()
+            else:
+                self._catalogos.pop(clave, None)
+            self.stats["invalidaciones"] += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "usuarios_en_cache": len(self._catalogos),
+                "ttl_minutos": self.ttl_segundos // 60
+            }
+
+
+def clave_catalogo(driver, contexto=None):
+    """Clave del usuario para el catálogo (user_id del contexto o id de la sesión WebDriver)."""
+    if contexto and contexto.get("user_id"):
+        return contexto["user_id"]
+    return getattr(driver, "session_id", None)
+
+
+def volcar_arbol(driver):
+    """
+    Vuelca el árbol completo con una sola llamada JS.
+    Requiere que el buscador de proyectos esté abierto (árbol en el DOM)
+    y SIN filtrar por una búsqueda previa.
+
+    Returns:
+        CatalogoProyectos o None si el árbol no está disponible
+    """
+    try:
+        nodos = driver.execute_script(_JS_VOLCAR_ARBOL)
+    except Exception as e:
+        print(f"[CATALOGO]  Error volcando árbol: {e}")
+        return None
+
+    if not nodos:
+        return None
+
+    catalogo = CatalogoProyectos(nodos)
+    print(f"[CATALOGO] 🌳 Árbol volcado: {len(catalogo.nodos)} nodos, {len(catalogo)} proyectos")
+    return catalogo if len(catalogo) else None
+
+
+def obtener_catalogo(driver, clave, volcar_si_falta=True):
+    """
+    Devuelve el catálogo cacheado del usuario; si no hay y `volcar_si_falta`,
+    lo construye desde el árbol abierto en el navegador.
+    """
+    catalogo = catalogo_proyectos.obtener(clave) if clave else None
+    if catalogo or not volcar_si_falta:
+        return catalogo
+
+    catalogo = volcar_arbol(driver)
+    if catalogo and clave:
+        catalogo_proyectos.guardar(clave, catalogo)
+    return catalogo
+
+
+def localizar_nodo(driver, nodo):
+    """WebElement <a> del nodo en el árbol abierto (por id o por ruta)."""
+    return driver.execute_script(_JS_LOCALIZAR_NODO, nodo.get("id") or "", nodo.get("ruta") or [])
+
+
+# Instancia global
+catalogo_proyectos = GestorCatalogos(ttl_minutes=settings.PROJECT_CATALOG_TTL_MINUTES)
@@ -23,15 +23,19 @@ def similitud(texto1, texto2):
     return SequenceMatcher(None, normalizar(texto1), normalizar(texto2)).ratio()
 
 
-def buscar_proyectos_duplicados(driver, wait, nombre_proyecto):
+def buscar_proyectos_duplicados(driver, wait, nombre_proyecto, clave_usuario=None):
     """
     Busca todos los proyectos que coincidan con el nombre dado
     y devuelve una lista con sus nodos padre.
     
+    Si el usuario tiene el catálogo del árbol en cache se responde desde
+    memoria (las coincidencias llevan "nodo_id" en lugar de "elemento").
+    
     Args:
         driver: WebDriver de Selenium
         wait: WebDriverWait configurado
         nombre_proyecto: Nombre del proyecto a buscar
+        clave_usuario: (Opcional) Clave del catálogo cacheado del usuario
         
     Returns:
         list: Lista de diccionarios con información de cada coincidencia:
@@ -46,6 +50,14 @@ def buscar_proyectos_duplicados(driver, wait, nombre_proyecto):
               ]
     """
     from selenium.webdriver.common.by import By
+    from web_automation.catalogo_proyectos import obtener_catalogo
+    
+    # No volcar aquí: el árbol puede estar filtrado por la búsqueda en curso
+    catalogo = obtener_catalogo(driver, clave_usuario, volcar_si_falta=False) if clave_usuario else None
+    if catalogo:
+        coincidencias = catalogo.coincidencias(nombre_proyecto)
+        print(f"[DEBUG]  {len(coincidencias)} coincidencias de '{nombre_proyecto}' (catálogo)")
+        return coincidencias
     
     try:
         print(f"[DEBUG]  Buscando todas las coincidencias de '{nombre_proyecto}'...")
@@ -56,8 +68,8 @@ def buscar_proyectos_duplicados(driver, wait, nombre_proyecto):
             if (tree && tree.jstree) { tree.jstree('open_all'); }
         """)
         
-        import time
-        time.sleep(1)
+        from web_automation.esperas import esperar_dom_estable
+        esperar_dom_estable(driver, "expandir_arbol", legacy=1)
         
         # Buscar todos los proyectos que coincidan
         xpath = (
@@ -0,0 +1,298 @@
+"""
+Esperas por eventos para la automatización web.
+
+Sustituye los time.sleep() fijos por condiciones explícitas: página cargada
+(readyState + jQuery.active == 0), elementos obsoletos tras una recarga,
+DOM estable (MutationObserver) o cambios concretos de la UI. Cada espera
+devuelve en cuanto la página está lista y registra cuánto ha tardado de
+verdad, para poder compararlo con el sleep fijo que reemplaza.
+
+Con settings.USE_EVENT_WAITS = False se vuelve a los sleeps antiguos.
+"""
+
+import threading
+import time
+from collections import deque
+
+from selenium.common.exceptions import (
+    NoSuchElementException,
+    StaleElementReferenceException,
+    TimeoutException,
+    WebDriverException,
+)
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+from config import settings, Selectors
+
+
+_JS_PAGINA_LISTA = """
+    if (document.readyState !== 'complete') { return false; }
+    if (window.jQuery && window.jQuery.active > 0) { return false; }
+    return true;
+"""
+
+# Resuelve cuando el DOM lleva `quiet` ms sin mutaciones (o a los `max` ms).
+_JS_DOM_ESTABLE = """
+    var quiet = arguments[0], max = arguments[1];
+    var done = arguments[arguments.length - 1];
+    var raiz = document.body || document.documentElement;
+    var temporizador, limite, observer;
+    function fin(ok) {
+        if (observer) { observer.disconnect(); }
+        clearTimeout(temporizador);
+        clearTimeout(limite);
+        done(ok);
+    }
+    observer = new MutationObserver(function () {
+        clearTimeout(temporizador);
+        temporizador = setTimeout(function () { fin(true); }, quiet);
+    });
+    observer.observe(raiz, {childList: true, subtree: true, attributes: true, characterData: true});
+    temporizador = setTimeout(function () { fin(true); }, quiet);
+    limite = setTimeout(function () { fin(false); }, max);
+"""
+
+
+class EstadisticasEsperas:
+    """Duración real de cada tipo de espera (frente al sleep fijo que sustituye)."""
+
+    def __init__(self, max_muestras: int = 500):
+        self._lock = threading.Lock()
+        self._max_muestras = max_muestras
+        self._esperas = {}  # nombre -> {"muestras": deque, "total", "timeouts", "segundos_totales", "legacy_totales"}
+
+    def registrar(self, nombre: str, segundos: float, ok: bool, legacy: float = None):
+        with self._lock:
+            datos = self._esperas.setdefault(nombre, {
+                "muestras": deque(maxlen=self._max_muestras),
+                "total": 0,
+                "timeouts": 0,
+                "segundos_totales": 0.0,
+                "legacy_totales": 0.0,
+            })
+            datos["muestras"].append(segundos)
+            datos["total"] += 1
+            datos["segundos_totales"] += segundos
+            if legacy:
+                datos["legacy_totales"] += legacy
+            if not ok:
+                datos["timeouts"] += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            resultado = {}
+            for nombre, datos in self._esperas.items():
+                muestras = sorted(datos["muestras"])
+                if not muestras:
+                    continue
+                resultado[nombre] = {
+                    "total": datos["total"],
+                    "timeouts": datos["timeouts"],
+                    "media_ms": round(datos["segundos_totales"] / datos["total"] * 1000, 1),
+                    "p50_ms": round(muestras[len(muestras) // 2] * 1000, 1),
+                    "p95_ms": round(muestras[min(len(muestras) - 1, int(len(muestras) * 0.95))] * 1000, 1),
+                    "max_ms": round(muestras[-1] * 1000, 1),
+                    "ahorro_vs_sleep_ms": round((datos["legacy_totales"] - datos["segundos_totales"]) * 1000, 1),
+                }
+            return resultado
+
+
+# Instancia global
+estadisticas_esperas = EstadisticasEsperas()
+
+
+def _legacy_sleep(nombre, legacy):
+    """Modo compatibilidad: el sleep fijo de siempre (también se registra)."""
+    segundos = legacy or 0
+    time.sleep(segundos)
+    estadisticas_esperas.registrar(nombre, segundos, True, legacy)
+    return True
+
+
+def pagina_lista(driver) -> bool:
+    """True si el documento ha terminado de cargar y no hay AJAX de jQuery en curso."""
+    try:
+        return bool(driver.execute_script(_JS_PAGINA_LISTA))
+    except WebDriverException:
+        # Navegación en curso: el documento anterior ya no responde
+        return False
+
+
+def esperar_condicion(driver, nombre, condicion, timeout=None, legacy=None):
+    """
+    Espera a que `condicion(driver)` sea verdadera.
+
+    Args:
+        driver: WebDriver de Selenium
+        nombre: Nombre de la espera (para las estadísticas)
+        condicion: Callable(driver) -> valor truthy cuando la página está lista
+        timeout: Máximo en segundos (por defecto WAIT_UI_TIMEOUT)
+        legacy: Sleep fijo al que sustituye (modo compatibilidad y estadísticas)
+
+    Los errores de Selenium (WebDriverException, p.ej. un script JS que falla
+    mientras la página carga) y KeyError (resultado JS incompleto) dentro de
+    `condicion` cuentan como "aún no": se sigue sondeando hasta el timeout.
+
+    Returns:
+        bool: True si se cumplió, False si venció el timeout (nunca lanza)
+    """
+    if not settings.USE_EVENT_WAITS:
+        return _legacy_sleep(nombre, legacy)
+
+    inicio = time.perf_counter()
+    ok = True
+    try:
+        WebDriverWait(
+            driver,
+            timeout if timeout is not None else settings.WAIT_UI_TIMEOUT,
+            poll_frequency=settings.WAIT_POLL_INTERVAL,
+            ignored_exceptions=(WebDriverException, KeyError),
+        ).until(condicion)
+    except TimeoutException:
+        ok = False
+        print(f"[ESPERAS]  Timeout en '{nombre}'")
+    estadisticas_esperas.registrar(nombre, time.perf_counter() - inicio, ok, legacy)
+    return ok
+
+
+def esperar_pagina_lista(driver, nombre="pagina_lista", timeout=None, legacy=None):
+    """Espera a readyState == 'complete' y sin peticiones jQuery pendientes."""
+    return esperar_condicion(
+        driver, nombre, pagina_lista,
+        timeout=timeout if timeout is not None else settings.WAIT_PAGE_TIMEOUT,
+        legacy=legacy
+    )
+
+
+def esperar_dom_estable(driver, nombre="dom_estable", quiet_ms=None, timeout=None, legacy=None):
+    """
+    Espera a que no haya AJAX pendiente y el DOM lleve `quiet_ms` sin cambios
+    (MutationObserver). Útil tras acciones que actualizan la tabla sin recargar.
+    """
+    if not settings.USE_EVENT_WAITS:
+        return _legacy_sleep(nombre, legacy)
+
+    quiet_ms = quiet_ms if quiet_ms is not None else settings.WAIT_DOM_QUIET_MS
+    timeout = timeout if timeout is not None else settings.WAIT_UI_TIMEOUT
+
+    inicio = time.perf_counter()
+    ok = False
+    try:
+        restante_ms = int(timeout * 1000)
+        ok = bool(driver.execute_async_script(_JS_DOM_ESTABLE, quiet_ms, restante_ms))
+        if ok:
+            restante = max(0.0, timeout - (time.perf_counter() - inicio))
+            ok = WebDriverWait(driver, restante, poll_frequency=settings.WAIT_POLL_INTERVAL).until(pagina_lista)
+    except (TimeoutException, WebDriverException):
+        # Si la página navegó mientras observábamos, esperar a la nueva
+        restante = max(0.0, timeout - (time.perf_counter() - inicio))
+        try:
+            ok = WebDriverWait(driver, restante, poll_frequency=settings.WAIT_POLL_INTERVAL).until(pagina_lista)
+        except TimeoutException:
+            ok = False
+    if not ok:
+        print(f"[ESPERAS]  DOM no estable a tiempo en '{nombre}'")
+    estadisticas_esperas.registrar(nombre, time.perf_counter() - inicio, ok, legacy)
+    return ok
+
+
+def _es_obsoleto(elemento) -> bool:
+    try:
+        elemento.is_enabled()
+        return False
+    except StaleElementReferenceException:
+        return True
+    except WebDriverException:
+        return True
+
+
+def esperar_recarga(driver, elemento_anterior, nombre="recarga", navega=True, timeout=None, legacy=None):
+    """
+    Espera a que una acción que recarga la página termine: el elemento pulsado
+    queda obsoleto y la nueva página está lista.
+
+    Args:
+        elemento_anterior: Elemento de la página antigua (p.ej. el botón pulsado)
+        navega: True si la acción SIEMPRE recarga la página. Si es False (puede
+                resolverse por AJAX), solo se espera a la recarga durante `legacy`
+                segundos y después basta con que el DOM se estabilice.
+    """
+    if not settings.USE_EVENT_WAITS:
+        return _legacy_sleep(nombre, legacy)
+
+    timeout = timeout if timeout is not None else settings.WAIT_PAGE_TIMEOUT
+    inicio = time.perf_counter()
+
+    deteccion = timeout if navega else (legacy or settings.WAIT_UI_TIMEOUT)
+    try:
+        WebDriverWait(driver, deteccion, poll_frequency=settings.WAIT_POLL_INTERVAL).until(
+            lambda d: _es_obsoleto(elemento_anterior)
+        )
+        recargada = True
+    except TimeoutException:
+        recargada = False
+
+    restante = max(0.0, timeout - (time.perf_counter() - inicio))
+    if recargada:
+        try:
+            ok = WebDriverWait(driver, restante, poll_frequency=settings.WAIT_POLL_INTERVAL).until(pagina_lista)
+        except TimeoutException:
+            ok = False
+        estadisticas_esperas.registrar(nombre, time.perf_counter() - inicio, ok, legacy)
+        return ok
+
+    if navega:
+        print(f"[ESPERAS]  La página no se recargó a tiempo en '{nombre}'")
+        estadisticas_esperas.registrar(nombre, time.perf_counter() - inicio, False, legacy)
+        return False
+
+    # Sin recarga: la acción se resolvió en la misma página (AJAX)
+    timeout_ajax = min(restante, settings.WAIT_UI_TIMEOUT)
+    ok = esperar_dom_estable(driver, f"{nombre}_ajax", timeout=timeout_ajax)
+    estadisticas_esperas.registrar(nombre, time.perf_counter() - inicio, ok, legacy)
+    return ok
+
+
+def _tabla_lista(driver) -> bool:
+    if not pagina_lista(driver):
+        return False
+    return bool(
+        driver.find_elements(By.CSS_SELECTOR, Selectors.BTN_NUEVA_LINEA)
+        or driver.find_elements(By.CSS_SELECTOR, Selectors.SELECT_SUBPROYECTO_NAME)
+    )
+
+
+def esperar_tabla_imputacion(driver, nombre="tabla_imputacion", elemento_anterior=None, timeout=None, legacy=None):
+    """
+    Espera a que la pantalla de imputación esté cargada (página lista y grid
+    presente). Si se pasa `elemento_anterior`, primero espera a que quede
+    obsoleto (la acción recarga la página).
+    """
+    if not settings.USE_EVENT_WAITS:
+        return _legacy_sleep(nombre, legacy)
+
+    timeout = timeout if timeout is not None else settings.WAIT_PAGE_TIMEOUT
+    inicio = time.perf_counter()
+
+    if elemento_anterior is not None:
+        try:
+            WebDriverWait(driver, timeout, poll_frequency=settings.WAIT_POLL_INTERVAL).until(
+                lambda d: _es_obsoleto(elemento_anterior)
+            )
+        except TimeoutException:
+            pass
+
+    restante = max(0.0, timeout - (time.perf_counter() - inicio))
+    try:
+        ok = WebDriverWait(
+            driver, restante,
+            poll_frequency=settings.WAIT_POLL_INTERVAL,
+            ignored_exceptions=(NoSuchElementException, StaleElementReferenceException),
+        ).until(_tabla_lista)
+    except TimeoutException:
+        ok = False
+        print(f"[ESPERAS]  Pantalla de imputación no lista a tiempo en '{nombre}'")
+
+    estadisticas_esperas.registrar(nombre, time.perf_counter() - inicio, ok, legacy)
+    return ok
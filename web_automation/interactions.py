@@ -11,6 +11,12 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
 
 from config import settings, Selectors
+from web_automation.esperas import (
+    esperar_condicion,
+    esperar_recarga,
+    esperar_tabla_imputacion
+)
+from web_automation.cache_semanas import cache_semanas
 
 
 def save_cookies(driver, path="cookies.json"):
@@ -19,6 +25,72 @@ def save_cookies(driver, path="cookies.json"):
         json.dump(driver.get_cookies(), f)
 
 
+def _entrar_pantalla_imputacion(driver):
+    """Pulsa el botón especial 'Imputar horas' si la interfaz lo muestra tras el login."""
+    print(f"[DEBUG]  Buscando botón especial 'Imputar horas'...")
+    try:
+        boton_imputar = driver.find_element(By.ID, "botonImputar")
+        if boton_imputar:
+            print(f"[DEBUG]  Botón 'Imputar horas' encontrado, haciendo click...")
+            boton_imputar.click()
+            # Esperar a que cargue la pantalla de imputación
+            esperar_tabla_imputacion(driver, "boton_imputar", elemento_anterior=boton_imputar, legacy=2)
+            print(f"[DEBUG]  Click en botón 'Imputar horas' completado")
+    except:
+        print(f"[DEBUG] ℹ️ Botón 'Imputar horas' no encontrado (interfaz estándar)")
+
+
+def restaurar_sesion_cookies(driver, cookies):
+    """
+    Intenta reanudar una sesión de la intranet inyectando cookies guardadas
+    en un navegador nuevo, sin rellenar el formulario de login.
+    
+    Args:
+        driver: WebDriver de Selenium (recién creado)
+        cookies: Lista de cookies tal como las devuelve driver.get_cookies()
+        
+    Returns:
+        bool: True si la intranet nos reconoce como logueados
+    """
+    if not cookies:
+        return False
+    
+    try:
+        driver.set_page_load_timeout(30)
+        cache_semanas.olvidar_pantalla(driver)
+        
+        # Las cookies solo se pueden añadir estando en el dominio
+        driver.get(settings.LOGIN_URL)
+        driver.delete_all_cookies()
+        
+        ahora = time.time()
+        for cookie in cookies:
+            cookie = dict(cookie)
+            if cookie.get("expiry") and cookie["expiry"] < ahora:
+                continue
+            # Chrome rechaza valores de sameSite que no conoce
+            if cookie.get("sameSite") not in ("Strict", "Lax", "None"):
+                cookie.pop("sameSite", None)
+            try:
+                driver.add_cookie(cookie)
+            except Exception as e:
+                print(f"[DEBUG]  Cookie '{cookie.get('name')}' descartada: {e}")
+        
+        driver.get(settings.LOGIN_URL)
+        
+        if "botonSalirHtml" not in driver.page_source:
+            print(f"[DEBUG]  Las cookies guardadas ya no son válidas")
+            return False
+        
+        print(f"[DEBUG]  Sesión restaurada desde cookies")
+        _entrar_pantalla_imputacion(driver)
+        return True
+    
+    except Exception as e:
+        print(f"[DEBUG]  Error restaurando cookies: {e}")
+        return False
+
+
 def hacer_login(driver, wait, username=None, password=None):
     """Realiza el login en la intranet con las credenciales proporcionadas.
     
@@ -44,6 +116,7 @@ def hacer_login(driver, wait, username=None, password=None):
         
         # Establecer timeout de 30 segundos para cargar páginas
         driver.set_page_load_timeout(30)
+        cache_semanas.olvidar_pantalla(driver)
         
         driver.get(settings.LOGIN_URL)
         
@@ -56,9 +129,10 @@ def hacer_login(driver, wait, username=None, password=None):
         pwd.clear()
         pwd.send_keys(password)
         
-        driver.find_element(By.CSS_SELECTOR, Selectors.SUBMIT).click()
+        btn_submit = driver.find_element(By.CSS_SELECTOR, Selectors.SUBMIT)
+        btn_submit.click()
         print(f"[DEBUG] Formulario enviado, esperando respuesta...")
-        time.sleep(3)
+        esperar_recarga(driver, btn_submit, "login", legacy=3)
         
         # Guardar HTML completo para debugging
         html_completo = driver.page_source
@@ -86,16 +160,7 @@ def hacer_login(driver, wait, username=None, password=None):
             print(f"[DEBUG]  CONFIRMADO: Login exitoso")
             
             #  NUEVO: Comprobar si existe el botón especial "Imputar horas"
-            print(f"[DEBUG]  Buscando botón especial 'Imputar horas'...")
-            try:
-                boton_imputar = driver.find_element(By.ID, "botonImputar")
-                if boton_imputar:
-                    print(f"[DEBUG]  Botón 'Imputar horas' encontrado, haciendo click...")
-                    boton_imputar.click()
-                    time.sleep(2)  # Esperar a que cargue la pantalla de imputación
-                    print(f"[DEBUG]  Click en botón 'Imputar horas' completado")
-            except:
-                print(f"[DEBUG] ℹ️ Botón 'Imputar horas' no encontrado (interfaz estándar)")
+            _entrar_pantalla_imputacion(driver)
             
             return True, "login_exitoso"
         else:
@@ -128,7 +193,8 @@ def volver_inicio(driver):
     try:
         btn_volver = driver.find_element(By.CSS_SELECTOR, Selectors.VOLVER)
         btn_volver.click()
-        time.sleep(2)
+        esperar_recarga(driver, btn_volver, "volver", legacy=2)
+        cache_semanas.olvidar_pantalla(driver)
         return "He vuelto a la pantalla principal"
     except Exception as e:
         return f"No he podido volver a la pantalla principal: {e}"
@@ -143,7 +209,7 @@ def guardar_linea(driver, wait):
     try:
         btn_guardar = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, Selectors.BTN_GUARDAR_LINEA)))
         btn_guardar.click()
-        time.sleep(1.5)
+        esperar_recarga(driver, btn_guardar, "guardar", navega=False, legacy=settings.AFTER_SAVE_WAIT)
         
         # Verificar si hay algún popup de error
         try:
@@ -159,11 +225,11 @@ def guardar_linea(driver, wait):
                     try:
                         btn_aceptar = popup_error.find_element(By.XPATH, ".//button[contains(text(), 'Aceptar') or contains(text(), 'OK') or contains(text(), 'Cerrar')]")
                         btn_aceptar.click()
-                        time.sleep(0.5)
                     except:
                         driver.find_element(By.TAG_NAME, "body").send_keys(Keys.ESCAPE)
-                        time.sleep(0.5)
+                    esperar_condicion(driver, "cerrar_popup", lambda d: not popup_error.is_displayed(), legacy=0.5)
                     
+                    cache_semanas.invalidar_pantalla(driver)
                     return f" Error al guardar: {mensaje_error}"
                 except:
                     return " Error al guardar (no se pudo leer el mensaje de error)"
@@ -171,6 +237,8 @@ def guardar_linea(driver, wait):
             # No hay popup de error, todo OK
             pass
         
+        # Write-through: la tabla guardada pasa a ser el estado de la semana en cache
+        cache_semanas.refrescar_pantalla(driver)
         return "He guardado los cambios"
     except Exception as e:
         return f"No he podido guardar: {e}"
@@ -186,10 +254,8 @@ def emitir_linea(driver, wait):
         btn_emitir = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, Selectors.BTN_EMITIR)))
         btn_emitir.click()
         
-        # Esperar a que aparezca el alert de confirmación
-        time.sleep(0.5)
-        
         try:
+            # Esperar a que aparezca el alert de confirmación
             # Capturar el alert de JavaScript
             alert = wait.until(EC.alert_is_present())
             
@@ -201,12 +267,14 @@ def emitir_linea(driver, wait):
             alert.accept()
             print(f"[DEBUG]  Alert aceptado")
             
-            time.sleep(1.5)
+            esperar_recarga(driver, btn_emitir, "emitir", navega=False, legacy=1.5)
+            cache_semanas.refrescar_pantalla(driver)
             return "He emitido las horas correctamente"
             
         except Exception as e_alert:
             print(f"[DEBUG]  No se detectó alert o error al aceptarlo: {e_alert}")
-            time.sleep(1.5)
+            esperar_recarga(driver, btn_emitir, "emitir", navega=False, legacy=1.5)
+            cache_semanas.invalidar_pantalla(driver)
             return "He pulsado emitir (no se detectó confirmación)"
             
     except Exception as e:
@@ -2,12 +2,12 @@
 Funciones para gestionar el inicio y fin de jornada laboral.
 """
 
-import time
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 from config import Selectors
+from web_automation.esperas import esperar_recarga
 
 
 def iniciar_jornada(driver, wait):
@@ -27,7 +27,7 @@ def iniciar_jornada(driver, wait):
             if btn_volver.is_displayed():
                 print("[DEBUG] 🔙 Volviendo al inicio antes de iniciar jornada...")
                 btn_volver.click()
-                time.sleep(2)
+                esperar_recarga(driver, btn_volver, "volver", legacy=2)
         except:
             pass  # Ya estamos en la pantalla correcta
         
@@ -35,7 +35,7 @@ def iniciar_jornada(driver, wait):
 
         if btn_inicio.is_enabled():
             btn_inicio.click()
-            time.sleep(2)
+            esperar_recarga(driver, btn_inicio, "iniciar_jornada", navega=False, legacy=2)
             return "He iniciado tu jornada laboral"
         else:
             return "Tu jornada ya estaba iniciada"
@@ -61,7 +61,7 @@ def finalizar_jornada(driver, wait):
             if btn_volver.is_displayed():
                 print("[DEBUG] 🔙 Volviendo al inicio antes de finalizar jornada...")
                 btn_volver.click()
-                time.sleep(2)
+                esperar_recarga(driver, btn_volver, "volver", legacy=2)
         except:
             pass  # Ya estamos en la pantalla correcta
         
@@ -69,7 +69,7 @@ def finalizar_jornada(driver, wait):
 
         if btn_fin.is_enabled():
             btn_fin.click()
-            time.sleep(2)
+            esperar_recarga(driver, btn_fin, "finalizar_jornada", navega=False, legacy=2)
             return "He finalizado tu jornada laboral"
         else:
             return "Tu jornada ya estaba finalizada"
@@ -0,0 +1,546 @@
+"""
+Lectura directa por HTTP de la tabla de imputación (solo lectura).
+
+Las consultas de horas (día, semana, mes) no necesitan el navegador: la
+intranet pinta la tabla en el servidor. El lector envía el mismo formulario
+que envía el datepicker al elegir un día y parsea el HTML devuelto. Así las
+consultas no mueven el navegador ni esperan a que cargue la página.
+
+La intranet guarda la semana elegida en la sesión del servidor, así que el
+lector no reutiliza la del navegador: hace su propio login por HTTP con las
+credenciales guardadas del usuario y trabaja sobre una sesión del servidor
+independiente. No toma el lock del navegador y puede ir en paralelo con los
+comandos. Para el mes abre varias sesiones (settings.HTTP_READ_SESSIONS) y lee
+las semanas en paralelo, cada una en su sesión. Hay un lector por usuario (sobrevive al cierre del navegador) y se
+descarta al cambiar las credenciales o cerrar la sesión (invalidar()).
+
+El formulario del datepicker se aprende la primera vez que seleccionar_fecha()
+lo abre en el navegador (registrar_plantilla_fecha). Mientras no hay plantilla,
+o si la respuesta no contiene la tabla, las consultas vuelven a Selenium.
+
+Se activa con settings.USE_HTTP_READS.
+"""
+
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import settings, Constants, Selectors
+from web_automation.proyecto_handler import convertir_filas_tabla, _parsear_horas
+
+
+# Formulario asociado al input del datepicker, tal como lo enviaría el navegador
+_JS_PLANTILLA_FECHA = """
+    if (!window.jQuery) { return null; }
+    var input = jQuery('input.hasDatepicker').first()[0];
+    if (!input || !input.form || !input.name) { return null; }
+    var form = input.form;
+    var campos = [];
+    for (var i = 0; i < form.elements.length; i++) {
+        var el = form.elements[i];
+        if (!el.name || el.disabled) { continue; }
+        var tipo = (el.type || '').toLowerCase();
+        if (['submit', 'button', 'image', 'reset', 'file'].indexOf(tipo) >= 0) { continue; }
+        if ((tipo === 'checkbox' || tipo === 'radio') && !el.checked) { continue; }
+        campos.push([el.name, el.value]);
+    }
+    var formato = null;
+    try { formato = jQuery(input).datepicker('option', 'dateFormat'); } catch (e) {}
+    return {
+        action: form.action || window.location.href,
+        method: (form.method || 'get').toLowerCase(),
+        campo: input.name,
+        formato: formato || 'dd/mm/yy',
+        campos: campos,
+        user_agent: navigator.userAgent
+    };
+"""
+
+
+def formatear_fecha_datepicker(fecha, formato):
+    """Formatea una fecha con la sintaxis de jQuery UI (dd/mm/yy, d-m-y...)."""
+    tokens = {
+        "dd": f"{fecha.day:02d}",
+        "d": str(fecha.day),
+        "mm": f"{fecha.month:02d}",
+        "m": str(fecha.month),
+        "yy": str(fecha.year),
+        "y": f"{fecha.year % 100:02d}",
+    }
+    return re.sub(r"dd|d|mm|m|yy|y", lambda m: tokens[m.group(0)], formato)
+
+
+class _ParserTabla(HTMLParser):
+    """
+    Extrae del HTML de la pantalla de imputación lo mismo que _JS_EXTRAER_TABLA:
+    un select de subproyecto por fila, los inputs .h1..h5 de su <tr> y las
+    cabeceras de día (td.tdDia / td.tdDiaDisabled).
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.es_pantalla_imputacion = False
+        self.es_login = False
+        self.filas = []          # en orden de aparición del select
+        self.cabeceras = []      # [(clase, texto)]
+        self._trs = []           # pila de <tr> abiertos
+        self._contador_tr = 0
+        self._celdas = {}        # id de <tr> -> {"h1": (valor, habilitado), ...}
+        self._select = None      # fila cuyo select está abierto
+        self._opcion = None      # [texto, seleccionada] de la <option> abierta
+        self._cabecera = None    # [clase, texto] del td de día abierto
+
+    def handle_starttag(self, tag, attrs):
+        a = dict(attrs)
+        ident = a.get("id") or ""
+        nombre = a.get("name") or ""
+
+        if tag == "tr":
+            self._contador_tr += 1
+            self._trs.append(self._contador_tr)
+        elif tag == "select" and ("subproyecto" in nombre or "subproyecto" in ident):
+            self.es_pantalla_imputacion = True
+            self._select = {
+                "tr": self._trs[-1] if self._trs else None,
+                "deshabilitado": "disabled" in a,
+                "opciones": [],
+            }
+        elif tag == "option" and self._select is not None:
+            self._opcion = ["", "selected" in a]
+        elif tag == "input":
+            if ident == "btNuevaLinea":
+                self.es_pantalla_imputacion = True
+            if ident == "password" or nombre == "password":
+                self.es_login = True
+            sufijo = ident.rsplit(".", 1)[-1] if "." in ident else ""
+            if sufijo in ("h1", "h2", "h3", "h4", "h5") and self._trs:
+                habilitado = not ("disabled" in a or "readonly" in a)
+                self._celdas.setdefault(self._trs[-1], {})[sufijo] = (a.get("value") or "0", habilitado)
+        elif tag == "td":
+            clase = a.get("class") or ""
+            if "tdDia" in clase.split() or "tdDiaDisabled" in clase.split():
+                self._cabecera = [clase, ""]
+        elif tag == "button" and ident == "btNuevaLinea":
+            self.es_pantalla_imputacion = True
+
+    def handle_endtag(self, tag):
+        if tag == "tr" and self._trs:
+            self._trs.pop()
+        elif tag == "option" and self._opcion is not None:
+            self._select["opciones"].append(self._opcion)
+            self._opcion = None
+        elif tag == "select" and self._select is not None:
+            if self._opcion is not None:
+                self._select["opciones"].append(self._opcion)
+                self._opcion = None
+            self.filas.append(self._select)
+            self._select = None
+        elif tag == "td" and self._cabecera is not None:
+            self.cabeceras.append((self._cabecera[0], self._cabecera[1].strip()))
+            self._cabecera = None
+
+    def handle_data(self, data):
+        if self._opcion is not None:
+            self._opcion[0] += data
+        if self._cabecera is not None:
+            self._cabecera[1] += data
+
+    def filas_tabla(self):
+        """Filas en el formato de extraer_tabla_imputacion()."""
+        resultado = []
+        for indice, fila in enumerate(self.filas):
+            opciones = fila["opciones"]
+            # Sin atributo selected, el navegador muestra la primera opción
+            elegida = next((o for o in opciones if o[1]), opciones[0] if opciones else None)
+            celdas = self._celdas.get(fila["tr"], {})
+            resultado.append({
+                "fila_idx": indice,
+                "proyecto": " ".join((elegida[0] if elegida else "").split()),
+                "deshabilitado": fila["deshabilitado"],
+                "horas": {f"h{d}": _parsear_horas(celdas.get(f"h{d}", ("0", False))[0]) for d in range(1, 6)},
+                "habilitados": {f"h{d}": celdas.get(f"h{d}", ("0", False))[1] for d in range(1, 6)},
+            })
+        return resultado
+
+    def dias_estado(self):
+        """Mismo resultado que detectar_dias_deshabilitados() a partir de las cabeceras."""
+        dias_estado = {dia: True for dia in Constants.DIAS_NOMBRES}
+        dia_idx = 0
+        for clase, texto in self.cabeceras:
+            if dia_idx >= len(Constants.DIAS_NOMBRES):
+                break
+            texto = texto.lower()
+            if any(dia in texto for dia in ['lunes', 'martes', 'miércoles', 'miercoles', 'jueves', 'viernes']):
+                dias_estado[Constants.DIAS_NOMBRES[dia_idx]] = "tdDiaDisabled" not in clase
+                dia_idx += 1
+        return dias_estado
+
+
+class _ParserLogin(HTMLParser):
+    """Formularios de la página de login con sus campos (para el login por HTTP)."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.formularios = []  # [{"action", "method", "campos": [{name, value, id, tipo, marcado}]}]
+        self._actual = None
+
+    def handle_starttag(self, tag, attrs):
+        a = dict(attrs)
+        if tag == "form":
+            self._actual = {"action": a.get("action") or "", "method": (a.get("method") or "get").lower(), "campos": []}
+            self.formularios.append(self._actual)
+        elif tag == "input" and self._actual is not None:
+            self._actual["campos"].append({
+                "name": a.get("name") or "",
+                "value": a.get("value") or "",
+                "id": a.get("id") or "",
+                "tipo": (a.get("type") or "text").lower(),
+                "marcado": "checked" in a,
+            })
+
+    def handle_endtag(self, tag):
+        if tag == "form":
+            self._actual = None
+
+    def formulario_login(self):
+        """El formulario que contiene el campo de contraseña, o None."""
+        return next((f for f in self.formularios if any(c["tipo"] == "password" for c in f["campos"])), None)
+
+
+class LectorHTTP:
+    """Lector de semanas por HTTP con sesiones propias de la intranet (login por HTTP)."""
+
+    def __init__(self, plantilla, usuario, password, lock_navegador=None):
+        self.plantilla = plantilla
+        self.usuario = usuario
+        self._password = password
+        self.lock_navegador = lock_navegador  # lock de la BrowserSession (solo para volver a Selenium)
+        self.valido = True
+
+        self._lock = threading.Lock()
+        self._libres = queue.LifoQueue()  # sesiones con login hecho y sin uso
+        self._creadas = 0
+        self._max_sesiones = max(1, settings.HTTP_READ_SESSIONS)
+        # Adaptador propio: las conexiones keep-alive se reutilizan entre lecturas
+        self._adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=settings.HTTP_POOL_SIZE)
+
+    def _nueva_sesion(self):
+        """requests.Session sin cookies sobre el adaptador del lector."""
+        http = requests.Session()
+        http.mount("https://", self._adaptador)
+        http.mount("http://", self._adaptador)
+        if self.plantilla.get("user_agent"):
+            http.headers["User-Agent"] = self.plantilla["user_agent"]
+        return http
+
+    def _login(self, http):
+        """
+        Login por HTTP con las credenciales del usuario (mismo formulario que
+        rellena hacer_login). Si la intranet las rechaza, el lector deja de ser válido.
+
+        Returns:
+            bool: True si la intranet ha abierto la sesión
+        """
+        id_usuario = Selectors.USERNAME.lstrip("#")
+        id_boton = Selectors.SUBMIT.lstrip("#")
+        try:
+            pagina = http.get(settings.LOGIN_URL, timeout=settings.HTTP_READ_TIMEOUT)
+            pagina.raise_for_status()
+            parser = _ParserLogin()
+            parser.feed(pagina.text)
+            formulario = parser.formulario_login()
+            if formulario is None:
+                print(f"[HTTP]  No se ha encontrado el formulario de login")
+                return False
+
+            datos = []
+            for campo in formulario["campos"]:
+                if not campo["name"]:
+                    continue
+                if campo["tipo"] == "password":
+                    datos.append((campo["name"], self._password))
+                elif campo["id"] == id_usuario:
+                    datos.append((campo["name"], self.usuario))
+                elif campo["tipo"] in ("submit", "button", "image", "reset", "file"):
+                    if campo["id"] == id_boton:
+                        datos.append((campo["name"], campo["value"]))
+                elif campo["tipo"] not in ("checkbox", "radio") or campo["marcado"]:
+                    datos.append((campo["name"], campo["value"]))
+
+            accion = urljoin(pagina.url, formulario["action"])
+            if formulario["method"] == "post":
+                respuesta = http.post(accion, data=datos, timeout=settings.HTTP_READ_TIMEOUT)
+            else:
+                respuesta = http.get(accion, params=datos, timeout=settings.HTTP_READ_TIMEOUT)
+            respuesta.raise_for_status()
+        except requests.RequestException as e:
+            print(f"[HTTP]  Error en el login por HTTP: {e}")
+            lectores_http.contar("fallos")
+            return False
+
+        # Mismas comprobaciones que hacer_login()
+        if "botonSalirHtml" in respuesta.text:
+            lectores_http.contar("logins")
+            return True
+        if "errorLogin" in respuesta.text:
+            print(f"[HTTP]  La intranet ha rechazado las credenciales, se vuelve a Selenium")
+            self.valido = False
+        else:
+            print(f"[HTTP]  Respuesta de login no reconocida")
+        lectores_http.contar("fallos")
+        return False
+
+    def _tomar_sesion(self):
+        """Sesión propia libre (con login hecho) para uso exclusivo, o None."""
+        try:
+            return self._libres.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            crear = self._creadas < self._max_sesiones
+            if crear:
+                self._creadas += 1
+        if not crear:
+            try:
+                return self._libres.get(timeout=settings.HTTP_READ_TIMEOUT)
+            except queue.Empty:
+                return None
+
+        http = self._nueva_sesion()
+        if self._login(http):
+            return http
+        http.close()
+        with self._lock:
+            self._creadas -= 1
+        return None
+
+    @contextmanager
+    def _sesion(self):
+        """
+        Una sesión del servidor para el thread actual. Cada una se usa en
+        exclusiva: la semana elegida de una lectura no la pisa otra.
+        """
+        http = self._tomar_sesion() if self.valido else None
+        try:
+            yield http
+        finally:
+            if http is not None:
+                self._libres.put(http)
+
+    def _datos_formulario(self, fecha):
+        campo = self.plantilla["campo"]
+        datos = [(nombre, valor) for nombre, valor in self.plantilla["campos"] if nombre != campo]
+        datos.append((campo, formatear_fecha_datepicker(fecha, self.plantilla["formato"])))
+        return datos
+
+    def leer_semana(self, fecha):
+        """
+        Lee la semana de `fecha` tal como la mostraría el navegador tras elegir ese día.
+
+        Returns:
+            dict: {"proyectos": [... formato leer_tabla_imputacion ...],
+                   "dias_estado": {"lunes": True, ...}}
+            None: si no se pudo leer (se debe usar Selenium)
+        """
+        with self._sesion() as http:
+            return self._leer(http, fecha) if http is not None else None
+
+    def leer_semanas(self, fechas):
+        """
+        Lee varias semanas en paralelo, repartidas entre hasta
+        settings.HTTP_READ_SESSIONS sesiones propias (cada una con su login).
+
+        Returns:
+            dict: fecha -> lectura (mismo formato que leer_semana) o None
+        """
+        fechas = list(fechas)
+        if not fechas:
+            return {}
+        inicio = time.perf_counter()
+        n = max(1, min(self._max_sesiones, len(fechas)))
+        grupos = [fechas[i::n] for i in range(n)]
+
+        def leer_grupo(grupo):
+            with self._sesion() as http:
+                return {fecha: self._leer(http, fecha) if http is not None and self.valido else None
+                        for fecha in grupo}
+
+        lecturas = {}
+        if n == 1:
+            lecturas.update(leer_grupo(grupos[0]))
+        else:
+            with ThreadPoolExecutor(max_workers=n, thread_name_prefix="lector-http") as pool:
+                for parcial in pool.map(leer_grupo, grupos):
+                    lecturas.update(parcial)
+        print(f"[HTTP] 📡 {len(fechas)} semanas leídas con {n} sesiones en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+        return lecturas
+
+    def _enviar_fecha(self, http, fecha):
+        """Envía el formulario del datepicker con `fecha`. Returns: respuesta o None."""
+        datos = self._datos_formulario(fecha)
+        try:
+            if self.plantilla["method"] == "post":
+                respuesta = http.post(self.plantilla["action"], data=datos, timeout=settings.HTTP_READ_TIMEOUT)
+            else:
+                respuesta = http.get(self.plantilla["action"], params=datos, timeout=settings.HTTP_READ_TIMEOUT)
+            respuesta.raise_for_status()
+            return respuesta
+        except requests.RequestException as e:
+            print(f"[HTTP]  Error enviando la semana del {fecha.strftime('%d/%m/%Y')}: {e}")
+            lectores_http.contar("fallos")
+            return None
+
+    def _leer(self, http, fecha, reintentar_login=True):
+        inicio = time.perf_counter()
+        respuesta = self._enviar_fecha(http, fecha)
+        if respuesta is None:
+            return None
+
+        parser = _ParserTabla()
+        parser.feed(respuesta.text)
+
+        if not parser.es_pantalla_imputacion:
+            if parser.es_login and reintentar_login:
+                # Sesión propia caducada: nuevo login sobre la misma sesión y se repite una vez
+                print(f"[HTTP]  La sesión del lector ha caducado, repitiendo el login")
+                if self._login(http):
+                    return self._leer(http, fecha, reintentar_login=False)
+            else:
+                print(f"[HTTP]  La respuesta no contiene la tabla de imputación")
+            self.valido = False
+            lectores_http.contar("fallos")
+            return None
+
+        lectores_http.contar("lecturas")
+        print(f"[HTTP] 📡 Semana del {fecha.strftime('%d/%m/%Y')} leída en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+        return {
+            "proyectos": convertir_filas_tabla(parser.filas_tabla()),
+            "dias_estado": parser.dias_estado(),
+        }
+
+    def close(self):
+        self.valido = False
+        while True:
+            try:
+                self._libres.get_nowait().close()
+            except queue.Empty:
+                break
+        self._adaptador.close()
+
+
+class GestorLectoresHTTP:
+    """Plantillas del formulario de fecha (por navegador) y lectores HTTP (por usuario)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._plantillas = {}  # session_id del driver -> plantilla
+        self._lectores = {}    # user_id -> LectorHTTP
+        self.stats = {"lecturas": 0, "fallos": 0, "sin_plantilla": 0, "logins": 0}
+
+    def contar(self, clave, cantidad=1):
+        with self._lock:
+            self.stats[clave] += cantidad
+
+    def registrar_plantilla(self, driver):
+        """Aprende el formulario del datepicker (datepicker abierto en el navegador)."""
+        clave = getattr(driver, "session_id", None)
+        if not clave:
+            return
+        with self._lock:
+            if clave in self._plantillas:
+                return
+        try:
+            plantilla = driver.execute_script(_JS_PLANTILLA_FECHA)
+        except Exception as e:
+            print(f"[HTTP]  No se pudo leer el formulario de fecha: {e}")
+            return
+        if not plantilla:
+            return
+        with self._lock:
+            self._plantillas[clave] = plantilla
+        print(f"[HTTP]  Formulario de fecha aprendido ({plantilla['method'].upper()} {plantilla['action']})")
+
+    def obtener(self, session, usuario, password):
+        """
+        LectorHTTP del usuario de la sesión, o None si faltan credenciales o aún
+        no hay plantilla (la primera consulta irá por Selenium y la registrará).
+        """
+        user_id = session.user_id
+        if not user_id or not usuario or not password:
+            return None
+
+        anterior = None
+        with self._lock:
+            lector = self._lectores.get(user_id)
+            if lector and lector.valido and lector.usuario == usuario:
+                lector.lock_navegador = session.lock  # el navegador del usuario puede haber cambiado
+                return lector
+            plantilla = self._plantillas.get(getattr(session.driver, "session_id", None))
+            if not plantilla and lector:
+                plantilla = lector.plantilla
+            if not plantilla:
+                self.stats["sin_plantilla"] += 1
+                return None
+            anterior = lector
+            lector = LectorHTTP(plantilla, usuario, password, lock_navegador=session.lock)
+            self._lectores[user_id] = lector
+        if anterior:
+            anterior.close()
+        return lector
+
+    def descartar(self, driver):
+        """Olvida la plantilla de un navegador (al cerrarlo o reutilizarlo para otro usuario)."""
+        clave = getattr(driver, "session_id", None)
+        with self._lock:
+            self._plantillas.pop(clave, None)
+
+    def invalidar(self, user_id):
+        """Cierra el lector de un usuario (cambio de credenciales o cierre de sesión)."""
+        with self._lock:
+            lector = self._lectores.pop(user_id, None)
+        if lector:
+            lector.close()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "activo": settings.USE_HTTP_READS,
+                "plantillas": len(self._plantillas),
+                "lectores": len(self._lectores),
+            }
+
+
+# Instancia global
+lectores_http = GestorLectoresHTTP()
+
+
+def registrar_plantilla_fecha(driver):
+    """Llamada desde seleccionar_fecha() con el datepicker abierto."""
+    if settings.USE_HTTP_READS:
+        lectores_http.registrar_plantilla(driver)
+
+
+def consultar_sin_navegador(session, credenciales, consulta, *args, **kwargs):
+    """
+    Ejecuta una consulta de core/consultas.py. Con lector HTTP disponible no
+    toma el lock del navegador (el lector usa sus propias sesiones de la
+    intranet); si no, la ejecuta con Selenium bajo el lock.
+
+    Args:
+        credenciales: (usuario, contraseña) de la intranet para el login del lector
+    """
+    lector = lectores_http.obtener(session, *credenciales) if settings.USE_HTTP_READS and credenciales else None
+    if lector:
+        return consulta(session.driver, session.wait, *args, lector=lector, **kwargs)
+    with session.lock:
+        return consulta(session.driver, session.wait, *args, **kwargs)
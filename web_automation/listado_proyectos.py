@@ -5,22 +5,27 @@ VERSIÓN CON JERARQUÍA COMPLETA DE CARPETAS - v2.0
 
 print("[IMPORT] 🔄 Cargando listado_proyectos.py v2.0 con jerarquía completa")
 
-import time
 from datetime import datetime
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from config import Selectors
+from web_automation.catalogo_proyectos import catalogo_proyectos, volcar_arbol
+from web_automation.esperas import esperar_condicion, esperar_dom_estable
 
 
-def listar_todos_proyectos(driver, wait, filtro_nodo=None):
+def listar_todos_proyectos(driver, wait, filtro_nodo=None, clave_usuario=None):
     """
     Lista TODOS los proyectos disponibles en el árbol con jerarquía completa de carpetas.
     
+    Si el usuario tiene el catálogo del árbol en cache, responde desde memoria
+    sin tocar el navegador.
+    
     Args:
         driver: WebDriver de Selenium
         wait: WebDriverWait configurado
         filtro_nodo: (Opcional) Nombre del nodo/carpeta para filtrar.
+        clave_usuario: (Opcional) Clave del catálogo cacheado del usuario
         
     Returns:
         dict: Estructura de proyectos con rutas completas:
@@ -30,6 +35,11 @@ def listar_todos_proyectos(driver, wait, filtro_nodo=None):
                   ...
               }
     """
+    catalogo = catalogo_proyectos.obtener(clave_usuario) if clave_usuario else None
+    if catalogo:
+        print(f"[DEBUG]  Listando proyectos desde el catálogo en cache ({len(catalogo)} proyectos)")
+        return catalogo.listado(filtro_nodo)
+    
     try:
         print("[DEBUG]  Listando todos los proyectos disponibles con jerarquía...")
         
@@ -39,7 +49,6 @@ def listar_todos_proyectos(driver, wait, filtro_nodo=None):
         
         try:
             volver_inicio(driver)
-            time.sleep(1)
         except Exception as e:
             print(f"[DEBUG]  Error volviendo a inicio: {e}")
         
@@ -49,16 +58,20 @@ def listar_todos_proyectos(driver, wait, filtro_nodo=None):
         try:
             mensaje = seleccionar_fecha(driver, fecha_hoy)
             print(f"[DEBUG]  {mensaje}")
-            time.sleep(1)
         except Exception as e:
             print(f"[DEBUG]  Error seleccionando fecha: {e}")
         
         #  PASO 2: Crear nueva línea para abrir el buscador
         try:
+            lineas_antes = len(driver.find_elements(By.CSS_SELECTOR, Selectors.SELECT_SUBPROYECTO_NAME))
             btn_nueva_linea = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, Selectors.BTN_NUEVA_LINEA)))
             btn_nueva_linea.click()
             print("[DEBUG]  Click en 'Nueva línea'")
-            time.sleep(1)
+            esperar_condicion(
+                driver, "nueva_linea",
+                lambda d: len(d.find_elements(By.CSS_SELECTOR, Selectors.SELECT_SUBPROYECTO_NAME)) > lineas_antes,
+                legacy=1
+            )
             
             selects = driver.find_elements(By.CSS_SELECTOR, "select[id^='listaEmpleadoHoras'][id$='.subproyecto']")
             if not selects:
@@ -73,7 +86,12 @@ def listar_todos_proyectos(driver, wait, filtro_nodo=None):
             driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", btn_cambiar)
             btn_cambiar.click()
             print("[DEBUG]  Abriendo buscador de proyectos...")
-            time.sleep(1.5)
+            esperar_condicion(
+                driver, "abrir_buscador",
+                lambda d: d.find_element(By.ID, "treeTipologia").is_displayed(),
+                legacy=1.5
+            )
+            esperar_dom_estable(driver, "abrir_buscador_arbol")
             
         except Exception as e:
             print(f"[DEBUG]  Error abriendo buscador: {e}")
@@ -81,114 +99,14 @@ def listar_todos_proyectos(driver, wait, filtro_nodo=None):
             traceback.print_exc()
             return {}
         
-        # 🌳 PASO 4: Expandir todo el árbol
-        driver.execute_script("""
-            var tree = $('#treeTipologia');
-            if (tree && tree.jstree) { 
-                tree.jstree('open_all'); 
-            }
-        """)
-        print("[DEBUG] 🌳 Expandiendo árbol completo...")
-        time.sleep(2)
-        
-        #  PASO 5: Buscar todos los nodos con JERARQUÍA COMPLETA
-        proyectos_por_nodo = {}
-        
-        nodos_padre = driver.find_elements(By.XPATH, "//li[contains(@class, 'jstree')]//li[@rel='subproyectos']/parent::ul/parent::li")
-        
-        print(f"[DEBUG]  Encontrados {len(nodos_padre)} nodos padre")
-        
-        if len(nodos_padre) == 0:
-            print(f"[DEBUG]  No se encontraron nodos padre en el árbol")
-            print(f"[DEBUG]  HTML del árbol: {driver.find_element(By.ID, 'treeTipologia').get_attribute('outerHTML')[:500]}")
-        
-        for idx, nodo in enumerate(nodos_padre):
-            print(f"[DEBUG] 🔄 INICIO bucle - Procesando nodo {idx+1}/{len(nodos_padre)}")
-            try:
-                print(f"[DEBUG] 🔄 DENTRO try - Procesando nodo {idx+1}/{len(nodos_padre)}")
-                
-                link_nodo = nodo.find_element(By.XPATH, "./a")
-                nombre_nodo = link_nodo.text.strip()
-                
-                print(f"[DEBUG]    Nombre nodo: '{nombre_nodo}'")
-                
-                if not nombre_nodo:
-                    print(f"[DEBUG]    Nodo vacío, saltando...")
-                    continue
-                
-                # 🌲 OBTENER JERARQUÍA COMPLETA
-                ruta_completa = [nombre_nodo]
-                nodo_actual = nodo
-                
-                print(f"[DEBUG]   🌲 Obteniendo jerarquía para '{nombre_nodo}'...")
-                
-                # Subir por los ancestros
-                intentos = 0
-                while True:
-                    intentos += 1
-                    if intentos > 10:
-                        print(f"[DEBUG]    Demasiados intentos subiendo jerarquía, cortando")
-                        break
-                        
-                    try:
-                        nodo_padre_superior = nodo_actual.find_element(By.XPATH, "./parent::ul/parent::li")
-                        link_padre = nodo_padre_superior.find_element(By.XPATH, "./a")
-                        nombre_padre = link_padre.text.strip()
-                        
-                        print(f"[DEBUG]    Padre encontrado: '{nombre_padre}'")
-                        
-                        if nombre_padre and nombre_padre not in ruta_completa:
-                            ruta_completa.insert(0, nombre_padre)
-                            nodo_actual = nodo_padre_superior
-                        else:
-                            print(f"[DEBUG]   🛑 Padre vacío o duplicado, cortando")
-                            break
-                    except Exception as ex:
-                        print(f"[DEBUG]    No hay más padres (esto es normal): {ex}")
-                        break
-                
-                # Crear clave: "Arelance > Admin-Staff"
-                clave_nodo = " > ".join(ruta_completa)
-                
-                # Filtrar si es necesario
-                if filtro_nodo:
-                    import unicodedata
-                    def normalizar(texto):
-                        return ''.join(
-                            c for c in unicodedata.normalize('NFD', texto.lower())
-                            if unicodedata.category(c) != 'Mn'
-                        )
-                    
-                    filtro_norm = normalizar(filtro_nodo)
-                    ruta_norm = normalizar(clave_nodo)
-                    
-                    if filtro_norm not in ruta_norm:
-                        continue
-                
-                # Encontrar proyectos
-                proyectos = nodo.find_elements(By.XPATH, ".//li[@rel='subproyectos']//a")
-                
-                print(f"[DEBUG]    Encontrados {len(proyectos)} proyectos en este nodo")
-                
-                nombres_proyectos = []
-                for proyecto in proyectos:
-                    nombre_proyecto = proyecto.text.strip()
-                    if nombre_proyecto and nombre_proyecto not in nombres_proyectos:
-                        nombres_proyectos.append(nombre_proyecto)
-                
-                print(f"[DEBUG]    Proyectos válidos: {len(nombres_proyectos)}")
-                
-                if nombres_proyectos:
-                    proyectos_por_nodo[clave_nodo] = sorted(nombres_proyectos)
-                    print(f"[DEBUG]   📁 {clave_nodo}: {len(nombres_proyectos)} proyectos")
-                else:
-                    print(f"[DEBUG]    No se encontraron proyectos válidos en {clave_nodo}")
-                
-            except Exception as e:
-                print(f"[DEBUG]  ERROR procesando nodo {idx+1}: {e}")
-                import traceback
-                traceback.print_exc()
-                continue
+        # 🌳 PASO 4-5: Volcar el árbol completo en una sola llamada y cachearlo
+        catalogo = volcar_arbol(driver)
+        if catalogo:
+            if clave_usuario:
+                catalogo_proyectos.guardar(clave_usuario, catalogo)
+            proyectos_por_nodo = catalogo.listado(filtro_nodo)
+        else:
+            proyectos_por_nodo = _listar_desde_dom(driver, filtro_nodo)
         
         #  PASO 6: Cerrar el overlay
         try:
@@ -201,7 +119,7 @@ def listar_todos_proyectos(driver, wait, filtro_nodo=None):
                 tree.jstree('close_all');
                 hideOverlay();
             """)
-            time.sleep(0.5)
+            esperar_dom_estable(driver, "cerrar_buscador", legacy=0.5)
         except Exception as e:
             print(f"[DEBUG]  Error cerrando overlay: {e}")
         
@@ -232,10 +150,9 @@ def listar_todos_proyectos(driver, wait, filtro_nodo=None):
                 
                 if btn_eliminar:
                     driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", btn_eliminar)
-                    time.sleep(0.3)
                     btn_eliminar.click()
                     print("[DEBUG]  Línea temporal eliminada")
-                    time.sleep(0.5)
+                    esperar_dom_estable(driver, "eliminar_linea", legacy=0.5)
         except Exception as e:
             print(f"[DEBUG]  Error eliminando línea: {e}")
         
@@ -255,6 +172,123 @@ def listar_todos_proyectos(driver, wait, filtro_nodo=None):
         return {}
 
 
+def _listar_desde_dom(driver, filtro_nodo=None):
+    """
+    Recorrido nodo a nodo del árbol (método antiguo). Solo se usa si el
+    volcado JS del catálogo no devuelve nada.
+    """
+    # 🌳 PASO 4: Expandir todo el árbol
+    driver.execute_script("""
+        var tree = $('#treeTipologia');
+        if (tree && tree.jstree) { 
+            tree.jstree('open_all'); 
+        }
+    """)
+    print("[DEBUG] 🌳 Expandiendo árbol completo...")
+    esperar_dom_estable(driver, "expandir_arbol", legacy=2)
+
+    #  PASO 5: Buscar todos los nodos con JERARQUÍA COMPLETA
+    proyectos_por_nodo = {}
+
+    nodos_padre = driver.find_elements(By.XPATH, "//li[contains(@class, 'jstree')]//li[@rel='subproyectos']/parent::ul/parent::li")
+
+    print(f"[DEBUG]  Encontrados {len(nodos_padre)} nodos padre")
+
+    if len(nodos_padre) == 0:
+        print(f"[DEBUG]  No se encontraron nodos padre en el árbol")
+        print(f"[DEBUG]  HTML del árbol: {driver.find_element(By.ID, 'treeTipologia').get_attribute('outerHTML')[:500]}")
+
+    for idx, nodo in enumerate(nodos_padre):
+        print(f"[DEBUG] 🔄 INICIO bucle - Procesando nodo {idx+1}/{len(nodos_padre)}")
+        try:
+            print(f"[DEBUG] 🔄 DENTRO try - Procesando nodo {idx+1}/{len(nodos_padre)}")
+
+            link_nodo = nodo.find_element(By.XPATH, "./a")
+            nombre_nodo = link_nodo.text.strip()
+
+            print(f"[DEBUG]    Nombre nodo: '{nombre_nodo}'")
+
+            if not nombre_nodo:
+                print(f"[DEBUG]    Nodo vacío, saltando...")
+                continue
+
+            # 🌲 OBTENER JERARQUÍA COMPLETA
+            ruta_completa = [nombre_nodo]
+            nodo_actual = nodo
+
+            print(f"[DEBUG]   🌲 Obteniendo jerarquía para '{nombre_nodo}'...")
+
+            # Subir por los ancestros
+            intentos = 0
+            while True:
+                intentos += 1
+                if intentos > 10:
+                    print(f"[DEBUG]    Demasiados intentos subiendo jerarquía, cortando")
+                    break
+
+                try:
+                    nodo_padre_superior = nodo_actual.find_element(By.XPATH, "./parent::ul/parent::li")
+                    link_padre = nodo_padre_superior.find_element(By.XPATH, "./a")
+                    nombre_padre = link_padre.text.strip()
+
+                    print(f"[DEBUG]    Padre encontrado: '{nombre_padre}'")
+
+                    if nombre_padre and nombre_padre not in ruta_completa:
+                        ruta_completa.insert(0, nombre_padre)
+                        nodo_actual = nodo_padre_superior
+                    else:
+                        print(f"[DEBUG]   🛑 Padre vacío o duplicado, cortando")
+                        break
+                except Exception as ex:
+                    print(f"[DEBUG]    No hay más padres (esto es normal): {ex}")
+                    break
+
+            # Crear clave: "Arelance > Admin-Staff"
+            clave_nodo = " > ".join(ruta_completa)
+
+            # Filtrar si es necesario
+            if filtro_nodo:
+                import unicodedata
+                def normalizar(texto):
+                    return ''.join(
+                        c for c in unicodedata.normalize('NFD', texto.lower())
+                        if unicodedata.category(c) != 'Mn'
+                    )
+
+                filtro_norm = normalizar(filtro_nodo)
+                ruta_norm = normalizar(clave_nodo)
+
+                if filtro_norm not in ruta_norm:
+                    continue
+
+            # Encontrar proyectos
+            proyectos = nodo.find_elements(By.XPATH, ".//li[@rel='subproyectos']//a")
+
+            print(f"[DEBUG]    Encontrados {len(proyectos)} proyectos en este nodo")
+
+            nombres_proyectos = []
+            for proyecto in proyectos:
+                nombre_proyecto = proyecto.text.strip()
+                if nombre_proyecto and nombre_proyecto not in nombres_proyectos:
+                    nombres_proyectos.append(nombre_proyecto)
+
+            print(f"[DEBUG]    Proyectos válidos: {len(nombres_proyectos)}")
+
+            if nombres_proyectos:
+                proyectos_por_nodo[clave_nodo] = sorted(nombres_proyectos)
+                print(f"[DEBUG]   📁 {clave_nodo}: {len(nombres_proyectos)} proyectos")
+            else:
+                print(f"[DEBUG]    No se encontraron proyectos válidos en {clave_nodo}")
+
+        except Exception as e:
+            print(f"[DEBUG]  ERROR procesando nodo {idx+1}: {e}")
+            import traceback
+            traceback.print_exc()
+            continue
+    
+    return proyectos_por_nodo
+
+
 def formatear_lista_proyectos(proyectos_por_nodo, canal="webapp"):
     """Formatea la lista de proyectos con jerarquía completa."""
     if not proyectos_por_nodo:
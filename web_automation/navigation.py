@@ -3,13 +3,15 @@ Funciones de navegación en la web.
 Incluye cambio de fechas, navegación por calendarios, etc.
 """
 
-import time
 from datetime import datetime, timedelta
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-from config import Selectors, Constants
+from config import settings, Selectors, Constants
+from web_automation.esperas import esperar_condicion, esperar_recarga, esperar_tabla_imputacion
+from web_automation.lector_http import registrar_plantilla_fecha
+from web_automation.cache_semanas import cache_semanas
 
 
 def lunes_de_semana(fecha):
@@ -152,12 +154,14 @@ def seleccionar_fecha(driver, fecha_obj, contexto=None):
                     # Misma semana, mismo mes → NO volver
                     print(f"[DEBUG]  Misma semana ({lunes_objetivo.strftime('%d/%m')}), NO volver atrás")
                     #  RETORNAR INMEDIATAMENTE - No necesitamos hacer nada más
+                    cache_semanas.marcar_en_pantalla(driver, fecha_obj)
                     return f"Ya estás en la semana del {lunes_objetivo.strftime('%d/%m/%Y')}"
             
             if debe_volver:
                 print(f"[DEBUG] 🔙 Volviendo atrás...")
                 btn_volver.click()
-                time.sleep(2)
+                esperar_recarga(driver, btn_volver, "volver", legacy=2)
+                cache_semanas.olvidar_pantalla(driver)
                 
                 # Limpiar el contexto porque todos los elementos quedan obsoletos
                 if contexto:
@@ -182,26 +186,44 @@ def seleccionar_fecha(driver, fecha_obj, contexto=None):
         anio_visible = int(partes[1])
         return mes_visible, anio_visible
 
+    def esperar_cambio_mes(mes_anterior, anio_anterior):
+        """Espera a que el datepicker muestre otro mes tras pulsar siguiente/anterior."""
+        esperar_condicion(
+            driver, "datepicker_mes",
+            lambda d: obtener_mes_anio_actual() != (mes_anterior, anio_anterior),
+            legacy=settings.AFTER_CALENDAR_CLICK
+        )
+
     mes_visible, anio_visible = obtener_mes_anio_actual()
 
     # Navegar hacia adelante si es necesario
     while (anio_visible, mes_visible) < (fecha_obj.year, fecha_obj.month):
         driver.find_element(By.CSS_SELECTOR, Selectors.DATEPICKER_NEXT).click()
-        time.sleep(0.3)
+        esperar_cambio_mes(mes_visible, anio_visible)
         mes_visible, anio_visible = obtener_mes_anio_actual()
 
     # Navegar hacia atrás si es necesario
     while (anio_visible, mes_visible) > (fecha_obj.year, fecha_obj.month):
         driver.find_element(By.CSS_SELECTOR, Selectors.DATEPICKER_PREV).click()
-        time.sleep(0.3)
+        esperar_cambio_mes(mes_visible, anio_visible)
         mes_visible, anio_visible = obtener_mes_anio_actual()
 
     dia_seleccionado = fecha_obj.day
 
+    # Con el datepicker abierto: aprender su formulario para el lector HTTP
+    registrar_plantilla_fecha(driver)
+
     try:
-        driver.find_element(By.XPATH, f"//a[text()='{dia_seleccionado}']").click()
+        enlace_dia = driver.find_element(By.XPATH, f"//a[text()='{dia_seleccionado}']")
+        enlace_dia.click()
         fecha_formateada = fecha_obj.strftime('%d/%m/%Y')
-        time.sleep(2)  # Esperar a que cargue la pantalla de imputación
+        # Esperar a que cargue la pantalla de imputación
+        esperar_tabla_imputacion(
+            driver, "seleccionar_fecha",
+            elemento_anterior=enlace_dia, legacy=settings.AFTER_DATE_SELECT
+        )
+        cache_semanas.marcar_en_pantalla(driver, fecha_obj)
         return f"He seleccionado la fecha {fecha_formateada}"
     except Exception as e:
+        cache_semanas.olvidar_pantalla(driver)
         return f"No he podido seleccionar el día {dia_seleccionado}: {e}"
\ No newline at end of file
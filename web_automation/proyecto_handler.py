@@ -13,7 +13,6 @@ CORRECCIONES APLICADAS:
 4.  Para imputar nuevo: si NO existe en tabla → buscar en sistema
 """
 
-import time
 import unicodedata
 from datetime import timedelta
 from selenium.webdriver.common.by import By
@@ -22,6 +21,19 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
 
 from config import Selectors, Constants
+from web_automation.esperas import (
+    esperar_condicion,
+    esperar_dom_estable,
+    esperar_pagina_lista,
+    esperar_tabla_imputacion
+)
+from web_automation.cache_semanas import cache_semanas
+from web_automation.catalogo_proyectos import (
+    catalogo_proyectos,
+    clave_catalogo,
+    obtener_catalogo,
+    localizar_nodo
+)
 
 
 def normalizar(texto):
@@ -32,6 +44,118 @@ def normalizar(texto):
     )
 
 
+def _cerrar_buscador(driver):
+    """Cierra el overlay del buscador de proyectos y deja el árbol sin filtro."""
+    try:
+        driver.execute_script("""
+            document.getElementById('textoBusqueda').value='Introduzca proyecto/tipologia';
+            document.getElementById('textoBusqueda').style.color='gray';
+            buscadorJTree();
+            var tree = $('#treeTipologia');
+            tree.jstree('deselect_all');
+            tree.jstree('close_all');
+            hideOverlay();
+        """)
+        esperar_dom_estable(driver, "cerrar_buscador", legacy=0.5)
+    except:
+        pass
+
+
+def _eliminar_linea_temporal(fila):
+    """Elimina la línea vacía creada para abrir el buscador."""
+    try:
+        btn_eliminar = fila.find_element(By.CSS_SELECTOR, "button.botonEliminar, button#botonEliminar, input[id*='btEliminar']")
+        btn_eliminar.click()
+        esperar_dom_estable(fila.parent, "eliminar_linea", legacy=0.3)  # fila.parent = WebDriver
+    except:
+        pass
+
+
+def _clic_nodo(driver, nodo):
+    """Hace click en un nodo del árbol del catálogo. Devuelve False si no está en el DOM."""
+    elemento = localizar_nodo(driver, nodo)
+    if not elemento:
+        return False
+    elemento.click()
+    esperar_dom_estable(driver, "seleccionar_nodo", legacy=1)
+    return True
+
+
+def _seleccionar_con_catalogo(driver, fila, catalogo, nombre_proyecto, nodo_padre=None):
+    """
+    Misma lógica de búsqueda que seleccionar_proyecto() pero resuelta contra el
+    catálogo en memoria, sin escribir en el buscador ni recorrer el DOM.
+    
+    Returns:
+        tuple como seleccionar_proyecto(), o None si el catálogo no resuelve
+        el nombre (el llamante vuelve a la búsqueda en el DOM)
+    """
+    #  Búsqueda con jerarquía: el proyecto bajo su nodo padre específico
+    if nodo_padre and nodo_padre != "__buscar__":
+        nodo_padre_norm = normalizar(nodo_padre)
+        padres = catalogo.buscar_nodos(nodo_padre)
+        if padres:
+            exactos, parciales = catalogo.buscar_proyectos(nombre_proyecto, bajo=padres[0])
+            en_nodo = exactos if exactos else parciales
+            print(f"[CATALOGO]  '{nombre_proyecto}' en '{padres[0]['nombre']}': {len(en_nodo)} (exactos: {len(exactos)})")
+            
+            if len(en_nodo) > 1:
+                coincidencias = catalogo.coincidencias(nombre_proyecto)
+                filtradas = [c for c in coincidencias if nodo_padre_norm in normalizar(c["nodo_padre"])]
+                _cerrar_buscador(driver)
+                _eliminar_linea_temporal(fila)
+                return (None, "", True, filtradas if filtradas else coincidencias)
+            
+            if en_nodo and _clic_nodo(driver, en_nodo[0]):
+                return (fila, f"He abierto el proyecto '{nombre_proyecto}' de '{nodo_padre}'", False, [])
+    
+    # Búsqueda estándar
+    exactos, parciales = catalogo.buscar_proyectos(nombre_proyecto)
+    elementos = exactos + parciales
+    print(f"[CATALOGO]  Coincidencias de '{nombre_proyecto}': {len(elementos)}")
+    
+    if not elementos:
+        #  Buscar en NODOS PADRE (departamentos/áreas)
+        proyectos_en_nodos = []
+        for carpeta in catalogo.buscar_nodos(nombre_proyecto, solo_carpetas=True):
+            for proyecto in catalogo.proyectos_bajo(carpeta):
+                proyectos_en_nodos.append({
+                    "proyecto": proyecto["nombre"],
+                    "nodo_padre": carpeta["nombre"],
+                    "nodo_id": proyecto["id"],
+                    "path_completo": f"{carpeta['nombre']} → {proyecto['nombre']}",
+                    "_nodo": proyecto
+                })
+        
+        if not proyectos_en_nodos:
+            return None
+        
+        if len(proyectos_en_nodos) == 1:
+            unico = proyectos_en_nodos[0]
+            if not _clic_nodo(driver, unico["_nodo"]):
+                return None
+            return (fila, f"He seleccionado '{unico['proyecto']}' de '{unico['nodo_padre']}'", False, [])
+        
+        for p in proyectos_en_nodos:
+            p.pop("_nodo")
+        _cerrar_buscador(driver)
+        _eliminar_linea_temporal(fila)
+        return (None, "", True, proyectos_en_nodos)
+    
+    if len(elementos) > 1 and (not nodo_padre or nodo_padre == "__buscar__"):
+        print(f"[DEBUG] 💬 Necesita desambiguación - devolviendo coincidencias del catálogo...")
+        coincidencias = catalogo.coincidencias(nombre_proyecto)
+        _cerrar_buscador(driver)
+        _eliminar_linea_temporal(fila)
+        return (None, "", True, coincidencias)
+    
+    if not _clic_nodo(driver, elementos[0]):
+        return None
+    
+    mensaje_nodo = f" (primera coincidencia de {len(elementos)})" if len(elementos) > 1 and nodo_padre else ""
+    return (fila, f"He abierto el proyecto '{nombre_proyecto}'{mensaje_nodo}", False, [])
+
+
 def seleccionar_proyecto(driver, wait, nombre_proyecto, nodo_padre=None, elemento_preseleccionado=None, contexto=None, solo_existente=False):
     """
     Selecciona el proyecto en la tabla de imputación.
@@ -58,8 +182,8 @@ def seleccionar_proyecto(driver, wait, nombre_proyecto, nodo_padre=None, element
             - coincidencias: Lista de coincidencias (si necesita_desambiguacion=True)
     """
     try:
-        # Dar tiempo a que la página se estabilice tras guardar
-        time.sleep(0.5)
+        # Esperar a que la página se estabilice tras guardar
+        esperar_pagina_lista(driver, "seleccionar_proyecto", legacy=0.5)
         
         # Buscar si el proyecto ya existe en TODAS las líneas (guardadas o no)
         selects = driver.find_elements(By.CSS_SELECTOR, "select[name*='subproyecto']")
@@ -73,20 +197,13 @@ def seleccionar_proyecto(driver, wait, nombre_proyecto, nodo_padre=None, element
         #  Recolectar TODAS las coincidencias
         coincidencias_encontradas = []
         
-        for idx, sel in enumerate(selects):
-            # Verificar si el select está disabled (guardado)
-            is_disabled = sel.get_attribute("disabled")
-            estado = "guardada" if is_disabled else "editable"
-            
-            # Obtener el texto de la opción seleccionada usando JavaScript
-            try:
-                texto_completo = driver.execute_script("""
-                    var select = arguments[0];
-                    var selectedOption = select.options[select.selectedIndex];
-                    return selectedOption ? selectedOption.text : '';
-                """, sel)
-            except:
-                texto_completo = ""
+        # Leer todas las líneas (texto, estado y horas) en una sola llamada JS
+        filas_tabla = extraer_tabla_imputacion(driver)
+        
+        for fila_tabla in filas_tabla:
+            idx = fila_tabla["fila_idx"]
+            estado = "guardada" if fila_tabla["deshabilitado"] else "editable"
+            texto_completo = fila_tabla["proyecto"]
             
             if not texto_completo or texto_completo == "Seleccione opción":
                 print(f"[DEBUG]   Línea {idx+1} ({estado}): Vacía o sin selección")
@@ -114,26 +231,12 @@ def seleccionar_proyecto(driver, wait, nombre_proyecto, nodo_padre=None, element
                 # Extraer nodo padre del proyecto en tabla
                 nodo_padre_encontrado = partes[-2].strip() if len(partes) >= 2 else ""
                 
-                # Leer las horas de la fila para mostrarlas
-                fila = sel.find_element(By.XPATH, "./ancestor::tr")
-                horas_dias = {}
-                total_horas = 0.0
-                
-                try:
-                    for dia_nombre, dia_key in Constants.DIAS_KEYS.items():
-                        try:
-                            campo = fila.find_element(By.CSS_SELECTOR, Selectors.campo_horas_dia(dia_key))
-                            valor = campo.get_attribute("value") or "0"
-                            try:
-                                valor_float = float(valor.replace(",", "."))
-                            except ValueError:
-                                valor_float = 0.0
-                            horas_dias[dia_nombre] = valor_float
-                            total_horas += valor_float
-                        except:
-                            horas_dias[dia_nombre] = 0.0
-                except Exception as e:
-                    print(f"[DEBUG]  Error leyendo horas: {e}")
+                # Horas de la fila (ya leídas en la extracción)
+                horas_dias = {
+                    dia_nombre: fila_tabla["horas"].get(dia_key, 0.0)
+                    for dia_nombre, dia_key in Constants.DIAS_KEYS.items()
+                }
+                total_horas = sum(fila_tabla["horas"].values())
                 
                 coincidencias_encontradas.append({
                     "proyecto": nombre_proyecto_real,
@@ -158,7 +261,6 @@ def seleccionar_proyecto(driver, wait, nombre_proyecto, nodo_padre=None, element
                     print(f"[DEBUG]  Nodo padre coincide, reutilizando línea existente")
                     fila = selects[coincidencia["fila_idx"]].find_element(By.XPATH, "./ancestor::tr")
                     driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", fila)
-                    time.sleep(0.3)
                     return (fila, f"Usando '{coincidencia['proyecto']}' de '{coincidencia['nodo_padre']}'", False, [])
         
         if coincidencias_encontradas and not nodo_padre:
@@ -175,7 +277,6 @@ def seleccionar_proyecto(driver, wait, nombre_proyecto, nodo_padre=None, element
                     coincidencia = coincidencias_encontradas[0]
                     fila = selects[coincidencia["fila_idx"]].find_element(By.XPATH, "./ancestor::tr")
                     driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", fila)
-                    time.sleep(0.3)
                     return (fila, f"Usando '{coincidencia['proyecto']}'", False, [])
                 else:
                     # ❓ Primera vez en este comando: preguntar al usuario
@@ -194,10 +295,15 @@ def seleccionar_proyecto(driver, wait, nombre_proyecto, nodo_padre=None, element
         # Si no existe → añadimos nueva línea y buscamos en sistema
         print(f"[DEBUG] ➕ Proyecto '{nombre_proyecto}' NO encontrado en tabla, añadiendo nueva línea y buscando en sistema...")
         try:
+            lineas_antes = len(driver.find_elements(By.CSS_SELECTOR, Selectors.SELECT_SUBPROYECTO_NAME))
             btn_nueva_linea = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, Selectors.BTN_NUEVA_LINEA)))
             btn_nueva_linea.click()
             print(f"[DEBUG]  Botón nueva línea pulsado")
-            time.sleep(1)
+            esperar_condicion(
+                driver, "nueva_linea",
+                lambda d: len(d.find_elements(By.CSS_SELECTOR, Selectors.SELECT_SUBPROYECTO_NAME)) > lineas_antes,
+                legacy=1
+            )
         except Exception as e:
             print(f"[DEBUG]  Error al pulsar botón nueva línea: {e}")
             return (None, f"No he podido crear una nueva línea: {e}", False, [])
@@ -232,6 +338,17 @@ def seleccionar_proyecto(driver, wait, nombre_proyecto, nodo_padre=None, element
 
         # Esperar a que aparezca el campo de búsqueda
         campo_buscar = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, Selectors.BUSCADOR_INPUT)))
+        
+        # 🌳 Resolver con el catálogo cacheado (o volcado ahora, antes de filtrar el árbol)
+        clave = clave_catalogo(driver, contexto)
+        catalogo = obtener_catalogo(driver, clave)
+        if catalogo:
+            resultado = _seleccionar_con_catalogo(driver, fila, catalogo, nombre_proyecto, nodo_padre)
+            if resultado is not None:
+                return resultado
+            # No está en el catálogo (¿proyecto nuevo?): invalidar y buscar en el DOM
+            catalogo_proyectos.invalidar(clave)
+        
         campo_buscar.clear()
         campo_buscar.send_keys(nombre_proyecto)
         print(f"[DEBUG]  Escrito '{nombre_proyecto}' en el campo de búsqueda")
@@ -240,7 +357,7 @@ def seleccionar_proyecto(driver, wait, nombre_proyecto, nodo_padre=None, element
         btn_buscar = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, Selectors.BUSCADOR_BOTON)))
         btn_buscar.click()
         print(f"[DEBUG] 🔘 Botón 'Buscar' pulsado, esperando resultados...")
-        time.sleep(1.5)
+        esperar_dom_estable(driver, "buscar_proyecto", legacy=1.5)
 
         # Expandir árbol de resultados
         print(f"[DEBUG] 🌳 Expandiendo árbol de resultados...")
@@ -248,7 +365,7 @@ def seleccionar_proyecto(driver, wait, nombre_proyecto, nodo_padre=None, element
             var tree = $('#treeTipologia');
             if (tree && tree.jstree) { tree.jstree('open_all'); }
         """)
-        time.sleep(1)
+        esperar_dom_estable(driver, "expandir_arbol", legacy=1)
         print(f"[DEBUG]  Árbol expandido")
 
         # Buscar y seleccionar el proyecto
@@ -320,7 +437,7 @@ def seleccionar_proyecto(driver, wait, nombre_proyecto, nodo_padre=None, element
                     print(f"[DEBUG] 🤔 Múltiples '{nombre_proyecto}' en '{nodo_padre}', necesita desambiguación")
                     
                     from web_automation.desambiguacion import buscar_proyectos_duplicados
-                    coincidencias = buscar_proyectos_duplicados(driver, wait, nombre_proyecto)
+                    coincidencias = buscar_proyectos_duplicados(driver, wait, nombre_proyecto, clave)
                     
                     # Filtrar solo las del nodo_padre especificado
                     coincidencias_filtradas = [
@@ -331,27 +448,10 @@ def seleccionar_proyecto(driver, wait, nombre_proyecto, nodo_padre=None, element
                     print(f"[DEBUG]  {len(coincidencias_filtradas)} coincidencias en '{nodo_padre}'")
                     
                     # Cerrar buscador
-                    try:
-                        driver.execute_script("""
-                            document.getElementById('textoBusqueda').value='Introduzca proyecto/tipologia';
-                            document.getElementById('textoBusqueda').style.color='gray';
-                            buscadorJTree();
-                            var tree = $('#treeTipologia');
-                            tree.jstree('deselect_all');
-                            tree.jstree('close_all');
-                            hideOverlay();
-                        """)
-                        time.sleep(0.5)
-                    except:
-                        pass
+                    _cerrar_buscador(driver)
                     
                     # Eliminar línea temporal
-                    try:
-                        btn_eliminar = fila.find_element(By.CSS_SELECTOR, "button.botonEliminar, button#botonEliminar, input[id*='btEliminar']")
-                        btn_eliminar.click()
-                        time.sleep(0.3)
-                    except:
-                        pass
+                    _eliminar_linea_temporal(fila)
                     
                     return (None, "", True, coincidencias_filtradas if coincidencias_filtradas else coincidencias)
                 
@@ -359,7 +459,7 @@ def seleccionar_proyecto(driver, wait, nombre_proyecto, nodo_padre=None, element
                 elemento = elemento_preseleccionado if elemento_preseleccionado else elementos_en_nodo[0]
                 driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", elemento)
                 elemento.click()
-                time.sleep(1)
+                esperar_dom_estable(driver, "seleccionar_nodo", legacy=1)
                 
                 return (fila, f"He abierto el proyecto '{nombre_proyecto}' de '{nodo_padre}'", False, [])
                 
@@ -453,7 +553,7 @@ def seleccionar_proyecto(driver, wait, nombre_proyecto, nodo_padre=None, element
                         elemento = proyecto_unico["elemento"]
                         driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", elemento)
                         elemento.click()
-                        time.sleep(1)
+                        esperar_dom_estable(driver, "seleccionar_nodo", legacy=1)
                         
                         return (fila, f"He seleccionado '{proyecto_unico['proyecto']}' de '{proyecto_unico['nodo_padre']}'", False, [])
                     
@@ -462,27 +562,10 @@ def seleccionar_proyecto(driver, wait, nombre_proyecto, nodo_padre=None, element
                         print(f"[DEBUG] 🤔 Múltiples proyectos en '{nombre_proyecto}', requiere desambiguación")
                         
                         # Cerrar buscador
-                        try:
-                            driver.execute_script("""
-                                document.getElementById('textoBusqueda').value='Introduzca proyecto/tipologia';
-                                document.getElementById('textoBusqueda').style.color='gray';
-                                buscadorJTree();
-                                var tree = $('#treeTipologia');
-                                tree.jstree('deselect_all');
-                                tree.jstree('close_all');
-                                hideOverlay();
-                            """)
-                            time.sleep(0.5)
-                        except:
-                            pass
+                        _cerrar_buscador(driver)
                         
                         # Eliminar línea temporal
-                        try:
-                            btn_eliminar = fila.find_element(By.CSS_SELECTOR, "button.botonEliminar, button#botonEliminar, input[id*='btEliminar']")
-                            btn_eliminar.click()
-                            time.sleep(0.3)
-                        except:
-                            pass
+                        _eliminar_linea_temporal(fila)
                         
                         return (None, "", True, proyectos_en_nodos)
                 
@@ -496,7 +579,7 @@ def seleccionar_proyecto(driver, wait, nombre_proyecto, nodo_padre=None, element
                 elemento = elementos[0]
                 driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", elemento)
                 elemento.click()
-                time.sleep(1)
+                esperar_dom_estable(driver, "seleccionar_nodo", legacy=1)
                 return (fila, f"He abierto el proyecto '{nombre_proyecto}'", False, [])
             
             #  DESAMBIGUACIÓN INTERACTIVA: Si hay múltiples coincidencias SIN nodo padre
@@ -508,30 +591,13 @@ def seleccionar_proyecto(driver, wait, nombre_proyecto, nodo_padre=None, element
                 # Importar la función para obtener información detallada de coincidencias
                 from web_automation.desambiguacion import buscar_proyectos_duplicados
                 
-                coincidencias = buscar_proyectos_duplicados(driver, wait, nombre_proyecto)
+                coincidencias = buscar_proyectos_duplicados(driver, wait, nombre_proyecto, clave)
                 
                 # Cerrar el buscador antes de preguntar
-                try:
-                    driver.execute_script("""
-                        document.getElementById('textoBusqueda').value='Introduzca proyecto/tipologia';
-                        document.getElementById('textoBusqueda').style.color='gray';
-                        buscadorJTree();
-                        var tree = $('#treeTipologia');
-                        tree.jstree('deselect_all');
-                        tree.jstree('close_all');
-                        hideOverlay();
-                    """)
-                    time.sleep(0.5)
-                except:
-                    pass
+                _cerrar_buscador(driver)
                 
                 # Eliminar la línea temporal
-                try:
-                    btn_eliminar = fila.find_element(By.CSS_SELECTOR, "button.botonEliminar, button#botonEliminar, input[id*='btEliminar']")
-                    btn_eliminar.click()
-                    time.sleep(0.3)
-                except:
-                    pass
+                _eliminar_linea_temporal(fila)
                 
                 # Devolver flag de desambiguación
                 return (None, "", True, coincidencias)
@@ -548,7 +614,7 @@ def seleccionar_proyecto(driver, wait, nombre_proyecto, nodo_padre=None, element
             
             driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", elemento)
             elemento.click()
-            time.sleep(1)
+            esperar_dom_estable(driver, "seleccionar_nodo", legacy=1)
 
             mensaje_nodo = f" (primera coincidencia de {len(elementos)})" if len(elementos) > 1 and nodo_padre else ""
             return (fila, f"He abierto el proyecto '{nombre_proyecto}'{mensaje_nodo}", False, [])
@@ -568,7 +634,7 @@ def seleccionar_proyecto(driver, wait, nombre_proyecto, nodo_padre=None, element
                     tree.jstree('close_all');
                     hideOverlay();
                 """)
-                time.sleep(0.5)
+                esperar_dom_estable(driver, "cerrar_buscador", legacy=0.5)
             except Exception as close_error:
                 print(f"[DEBUG]  Error cerrando overlay: {close_error}")
             
@@ -576,9 +642,8 @@ def seleccionar_proyecto(driver, wait, nombre_proyecto, nodo_padre=None, element
             try:
                 btn_eliminar = fila.find_element(By.CSS_SELECTOR, "button.botonEliminar, button#botonEliminar, input[id*='btEliminar']")
                 driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", btn_eliminar)
-                time.sleep(0.2)
                 btn_eliminar.click()
-                time.sleep(0.5)
+                esperar_dom_estable(driver, "eliminar_linea", legacy=0.5)
                 print(f"[DEBUG] 🗑️ Línea vacía eliminada")
             except Exception as del_error:
                 print(f"[DEBUG]  No se pudo eliminar la línea vacía: {del_error}")
@@ -605,6 +670,7 @@ def eliminar_linea_proyecto(driver, wait, nombre_proyecto, fila_contexto=None):
         str: Mensaje de confirmación o error
     """
     try:
+        cache_semanas.invalidar_pantalla(driver)  # Cambios sin guardar en la semana en pantalla
         fila = None
         
         #  Si tenemos fila del contexto, usarla directamente
@@ -643,7 +709,6 @@ def eliminar_linea_proyecto(driver, wait, nombre_proyecto, fila_contexto=None):
         # Buscar el botón de eliminar en la fila
         try:
             driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", fila)
-            time.sleep(0.3)
             
             # Intentar varios selectores para el botón eliminar
             btn_eliminar = None
@@ -684,17 +749,14 @@ def eliminar_linea_proyecto(driver, wait, nombre_proyecto, fila_contexto=None):
             #  CLICK en el botón eliminar
             print(f"[DEBUG] 🔘 Haciendo click en botón eliminar...")
             btn_eliminar.click()
-            time.sleep(0.5)
             
             #  Manejar posible ALERT de confirmación
             try:
-                from selenium.webdriver.common.alert import Alert
-                alert = Alert(driver)
+                alert = WebDriverWait(driver, 0.5, poll_frequency=0.05).until(EC.alert_is_present())
                 alert_text = alert.text
                 print(f"[DEBUG]  Alert detectado: {alert_text}")
                 alert.accept()  # Aceptar el alert
                 print(f"[DEBUG]  Alert aceptado")
-                time.sleep(0.5)
             except:
                 # No hay alert, continuar normalmente
                 print(f"[DEBUG] 👍 No hay alert de confirmación")
@@ -705,11 +767,10 @@ def eliminar_linea_proyecto(driver, wait, nombre_proyecto, fila_contexto=None):
                 if modal_confirm:
                     print(f"[DEBUG] 🔘 Modal de confirmación detectado, confirmando...")
                     modal_confirm.click()
-                    time.sleep(0.5)
             except:
                 pass
             
-            time.sleep(0.5)
+            esperar_dom_estable(driver, "eliminar_linea", legacy=1)
             
             print(f"[DEBUG]  Línea del proyecto '{nombre_proyecto}' eliminada")
             return f"He eliminado la línea del proyecto '{nombre_proyecto}'"
@@ -745,6 +806,7 @@ def imputar_horas_dia(driver, wait, dia, horas, fila, nombre_proyecto=None, modo
         return f"No reconozco el día '{dia}'"
 
     try:
+        cache_semanas.invalidar_pantalla(driver)  # Cambios sin guardar en la semana en pantalla
         campo = fila.find_element(By.CSS_SELECTOR, Selectors.campo_horas_dia(dia_clave))
         
         print(f"[DEBUG]  Campo encontrado para {dia} ({dia_clave})")
@@ -752,14 +814,12 @@ def imputar_horas_dia(driver, wait, dia, horas, fila, nombre_proyecto=None, modo
         if campo.is_enabled():
             # Hacer scroll y enfocar el campo
             driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", campo)
-            time.sleep(0.3)
 
             # Click para asegurar foco
             # Puede lanzar ElementNotInteractableException si el campo está en un mes
             # diferente al de la vista actual (misma semana, diferente mes)
             try:
                 campo.click()
-                time.sleep(0.2)
             except Exception as e_click:
                 print(f"[DEBUG] Campo {dia} enabled pero no interactuable (cambio de mes): {e_click}")
                 dias_laborables = ["lunes", "martes", "miércoles", "miercoles", "jueves", "viernes"]
@@ -786,14 +846,12 @@ def imputar_horas_dia(driver, wait, dia, horas, fila, nombre_proyecto=None, modo
                 # Limpiar con Ctrl+A y Delete para asegurar
                 campo.send_keys(Keys.CONTROL + "a")
                 campo.send_keys(Keys.DELETE)
-                time.sleep(0.1)
                 campo.send_keys(str(total))
                 
                 #  CRÍTICO: Hacer clic fuera del input para que refresque la tabla
                 # Esto evita que el botón guardar se desactualice
-                time.sleep(0.2)
                 campo.send_keys(Keys.TAB)  # Salir del campo con TAB
-                time.sleep(0.5)  # Dar tiempo a que la tabla se actualice
+                esperar_dom_estable(driver, "imputar_campo", legacy=0.8)  # La tabla recalcula totales
                 
                 proyecto_texto = f"en el proyecto {nombre_proyecto}" if nombre_proyecto else ""
                 print(f"[DEBUG]  Establecidas {total}h el {dia} {proyecto_texto}")
@@ -803,14 +861,12 @@ def imputar_horas_dia(driver, wait, dia, horas, fila, nombre_proyecto=None, modo
                 # Limpiar con Ctrl+A y Delete para asegurar
                 campo.send_keys(Keys.CONTROL + "a")
                 campo.send_keys(Keys.DELETE)
-                time.sleep(0.1)
                 campo.send_keys(str(total))
                 
                 #  CRÍTICO: Hacer clic fuera del input para que refresque la tabla
                 # Esto evita que el botón guardar se desactualice
-                time.sleep(0.2)
                 campo.send_keys(Keys.TAB)  # Salir del campo con TAB
-                time.sleep(0.5)  # Dar tiempo a que la tabla se actualice
+                esperar_dom_estable(driver, "imputar_campo", legacy=0.8)  # La tabla recalcula totales
                 
                 proyecto_texto = f"en el proyecto {nombre_proyecto}" if nombre_proyecto else ""
                 accion = "añadido" if nuevas_horas > 0 else "restado"
@@ -863,6 +919,7 @@ def imputar_horas_semana(driver, wait, fila, nombre_proyecto=None):
     dias_omitidos = []
 
     try:
+        cache_semanas.invalidar_pantalla(driver)  # Cambios sin guardar en la semana en pantalla
         #  PASO 1: Leer las horas existentes de TODOS los proyectos para cada día
         horas_existentes_por_dia = {
             'lunes': 0.0,
@@ -872,89 +929,43 @@ def imputar_horas_semana(driver, wait, fila, nombre_proyecto=None):
             'viernes': 0.0
         }
         
-        # Buscar TODAS las filas con proyectos
-        selects = driver.find_elements(By.CSS_SELECTOR, "select[name*='subproyecto']")
-        if not selects:
-            selects = driver.find_elements(By.CSS_SELECTOR, "select[id*='subproyecto']")
-        
-        for sel in selects:
-            try:
-                # Verificar si tiene un proyecto seleccionado
-                proyecto_nombre = driver.execute_script("""
-                    var select = arguments[0];
-                    var selectedOption = select.options[select.selectedIndex];
-                    return selectedOption ? selectedOption.text : '';
-                """, sel)
-                
-                if not proyecto_nombre or proyecto_nombre == "Seleccione opción":
-                    continue
-                
-                fila_actual = sel.find_element(By.XPATH, "./ancestor::tr")
-                
-                # Leer horas de cada día
-                for dia_nombre in horas_existentes_por_dia.keys():
-                    try:
-                        dia_key = Constants.DIAS_KEYS.get(dia_nombre)
-                        if not dia_key:
-                            continue
-                        campo = fila_actual.find_element(By.CSS_SELECTOR, Selectors.campo_horas_dia(dia_key))
-                        valor = campo.get_attribute("value") or "0"
-                        try:
-                            valor_float = float(valor.replace(",", "."))
-                        except ValueError:
-                            valor_float = 0.0
-                        horas_existentes_por_dia[dia_nombre] += valor_float
-                    except:
-                        pass
-            except:
+        # Leer TODAS las filas con proyectos en una sola llamada
+        for fila_tabla in extraer_tabla_imputacion(driver):
+            if not fila_tabla["proyecto"] or fila_tabla["proyecto"] == "Seleccione opción":
                 continue
+            for dia_nombre in horas_existentes_por_dia.keys():
+                dia_key = Constants.DIAS_KEYS.get(dia_nombre)
+                horas_existentes_por_dia[dia_nombre] += fila_tabla["horas"].get(dia_key, 0.0)
         
         print(f"[DEBUG]  Horas existentes por día: {horas_existentes_por_dia}")
         
-        #  PASO 2: Imputar solo en días SIN horas existentes
+        #  PASO 2: Imputar solo en días SIN horas existentes, todos de una vez
+        objetivo = {}
         for dia_nombre, valor in Constants.HORAS_SEMANA_DEFAULT.items():
-            try:
-                # Verificar si el día ya tiene horas de otro proyecto
-                horas_dia_existentes = horas_existentes_por_dia.get(dia_nombre, 0)
-                
-                if horas_dia_existentes > 0:
-                    print(f"[DEBUG] ⏭️ {dia_nombre}: ya tiene {horas_dia_existentes}h, omitiendo")
-                    dias_omitidos.append(f"{dia_nombre} (ya tiene {horas_dia_existentes}h)")
-                    continue
-                
-                dia_key = Constants.DIAS_KEYS[dia_nombre]
-                campo = fila.find_element(By.CSS_SELECTOR, Selectors.campo_horas_dia(dia_key))
-                
-                if campo.is_enabled():
-                    # Hacer scroll y click
-                    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", campo)
-                    campo.click()
-                    time.sleep(0.1)
-                    
-                    # Limpiar y escribir
-                    campo.send_keys(Keys.CONTROL + "a")
-                    campo.send_keys(Keys.DELETE)
-                    campo.send_keys(str(valor))
-                    
+            # Verificar si el día ya tiene horas de otro proyecto
+            horas_dia_existentes = horas_existentes_por_dia.get(dia_nombre, 0)
+            
+            if horas_dia_existentes > 0:
+                print(f"[DEBUG] ⏭️ {dia_nombre}: ya tiene {horas_dia_existentes}h, omitiendo")
+                dias_omitidos.append(f"{dia_nombre} (ya tiene {horas_dia_existentes}h)")
+                continue
+            objetivo[dia_nombre] = valor
+        
+        if objetivo:
+            fila_idx = indices_filas(driver, [fila])[0]
+            if fila_idx is None:
+                return "No he podido localizar la línea del proyecto en la tabla"
+            
+            resultado = aplicar_cambios_tabla(driver, wait, {fila_idx: objetivo})
+            escritos = {dia_key for _, dia_key, _ in resultado["escritos"]}
+            
+            for dia_nombre, valor in objetivo.items():
+                if Constants.DIAS_KEYS[dia_nombre] in escritos:
                     dias_imputados.append(f"{dia_nombre} ({valor}h)")
                     print(f"[DEBUG]  {dia_nombre}: imputado {valor}h")
-                    time.sleep(0.1)
                 else:
                     print(f"[DEBUG] ⏭️ {dia_nombre}: campo deshabilitado")
                     dias_omitidos.append(f"{dia_nombre} (bloqueado)")
-            except Exception as e:
-                print(f"[DEBUG]  Error en {dia_nombre}: {e}")
-                pass
-        
-        #  CRÍTICO: Después de modificar TODOS los días, salir del último input
-        # para que la tabla se actualice correctamente antes de guardar
-        if dias_imputados:
-            try:
-                # Enviar TAB para salir del último campo
-                driver.switch_to.active_element.send_keys(Keys.TAB)
-                time.sleep(0.5)  # Dar tiempo a que la tabla se actualice
-            except:
-                pass
 
         if dias_imputados:
             dias_texto = ", ".join(dias_imputados)
@@ -993,64 +1004,35 @@ def borrar_todas_horas_dia(driver, wait, dia):
         return f"No reconozco el día '{dia}'"
 
     try:
-        # Buscar TODAS las filas de proyectos
-        selects = driver.find_elements(By.CSS_SELECTOR, "select[name*='subproyecto']")
-        if not selects:
-            selects = driver.find_elements(By.CSS_SELECTOR, "select[id*='subproyecto']")
+        cache_semanas.invalidar_pantalla(driver)  # Cambios sin guardar en la semana en pantalla
+        # Leer el estado de TODAS las filas en una sola llamada
+        objetivo = {}
+        nombres = {}
         
-        proyectos_modificados = []
-        
-        for idx, sel in enumerate(selects):
-            try:
-                # Obtener el nombre del proyecto
-                proyecto_nombre = driver.execute_script("""
-                    var select = arguments[0];
-                    var selectedOption = select.options[select.selectedIndex];
-                    return selectedOption ? selectedOption.text : '';
-                """, sel)
-                
-                if not proyecto_nombre or proyecto_nombre == "Seleccione opción":
-                    continue
-                
-                # Extraer solo el nombre del proyecto (última parte)
-                partes = proyecto_nombre.split(' - ')
-                nombre_corto = partes[-1].strip() if partes else proyecto_nombre
-                
-                # Buscar la fila
-                fila = sel.find_element(By.XPATH, "./ancestor::tr")
-                
-                # Buscar el campo de horas del día
-                campo = fila.find_element(By.CSS_SELECTOR, Selectors.campo_horas_dia(dia_clave))
-                
-                if campo.is_enabled():
-                    valor_actual = campo.get_attribute("value") or "0"
-                    try:
-                        valor_actual = float(valor_actual.replace(",", "."))
-                    except ValueError:
-                        valor_actual = 0.0
-                    
-                    # Solo modificar si tenía horas
-                    if valor_actual > 0:
-                        campo.click()
-                        campo.send_keys(Keys.CONTROL + "a")
-                        campo.send_keys("0")
-                        proyectos_modificados.append(f"{nombre_corto} ({valor_actual}h)")
-                        time.sleep(0.1)
+        for fila_tabla in extraer_tabla_imputacion(driver):
+            proyecto_nombre = fila_tabla["proyecto"]
+            if not proyecto_nombre or proyecto_nombre == "Seleccione opción":
+                continue
             
-            except Exception as e:
-                print(f"[DEBUG]  Error procesando línea {idx+1}: {e}")
+            # Solo modificar si tenía horas y el campo es editable
+            valor_actual = fila_tabla["horas"].get(dia_clave, 0.0)
+            if valor_actual <= 0 or not fila_tabla["habilitados"].get(dia_clave):
                 continue
+            
+            # Extraer solo el nombre del proyecto (última parte)
+            partes = proyecto_nombre.split(' - ')
+            nombre_corto = partes[-1].strip() if partes else proyecto_nombre
+            
+            objetivo[fila_tabla["fila_idx"]] = {dia_clave: 0}
+            nombres[fila_tabla["fila_idx"]] = f"{nombre_corto} ({valor_actual}h)"
+        
+        # Poner a 0 todos los campos en una sola escritura
+        proyectos_modificados = []
+        if objetivo:
+            resultado = aplicar_cambios_tabla(driver, wait, objetivo)
+            proyectos_modificados = [nombres[idx] for idx, _, _ in resultado["escritos"]]
         
-        #  CRÍTICO: Después de modificar todos los campos, salir del último input
-        # para que la tabla se actualice correctamente antes de guardar
         if proyectos_modificados:
-            try:
-                # Enviar TAB para salir del último campo
-                driver.switch_to.active_element.send_keys(Keys.TAB)
-                time.sleep(0.5)  # Dar tiempo a que la tabla se actualice
-            except:
-                pass
-            
             proyectos_texto = ", ".join(proyectos_modificados)
             return f"He borrado las horas del {dia} en: {proyectos_texto}"
         else:
@@ -1060,11 +1042,139 @@ def borrar_todas_horas_dia(driver, wait, dia):
         return f"No he podido borrar las horas del {dia}: {e}"
 
 
+# Script de extracción de la tabla completa en UNA sola llamada a execute_script.
+# Devuelve, por cada fila con select de subproyecto: índice, texto del proyecto,
+# estado deshabilitado y los valores/estado de los 5 campos de día (h1..h5).
+_JS_EXTRAER_TABLA = """
+    var selects = document.querySelectorAll("select[name*='subproyecto']");
+    if (!selects.length) {
+        selects = document.querySelectorAll("select[id*='subproyecto']");
+    }
+    var filas = [];
+    for (var i = 0; i < selects.length; i++) {
+        var sel = selects[i];
+        var opcion = sel.options[sel.selectedIndex];
+        var tr = sel.closest('tr');
+        var valores = {};
+        var habilitados = {};
+        for (var d = 1; d <= 5; d++) {
+            var campo = tr ? tr.querySelector("input[id$='.h" + d + "']") : null;
+            valores['h' + d] = campo ? (campo.value || '0') : '0';
+            habilitados['h' + d] = campo ? !(campo.disabled || campo.readOnly) : false;
+        }
+        filas.push({
+            indice: i,
+            proyecto: opcion ? opcion.text : '',
+            deshabilitado: sel.disabled,
+            valores: valores,
+            habilitados: habilitados
+        });
+    }
+    return filas;
+"""
+
+
+def _parsear_horas(valor):
+    """Convierte el valor de un input de horas ('8,5', '', None) a float."""
+    try:
+        return float(str(valor or "0").replace(",", "."))
+    except ValueError:
+        return 0.0
+
+
+def extraer_tabla_imputacion(driver):
+    """
+    Extrae el grid de imputación completo con una única llamada JavaScript.
+    
+    Sustituye al recorrido select a select (execute_script + find_element +
+    get_attribute por cada celda), que costaba decenas de round-trips al
+    driver por cada lectura de la semana.
+    
+    Args:
+        driver: WebDriver de Selenium
+        
+    Returns:
+        list: Una entrada por fila con select de subproyecto (incluidas las vacías):
+              [
+                  {
+                      "fila_idx": 0,
+                      "proyecto": "Arelance - Departamento - Proyecto",
+                      "deshabilitado": False,
+                      "horas": {"h1": 8.5, "h2": 0.0, ...},
+                      "habilitados": {"h1": True, "h2": False, ...}
+                  },
+                  ...
+              ]
+    """
+    filas = driver.execute_script(_JS_EXTRAER_TABLA) or []
+    
+    resultado = []
+    for fila in filas:
+        valores = fila.get("valores") or {}
+        resultado.append({
+            "fila_idx": fila.get("indice", len(resultado)),
+            "proyecto": (fila.get("proyecto") or "").strip(),
+            "deshabilitado": bool(fila.get("deshabilitado")),
+            "horas": {k: _parsear_horas(v) for k, v in valores.items()},
+            "habilitados": fila.get("habilitados") or {},
+        })
+    return resultado
+
+
+def convertir_filas_tabla(filas):
+    """
+    Convierte las filas de extraer_tabla_imputacion() (claves h1..h5) al
+    formato por nombre de día de leer_tabla_imputacion(), descartando las
+    líneas sin proyecto. La usa también el lector HTTP (lector_http.py).
+    """
+    print(f"[DEBUG]  Leyendo tabla... Encontrados {len(filas)} proyectos")
+    
+    proyectos_info = []
+    
+    for fila in filas:
+        proyecto_nombre = fila["proyecto"]
+        
+        if not proyecto_nombre or proyecto_nombre == "Seleccione opción":
+            print(f"[DEBUG]   Proyecto {fila['fila_idx']+1}: Sin selección")
+            continue
+        
+        # Mantener las claves de DIAS_KEYS (con y sin acento) por compatibilidad
+        horas_dias = {
+            dia_nombre: fila["horas"].get(dia_key, 0.0)
+            for dia_nombre, dia_key in Constants.DIAS_KEYS.items()
+        }
+        dias_habilitados = {
+            dia_nombre: bool(fila["habilitados"].get(dia_key, False))
+            for dia_nombre, dia_key in Constants.DIAS_KEYS.items()
+        }
+        
+        # Total sobre los 5 campos reales (h1..h5), sin contar miércoles dos veces
+        total_horas = sum(fila["horas"].values())
+        
+        print(f"[DEBUG]   Proyecto {fila['fila_idx']+1}: {proyecto_nombre} ({total_horas}h)")
+        
+        # INCLUIR PROYECTO AUNQUE TENGA 0 HORAS (FIX)
+        proyectos_info.append({
+            "proyecto": proyecto_nombre,
+            "horas": horas_dias,
+            "total": total_horas,
+            "fila_idx": fila["fila_idx"],
+            "deshabilitado": fila["deshabilitado"],
+            "dias_habilitados": dias_habilitados,
+        })
+    
+    print(f"[DEBUG]  Lectura completa: {len(proyectos_info)} proyectos procesados")
+    return proyectos_info
+
+
 def leer_tabla_imputacion(driver):
     """
     Lee toda la información de la tabla de imputación actual.
     Devuelve una lista de diccionarios con los proyectos y sus horas.
     
+    Usa extraer_tabla_imputacion() (una sola llamada JS) en lugar de
+    consultar cada celda por separado.
+    
     Args:
         driver: WebDriver de Selenium
         
@@ -1074,73 +1184,16 @@ def leer_tabla_imputacion(driver):
                   {
                       "proyecto": "Nombre del proyecto",
                       "horas": {"lunes": 8.5, "martes": 8.5, ...},
-                      "total": 42.5
+                      "total": 42.5,
+                      "fila_idx": 0,
+                      "deshabilitado": False,
+                      "dias_habilitados": {"lunes": True, ...}
                   },
                   ...
               ]
     """
     try:
-        # Buscar todas las filas con proyectos
-        selects = driver.find_elements(By.CSS_SELECTOR, "select[name*='subproyecto']")
-        
-        if not selects:
-            selects = driver.find_elements(By.CSS_SELECTOR, "select[id*='subproyecto']")
-        
-        print(f"[DEBUG]  Leyendo tabla... Encontrados {len(selects)} proyectos")
-        
-        proyectos_info = []
-        
-        for idx, sel in enumerate(selects):
-            # Leer el proyecto seleccionado
-            try:
-                proyecto_nombre = driver.execute_script("""
-                    var select = arguments[0];
-                    var selectedOption = select.options[select.selectedIndex];
-                    return selectedOption ? selectedOption.text : '';
-                """, sel)
-                
-                if not proyecto_nombre or proyecto_nombre == "Seleccione opción":
-                    print(f"[DEBUG]   Proyecto {idx+1}: Sin selección")
-                    continue
-                
-                print(f"[DEBUG]   Proyecto {idx+1}: {proyecto_nombre}")
-                
-                # Buscar la fila correspondiente
-                fila = sel.find_element(By.XPATH, "./ancestor::tr")
-                
-                # Leer las horas de cada día
-                horas_dias = {}
-                
-                for dia_nombre, dia_key in Constants.DIAS_KEYS.items():
-                    try:
-                        campo = fila.find_element(By.CSS_SELECTOR, Selectors.campo_horas_dia(dia_key))
-                        valor = campo.get_attribute("value") or "0"
-                        try:
-                            valor_float = float(valor.replace(",", "."))
-                        except ValueError:
-                            valor_float = 0.0
-                        horas_dias[dia_nombre] = valor_float
-                    except:
-                        horas_dias[dia_nombre] = 0.0
-                
-                # Calcular total
-                total_horas = sum(horas_dias.values())
-                
-                print(f"[DEBUG]     Total horas: {total_horas}")
-                
-                # INCLUIR PROYECTO AUNQUE TENGA 0 HORAS (FIX)
-                proyectos_info.append({
-                    "proyecto": proyecto_nombre,
-                    "horas": horas_dias,
-                    "total": total_horas
-                })
-            
-            except Exception as e:
-                print(f"[DEBUG]  Error leyendo proyecto {idx}: {e}")
-                continue
-        
-        print(f"[DEBUG]  Lectura completa: {len(proyectos_info)} proyectos procesados")
-        return proyectos_info
+        return convertir_filas_tabla(extraer_tabla_imputacion(driver))
     
     except Exception as e:
         print(f"[DEBUG]  Error leyendo tabla: {e}")
@@ -1149,6 +1202,148 @@ def leer_tabla_imputacion(driver):
         return []
 
 
+# Escritura en bloque: aplica una lista de cambios [[fila_idx, 'hN', 'valor'], ...]
+# en UNA llamada a execute_script. Localiza las filas igual que _JS_EXTRAER_TABLA
+# y dispara los mismos eventos que teclear en el campo y salir de él.
+_JS_ESCRIBIR_CAMPOS = """
+    var cambios = arguments[0];
+    var selects = document.querySelectorAll("select[name*='subproyecto']");
+    if (!selects.length) {
+        selects = document.querySelectorAll("select[id*='subproyecto']");
+    }
+    var escritos = [], omitidos = [];
+    for (var i = 0; i < cambios.length; i++) {
+        var idx = cambios[i][0], dia = cambios[i][1], valor = cambios[i][2];
+        var tr = selects[idx] ? selects[idx].closest('tr') : null;
+        var campo = tr ? tr.querySelector("input[id$='." + dia + "']") : null;
+        if (!campo) { omitidos.push([idx, dia, 'sin_campo']); continue; }
+        if (campo.disabled || campo.readOnly) { omitidos.push([idx, dia, 'bloqueado']); continue; }
+        // Campo oculto = día de otro mes en una semana partida (no interactuable)
+        if (campo.offsetParent === null) { omitidos.push([idx, dia, 'no_interactuable']); continue; }
+        campo.focus();
+        campo.value = valor;
+        campo.dispatchEvent(new Event('input', {bubbles: true}));
+        campo.dispatchEvent(new KeyboardEvent('keyup', {bubbles: true}));
+        campo.dispatchEvent(new Event('change', {bubbles: true}));
+        campo.blur();
+        escritos.push([idx, dia, valor]);
+    }
+    return {escritos: escritos, omitidos: omitidos};
+"""
+
+# Índice (orden de los selects de subproyecto) de cada <tr> recibido; -1 si no está
+_JS_INDICES_FILAS = """
+    var selects = document.querySelectorAll("select[name*='subproyecto']");
+    if (!selects.length) {
+        selects = document.querySelectorAll("select[id*='subproyecto']");
+    }
+    return arguments[0].map(function (tr) {
+        for (var i = 0; i < selects.length; i++) {
+            if (tr.contains(selects[i])) { return i; }
+        }
+        return -1;
+    });
+"""
+
+_CLAVES_CAMPO = ("h1", "h2", "h3", "h4", "h5")
+
+
+def indices_filas(driver, filas):
+    """
+    Traduce elementos <tr> (los que devuelve seleccionar_proyecto) al fila_idx
+    de extraer_tabla_imputacion(), con una sola llamada JS.
+
+    Returns:
+        list: Un índice por fila, o None si la fila ya no está en la página
+    """
+    if not filas:
+        return []
+    try:
+        indices = driver.execute_script(_JS_INDICES_FILAS, list(filas)) or []
+    except Exception as e:
+        # Alguna fila obsoleta (la tabla se ha recargado)
+        print(f"[DEBUG]  No se pudieron resolver las filas: {e}")
+        return [None] * len(filas)
+    return [i if isinstance(i, int) and i >= 0 else None for i in indices]
+
+
+def aplicar_cambios_tabla(driver, wait, objetivo, guardar=False):
+    """
+    Aplica de una vez una rejilla de horas objetivo sobre la semana en pantalla.
+
+    Compara `objetivo` con la tabla actual (extraer_tabla_imputacion) y escribe
+    SOLO los campos que cambian, todos en una llamada JS que dispara los eventos
+    de teclear y salir del campo. Después espera una sola vez a que la tabla
+    recalcule y, si se pide, guarda una sola vez.
+
+    Sustituye al bucle scroll + click + Ctrl+A + send_keys + TAB por campo.
+
+    Args:
+        driver: WebDriver de Selenium
+        wait: WebDriverWait configurado
+        objetivo: {fila_idx: {dia: horas}} - el día por nombre ("lunes",
+                  "miércoles"...) o por clave de campo ("h1".."h5")
+        guardar: True para pulsar Guardar al terminar
+
+    Returns:
+        dict: {
+            "escritos": [(fila_idx, "h1", 8.5), ...],
+            "omitidos": [(fila_idx, "h3", motivo), ...],  # bloqueado, no_interactuable, sin_fila, sin_campo
+            "sin_cambios": 3,   # celdas que ya tenían ese valor
+            "guardado": None    # mensaje de guardar_linea si guardar=True y hubo cambios
+        }
+    """
+    cache_semanas.invalidar_pantalla(driver)  # Cambios sin guardar en la semana en pantalla
+
+    actuales = {f["fila_idx"]: f for f in extraer_tabla_imputacion(driver)}
+    cambios = {}  # (fila_idx, dia_key) -> valor; deduplica "miércoles"/"miercoles"
+    omitidos = []
+    sin_cambios = 0
+
+    for fila_idx, dias in objetivo.items():
+        actual = actuales.get(fila_idx)
+        for dia, horas in dias.items():
+            dia_key = dia if dia in _CLAVES_CAMPO else Constants.DIAS_KEYS.get(str(dia).lower())
+            if not dia_key or (fila_idx, dia_key) in cambios:
+                continue
+            if actual is None:
+                omitidos.append((fila_idx, dia_key, "sin_fila"))
+                continue
+            horas = round(float(horas), 2)
+            if abs(actual["horas"].get(dia_key, 0.0) - horas) < 0.001:
+                sin_cambios += 1
+                continue
+            if not actual["habilitados"].get(dia_key):
+                omitidos.append((fila_idx, dia_key, "bloqueado"))
+                continue
+            cambios[(fila_idx, dia_key)] = horas
+
+    escritos = []
+    if cambios:
+        resultado = driver.execute_script(
+            _JS_ESCRIBIR_CAMPOS,
+            [[idx, key, str(horas)] for (idx, key), horas in cambios.items()]
+        ) or {}
+        escritos = [(idx, key, cambios[(idx, key)]) for idx, key, _ in resultado.get("escritos", [])]
+        omitidos.extend(tuple(o) for o in resultado.get("omitidos", []))
+        esperar_dom_estable(driver, "escritura_lote", legacy=0.5)  # La tabla recalcula totales
+
+    print(f"[DEBUG] ✍️ Escritura en bloque: {len(escritos)} campos escritos, "
+          f"{len(omitidos)} omitidos, {sin_cambios} sin cambios")
+
+    guardado = None
+    if guardar and escritos:
+        from web_automation.interactions import guardar_linea
+        guardado = guardar_linea(driver, wait)
+
+    return {
+        "escritos": escritos,
+        "omitidos": omitidos,
+        "sin_cambios": sin_cambios,
+        "guardado": guardado,
+    }
+
+
 def copiar_semana_anterior(driver, wait, contexto=None):
     """
     Copia el horario de la semana anterior a la semana actual.
@@ -1156,10 +1351,8 @@ def copiar_semana_anterior(driver, wait, contexto=None):
     Proceso:
     1. Va a la semana pasada y lee todos los proyectos con sus horas
     2. Vuelve a la semana actual
-    3. Para cada proyecto de la semana pasada:
-       - Selecciona/crea el proyecto
-       - Imputa las mismas horas en los mismos días
-    4. Guarda al final
+    3. Selecciona/crea cada proyecto de la semana pasada
+    4. Escribe todas las horas en bloque (aplicar_cambios_tabla) y guarda una vez
     
     Args:
         driver: WebDriver de Selenium
@@ -1171,7 +1364,6 @@ def copiar_semana_anterior(driver, wait, contexto=None):
     """
     from datetime import datetime, timedelta
     from web_automation.navigation import seleccionar_fecha, lunes_de_semana
-    from web_automation.interactions import guardar_linea
     
     try:
         # Calcular fechas
@@ -1191,7 +1383,7 @@ def copiar_semana_anterior(driver, wait, contexto=None):
         resultado_fecha = seleccionar_fecha(driver, lunes_pasado, contexto_nav)
         print(f"[DEBUG]  {resultado_fecha}")
         
-        time.sleep(1.5)  # Esperar a que cargue la tabla
+        esperar_tabla_imputacion(driver, "copiar_semana", legacy=1.5)  # Esperar a que cargue la tabla
         
         # Leer los proyectos de la semana pasada
         proyectos_semana_pasada = leer_tabla_imputacion(driver)
@@ -1237,18 +1429,18 @@ def copiar_semana_anterior(driver, wait, contexto=None):
         resultado_fecha = seleccionar_fecha(driver, lunes_actual, contexto_nav)
         print(f"[DEBUG]  {resultado_fecha}")
         
-        time.sleep(1.5)  # Esperar a que cargue la tabla
+        esperar_tabla_imputacion(driver, "copiar_semana", legacy=1.5)  # Esperar a que cargue la tabla
         
         # =====================================================
-        # PASO 3: Copiar cada proyecto con sus horas
+        # PASO 3: Seleccionar/crear cada proyecto
         # =====================================================
         proyectos_copiados = []
         errores = []
+        seleccionados = []  # (proyecto, fila)
         
         for proyecto in proyectos_a_copiar:
             nombre = proyecto['nombre']
             nodo_padre = proyecto['nodo_padre']
-            horas = proyecto['horas']
             
             print(f"[DEBUG]  Copiando proyecto '{nombre}'...")
             
@@ -1269,25 +1461,7 @@ def copiar_semana_anterior(driver, wait, contexto=None):
                     errores.append(f"{nombre} ({mensaje})")
                     continue
                 
-                # Imputar las horas de cada día
-                dias_imputados = []
-                for dia_nombre, valor in horas.items():
-                    if valor > 0:
-                        resultado = imputar_horas_dia(
-                            driver, wait, dia_nombre, valor, fila, nombre, modo="establecer"
-                        )
-                        dias_imputados.append(f"{dia_nombre}: {valor}h")
-                        print(f"[DEBUG]    {dia_nombre}: {valor}h")
-                
-                if dias_imputados:
-                    # Calcular total de este proyecto
-                    total_proyecto = sum(v for v in horas.values() if v > 0)
-                    
-                    proyectos_copiados.append({
-                        'nombre': nombre,
-                        'total': total_proyecto,
-                        'dias': dias_imputados
-                    })
+                seleccionados.append((proyecto, fila))
                     
             except Exception as e:
                 print(f"[DEBUG]  Error copiando '{nombre}': {e}")
@@ -1295,12 +1469,49 @@ def copiar_semana_anterior(driver, wait, contexto=None):
                 continue
         
         # =====================================================
-        # PASO 4: Guardar
+        # PASO 4: Escribir todas las horas de una vez y guardar
         # =====================================================
-        if proyectos_copiados:
-            print(f"[DEBUG] 💾 Guardando...")
-            resultado_guardar = guardar_linea(driver, wait)
-            print(f"[DEBUG] {resultado_guardar}")
+        if seleccionados:
+            # Las filas pueden haber quedado obsoletas si la tabla se recargó al
+            # añadir líneas: en ese caso se localizan por el texto del proyecto
+            indices = indices_filas(driver, [fila for _, fila in seleccionados])
+            if any(i is None for i in indices):
+                por_nombre = {
+                    f["proyecto"]: f["fila_idx"] for f in extraer_tabla_imputacion(driver)
+                }
+                indices = [
+                    i if i is not None else por_nombre.get(proyecto['path_completo'])
+                    for i, (proyecto, _) in zip(indices, seleccionados)
+                ]
+            
+            objetivo = {}
+            for fila_idx, (proyecto, _) in zip(indices, seleccionados):
+                if fila_idx is None:
+                    errores.append(f"{proyecto['nombre']} (no encontré su línea)")
+                    continue
+                objetivo[fila_idx] = {
+                    dia: valor for dia, valor in proyecto['horas'].items() if valor > 0
+                }
+            
+            print(f"[DEBUG] 💾 Escribiendo {len(objetivo)} proyecto(s) y guardando...")
+            resultado = aplicar_cambios_tabla(driver, wait, objetivo, guardar=True)
+            print(f"[DEBUG] {resultado['guardado']}")
+            
+            bloqueados = {idx for idx, _, _ in resultado["omitidos"]}
+            for fila_idx, (proyecto, _) in zip(indices, seleccionados):
+                if fila_idx is None:
+                    continue
+                horas = objetivo[fila_idx]
+                dias_imputados = [
+                    f"{dia}: {valor}h" for dia, valor in horas.items() if dia != "miercoles"
+                ]
+                if fila_idx in bloqueados:
+                    print(f"[DEBUG]  '{proyecto['nombre']}': algún día bloqueado en esta semana")
+                proyectos_copiados.append({
+                    'nombre': proyecto['nombre'],
+                    'total': proyecto['total'],
+                    'dias': dias_imputados
+                })
         
         # =====================================================
         # Generar mensaje de resultado
@@ -1308,7 +1519,7 @@ def copiar_semana_anterior(driver, wait, contexto=None):
         if proyectos_copiados:
             #  Leer la tabla DESPUÉS de copiar para obtener el total REAL
             # (misma lógica que consultar_semana)
-            time.sleep(1)  # Esperar a que se actualice la tabla
+            esperar_dom_estable(driver, "copiar_semana_guardado", legacy=1)  # Esperar a que se actualice la tabla
             proyectos_actuales = leer_tabla_imputacion(driver)
             
             # Calcular totales por día (igual que consultar_semana)